@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Reports what random eldritch games allocate.
+
+Plays a number of seeded games with random moves up to a given turn and prints the events created
+by class (see simulation.EventCounter), the number of garbage collections run in each generation,
+and the peak memory traced by tracemalloc. The peak includes the games themselves, since each game
+is kept until the next one is started. Tracing makes the games much slower; --no-trace skips it.
+"""
+
+import argparse
+import gc
+import os
+import random
+import resource
+import sys
+import time
+import tracemalloc
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import simulation
+
+
+def PlayGames(games, seed, players, until_turn):
+  moves = 0
+  for game_seed in range(seed, seed + games):
+    rng = random.Random(game_seed)
+    state = simulation.NewGame(players, rng)
+    try:
+      for _ in simulation.PlayMoves(
+          state, simulation.RandomPolicy(rng), rng, until_turn, max_moves=5000,
+      ):
+        moves += 1
+    except Exception:  # pylint: disable=broad-except
+      pass  # Random play runs into unrelated bugs; count what was created until then.
+  return moves
+
+
+def main(games, seed, players, until_turn, trace, top):
+  if trace:
+    tracemalloc.start()
+  gc.collect()
+  before = [stats["collections"] for stats in gc.get_stats()]
+  start = time.perf_counter()
+  with simulation.EventCounter() as counter:
+    moves = PlayGames(games, seed, players, until_turn)
+  seconds = time.perf_counter() - start
+  collections = [stats["collections"] - old for stats, old in zip(gc.get_stats(), before)]
+  print(f"{games} games with {players} players to turn {until_turn}: {moves} moves, {seconds:.2f}s")
+  print(f"  events created: {counter.events}, event logs: {counter.counts['EventLog']}")
+  for name, count in counter.counts.most_common(top + 1):
+    if name != "EventLog":
+      print(f"    {name:24} {count:8}")
+  print(f"  gc collections: {' / '.join(str(count) for count in collections)}")
+  if trace:
+    print(f"  peak traced memory: {tracemalloc.get_traced_memory()[1] / 1e6:.2f} MB")
+  print(f"  max rss: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1e3:.1f} MB")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--games", type=int, default=10)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--players", type=int, default=4)
+  parser.add_argument("--turns", type=int, default=12)
+  parser.add_argument("--top", type=int, default=12)
+  parser.add_argument("--no-trace", dest="trace", action="store_false")
+  flags = parser.parse_args()
+  main(flags.games, flags.seed, flags.players, flags.turns, flags.trace, flags.top)
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""Measures eldritch engine throughput by playing whole games without clients.
+
+Games are played with eldritch.simulation across a pool of worker processes, each game from its
+own seed, so the same arguments play the same games on every run. Reports moves and resolved
+events per second, how the games ended, and where resolve() time went by event class. Use --json
+to save the numbers for comparing runs.
+
+Moves per second is per core: total moves divided by the time spent inside games. Games per
+minute counts wall time, so it grows with --processes.
+"""
+
+import argparse
+import collections
+import functools
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import simulation
+
+
+def Summarize(results, wall_seconds):
+  game_seconds = sum(result.seconds for result in results)
+  moves = sum(result.moves for result in results)
+  event_counts = collections.Counter()
+  event_seconds = collections.Counter()
+  for result in results:
+    event_counts.update(result.event_counts)
+    event_seconds.update(result.event_seconds)
+  return {
+      "games": len(results),
+      "wall_seconds": wall_seconds,
+      "game_seconds": game_seconds,
+      "games_per_minute": 60 * len(results) / wall_seconds,
+      "moves": moves,
+      "moves_per_second": moves / game_seconds,
+      "events": sum(event_counts.values()),
+      "events_per_second": sum(event_counts.values()) / game_seconds,
+      "turns": sum(result.turns for result in results),
+      "outcomes": dict(collections.Counter(result.outcome for result in results)),
+      "event_classes": {
+          name: {"count": event_counts[name], "seconds": seconds}
+          for name, seconds in event_seconds.most_common()
+      },
+  }
+
+
+def PrintSummary(summary, results, top):
+  print(
+      f"{summary['games']} games in {summary['wall_seconds']:.1f}s "
+      f"({summary['games_per_minute']:.0f} games/minute), {summary['turns']} turns"
+  )
+  print("outcomes: " + ", ".join(f"{name} {count}" for name, count in summary["outcomes"].items()))
+  print(
+      f"{summary['moves']} moves, {summary['moves_per_second']:.0f} moves/s; "
+      f"{summary['events']} events, {summary['events_per_second']:.0f} events/s"
+  )
+  errors = collections.Counter(result.error for result in results if result.outcome == "error")
+  for error, count in errors.most_common(5):
+    print(f"  {count:4} x {error}")
+  print(f"\n{'event class':32} {'count':>9} {'total ms':>10} {'us/call':>9} {'share':>6}")
+  total = sum(entry["seconds"] for entry in summary["event_classes"].values()) or 1
+  for name, entry in list(summary["event_classes"].items())[:top]:
+    print(
+        f"{name:32} {entry['count']:9} {entry['seconds'] * 1000:10.1f} "
+        f"{entry['seconds'] * 1e6 / entry['count']:9.1f} {entry['seconds'] / total:6.1%}"
+    )
+
+
+def main(games, players, policy, processes, seed, max_moves, top, json_path):
+  run = functools.partial(simulation.RunGame, players=players, policy=policy, max_moves=max_moves)
+  start = time.perf_counter()
+  if processes == 1:
+    results = [run(game_seed) for game_seed in range(seed, seed + games)]
+  else:
+    with multiprocessing.Pool(processes) as pool:
+      results = list(pool.imap_unordered(run, range(seed, seed + games)))
+  wall_seconds = time.perf_counter() - start
+  results.sort(key=lambda result: result.seed)
+
+  summary = Summarize(results, wall_seconds)
+  summary.update({
+      "players": players, "policy": policy, "processes": processes, "seed": seed,
+      "max_moves": max_moves,
+  })
+  print(f"eldritch, {players} players, {policy} policy, {processes} processes, seeds {seed}+")
+  PrintSummary(summary, results, top)
+  if json_path:
+    with open(json_path, "w", encoding="utf-8") as output:
+      json.dump(summary, output, indent=2)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--games", type=int, default=100)
+  parser.add_argument("--players", type=int, default=4)
+  parser.add_argument("--policy", choices=sorted(simulation.POLICIES), default="random")
+  parser.add_argument("--processes", type=int, default=os.cpu_count())
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--max-moves", type=int, default=20000)
+  parser.add_argument("--top", type=int, default=25, help="Show this many event classes")
+  parser.add_argument("--json", default=None, metavar="PATH", help="Also write a JSON summary")
+  flags = parser.parse_args()
+  main(
+      flags.games, flags.players, flags.policy, flags.processes, flags.seed, flags.max_moves,
+      flags.top, flags.json,
+  )
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""HTTP load test for server.py.
+
+Start a server (e.g. `./server.py --http-port 8001`), then run this against it. To compare two
+versions of the server, check the other one out with `git worktree add` and run both in turn on
+the same port. Reports requests/sec and latency percentiles for each path.
+"""
+
+import argparse
+import asyncio
+import time
+import urllib.parse
+
+
+async def Fetch(reader, writer, host, path, keep_alive):
+  connection = "keep-alive" if keep_alive else "close"
+  request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\nConnection: {connection}\r\n\r\n"
+  writer.write(request.encode("latin-1"))
+  await writer.drain()
+  head = await reader.readuntil(b"\r\n\r\n")
+  status = int(head.split(b" ", 2)[1])
+  length = None
+  for line in head.split(b"\r\n")[1:]:
+    name, _, value = line.partition(b":")
+    if name.strip().lower() == b"content-length":
+      length = int(value)
+  if length is None:
+    await reader.read()
+  else:
+    await reader.readexactly(length)
+  return status
+
+
+async def Worker(host, port, path, deadline, keep_alive, latencies, errors):
+  conn = None
+  while time.perf_counter() < deadline:
+    start = time.perf_counter()
+    try:
+      if conn is None:
+        conn = await asyncio.open_connection(host, port)
+      status = await Fetch(*conn, host, path, keep_alive)
+    except (OSError, asyncio.IncompleteReadError, ValueError):
+      status = None
+    if status != 200:
+      errors.append(status)
+    latencies.append(time.perf_counter() - start)
+    if conn is not None and (not keep_alive or status is None):
+      conn[1].close()
+      conn = None
+  if conn is not None:
+    conn[1].close()
+
+
+def Percentile(values, pct):
+  return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def Run(url, concurrency, duration, keep_alive):
+  parsed = urllib.parse.urlparse(url)
+  path = parsed.path + ("?" + parsed.query if parsed.query else "")
+  latencies, errors = [], []
+  deadline = time.perf_counter() + duration
+  await asyncio.gather(*[
+      Worker(parsed.hostname, parsed.port or 80, path, deadline, keep_alive, latencies, errors)
+      for _ in range(concurrency)
+  ])
+  latencies.sort()
+  print(
+      f"{path:32} {len(latencies) / duration:9.1f} req/s"
+      f"  p50 {Percentile(latencies, 50) * 1000:7.2f} ms"
+      f"  p99 {Percentile(latencies, 99) * 1000:7.2f} ms"
+      f"  errors {len(errors)}"
+  )
+
+
+def main():
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--base", default="http://localhost:8001")
+  parser.add_argument(
+      "--paths", nargs="+", default=["/", "/eldritch/game.js", "/islanders/images/hex.png"])
+  parser.add_argument("--concurrency", type=int, default=32)
+  parser.add_argument("--duration", type=float, default=5)
+  parser.add_argument("--keep-alive", action="store_true")
+  flags = parser.parse_args()
+  for path in flags.paths:
+    asyncio.run(Run(flags.base + path, flags.concurrency, flags.duration, flags.keep_alive))
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+"""Times the islanders computations that walk the board.
+
+For each map, lays down a random network of roads and ships for a few players, then times
+the longest route calculation for every player, the edge type of every edge on the map (as used
+to find where roads and ships may go), json_for_player() and for_player(), which is what a player
+is sent, working out a player's legal moves from scratch, and working out who gets what for
+every dice total from the settlements and cities along the network. Also times building the whole
+network again one edge at a time, finding the builder's longest route after each edge as
+add_road() does. Finally, times the state sent to a lobby of four players before the game
+starts, for each scenario.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from islanders import islanders
+
+# pylint: disable=protected-access
+
+MAPS = {
+    "standard6": (islanders.StandardMap, "standard6.json"),
+    "shores4": (islanders.SeafarerShores, "shores4.json"),
+    "islands4": (islanders.SeafarerIslands, "islands4.json"),
+    "desert4": (islanders.SeafarerDesert, "desert4.json"),
+}
+
+
+def BoardEdges(state):
+  return sorted({
+      edge for tile in state.tiles for corner in tile.get_corner_locations()
+      for edge in corner.get_edges()
+  })
+
+
+def BuildNetworks(state, players, length, rng):
+  """Grows a network of up to length roads and ships for each player, one edge at a time."""
+  edges = [edge for edge in BoardEdges(state) if state._get_edge_type(edge) is not None]
+  for player in range(players):
+    state.add_player(f"color{player}", f"player{player}")
+  for player in range(players):
+    frontier = [rng.choice([edge for edge in edges if edge not in state.roads])]
+    built = 0
+    while frontier and built < length:
+      edge = frontier.pop(rng.randrange(len(frontier)))
+      edge_type = state._get_edge_type(edge)
+      if edge in state.roads or edge_type is None:
+        continue
+      road_type = rng.choice(["road", "ship"]) if edge_type.startswith("coast") else edge_type
+      state._add_road(islanders.Road(edge, road_type, player))
+      built += 1
+      corner = edge.corner_left
+      free = all(loc not in state.pieces for loc in [corner] + corner.get_adjacent_corners())
+      if built % 4 == 1 and free:
+        piece_type = "city" if built % 8 == 1 else "settlement"
+        state._add_piece(islanders.Piece(corner.x, corner.y, piece_type, player))
+      for corner in [edge.corner_left, edge.corner_right]:
+        frontier.extend(other for other in corner.get_edges() if other not in state.roads)
+  return edges
+
+
+def Bench(name, players, length, number, seed):
+  scenario, filename = MAPS[name]
+  state = islanders.IslandersState()
+  scenario.mutate_options(state.options)
+  scenario.load_file(state, filename)
+  BuildNetworks(state, players, length, random.Random(seed))
+  all_edges = BoardEdges(state)
+  # Player 0's turn, with enough to build anything.
+  state.game_phase = "main"
+  state.action_stack.clear()
+  state.player_data[0].cards.update({rsrc: 5 for rsrc in islanders.RESOURCES})
+
+  def LongestRoutes():
+    return [state._calculate_longest_road(player) for player in range(players)]
+
+  def EdgeTypes():
+    return [state._get_edge_type(edge) for edge in all_edges]
+
+  def LegalMoves():
+    state.legal_move_cache.clear()
+    return state.legal_moves(0)
+
+  def ForPlayer():
+    return state.for_player(0)
+
+  def Distribute():
+    return [state.calculate_resource_distribution((total - 1, 1)) for total in range(2, 13)]
+
+  def Rebuild():
+    roads = list(state.roads.values())
+    state.roads.clear()
+    state.route_lengths.clear()
+    for road in roads:
+      state._add_road(road)
+      state._calculate_longest_road(road.player)
+
+  routes = LongestRoutes()
+  sent = len(json.dumps(ForPlayer(), cls=islanders.CustomEncoder))
+  print(f"{name}: {len(state.tiles)} tiles, {len(all_edges)} edges, {len(state.roads)} roads and "
+        f"ships, {len(state.pieces)} settlements and cities, longest routes {routes}, "
+        f"{sent / 1e3:.1f} KB sent to a player")
+  for label, func in [
+      ("longest routes", LongestRoutes), ("edge types", EdgeTypes),
+      ("json_for_player", state.json_for_player), ("for_player", ForPlayer),
+      ("legal moves", LegalMoves), ("distribute", Distribute), ("rebuild", Rebuild),
+  ]:
+    seconds = min(timeit.repeat(func, number=number, repeat=3)) / number
+    print(f"  {label:16} {seconds * 1e6:9.1f} us")
+
+
+def BenchPreview(number):
+  lobby = islanders.IslandersGame()
+  for session in ["one", "two", "three", "four"]:
+    lobby.connect_user(session)
+    lobby.handle_join(session, {"name": session})
+  print("lobby of four players:")
+  for scenario in lobby.SCENARIOS:
+    lobby.handle_change_scenario("one", {"scenario": scenario})
+    seconds = min(timeit.repeat(lobby.public_state, number=number, repeat=3)) / number
+    print(f"  {scenario:24} {seconds * 1e6:9.1f} us")
+
+
+def main(maps, players, length, number, seed):
+  for name in maps:
+    Bench(name, players, length, number, seed)
+  BenchPreview(number)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--maps", nargs="+", choices=sorted(MAPS), default=list(MAPS))
+  parser.add_argument("--players", type=int, default=3)
+  parser.add_argument("--length", type=int, default=15)
+  parser.add_argument("--number", type=int, default=200)
+  parser.add_argument("--seed", type=int, default=0)
+  flags = parser.parse_args()
+  main(flags.maps, flags.players, flags.length, flags.number, flags.seed)
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Measures how far behind the event loop falls while games are busy.
+
+Keeps some eldritch games busy by loading a mid-game save into them over and over, each with a few
+connected websockets, and meanwhile wakes up a task every --interval seconds, as the lobby ticker
+and websocket keepalives do. Reports how late that task woke up, and how many loads were done.
+While games run on the event loop, every load holds up the loop for as long as it takes.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import simulation
+import game
+
+
+class NullWebsocket:
+
+  async def send(self, data):
+    pass
+
+
+class NullHttpHandler:
+
+  def __init__(self):
+    self.wfile = self
+
+  def send_response(self, code):
+    pass
+
+  def end_headers(self):
+    pass
+
+  def send_error(self, code, message=None):
+    raise RuntimeError(f"{code}: {message}")
+
+  def write(self, data):
+    pass
+
+
+def MidGameSave(seed, turns):
+  rng = random.Random(seed)
+  state = simulation.NewGame(4, rng)
+  try:
+    simulation.Play(state, simulation.RandomPolicy(rng), rng, until_turn=turns, max_moves=2000)
+  except simulation.Stuck:
+    pass
+  handler = eldritch.EldritchGame()
+  handler.game = state
+  return handler.json_str().encode("utf-8")
+
+
+async def KeepBusy(handler, save, until):
+  loads = 0
+  while time.monotonic() < until:
+    await handler.handle_post(NullHttpHandler(), "/load", {}, save)
+    loads += 1
+    await asyncio.sleep(0)
+  return loads
+
+
+async def Lags(until, interval):
+  lags = []
+  loop = asyncio.get_running_loop()
+  while time.monotonic() < until:
+    start = loop.time()
+    await asyncio.sleep(interval)
+    lags.append(max(0, loop.time() - start - interval))
+  return lags
+
+
+async def Measure(games, sessions, save, seconds, interval):
+  handlers = []
+  for idx in range(games):
+    handler = game.GameHandler(f"game{idx}", eldritch.EldritchGame)
+    for session in range(sessions):
+      await handler.connect_user(f"session{session}", NullWebsocket())
+    handlers.append(handler)
+  until = time.monotonic() + seconds
+  busy = [asyncio.ensure_future(KeepBusy(handler, save, until)) for handler in handlers]
+  lags = await Lags(until, interval)
+  return lags, sum(await asyncio.gather(*busy))
+
+
+def Summary(lags):
+  lags = sorted(lags)
+
+  def Pct(pct):
+    return lags[min(len(lags) - 1, int(len(lags) * pct / 100))] * 1000
+  return (f"n={len(lags):4}  p50 {Pct(50):7.1f} ms  p95 {Pct(95):7.1f} ms  "
+          f"max {lags[-1] * 1000:7.1f} ms")
+
+
+def main(games, sessions, seconds, interval):
+  save = MidGameSave(0, 6)
+  print(f"{games} eldritch games with {sessions} websockets each, reloading a "
+        f"{len(save) / 1e3:.0f} KB save in a loop for {seconds}s")
+  lags, loads = asyncio.run(Measure(games, sessions, save, seconds, interval))
+  print(f"  loads: {loads}")
+  print(f"  loop lag: {Summary(lags)}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--games", type=int, default=4)
+  parser.add_argument("--sessions", type=int, default=3)
+  parser.add_argument("--seconds", type=float, default=5)
+  parser.add_argument("--interval", type=float, default=0.01)
+  flags = parser.parse_args()
+  main(flags.games, flags.sessions, flags.seconds, flags.interval)
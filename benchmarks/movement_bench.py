@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Measures CityMovement.compute_choices() on random boards.
+
+Each board is a started game with monsters scattered over the streets and locations, some closed
+locations, and one character with a random place and number of movement points. Reports the time
+to compute the character's choices the first time (nothing remembered by board.Routes()) and again
+(as every later pass through the event loop does).
+"""
+
+import argparse
+import os
+import random
+import sys
+import timeit
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import board
+from eldritch import events
+from eldritch import simulation
+
+
+def RandomBoards(count, seed, monsters):
+  rng = random.Random(seed)
+  state = simulation.NewGame(4, rng)
+  city = [state.places[name] for name in board.NAMES if board.NEIGHBORS[board.IDS[name]]]
+  boards = []
+  for _ in range(count):
+    monster_places = [rng.choice(city) for _ in range(monsters)]
+    closed = rng.sample(sorted(board.LOCATIONS), 2)
+    start = rng.choice(city)
+    boards.append((monster_places, closed, start, rng.randint(1, 6)))
+  return state, boards
+
+
+def Setup(state, monster_places, closed, start, movement_points):
+  for monster, place in zip(state.monsters, monster_places):
+    monster.place = place
+  for place in state.places.values():
+    if hasattr(place, "closed_until"):
+      place.closed_until = 1 if place.name in closed else None
+  char = state.characters[0]
+  char.place = start
+  char.movement_points = movement_points
+  return events.CityMovement(char)
+
+
+def main(count, seed, monsters, number):
+  state, boards = RandomBoards(count, seed, monsters)
+  first = again = 0
+  for entry in boards:
+    move = Setup(state, *entry)
+
+    def cold(move=move):
+      board.Routes.cache_clear()
+      move.compute_choices(state)
+    first += timeit.timeit(cold, number=number) / number
+    again += timeit.timeit(lambda move=move: move.compute_choices(state), number=number) / number
+  print(f"CityMovement.compute_choices, {count} boards, {monsters} monsters on the board")
+  print(f"  first time: {first * 1e6 / count:8.1f} us/call")
+  print(f"  again:      {again * 1e6 / count:8.1f} us/call")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--boards", type=int, default=200)
+  parser.add_argument("--seed", type=int, default=0)
+  parser.add_argument("--monsters", type=int, default=8)
+  parser.add_argument("--number", type=int, default=200)
+  flags = parser.parse_args()
+  main(flags.boards, flags.seed, flags.monsters, flags.number)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""Compares per-session for_player() encoding against the shared public state + overlay push,
+and full-state pushes against patch pushes in bytes on the wire."""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import timeit
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import ancient_ones
+from eldritch import eldritch
+import game
+
+
+def StartedEldritch(players, spectators):
+  handler = game.GameHandler("bench", eldritch.EldritchGame)
+  handler.game.game.ancient_one = ancient_ones.DummyAncient()
+  names = ["Nun", "Doctor", "Archaeologist", "Gangster", "Student", "Photographer", "Drifter"]
+  for idx in range(players + spectators):
+    session = f"session{idx}"
+    handler.websockets[session].add(None)
+    handler.game.connect_user(session)
+    if idx < players:
+      for _ in handler.game.handle(session, {"type": "join", "char": names[idx]}):
+        pass
+  for _ in handler.game.handle("session0", {"type": "start"}):
+    pass
+  return handler
+
+
+class CountingWebsocket:
+
+  def __init__(self):
+    self.sent_bytes = 0
+    self.sent_count = 0
+
+  async def send(self, data):
+    self.sent_bytes += len(data)
+    self.sent_count += 1
+
+
+def WireBytes(players, patches):
+  handler = StartedEldritch(players, 0)
+  handler.websockets.clear()
+  websockets = {}
+  for idx in range(players):
+    session = f"session{idx}"
+    websockets[session] = CountingWebsocket()
+    handler.websockets[session].add(websockets[session])
+    if patches:
+      asyncio.run(handler.push_snapshot(websockets[session], session))
+  for websocket in websockets.values():
+    websocket.sent_bytes = websocket.sent_count = 0
+  # The first player is setting their sliders.
+  for value in [1, 2, 0, 3]:
+    message = {"type": "set_slider", "name": "speed_sneak", "value": value}
+    asyncio.run(handler.handle(websockets["session0"], "session0", json.dumps(message)))
+  total = sum(websocket.sent_bytes for websocket in websockets.values())
+  return total / sum(websocket.sent_count for websocket in websockets.values())
+
+
+def main(players, spectators, number):
+  handler = StartedEldritch(players, spectators)
+
+  def per_session():
+    return {session: handler.game.for_player(session) for session in handler.websockets}
+
+  sessions = len(handler.websockets)
+  old = timeit.timeit(per_session, number=number) / number
+  new = timeit.timeit(handler.encode_for_sessions, number=number) / number
+  print(f"eldritch, {players} players + {spectators} spectators ({sessions} sessions)")
+  print(f"  for_player per session: {old * 1000:8.2f} ms/push")
+  print(f"  shared state + overlay: {new * 1000:8.2f} ms/push ({old / new:.1f}x)")
+
+  full = WireBytes(players, patches=False)
+  patch = WireBytes(players, patches=True)
+  print(f"eldritch slider moves, {players} players")
+  print(f"  full state messages: {full:10.0f} bytes/message")
+  print(f"  patch messages:      {patch:10.0f} bytes/message ({full / patch:.1f}x)")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--players", type=int, default=6)
+  parser.add_argument("--spectators", type=int, default=2)
+  parser.add_argument("--number", type=int, default=20)
+  flags = parser.parse_args()
+  main(flags.players, flags.spectators, flags.number)
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""Measures how long the lobby takes to answer while other games are busy.
+
+Starts server.py without shards and then with --shards, and in each creates some eldritch games
+and keeps them busy by loading a mid-game save into them over and over (POST /load decodes the
+save and pushes it, which takes a while). Meanwhile it connects to the lobby websocket again and
+again, and reports how long the list of games took to arrive, both before and during the load.
+Without shards, every load holds up the lobby; with them, only the worker that has the game waits.
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import websockets
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import simulation
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def MidGameSave(seed, turns):
+  rng = random.Random(seed)
+  state = simulation.NewGame(4, rng)
+  try:
+    simulation.Play(state, simulation.RandomPolicy(rng), rng, until_turn=turns, max_moves=2000)
+  except simulation.Stuck:
+    pass
+  game = eldritch.EldritchGame()
+  game.game = state
+  return game.json_str().encode("utf-8")
+
+
+async def Request(port, command, path, body=b""):
+  """Sends one request on a new connection and returns (status, headers, body)."""
+  reader, writer = await asyncio.open_connection("127.0.0.1", port)
+  try:
+    head = f"{command} {path} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n"
+    head += f"Content-Length: {len(body)}\r\n\r\n"
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+  finally:
+    writer.close()
+  head, _, content = response.partition(b"\r\n\r\n")
+  lines = head.decode("latin-1").split("\r\n")
+  headers = dict(line.split(": ", 1) for line in lines[1:])
+  return int(lines[0].split()[1]), headers, content
+
+
+async def WaitForServer(port, deadline):
+  while True:
+    try:
+      await Request(port, "GET", "/")
+      return
+    except OSError:
+      if time.monotonic() > deadline:
+        raise
+      await asyncio.sleep(0.1)
+
+
+async def LobbyLatencies(ws_port, until, interval):
+  latencies = []
+  while time.monotonic() < until:
+    start = time.perf_counter()
+    async with websockets.connect(f"ws://127.0.0.1:{ws_port}/") as websocket:
+      await websocket.recv()
+    latencies.append(time.perf_counter() - start)
+    await asyncio.sleep(interval)
+  return latencies
+
+
+async def KeepBusy(http_port, game_id, save, until):
+  loads = 0
+  while time.monotonic() < until:
+    await Request(http_port, "POST", f"/load?game_id={game_id}", save)
+    loads += 1
+  return loads
+
+
+def Summary(latencies):
+  latencies = sorted(latencies)
+  if not latencies:
+    return "no samples"
+
+  def Pct(pct):
+    return latencies[min(len(latencies) - 1, int(len(latencies) * pct / 100))] * 1000
+  return (f"n={len(latencies):4}  p50 {Pct(50):7.1f} ms  p95 {Pct(95):7.1f} ms  "
+          f"max {latencies[-1] * 1000:7.1f} ms")
+
+
+async def Measure(http_port, ws_port, games, save, seconds, interval):
+  await WaitForServer(http_port, time.monotonic() + 30)
+  game_ids = []
+  for _ in range(games):
+    _, headers, _ = await Request(http_port, "POST", "/new", b"type=eldritch")
+    game_ids.append(headers["Location"].split("game_id=")[1])
+  await asyncio.sleep(1.5)  # Let sharded workers tell the front end about their games.
+  idle = await LobbyLatencies(ws_port, time.monotonic() + seconds / 2, interval)
+  until = time.monotonic() + seconds
+  busy = [asyncio.ensure_future(KeepBusy(http_port, game_id, save, until)) for game_id in game_ids]
+  loaded = await LobbyLatencies(ws_port, until, interval)
+  loads = sum(await asyncio.gather(*busy))
+  return idle, loaded, loads
+
+
+def main(shard_counts, games, seconds, interval, http_port, ws_port):
+  save = MidGameSave(0, 6)
+  print(f"{games} busy eldritch games, reloading a {len(save) / 1e3:.0f} KB save in a loop")
+  for count in shard_counts:
+    command = [
+        sys.executable, os.path.join(ROOT_DIR, "server.py"), "--http-port", str(http_port),
+        "--ws-port", str(ws_port), "--shards", str(count),
+    ]
+    with subprocess.Popen(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL) as server:
+      try:
+        idle, loaded, loads = asyncio.run(
+            Measure(http_port, ws_port, games, save, seconds, interval))
+      finally:
+        server.terminate()
+        server.wait()
+    print(f"shards={count}: {loads} loads in {seconds}s")
+    print(f"  lobby, idle: {Summary(idle)}")
+    print(f"  lobby, busy: {Summary(loaded)}")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--shards", type=int, nargs="+", default=[0, 4])
+  parser.add_argument("--games", type=int, default=4)
+  parser.add_argument("--seconds", type=float, default=5)
+  parser.add_argument("--interval", type=float, default=0.02)
+  parser.add_argument("--http-port", type=int, default=8701)
+  parser.add_argument("--ws-port", type=int, default=8702)
+  flags = parser.parse_args()
+  main(flags.shards, flags.games, flags.seconds, flags.interval, flags.http_port, flags.ws_port)
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""Measures eldritch snapshot size and encode/decode time as a game progresses.
+
+Plays a game with random moves and takes snapshots at the start of the given turns, in both the
+JSON format that goes to the game store and the binary format used to move games between
+processes. If random play loses the game before the last turn, the next seed is tried.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import random
+import sys
+import timeit
+
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import serialization
+from eldritch import simulation
+from game import CustomEncoder
+
+
+def Snapshots(seed, players, turns):
+  rng = random.Random(seed)
+  state = simulation.NewGame(players, rng)
+  policy = simulation.RandomPolicy(rng)
+  snapshots = []
+  for turn in turns:
+    simulation.Play(state, policy, rng, turn)
+    if state.turn_number < turn:
+      return None
+    # Keep a copy; the state keeps changing as we play on.
+    snapshots.append((turn, serialization.DecodeBinary(serialization.EncodeBinary(state))))
+  return snapshots
+
+
+def Measure(state, number):
+  formats = [
+      ("json", serialization.EncodeJson, serialization.DecodeJson),
+      ("binary", serialization.EncodeBinary, serialization.DecodeBinary),
+  ]
+  results = {}
+  for name, encode, decode in formats:
+    data = encode(state)
+    raw = data.encode("utf-8") if isinstance(data, str) else data
+    results[name] = (
+        len(raw), len(gzip.compress(raw)),
+        timeit.timeit(lambda: encode(state), number=number) / number,  # pylint: disable=W0640
+        timeit.timeit(lambda: decode(data), number=number) / number,  # pylint: disable=W0640
+    )
+  return results
+
+
+def main(players, turns, number, seed):
+  snapshots = None
+  while snapshots is None:
+    try:
+      snapshots = Snapshots(seed, players, turns)
+    except Exception as err:  # pylint: disable=broad-except
+      print(f"seed {seed}: {type(err).__name__}: {err}")
+    if snapshots is None:
+      seed += 1
+  print(f"eldritch, {players} players, seed {seed}")
+  for turn, state in snapshots:
+    display = len(json.dumps(state.json_repr(), cls=CustomEncoder))
+    print(f"turn {turn:3} (event log {len(state.event_log)}, json_repr {display} bytes)")
+    for name, (size, zipped, encode, decode) in Measure(state, number).items():
+      print(
+          f"  {name:6}  {size:8} bytes  {zipped:7} gzipped"
+          f"  encode {encode * 1000:7.2f} ms  decode {decode * 1000:7.2f} ms"
+      )
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("--players", type=int, default=4)
+  parser.add_argument("--turns", type=int, nargs="+", default=[1, 10, 30])
+  parser.add_argument("--number", type=int, default=20)
+  parser.add_argument("--seed", type=int, default=0)
+  flags = parser.parse_args()
+  main(flags.players, flags.turns, flags.number, flags.seed)
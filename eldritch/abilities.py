@@ -1,6 +1,7 @@
 from eldritch.expansions.seaside.abilities import *
 from eldritch import assets
 from eldritch import events
+from eldritch import listeners
 from eldritch import values
 
 
@@ -14,6 +15,7 @@ class BonusSkill(assets.Card):
   def _check_matches(self, check_type):
     return check_type == self.check_type or assets.SUB_CHECKS.get(check_type) == self.check_type
 
+  @listeners.ReactsTo("BonusDiceRoll")
   def get_interrupt(self, event, owner, state):
     if not isinstance(event, events.BonusDiceRoll):
       return None
@@ -31,6 +33,7 @@ class RerollSkill(assets.Card):
     super().__init__(name, idx, "skills", {}, {})
     self.check_type = check_type
 
+  @listeners.ReactsTo("SpendChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.SpendChoice) or event.character != owner or event.is_done():
       return None
@@ -101,6 +104,7 @@ class GuardianAngel(assets.Asset):
   def __init__(self):
     super().__init__("Guardian Angel")
 
+  @listeners.ReactsTo("LostInTimeAndSpace")
   def get_interrupt(self, event, owner, state):
     if not isinstance(event, events.LostInTimeAndSpace) or event.character != owner:
       return None
@@ -127,6 +131,8 @@ class ExtraDraw(assets.Asset):
     self.deck_name = deck
     self.attribute = attribute
 
+  # Every draw_type used below.
+  @listeners.ReactsTo("DrawItems", "DrawEncounter", "GateEncounter")
   def get_interrupt(self, event, owner, state):
     if not isinstance(event, self.draw_type):
       return None
@@ -167,6 +173,7 @@ class Prevention(assets.Asset):
     super().__init__(name)
     self.attribute = attribute
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_interrupt(self, event, owner, state):
     if not isinstance(event, events.GainOrLoss) or owner != event.character:
       return None
@@ -191,6 +198,7 @@ class TrustFund(assets.Asset):
   def __init__(self):
     super().__init__("Trust Fund")
 
+  @listeners.ReactsTo("RefreshAssets")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.RefreshAssets) and event.character == owner:
       return events.Gain(owner, {"dollars": 1})
@@ -202,6 +210,7 @@ class Hunches(assets.Asset):
   def __init__(self):
     super().__init__("Hunches")
 
+  @listeners.ReactsTo("BonusDiceRoll")
   def get_interrupt(self, event, owner, state):
     if not isinstance(event, events.BonusDiceRoll) or event.character != owner:
       return None
@@ -215,6 +224,7 @@ class Research(assets.Asset):
   def __init__(self):
     super().__init__("Research")
 
+  @listeners.ReactsTo("SpendChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.SpendChoice) or event.is_done() or self.exhausted:
       return None
@@ -234,6 +244,7 @@ class UpkeepRestoreStat(assets.Asset):
     self.stat = stat
     self.verb = verb
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if event.is_done() or not isinstance(event, events.SliderInput):
       return None
@@ -241,7 +252,7 @@ class UpkeepRestoreStat(assets.Asset):
       return None
     if event.character != owner:
       return None
-    neighbors = [char for char in state.characters if char.place == owner.place]
+    neighbors = state.characters_at(owner.place)
     eligible = [
         char for char in neighbors
         if getattr(char, self.stat) < getattr(char, "max_"+self.stat)(state)
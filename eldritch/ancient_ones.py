@@ -1,7 +1,7 @@
 import abc
 from typing import Optional, TYPE_CHECKING, Union
 
-from eldritch import events, places, monsters, values, mythos
+from eldritch import events, listeners, places, monsters, values, mythos
 from eldritch.events import AncientOneAttack
 from eldritch.characters import BaseCharacter
 
@@ -163,12 +163,14 @@ class Wendigo(AncientOne):
     super().__init__("Wendigo", 11, set(), -3)
     self.fight_modifier = 1
 
+  @listeners.ReactsTo("ActivateEnvironment")
   def get_interrupt(self, event, state):
     # TODO: Discard weather cards
     if isinstance(event, events.ActivateEnvironment) and event.env.environment_type == "weather":
       return events.CancelEvent(event)
     return None
 
+  @listeners.ReactsTo("Mythos", "Awaken")
   def get_trigger(self, event, state):
     losses = []
     if isinstance(event, events.Mythos):
@@ -212,6 +214,7 @@ class BlackPharaoh(AncientOne):
       return True
     return super().get_override(thing, attribute)
 
+  @listeners.ReactsTo("Awaken")
   def get_trigger(self, event, state):
     if not isinstance(event, events.Awaken):
       return None
@@ -258,6 +261,7 @@ class BlackGoat(AncientOne):
       return True
     return super().get_override(thing, attribute)
 
+  @listeners.ReactsTo("Awaken", "AncientOneAttack")
   def get_trigger(self, event, state):
     if not isinstance(event, (events.Awaken, events.AncientOneAttack)):
       return None
@@ -304,6 +308,7 @@ class SerpentGod(AncientOne):
         return 3
     return 0
 
+  @listeners.ReactsTo("LostInTimeAndSpace", "PassCombatRound", "Awaken")
   def get_trigger(self, event, state):
     if isinstance(event, events.LostInTimeAndSpace):
       return events.AddDoom()
@@ -349,6 +354,7 @@ class SpaceBubbles(AncientOne):
     super().__init__("Space Bubbles", 12, {"magical immunity"}, -5)
     self.will_modifier = 1
 
+  @listeners.ReactsTo("Awaken", "LostInTimeAndSpace")
   def get_trigger(self, event, state):
     if isinstance(event, events.Awaken):
       to_devour = []
@@ -3,6 +3,7 @@ import collections
 from typing import TYPE_CHECKING, Optional
 
 from eldritch import events
+from eldritch import listeners
 from eldritch import values
 
 if TYPE_CHECKING:
@@ -45,6 +46,13 @@ class Asset(metaclass=abc.ABCMeta):
   def get_bonus(self, check_type, attributes, owner, state: Optional["GameState"]):
     return 0
 
+  def bonus_state(self, owner, state):
+    """Returns whatever get_bonus() reads besides its arguments and the owner's place.
+
+    The owner's cached bonuses are recomputed whenever this changes; see bonus_cache.py.
+    """
+    return None
+
   @property
   def bonuses(self):
     bonuses = {check: self.get_bonus(check, None, None, None) for check in CHECK_TYPES |
@@ -61,18 +69,23 @@ class Asset(metaclass=abc.ABCMeta):
   def get_override(self, other, attribute):
     return None
 
+  @listeners.ReactsTo()
   def get_interrupt(self, event, owner, state):
     return None
 
+  @listeners.ReactsTo()
   def get_usable_interrupt(self, event, owner, state):
     return None
 
+  @listeners.ReactsTo()
   def get_trigger(self, event, owner, state):
     return None
 
+  @listeners.ReactsTo()
   def get_usable_trigger(self, event, owner, state):
     return None
 
+  @listeners.ReactsTo()
   def get_spend_amount(self, event, owner, state):
     return None
 
@@ -121,12 +134,16 @@ class Card(Asset):
       bonus += self.active_bonuses[check_type]
     return bonus
 
+  def bonus_state(self, owner, state):
+    return self.active
+
 
 class FortuneTeller(Card):
 
   def __init__(self):
     super().__init__("Fortune Teller", None, "allies", {}, {"luck": 2})
 
+  @listeners.ReactsTo("KeepDrawn")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       return events.Gain(owner, {"clues": 2})
@@ -138,6 +155,7 @@ class TravelingSalesman(Card):
   def __init__(self):
     super().__init__("Traveling Salesman", None, "allies", {}, {"sneak": 1, "will": 1})
 
+  @listeners.ReactsTo("KeepDrawn")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       return events.Draw(owner, "common", 1)
@@ -149,6 +167,7 @@ class PoliceDetective(Card):
   def __init__(self):
     super().__init__("Police Detective", None, "allies", {}, {"fight": 1, "lore": 1})
 
+  @listeners.ReactsTo("KeepDrawn")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       return events.Draw(owner, "spells", 1)
@@ -160,6 +179,7 @@ class Thief(Card):
   def __init__(self):
     super().__init__("Thief", None, "allies", {}, {"sneak": 2})
 
+  @listeners.ReactsTo("KeepDrawn")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       return events.Draw(owner, "unique", 1)
@@ -173,6 +193,7 @@ class StatIncreaser(Card):
     super().__init__(name, None, "allies", {}, {stat: 1})
     self.stat = stat[4:]
 
+  @listeners.ReactsTo("KeepDrawn", "DiscardNamed", "DiscardSpecific")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       return events.Gain(owner, {self.stat: 1})
@@ -182,6 +203,8 @@ class StatIncreaser(Card):
       return events.CapStatsAtMax(owner)
     return None
 
+  # Not usable yet (see is_usable); name the events here once it is.
+  @listeners.ReactsTo()
   def get_usable_interrupt(self, event, owner, state):
     if not self.is_usable(event, owner, state):
       return None
@@ -275,6 +298,7 @@ class Deputy(Card):
   def __init__(self):
     super().__init__("Deputy", None, "specials", {}, {})
 
+  @listeners.ReactsTo("RefreshAssets", "KeepDrawn")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.RefreshAssets) and event.character == owner:
       return events.Gain(owner, {"dollars": 1})
@@ -296,6 +320,7 @@ class SelfDiscardingCard(Card):
     self.tokens["must_roll"] = 0
     self.upkeep_bad_rolls = [1]
 
+  @listeners.ReactsTo("KeepDrawn", "RefreshAssets")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       selves = [p for p in event.character.possessions if p.name == self.name]
@@ -322,6 +347,7 @@ class BlessingOrCurse(SelfDiscardingCard):
     super().__init__(name, idx)
     self.opposite = "Curse" if name == "Blessing" else "Blessing"
 
+  @listeners.ReactsTo("KeepDrawn", "RefreshAssets")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.KeepDrawn) and self.name in event.kept:
       if self.opposite in [p.name for p in event.character.possessions]:
@@ -347,6 +373,7 @@ class Retainer(SelfDiscardingCard):
   def __init__(self, idx):
     super().__init__("Retainer", idx)
 
+  @listeners.ReactsTo("RefreshAssets")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.RefreshAssets) and event.character == owner:
       roll = super().get_trigger(event, owner, state)
@@ -389,11 +416,13 @@ class BankLoan(SelfDiscardingCard):
         events.Conditional(character, interest, "choice_index", {0: events.Nothing(), 1: default})
     ], character)
 
+  @listeners.ReactsTo("TakeBankLoan", "KeepDrawn", "RefreshAssets")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.TakeBankLoan):
       return events.Gain(owner, {"dollars": 10}, self)
     return super().get_trigger(event, owner, state)
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if isinstance(event, events.SliderInput) and event.character == owner and not event.is_done():
       # TODO: Usable "anytime"
@@ -410,6 +439,7 @@ class BadCredit(Asset):
   def __init__(self, idx):
     super().__init__("Bad Credit", idx)
 
+  @listeners.ReactsTo("TakeBankLoan")
   def get_interrupt(self, event, owner, state):
     if (
         isinstance(event, events.TakeBankLoan)
@@ -423,6 +453,7 @@ class LodgeMembership(Card):
   def __init__(self, idx):
     super().__init__("Lodge Membership", idx, "specials", {}, {})
 
+  @listeners.ReactsTo("KeepDrawn")
   def get_interrupt(self, event, owner, state):
     if (
         isinstance(event, events.KeepDrawn)
@@ -441,6 +472,7 @@ class BonusToAllChecks(Card):
         {f"{ability}_check": 1 for ability in CHECK_TYPES}
     )
 
+  @listeners.ReactsTo("Mythos")
   def get_interrupt(self, event, owner, state):
     if isinstance(event, events.Mythos) and event.is_done():
       return events.DiscardSpecific(owner, [self])
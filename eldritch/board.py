@@ -0,0 +1,84 @@
+"""The streets and locations of Arkham, and how far apart they are.
+
+The map never changes during a game, so this module builds it once from places.CreatePlaces() when
+it is imported: which places are next to each other, which of them are streets, and the distance
+between every pair of places. Places are numbered in the order that CreatePlaces() lists them, and
+searches visit neighbors in that order, so they find the same routes in every process.
+
+What does change is which places are closed and where the monsters are. Routes() takes those as
+arguments instead of reading them from a game, and remembers its answers; a character's choices
+are computed again on every pass through the event loop, but only searched once. Closing or
+reopening a place, or moving a monster, asks a different question instead of changing the board.
+"""
+
+import collections
+import functools
+
+from eldritch import places
+
+
+def _Distances(neighbors, start):
+  distances = [None] * len(neighbors)
+  distances[start] = 0
+  queue = collections.deque([start])
+  while queue:
+    place = queue.popleft()
+    for nearby in neighbors[place]:
+      if distances[nearby] is None:
+        distances[nearby] = distances[place] + 1
+        queue.append(nearby)
+  return tuple(distances)
+
+
+_CITY = [place for place in places.CreatePlaces().values() if isinstance(place, places.CityPlace)]
+NAMES = tuple(place.name for place in _CITY)
+IDS = {name: idx for idx, name in enumerate(NAMES)}
+NEIGHBORS = tuple(tuple(sorted(IDS[conn.name] for conn in place.connections)) for place in _CITY)
+STREETS = frozenset(place.name for place in _CITY if isinstance(place, places.Street))
+LOCATIONS = frozenset(place.name for place in _CITY if isinstance(place, places.Location))
+DISTANCES = tuple(_Distances(NEIGHBORS, start) for start in range(len(NAMES)))
+# Streets that a flying monster at each place can swoop down to. From the sky, that is all of them.
+NEARBY_STREETS = {
+    name: frozenset(NAMES[nearby] for nearby in NEIGHBORS[IDS[name]] if NAMES[nearby] in STREETS)
+    for name in NAMES
+}
+NEARBY_STREETS["Sky"] = STREETS
+del _CITY
+
+
+def Distance(source, destination):
+  """Returns the number of moves from source to destination, or None if there is no way there."""
+  if source not in IDS or destination not in IDS:
+    return None
+  return DISTANCES[IDS[source]][IDS[destination]]
+
+
+@functools.lru_cache(maxsize=4096)
+def Routes(start, movement_points, closed, blocked):
+  """Returns the shortest route from start to every place within movement_points.
+
+  closed and blocked are frozensets of place names. Closed places cannot be entered; moving into a
+  blocked place (one with a monster) ends the route there. The result is a tuple of (destination,
+  route) pairs, where route is a tuple of the places entered on the way, ending at destination.
+  Callers must not rely on its order.
+  """
+  routes = {start: ()}
+  if start in closed or start not in IDS:
+    return tuple(routes.items())
+  closed_ids = {IDS[name] for name in closed if name in IDS}
+  blocked_ids = {IDS[name] for name in blocked if name in IDS}
+  found = {IDS[start]}
+  queue = collections.deque(
+      (nearby, ()) for nearby in NEIGHBORS[IDS[start]] if nearby not in closed_ids
+  )
+  while queue:
+    place, route = queue.popleft()
+    if place in found or place in closed_ids:
+      continue
+    found.add(place)
+    route += (NAMES[place],)
+    routes[NAMES[place]] = route
+    if len(route) == movement_points or place in blocked_ids:
+      continue
+    queue.extend((nearby, route) for nearby in NEIGHBORS[place])
+  return tuple(routes.items())
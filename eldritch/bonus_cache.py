@@ -0,0 +1,51 @@
+"""Remembers each character's bonuses until something they depend on changes.
+
+BaseCharacter.bonus() asks every global effect and walks every possession (twice, for checks) on
+each call, and the same bonuses are asked for many times while nothing changes: every stat for
+every push, and again by checks, combat and monster movement. A bonus only depends on its
+arguments, the character's place, the global effects in play, and each possession's
+bonus_state(), so the cache keeps the bonuses computed for one value of those inputs and forgets
+them as soon as the inputs differ. The inputs are compared on every read, so changing a possession
+or a global effect directly (as tests and debugging commands do) needs no extra bookkeeping.
+Comparing them costs about as much as computing one bonus; code that reads several bonuses in a
+row holds the character so that the inputs are only compared once.
+
+Possessions whose get_bonus() reads anything other than its arguments and the possession itself
+must say so in bonus_state().
+"""
+
+import contextlib
+
+
+class BonusCache:
+
+  def __init__(self):
+    self.characters = {}  # character name -> (inputs, {bonus key: value})
+    self.held = set()
+
+  def __reduce__(self):
+    # Only holds data computed from the game, so a loaded game starts with an empty cache.
+    return BonusCache, ()
+
+  def bonuses(self, char, state):
+    """Returns the bonuses known for char, forgetting them first if their inputs have changed."""
+    if char.name in self.held:
+      return self.characters[char.name][1]
+    inputs = char.bonus_inputs(state)
+    cached = self.characters.get(char.name)
+    if cached is None or cached[0] != inputs:
+      cached = self.characters[char.name] = (inputs, {})
+    return cached[1]
+
+  @contextlib.contextmanager
+  def hold(self, char, state):
+    """Compares char's inputs only once inside the block, which must not change them."""
+    if char.name in self.held:
+      yield
+      return
+    self.bonuses(char, state)
+    self.held.add(char.name)
+    try:
+      yield
+    finally:
+      self.held.discard(char.name)
@@ -1,11 +1,14 @@
 import abc
 from collections import OrderedDict
+import contextlib
 import math
 from typing import Iterable
 
 from eldritch import events
 from eldritch import gates
+from eldritch import listeners
 from eldritch import monsters
+from eldritch import place_index
 
 
 class BaseCharacter(metaclass=abc.ABCMeta):
@@ -29,6 +32,11 @@ class BaseCharacter(metaclass=abc.ABCMeta):
     self.sanity = 0
     self.stamina = 0
 
+  def __setattr__(self, name, value):
+    if name == "place":
+      place_index.Changed(self)  # Moves that do not go through GameState.move_character().
+    super().__setattr__(name, value)
+
   def get_json(self, state):
     attrs = [
         "name", "stamina", "sanity", "focus",
@@ -53,7 +61,8 @@ class BaseCharacter(metaclass=abc.ABCMeta):
       else:
         data["trophies"].append(trophy)
     computed = ["speed", "sneak", "fight", "will", "lore", "luck", "max_sanity", "max_stamina"]
-    data.update({attr: getattr(self, attr)(state) for attr in computed})
+    with self.holding_bonuses(state):
+      data.update({attr: getattr(self, attr)(state) for attr in computed})
     data["place"] = self.place.name if self.place is not None else None
     data["fixed"] = sum(self.fixed_possessions().values(), [])
     data["random"] = self.random_possessions()
@@ -123,21 +132,50 @@ class BaseCharacter(metaclass=abc.ABCMeta):
     return speed
 
   def evade(self, state):
-    return self.sneak(state) + self.bonus("evade", state, check=True)
+    with self.holding_bonuses(state):
+      return self.sneak(state) + self.bonus("evade", state, check=True)
 
   def combat(self, state, attributes):
-    combat = self.fight(state)
-    for bonus_type in {"physical", "magical", "combat"}:
-      combat += self.bonus(bonus_type, state, attributes, check=True)
+    with self.holding_bonuses(state):
+      combat = self.fight(state)
+      for bonus_type in {"physical", "magical", "combat"}:
+        combat += self.bonus(bonus_type, state, attributes, check=True)
     return combat
 
   def horror(self, state):
-    return self.will(state) + self.bonus("horror", state, check=True)
+    with self.holding_bonuses(state):
+      return self.will(state) + self.bonus("horror", state, check=True)
 
   def spell(self, state):
-    return self.lore(state) + self.bonus("spell", state, check=True)
+    with self.holding_bonuses(state):
+      return self.lore(state) + self.bonus("spell", state, check=True)
 
   def bonus(self, check_name, state, attributes=None, check=True):
+    cache = getattr(state, "bonus_cache", None)
+    if cache is None:
+      return self.compute_bonus(check_name, state, attributes, check)
+    bonuses = cache.bonuses(self, state)
+    key = (check_name, frozenset(attributes) if attributes else None, check)
+    if key not in bonuses:
+      bonuses[key] = self.compute_bonus(check_name, state, attributes, check)
+    return bonuses[key]
+
+  def holding_bonuses(self, state):
+    """Reads every bonus inside the block with one look at their inputs; see bonus_cache.py."""
+    cache = getattr(state, "bonus_cache", None)
+    if cache is None:
+      return contextlib.nullcontext()
+    return cache.hold(self, state)
+
+  def bonus_inputs(self, state):
+    """Returns everything besides its arguments that bonus() depends on; see bonus_cache.py."""
+    return (
+        self.place,
+        tuple(state.globals()),
+        tuple((pos, pos.bonus_state(self, state)) for pos in self.possessions),
+    )
+
+  def compute_bonus(self, check_name, state, attributes=None, check=True):
     modifier = 0
     if state:
       modifier += state.get_modifier(self, check_name + ("_check" if check else ""))
@@ -223,27 +261,27 @@ class BaseCharacter(metaclass=abc.ABCMeta):
     return {}
 
   def get_interrupts(self, event, state):
-    return [
-        p.get_interrupt(event, self, state) for p in self.possessions
-        if p.get_interrupt(event, self, state)
-    ]
+    interrupts = []
+    for pos in listeners.Listeners(self.possessions, "get_interrupt", event):
+      interrupt = pos.get_interrupt(event, self, state)
+      if interrupt:
+        interrupts.append(interrupt)
+    return interrupts
 
   def get_usable_interrupts(self, event, state):
-    interrupts = {
-        pos.handle: pos.get_usable_interrupt(event, self, state)
-        for pos in self.possessions
-        if (
-            pos.get_usable_interrupt(event, self, state)
-            and state.get_override(pos, "can_use")
-        )
-    }
+    interrupts = {}
+    for pos in listeners.Listeners(self.possessions, "get_usable_interrupt", event):
+      interrupt = pos.get_usable_interrupt(event, self, state)
+      if interrupt and state.get_override(pos, "can_use"):
+        interrupts[pos.handle] = interrupt
     return interrupts
 
   def get_spendables(self, event, state):
-    spendables = {
-        pos.handle: pos.get_spend_amount(event, self, state)
-        for pos in self.possessions if pos.get_spend_amount(event, self, state) is not None
-    }
+    spendables = {}
+    for pos in listeners.Listeners(self.possessions, "get_spend_amount", event):
+      amount = pos.get_spend_amount(event, self, state)
+      if amount is not None:
+        spendables[pos.handle] = amount
     if isinstance(event, events.SpendMixin) and event.character == self and not event.is_done():
       spent_handles = event.spent_handles()
       for trophy in self.trophies:
@@ -261,27 +299,26 @@ class BaseCharacter(metaclass=abc.ABCMeta):
     return spendables
 
   def get_triggers(self, event, state):
-    triggers = []
+    candidates = []
     if isinstance(event, events.DiscardSpecific):
-      triggers.extend([
-          p.get_trigger(event, self, state) for p in event.discarded
-          if p.get_trigger(event, self, state)
-      ])
+      candidates.extend(event.discarded)
     if isinstance(event, events.DiscardNamed) and event.discarded:
-      trig = event.discarded.get_trigger(event, self, state)
-      triggers.extend([trig] if trig else [])
-    return triggers + [
-        p.get_trigger(event, self, state) for p in self.possessions
-        if p.get_trigger(event, self, state)
-    ]
+      candidates.append(event.discarded)
+    candidates.extend(self.possessions)
+    triggers = []
+    for pos in listeners.Listeners(candidates, "get_trigger", event):
+      trigger = pos.get_trigger(event, self, state)
+      if trigger:
+        triggers.append(trigger)
+    return triggers
 
   def get_usable_triggers(self, event, state):
-    return {
-        pos.handle: pos.get_usable_trigger(event, self, state)
-        for pos in self.possessions
-        if pos.get_usable_trigger(event, self, state)
-        and state.get_override(pos, "can_use")
-    }
+    triggers = {}
+    for pos in listeners.Listeners(self.possessions, "get_usable_trigger", event):
+      trigger = pos.get_usable_trigger(event, self, state)
+      if trigger and state.get_override(pos, "can_use"):
+        triggers[pos.handle] = trigger
+    return triggers
 
   def get_spend_event(self, handle):
     matching = [pos for pos in self.possessions if pos.handle == handle]
@@ -1,14 +1,16 @@
 import collections
-import json
 import operator
-from random import SystemRandom
+import time
 from typing import List, Dict
 
 from eldritch import values
 from eldritch import places
+from eldritch import serialization
 from eldritch import mythos
 from eldritch import monsters
 from eldritch import location_specials
+from eldritch import listeners
+from eldritch import log_history
 from eldritch import items
 from eldritch import gate_encounters
 from eldritch import gates
@@ -18,15 +20,17 @@ from eldritch import characters
 from eldritch import assets
 from eldritch import abilities
 from eldritch import ancient_ones
+from eldritch import bonus_cache
+from eldritch import place_index
+from eldritch import view_model
+import metrics
 from game import (  # pylint: disable=unused-import
     BaseGame, CustomEncoder, InvalidInput, UnknownMove, InvalidMove, InvalidPlayer, NotYourTurn,
     ValidatePlayer, TooManyPlayers,
 )
 
 
-random = SystemRandom()
-
-
+@metrics.Instrumented
 class GameState:
 
   DEQUE_ATTRIBUTES = {
@@ -34,11 +38,15 @@ class GameState:
   }
   HIDDEN_ATTRIBUTES = {
       "event_stack", "interrupt_stack", "trigger_stack", "log_stack", "mythos", "gate_cards",
+      "rng", "profile", "view", "bonus_cache", "place_index",
   }
   CUSTOM_ATTRIBUTES = {
       "characters", "all_characters", "environment", "mythos", "other_globals", "ancient_one",
-      "all_ancients", "monsters", "usables", "spendables",
+      "all_ancients", "monsters", "places", "usables", "spendables", "event_log",
   }
+  # Moves that only change the characters, or the event on top of the stack; see mark_move().
+  CHARACTER_MOVES = {"give", "spend", "unspend", "use"}
+  EVENT_MOVES = {"choice", "roll", "set_slider"}
   TURN_PHASES = ["upkeep", "movement", "encounter", "otherworld", "mythos"]
   AWAKENED_PHASES = ["upkeep", "attack", "ancient"]
   TURN_TYPES = {
@@ -58,8 +66,14 @@ class GameState:
       events.EvadeRound,
   )
 
-  def __init__(self):
+  def __init__(self, rng=None):
     self.name = "game"
+    # Every random choice in the game goes through this generator; see EldritchGame.set_random.
+    self.rng = rng if rng is not None else events.random
+    self.profile = None  # Only used when metrics are enabled; see EldritchGame.set_profile.
+    self.view = view_model.ViewCache()  # Parts of json_repr() that have not changed.
+    self.bonus_cache = bonus_cache.BonusCache()  # Characters' bonuses; see bonus_cache.py.
+    self.place_index = place_index.PlaceIndex()  # Who is where; see move_monster().
     self.places: Dict[str, places.Place] = {}
     self.characters = []
     self.all_characters = characters.CreateCharacters()
@@ -88,7 +102,7 @@ class GameState:
     self.spendables = {}
     self.usables = {}
     self.done_using = {}
-    self.event_log = []
+    self.event_log = log_history.LogHistory()  # Older turns are compressed; see history().
     self.turn_number = -1
     self.turn_idx = 0
     self.first_player = 0
@@ -110,7 +124,7 @@ class GameState:
     self.monsters = [monsters.Cultist(), monsters.Maniac()]
     for idx, monster in enumerate(self.monsters):
       monster.idx = idx
-      monster.place = self.monster_cup
+      self.move_monster(monster, self.monster_cup)
 
     self.game_stage = "slumber"
     self.turn_idx = 0
@@ -128,19 +142,19 @@ class GameState:
     encounter_cards = encounters.CreateEncounterCards()
     self.gate_cards.extend(gate_encounters.CreateGateCards())
     for neighborhood_name, cards in encounter_cards.items():
-      random.shuffle(cards)
+      self.rng.shuffle(cards)
       self.places[neighborhood_name].encounters.extend(cards)
     for location_name, fixed_encounters in specials.items():
       self.places[location_name].fixed_encounters.extend(fixed_encounters)
 
     gate_markers = gates.CreateGates()
-    random.shuffle(gate_markers)
+    self.rng.shuffle(gate_markers)
     self.gates.extend(gate_markers)
 
     self.monsters = monsters.CreateMonsters()
     for idx, monster in enumerate(self.monsters):
       monster.idx = idx
-      monster.place = self.monster_cup
+      self.move_monster(monster, self.monster_cup)
 
     self.common.extend(items.CreateCommon())
     self.unique.extend(items.CreateUnique())
@@ -157,8 +171,8 @@ class GameState:
     self.mythos.extend(mythos.CreateMythos())
 
     # Shuffle the decks.
-    for deck in assets.Card.DECKS | {"gate_cards", "mythos"} - {"tradables", "specials"}:
-      random.shuffle(getattr(self, deck))
+    for deck in sorted(assets.Card.DECKS | {"gate_cards", "mythos"} - {"tradables", "specials"}):
+      self.rng.shuffle(getattr(self, deck))
     # Place initial clues.
     for place in self.places.values():
       if isinstance(place, places.Location) and place.is_unstable(self):
@@ -210,6 +224,52 @@ class GameState:
       override = override and val
     return override
 
+  def move_monster(self, monster, place):
+    """Puts monster at place (a place, the monster cup, or None), keeping the place index."""
+    self.place_index.refresh(self)
+    self.place_index.move(self.place_index.monsters, monster, place)
+    object.__setattr__(monster, "place", place)
+
+  def move_character(self, char, place):
+    self.place_index.refresh(self)
+    self.place_index.move(self.place_index.characters, char, place)
+    object.__setattr__(char, "place", place)
+
+  def set_gate(self, place, gate):
+    """Opens gate at place, or closes the gate there if gate is None, keeping the place index."""
+    self.place_index.refresh(self)
+    object.__setattr__(place, "gate", gate)
+    self.place_index.gate_changed(place)
+
+  def monsters_at(self, place):
+    """Returns the monsters at place (or in the cup if place is the monster cup), in order."""
+    self.place_index.refresh(self)
+    return list(self.place_index.monsters.get(place, []))
+
+  def monster_indexes_at(self, place):
+    """Returns the positions in self.monsters of the monsters at place, in order."""
+    self.place_index.refresh(self)
+    return [self.place_index.order[id(mon)] for mon in self.place_index.monsters.get(place, [])]
+
+  def characters_at(self, place):
+    self.place_index.refresh(self)
+    return list(self.place_index.characters.get(place, []))
+
+  def open_gates(self):
+    """Returns the places that have an open gate."""
+    self.place_index.refresh(self)
+    return list(self.place_index.gates)
+
+  def closed_places(self):
+    """Returns a frozenset of the names of the places that are closed."""
+    self.place_index.refresh(self)
+    return self.place_index.closed
+
+  def monster_places(self):
+    """Returns a frozenset of the names of the places with at least one monster."""
+    self.place_index.refresh(self)
+    return frozenset(getattr(place, "name", None) for place in self.place_index.monsters)
+
   def globals(self) -> List[mythos.GlobalEffect]:
     return [self.rumor, self.environment, self.ancient_one] + self.other_globals
 
@@ -236,32 +296,51 @@ class GameState:
     for attr in self.DEQUE_ATTRIBUTES:
       output[attr] = list(getattr(self, attr))
 
-    output["characters"] = []
-    for char in self.characters:
-      output["characters"].append(char.get_json(self))
+    # The sections are shared between calls, so callers must copy anything they change.
+    # Some bonuses only apply while a check is on top of the stack (e.g. Team Player).
+    checking = bool(self.event_stack) and isinstance(self.event_stack[-1], events.Check)
+    characters_json = self.view.get(view_model.CHARACTERS, self.characters_json, key=checking)
+    output["characters"] = list(characters_json)
+    # Everything else about these characters and ancient ones is in Catalog().
+    output["all_characters"] = {
+        name: {"gone": char.gone} for name, char in self.all_characters.items()
+    }
+    output["all_ancients"] = sorted(self.all_ancients)
+    # Only the last few turns of the log; clients fetch older turns with EldritchGame.history().
+    output["event_log"] = self.event_log.recent()
+    output["event_log_start"] = self.event_log.spilled
+    output["event_log_pages"] = len(self.event_log.pages)
+    output["monsters"] = list(self.view.get(view_model.MONSTERS, self.monsters_json))
+    output["places"] = dict(self.view.get(view_model.PLACES, self.places_json))
+    output.update(self.view.get(view_model.GLOBALS, self.globals_json))
+    return output
 
-    output["all_characters"] = {}
-    for name, char in self.all_characters.items():
-      output["all_characters"][name] = char.get_json(self)
+  def characters_json(self):
+    return [char.get_json(self) for char in self.characters]
 
-    output["monsters"] = []
-    for monster in self.monsters:
-      output["monsters"].append(monster.json_repr(self, None))
+  def monsters_json(self):
+    return [monster.json_repr(self, None) for monster in self.monsters]
+
+  def places_json(self):
+    return {name: place.json_repr() for name, place in self.places.items()}
 
+  def globals_json(self):
+    output = {}
     for attr in ["environment", "rumor", "ancient_one"]:
       output[attr] = getattr(self, attr).json_repr(self) if getattr(self, attr) else None
     output["other_globals"] = [glob.json_repr(self) for glob in self.other_globals]
-    output["all_ancients"] = {
-        name: ancient.json_repr(self) for name, ancient in self.all_ancients.items()
-    }
-
     return output
 
   def for_player(self, char_idx):
+    output = self.public_state()
+    output.update(self.player_overlay(char_idx))
+    return output
+
+  def public_state(self):
     output = self.json_repr()
 
     # We only return the counts of these items, not the actual items.
-    output["monster_cup"] = len([mon for mon in self.monsters if mon.place == self.monster_cup])
+    output["monster_cup"] = len(self.monsters_at(self.monster_cup))
     output["gates"] = len(self.gates)
 
     output["gate_limit"] = self.gate_limit()
@@ -280,6 +359,11 @@ class GameState:
 
     top_event = self.event_stack[-1] if self.event_stack else None
 
+    # Monsters that just moved together, with every place they moved through, so that the client
+    # can animate them at the same time.
+    if isinstance(top_event, events.MoveMonsterGroup) and top_event.is_resolved():
+      output["monster_paths"] = dict(top_event.paths)
+
     # Figure out the current encounter/mythos card being resolved.
     current = None
     for event in reversed(self.event_stack):
@@ -425,7 +509,7 @@ class GameState:
         # Update the output to put the monsters in their pending places.
         for place, indexes in choice.pending.items():
           for idx in indexes:
-            output["monsters"][idx]["place"] = place
+            output["monsters"][idx] = dict(output["monsters"][idx], place=place)
       elif isinstance(choice, events.MonsterOnBoardChoice):
         output["choice"]["board_monster"] = True
       else:
@@ -437,20 +521,29 @@ class GameState:
       for name, value in top_event.pending.items():
         output["sliders"][name] = {"selection": value}
 
-    output["spendables"] = None
-    output["usables"] = None
+    output["autochoose"] = not bool(self.usables)
+    return output
+
+  def player_overlay(self, char_idx):
+    output = {"spendables": None, "usables": None}
     if self.spendables.get(char_idx):
       output["spendables"] = list(self.spendables[char_idx].keys())
     if self.usables.get(char_idx):
       output["usables"] = list(self.usables[char_idx].keys())
-    output["autochoose"] = not bool(self.usables)
     return output
 
+  def json_str(self):
+    return serialization.EncodeJson(self)
+
   @classmethod
   def parse_json(cls, json_str):
-    pass  # TODO
+    state = serialization.DecodeJson(json_str)
+    if not isinstance(state, cls):
+      raise serialization.SerializationError(f"Expected a {cls.__name__}")
+    return state
 
   def handle(self, char_idx, data):
+    self.mark_move(data.get("type"))
     if data.get("type") == "start":
       self.handle_start()
       return self.resolve_loop()
@@ -530,6 +623,17 @@ class GameState:
 
     return self.resolve_loop()  # Returns a generator object.
 
+  def mark_move(self, move_type):
+    """Marks the sections of the view that a move can change before any event is resolved."""
+    if move_type == "done_using":
+      return
+    if move_type in self.EVENT_MOVES and self.event_stack:
+      self.view.mark(view_model.Sections(self.event_stack[-1]))
+    elif move_type in self.CHARACTER_MOVES:
+      self.view.mark({view_model.CHARACTERS})
+    else:
+      self.view.mark_all()
+
   def resolve_loop(self):
     if not (self.event_stack or self.test_mode or self.game_stage in ("victory", "defeat")):
       self.next_turn()
@@ -545,6 +649,7 @@ class GameState:
       self.usables = self.get_usable_interrupts(event)
       # TODO: maybe we can have an Input class. Or a needs_input() method.
       if isinstance(event, events.ChoiceEvent) and not event.is_done():
+        self.view.mark(view_model.Sections(event))
         event.compute_choices(self)
         if not event.is_done():
           if event != self.event_stack[-1]:  # Some choices may put a new event on the stack.
@@ -563,7 +668,11 @@ class GameState:
         yield None
         return
       if not event.is_done():
-        event.resolve(self)
+        self.view.mark(view_model.Sections(event))
+        if metrics.ENABLED and self.profile is not None:
+          self.profiled_resolve(event)
+        else:
+          event.resolve(self)
         self.validate_resolve(event)
       if not event.is_done():
         continue
@@ -583,6 +692,18 @@ class GameState:
         self.next_turn()
         yield None
 
+  def profiled_resolve(self, event):
+    start = time.perf_counter()
+    try:
+      event.resolve(self)
+    finally:
+      name = type(event).__name__
+      self.profile.count("eldritch_resolve_total", label=name)
+      self.profile.count("eldritch_resolve_seconds_total", time.perf_counter() - start, name)
+
+  def possession_count(self):
+    return sum(len(char.possessions) for char in self.characters if not char.gone)
+
   def validate_resolve(self, event):
     if event.is_done():
       return
@@ -599,6 +720,9 @@ class GameState:
     if len(self.interrupt_stack) >= len(self.event_stack):
       return
 
+    if metrics.ENABLED and self.profile is not None:
+      self.profile.count("game_events_total")
+
     # Create a log event and attach it to its parent log event, if any.
     log = events.EventLog(event.log(self), event.flatten())
     if not log.flatten:
@@ -606,7 +730,7 @@ class GameState:
         prev_log = next(prev_log for prev_log in reversed(self.log_stack) if not prev_log.flatten)
         prev_log.sub_events.append(log)
       else:
-        self.event_log.append(log)
+        self.event_log.append(log, self.turn_number)
 
     # Extend all other stacks to match the event stack. Also initialize any interrupts.
     self.log_stack.append(log)
@@ -652,23 +776,46 @@ class GameState:
     self.usables.clear()
     self.done_using.clear()
 
+  def may_react(self, event):
+    """Returns whether any possession or global effect may have something to do for event.
+
+    Hooks without a ReactsTo declaration count as reacting. Interrupts and triggers that the game
+    itself adds (e.g. fighting monsters after moving) are not included.
+    """
+    for char in self.characters:
+      if char.gone:
+        continue
+      for hook in ["get_interrupt", "get_usable_interrupt", "get_trigger", "get_usable_trigger"]:
+        if listeners.Listeners(char.possessions, hook, event):
+          return True
+    global_effects = [glob for glob in self.globals() if glob]
+    hooks = ["get_interrupt", "get_trigger"]
+    return any(listeners.Listeners(global_effects, hook, event) for hook in hooks)
+
   # TODO: global interrupts/triggers from ancient one, environment, other mythos/encounter cards
+  @metrics.Timed("eldritch_collect_seconds", "interrupts", scanned="possession_count")
   def get_interrupts(self, event):
     interrupts = []
     if isinstance(event, (events.MoveOne, events.WagonMove)):
-      nearby_monsters = [mon for mon in self.monsters if mon.place == event.character.place]
+      nearby_monsters = self.monsters_at(event.character.place)
       if nearby_monsters:
         interrupts.append(events.EvadeOrFightAll(event.character, nearby_monsters))
-    interrupts.extend(sum(
-        [char.get_interrupts(event, self) for char in self.characters if not char.gone], [],
-    ))
-    global_interrupts = [glob.get_interrupt(event, self) for glob in self.globals() if glob]
+    for char in self.characters:
+      if not char.gone:
+        interrupts.extend(char.get_interrupts(event, self))
+    global_effects = [glob for glob in self.globals() if glob]
+    global_interrupts = [
+        glob.get_interrupt(event, self)
+        for glob in listeners.Listeners(global_effects, "get_interrupt", event)
+    ]
     interrupts.extend([interrupt for interrupt in global_interrupts if interrupt])
     if isinstance(event, self.MONSTER_EVENTS) and isinstance(event.monster, monsters.Monster):
-      monster_interrupt = event.monster.get_interrupt(event, self)
-      interrupts.extend([monster_interrupt] if monster_interrupt else [])
+      if listeners.Listeners([event.monster], "get_interrupt", event):
+        monster_interrupt = event.monster.get_interrupt(event, self)
+        interrupts.extend([monster_interrupt] if monster_interrupt else [])
     return interrupts
 
+  @metrics.Timed("eldritch_collect_seconds", "usable_interrupts", scanned="possession_count")
   def get_usable_interrupts(self, event):
     i = {
         idx: char.get_usable_interrupts(event, self)
@@ -677,16 +824,18 @@ class GameState:
     if self.turn_phase == "movement":
       # If the character is in another world with another character, let them trade before moving.
       if isinstance(event, (events.ForceMovement, events.GateChoice)) and not event.is_done():
-        if len([char for char in self.characters if char.place == event.character.place]) > 1:
+        if len(self.characters_at(event.character.place)) > 1:
           i[self.characters.index(event.character)]["trade"] = events.Nothing()
     return {char_idx: interrupts for char_idx, interrupts in i.items() if interrupts}
 
+  @metrics.Timed("eldritch_collect_seconds", "spendables", scanned="possession_count")
   def get_spendables(self, event):
     return {
         idx: char.get_spendables(event, self)
         for idx, char in enumerate(self.characters) if char.get_spendables(event, self)
     }
 
+  @metrics.Timed("eldritch_collect_seconds", "triggers", scanned="possession_count")
   def get_triggers(self, event):
     triggers = []
 
@@ -720,14 +869,13 @@ class GameState:
 
     # Lost investigators are devoured when the ancient one awakens.
     if isinstance(event, events.Awaken):
-      for char in self.characters:
-        if char.place == self.places["Lost"]:
-          triggers.append(events.Devoured(char))
+      for char in self.characters_at(self.places["Lost"]):
+        triggers.append(events.Devoured(char))
 
     # Must fight monsters when you end your movement.
     if isinstance(event, (events.CityMovement, events.WagonMove, events.Return)):
       if self.turn_phase == "movement":
-        nearby_monsters = [mon for mon in self.monsters if mon.place == event.character.place]
+        nearby_monsters = self.monsters_at(event.character.place)
         if nearby_monsters:
           auto_evade = isinstance(event, events.Return)
           triggers.append(events.EvadeOrFightAll(event.character, nearby_monsters, auto_evade))
@@ -740,11 +888,9 @@ class GameState:
     # Pulled through a gate if it opens on top of you.
     # Ancient one awakens if gate limit has been hit.
     if isinstance(event, events.OpenGate) and event.opened:
-      open_gates = len([place for place in self.places.values() if getattr(place, "gate", None)])
-      if open_gates >= self.gate_limit():
+      if len(self.open_gates()) >= self.gate_limit():
         triggers.append(events.Awaken())
-      loc = self.places[event.location_name]
-      chars = [char for char in self.characters if char.place == loc]
+      chars = self.characters_at(self.places[event.location_name])
       if chars:
         triggers.append(events.PullThroughGate(chars))
 
@@ -757,17 +903,23 @@ class GameState:
     if isinstance(event, (events.Combat, events.InvestigatorAttack, events.InsaneOrUnconscious)):
       triggers.append(events.DeactivateCombatSpells(event.character))
 
-    triggers.extend(sum(
-        [char.get_triggers(event, self) for char in self.characters if not char.gone], [],
-    ))
-    global_triggers = [glob.get_trigger(event, self) for glob in self.globals() if glob]
+    for char in self.characters:
+      if not char.gone:
+        triggers.extend(char.get_triggers(event, self))
+    global_effects = [glob for glob in self.globals() if glob]
+    global_triggers = [
+        glob.get_trigger(event, self)
+        for glob in listeners.Listeners(global_effects, "get_trigger", event)
+    ]
     triggers.extend([trigger for trigger in global_triggers if trigger])
     if isinstance(event, self.MONSTER_EVENTS) and isinstance(event.monster, monsters.Monster):
-      monster_trigger = event.monster.get_trigger(event, self)
-      triggers.extend([monster_trigger] if monster_trigger else [])
+      if listeners.Listeners([event.monster], "get_trigger", event):
+        monster_trigger = event.monster.get_trigger(event, self)
+        triggers.extend([monster_trigger] if monster_trigger else [])
 
     return triggers
 
+  @metrics.Timed("eldritch_collect_seconds", "usable_triggers", scanned="possession_count")
   def get_usable_triggers(self, event):
     trgs = {
         idx: char.get_usable_triggers(event, self)
@@ -775,7 +927,7 @@ class GameState:
     }
     # If the character moved from another world to another character, let them trade after moving.
     if isinstance(event, (events.ForceMovement, events.Return)) and self.turn_phase == "movement":
-      if len([char for char in self.characters if char.place == event.character.place]) > 1:
+      if len(self.characters_at(event.character.place)) > 1:
         trgs[self.characters.index(event.character)]["trade"] = events.Nothing()
     # If the ancient one has awakened and this is the end of the last upkeep phase before the
     # players attack, give all characters a chance to trade.
@@ -939,7 +1091,7 @@ class GameState:
     assert place in self.places
     assert getattr(self.places[place], "gate", None) is not None
     self.gates.append(self.places[place].gate)
-    self.places[place].gate = None
+    self.set_gate(self.places[place], None)
 
   def handle_toggle_seal(self, place):
     assert place in self.places
@@ -951,7 +1103,7 @@ class GameState:
     assert getattr(self.places[place], "gate", True) is None
     for gate in self.gates:
       if gate.name == gate_name:
-        self.places[place].gate = gate
+        self.set_gate(self.places[place], gate)
         self.gates.remove(gate)
         return
     raise InvalidMove("No gates of that type left in the stack.")
@@ -961,7 +1113,7 @@ class GameState:
     assert monster_name in monsters.MONSTERS
     for monster in self.monsters:
       if monster.name == monster_name and monster.place == self.monster_cup:
-        monster.place = self.places[place]
+        self.move_monster(monster, self.places[place])
         return
     raise InvalidMove("No monsters of that type left in the cup.")
 
@@ -970,7 +1122,7 @@ class GameState:
     assert monster_name in monsters.MONSTERS
     for monster in self.monsters:
       if monster.name == monster_name and monster.place == self.places[place]:
-        monster.place = self.monster_cup
+        self.move_monster(monster, self.monster_cup)
         return
     raise InvalidMove("No monsters of that type in that place.")
 
@@ -1006,9 +1158,9 @@ class GameState:
     assert len(chars) == 1
     char = chars[0]
     if place in self.places:
-      char.place = self.places[place]
+      self.move_character(char, self.places[place])
     elif place + "1" in self.places:
-      char.place = self.places[place + "1"]
+      self.move_character(char, self.places[place + "1"])
     else:
       raise InvalidMove(f"Unknown place {place}")
 
@@ -1061,7 +1213,7 @@ class GameState:
     char = chars[0]
     for monster in self.monsters:
       if monster.place == self.monster_cup and monster.name == monster_or_gate:
-        monster.place = None
+        self.move_monster(monster, None)
         char.trophies.append(monster)
         return
     for gate in self.gates:
@@ -1080,7 +1232,7 @@ class GameState:
     trophy = found[0]
     if isinstance(trophy, monsters.Monster):
       char.trophies.remove(trophy)
-      trophy.place = self.monster_cup
+      self.move_monster(trophy, self.monster_cup)
     elif isinstance(trophy, gates.Gate):
       char.trophies.remove(trophy)
       self.gates.append(trophy)
@@ -1187,6 +1339,7 @@ class GameState:
     return False
 
   def next_turn(self):
+    self.view.mark_all()
     if self.game_stage == "awakened":
       self.next_awaken_turn()
       return
@@ -1284,7 +1437,7 @@ class GameState:
     # Abilities and fixed possessions.
     char_specials = abilities.CreateSpecials()
     for char in new_characters:
-      char.place = self.places[char.home]
+      self.move_character(char, self.places[char.home])
       char.possessions.extend([char_specials[name] for name in char.abilities()])
       self.give_fixed_possessions(char, char.fixed_possessions())
     # Random possessions.
@@ -1298,6 +1451,40 @@ class GameState:
     return events.Sequence([events.SliderInput(char, free=True) for char in new_characters], None)
 
 
+def Catalog():
+  """Returns the parts of the game that never change, for the client to fetch once.
+
+  Pushed states only carry the names of characters and ancient ones that are not in play; the
+  client looks up everything else here. Characters, ancient ones and monsters are described as
+  they are before any global effect modifies them.
+  """
+  state = GameState()
+  cards = (
+      items.CreateCommon() + items.CreateUnique() + items.CreateSpells() + abilities.CreateSkills()
+      + assets.CreateAllies() + items.CreateTradables() + items.CreateSpecials()
+  )
+  per_monster = ["handle", "idx", "place"]
+  return {
+      "characters": {name: char.get_json(state) for name, char in state.all_characters.items()},
+      "ancients": {name: ancient.json_repr(state) for name, ancient in state.all_ancients.items()},
+      "cards": {
+          card.name: {
+              "deck": card.deck,
+              "active_bonuses": dict(card.active_bonuses),
+              "passive_bonuses": dict(card.passive_bonuses),
+          }
+          for card in cards if isinstance(card, assets.Card)
+      },
+      "monsters": {
+          monster.name: {
+              key: value for key, value in monster.json_repr(state, None).items()
+              if key not in per_monster
+          }
+          for monster in monsters.CreateMonsters()
+      },
+  }
+
+
 class EldritchGame(BaseGame):
 
   def __init__(self):
@@ -1313,26 +1500,69 @@ class EldritchGame(BaseGame):
   def game_status(self):
     return self.game.game_status()
 
+  def set_random(self, rng):
+    self.game.rng = rng
+
+  def set_profile(self, profile):
+    self.game.profile = profile
+
+  @classmethod
+  def catalog(cls):
+    return Catalog()
+
   @classmethod
-  def parse_json(cls, json_str):  # pylint: disable=arguments-renamed,unused-argument
-    return None  # TODO
+  def parse_json(cls, json_str):  # pylint: disable=arguments-renamed
+    data = serialization.DecodeJson(json_str)
+    game = cls()
+    game.game = data["game"]
+    game.player_sessions = data["player_sessions"]
+    game.pending_sessions = data["pending_sessions"]
+    if isinstance(game.game.event_log, list):  # Saved before the log was kept in pages.
+      history = log_history.LogHistory()
+      for log in game.game.event_log:
+        history.append(log, game.game.turn_number)
+      game.game.event_log = history
+    return game
 
   def json_str(self):
-    output = self.game.json_repr()
-    output["player_sessions"] = self.player_sessions
-    output["pending_sessions"] = self.pending_sessions
-    return json.dumps(output, cls=CustomEncoder)
+    return serialization.EncodeJson({
+        "game": self.game,
+        "player_sessions": self.player_sessions,
+        "pending_sessions": self.pending_sessions,
+    })
+
+  def snapshot_later(self):
+    # Pickling takes a fraction of the time that encoding JSON does, so moves only wait for that.
+    data = serialization.EncodeBinary(self)
+    return lambda: serialization.DecodeBinary(data).json_str()
+
+  def shared_json_str(self):
+    return serialization.EncodeJson({
+        "game": self.game,
+        "player_sessions": self.player_sessions,
+        "pending_sessions": self.pending_sessions,
+    }, hide_random=True)
 
   def for_player(self, session):
-    output = self.game.for_player(self.player_sessions.get(session))
+    return self.spliced_for_player(session)
+
+  def history(self, page):
+    return self.game.event_log.page(page)
+
+  def public_state(self):
+    output = self.game.public_state()
     # is_connected = {idx: sess in self.connected for sess, idx in self.player_sessions.items()}
     # TODO: send connection information somehow
     # for idx in range(len(output["characters"])):
     #   output["characters"][idx]["disconnected"] = not is_connected.get(idx, False)
+    return output
+
+  def player_overlay(self, session):
+    output = self.game.player_overlay(self.player_sessions.get(session))
     output["player_idx"] = self.player_sessions.get(session)
     output["pending_name"] = self.pending_sessions.get(session)
     output["host"] = self.host == session
-    return json.dumps(output, cls=CustomEncoder)
+    return output
 
   def connect_user(self, session):
     self.connected.add(session)
@@ -1,6 +1,7 @@
 import operator
 
 from eldritch import events
+from eldritch import listeners
 from eldritch import mythos
 from eldritch import values
 from eldritch.monsters import EventMonster
@@ -35,6 +36,7 @@ class CardRevealer(mythos.GlobalEffect):
       return "Next " + self.choice.choice + " Card"
     return "Next Card"
 
+  @listeners.ReactsTo("DrawEncounter")
   def get_trigger(self, event, state):
     if not isinstance(event, events.DrawEncounter):
       return None
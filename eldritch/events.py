@@ -8,8 +8,10 @@ from typing import (
 )
 
 from eldritch import assets
+from eldritch import board as _board  # Private, since tests import * from here.
 from eldritch import places
 from eldritch import values
+from eldritch import view_model
 
 from game import InvalidMove, InvalidInput
 
@@ -17,6 +19,7 @@ if TYPE_CHECKING:
   from eldritch.eldritch import GameState
   from eldritch import items
 
+# Used by states that were not given a generator of their own; tests patch it to fix dice rolls.
 random = SystemRandom()
 
 
@@ -26,6 +29,8 @@ DECKS = {"common", "unique", "spells", "skills", "allies", "tradables", "special
 
 class EventLog:
 
+  __slots__ = ("text", "flatten", "sub_events")
+
   def __init__(self, text, flatten):
     self.text: str = text
     self.flatten: bool = flatten
@@ -64,8 +69,13 @@ class Event(metaclass=abc.ABCMeta):
 
   An Event's is_resolved() method must use information from the Event's internal state to
   decide whether to return True or False; it should not use references to game objects.
+
+  Events that are created very often declare __slots__ for all of their attributes, so that they
+  take less memory. Their subclasses and all other events have a __dict__ as usual.
   """
 
+  __slots__ = ("cancelled",)
+
   def __init__(self):
     self.cancelled = False
 
@@ -124,8 +134,11 @@ class ChoiceEvent(Event):
     return None
 
 
+@view_model.Changes()
 class Nothing(Event):
 
+  __slots__ = ("done",)
+
   def __init__(self):
     super().__init__()
     self.done = False
@@ -140,6 +153,35 @@ class Nothing(Event):
     return ""
 
 
+class AlreadyDone(Nothing):
+  """A Nothing that has already been resolved, for events that need a finished placeholder.
+
+  There is only one, DONE, since there is nothing about it that could differ; it cannot be changed.
+  """
+
+  __slots__ = ()
+
+  def __init__(self):  # pylint: disable=super-init-not-called
+    object.__setattr__(self, "cancelled", False)
+    object.__setattr__(self, "done", True)
+
+  def __setattr__(self, name, value):
+    raise AttributeError(f"cannot set {name} on {type(self).__name__}")
+
+  def __reduce__(self):
+    return Done, ()
+
+  def resolve(self, state):
+    pass
+
+
+def Done():
+  return DONE
+
+
+DONE = AlreadyDone()
+
+
 class Unimplemented(Nothing):
   pass
 
@@ -150,13 +192,16 @@ class Animate(Nothing):
     return True
 
 
+@view_model.Changes()
 class Sequence(Event):
 
+  __slots__ = ("events", "idx", "character")
+
   def __init__(self, events, character=None):
     super().__init__()
     self.events: List[Event] = events
     if not self.events:
-      self.events = [Nothing()]
+      self.events = [DONE]
     self.idx = 0
     self.character = character
 
@@ -205,6 +250,7 @@ class Turn(Event, metaclass=abc.ABCMeta):
     return False
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class Upkeep(Turn):
 
   def __init__(self, character):
@@ -247,6 +293,7 @@ class Upkeep(Turn):
     return f"[{self.character.name}]'s upkeep"
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class SliderInput(Event):
 
   def __init__(self, character, free=False):
@@ -333,6 +380,7 @@ class MoveSliders(Event):
     return True
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class Movement(Turn):
 
   def __init__(self, character):
@@ -382,6 +430,7 @@ class Movement(Turn):
     return f"[{self.character.name}]'s movement"
 
 
+@view_model.Changes()
 class CityMovement(ChoiceEvent):
 
   def __init__(self, character):
@@ -436,39 +485,19 @@ class CityMovement(ChoiceEvent):
   def get_routes(self, state):
     if self.character.movement_points == 0:
       return {}
-    routes = {self.character.place.name: []}
-    if self.character.place.closed:
-      return routes
-
-    monster_counts = collections.defaultdict(int)
-    for monster in state.monsters:
-      if monster.place is not None:
-        monster_counts[monster.place.name] += 1
-
-    queue = collections.deque()
-    for place in self.character.place.connections:
-      if not place.closed:
-        queue.append((place, []))
-    while queue:
-      place, route = queue.popleft()
-      if place.name in routes:
-        continue
-      if place.closed:  # TODO: more possibilities?
-        continue
-      routes[place.name] = route + [place.name]
-      if len(routes[place.name]) == self.character.movement_points:
-        continue
-      if monster_counts[place.name] > 0:
-        continue
-      for next_place in place.connections:
-        queue.append((next_place, route + [place.name]))
-    return routes
+    # TODO: more possibilities for closed places?
+    routes = _board.Routes(
+        self.character.place.name, self.character.movement_points, state.closed_places(),
+        state.monster_places(),
+    )
+    return {dest: list(route) for dest, route in routes}
 
 
 class WagonMove(Sequence):
   pass
 
 
+@view_model.Changes()
 class EncounterPhase(Turn):
 
   def __init__(self, character):
@@ -482,8 +511,7 @@ class EncounterPhase(Turn):
       return
     if self.action is None:
       if not isinstance(self.character.place, places.Location):
-        self.action = Nothing()
-        self.action.done = True
+        self.action = DONE
         self.done = True
         return
       if self.character.place.gate and self.character.explored:
@@ -520,6 +548,7 @@ class EncounterPhase(Turn):
     return f"[{self.character.name}]'s encounter phase"
 
 
+@view_model.Changes()
 class OtherWorldPhase(Turn):
 
   def __init__(self, character):
@@ -533,8 +562,7 @@ class OtherWorldPhase(Turn):
       return
     if self.action is None:
       if not isinstance(self.character.place, places.OtherWorld):
-        self.action = Nothing()
-        self.action.done = True
+        self.action = DONE
         self.done = True
         return
       self.action = GateEncounter(self.character)
@@ -689,8 +717,11 @@ class AncientAttack(Turn):
     return True
 
 
+@view_model.Changes()
 class DiceRoll(Event):
 
+  __slots__ = ("character", "count", "name", "bad", "roll", "sum", "successes")
+
   def __init__(self, character, count, *, name=None, bad=None):
     super().__init__()
     self.character = character
@@ -704,7 +735,7 @@ class DiceRoll(Event):
   def resolve(self, state):
     if isinstance(self.count, values.Value):
       self.count = self.count.value(state)
-    self.roll = [random.randint(1, 6) for _ in range(self.count)]
+    self.roll = [state.rng.randint(1, 6) for _ in range(self.count)]
     self.sum = sum(self.roll)
     # Some encounters have: "Roll a die for each X. On a success..."
     self.successes = self.character.count_successes(self.roll, None)
@@ -730,8 +761,11 @@ class BonusDiceRoll(DiceRoll):
   pass
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class MoveOne(Event):
 
+  __slots__ = ("character", "dest", "done", "moved")
+
   def __init__(self, character, dest):
     super().__init__()
     self.character = character
@@ -746,7 +780,7 @@ class MoveOne(Event):
       return
     assert self.dest in [conn.name for conn in self.character.place.connections]
     if not (self.character.place.closed or state.places[self.dest].closed):
-      self.character.place = state.places[self.dest]
+      state.move_character(self.character, state.places[self.dest])
       self.character.movement_points -= 1
       self.character.explored = False
       self.character.avoid_monsters = []
@@ -772,8 +806,11 @@ class MoveOne(Event):
     return True
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class GainOrLoss(Event):
 
+  __slots__ = ("character", "gains", "losses", "source", "final_adjustments")
+
   def __init__(self, character, gains, losses, source=None):
     assert not gains.keys() - {"stamina", "sanity", "dollars", "clues"}
     assert not losses.keys() - {"stamina", "sanity", "dollars", "clues"}
@@ -1039,6 +1076,7 @@ class StackClearMixin:
     assert len(state.event_stack) == len(state.log_stack)
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class InsaneOrUnconscious(StackClearMixin, Event):
 
   def __init__(self, character, attribute, desc):
@@ -1125,7 +1163,7 @@ class Devoured(StackClearMixin, Event):
       self.stack_cleared = True
       self.character.gone = True
       self.character.lose_turn_until = float("inf")
-      self.character.place = None
+      state.move_character(self.character, None)
       for pos in self.character.possessions:
         if hasattr(pos, "deck"):
           getattr(state, getattr(pos, "deck")).append(pos)
@@ -1146,6 +1184,7 @@ class Devoured(StackClearMixin, Event):
     return True
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class DelayOrLoseTurn(Event):
 
   def __init__(self, character, status, which="next"):
@@ -1295,6 +1334,7 @@ class TakeBankLoan(Sequence):
     )
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class ForceMovement(Event):
 
   def __init__(self, character, location_name):
@@ -1332,7 +1372,7 @@ class ForceMovement(Event):
         self.cancelled = True
         return
       self.location_name = self.location_name.card.gate_location
-    self.character.place = state.places[self.location_name]
+    state.move_character(self.character, state.places[self.location_name])
     self.character.explored = False
     self.character.avoid_monsters = []
     self.done = True
@@ -1404,6 +1444,7 @@ class DrawItems(LookAtItems):
   pass
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class KeepDrawn(Event):
   def __init__(self, character, draw, prompt="Choose a card", keep_count=1, sort_uniq=False):
     super().__init__()
@@ -1671,6 +1712,7 @@ def TravelOrEncounter(character, count=1):
   return Conditional(character, on_gate, "", {0: Encounter(character, count), 1: Travel(character)})
 
 
+@view_model.Changes()
 class Encounter(Event):
 
   def __init__(self, character, count=1):
@@ -1735,6 +1777,7 @@ class Encounter(Event):
     return f"[{self.character.name}] had an encounter at [{self.loc_name}]"
 
 
+@view_model.Changes()
 class DrawEncounter(Event):
 
   def __init__(self, character, neighborhood, count):
@@ -1747,7 +1790,7 @@ class DrawEncounter(Event):
 
   def resolve(self, state):
     self.cards = self.neighborhood.encounters[:self.count]
-    random.shuffle(self.neighborhood.encounters)
+    state.rng.shuffle(self.neighborhood.encounters)
 
   def is_resolved(self):
     return self.cards is not None
@@ -1844,7 +1887,7 @@ class DrawGateCard(Event):
         break
       state.gate_cards.append(card)
       if card.name == "ShuffleGate":
-        random.shuffle(state.gate_cards)
+        state.rng.shuffle(state.gate_cards)
         self.shuffled = True
     self.card = card
 
@@ -1880,7 +1923,7 @@ class DrawNamed(Event):
     else:
       self.drawn = []
     if self.deck not in {"specials", "tradables"}:
-      random.shuffle(getattr(state, self.deck))
+      state.rng.shuffle(getattr(state, self.deck))
 
   def is_resolved(self):
     return self.drawn is not None
@@ -1895,8 +1938,11 @@ class DrawNamed(Event):
     return f"There were no [{self.item_name}]s left in the {self.deck} deck"
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class ExhaustAsset(Event):
 
+  __slots__ = ("character", "item", "exhausted")
+
   def __init__(self, character, item):
     assert item in character.possessions
     super().__init__()
@@ -1927,6 +1973,7 @@ class ExhaustAsset(Event):
     return True
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class RefreshAsset(Event):
 
   def __init__(self, character, item):
@@ -1959,6 +2006,7 @@ class RefreshAsset(Event):
     return True
 
 
+@view_model.Changes()
 class RefreshAssets(Event):
 
   def __init__(self, character):
@@ -1987,6 +2035,7 @@ class RefreshAssets(Event):
     return ""
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class ActivateItem(Event):
 
   def __init__(self, character, item):
@@ -2021,6 +2070,7 @@ class ActivateItem(Event):
     return True
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class ActivateChosenItems(Event):
 
   def __init__(self, character, item_choice):
@@ -2062,6 +2112,7 @@ class ActivateChosenItems(Event):
     return ""
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class DeactivateItem(Event):
 
   def __init__(self, character, item, discarded=False):
@@ -2098,6 +2149,7 @@ class DeactivateItem(Event):
     return True
 
 
+@view_model.Changes()
 class DeactivateItems(Event):
 
   def __init__(self, character):
@@ -2129,6 +2181,7 @@ class DeactivateItems(Event):
     return ""
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class CastSpell(Event):
 
   def __init__(self, character, spell, choice=None):
@@ -2236,6 +2289,7 @@ class MarkDeactivatable(Event):
     return ""
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class DeactivateSpell(Event):
 
   def __init__(self, character, spell):
@@ -2267,6 +2321,7 @@ class DeactivateSpell(Event):
     return True
 
 
+@view_model.Changes()
 class DeactivateCombatSpells(Event):
 
   def __init__(self, character):
@@ -2304,6 +2359,7 @@ def LoseItems(character, count, prompt=None, decks=None, item_type=None):
   return Sequence([choice, loss], character)
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class DiscardSpecific(Event):
 
   def __init__(
@@ -2382,6 +2438,7 @@ class DiscardSpecific(Event):
     return True
 
 
+@view_model.Changes()
 class RollToMaintain(Event):
   def __init__(self, character, item: "assets.SelfDiscardingCard"):
     super().__init__()
@@ -2471,7 +2528,7 @@ class ReturnMonsterFromBoard(Event):  # TODO: merge the three return monster to
     self.returned = False
 
   def resolve(self, state):
-    self.monster.place = None if self.to_box else state.monster_cup
+    state.move_monster(self.monster, None if self.to_box else state.monster_cup)
     self.returned = True
 
   def is_resolved(self):
@@ -2501,7 +2558,7 @@ class ReturnMonsterToCup(Event):
     self.returned = []
     for monster in monsters:
       self.character.trophies.remove(monster)
-      monster.place = state.monster_cup
+      state.move_monster(monster, state.monster_cup)
       self.returned.append(monster.name)
 
   def is_resolved(self):
@@ -2554,8 +2611,14 @@ class ReturnGateToStack(Event):
     return True
 
 
+@view_model.Changes()
 class Check(Event):
 
+  __slots__ = (
+      "character", "check_type", "modifier", "difficulty", "attributes", "name", "dice",
+      "pass_check", "roll", "successes", "spend", "bonus_dice", "done",
+  )
+
   def __init__(self, character, check_type, modifier, *, difficulty=1, name=None, attributes=None):
     # TODO: assert on check type
     assert difficulty > 0
@@ -2691,6 +2754,7 @@ class AddExtraDie(Event):
     return f"[{self.character.name}] gets an extra die from their skill"
 
 
+@view_model.Changes()
 class RerollCheck(Event):
 
   def __init__(self, character, check):
@@ -2726,6 +2790,7 @@ class RerollCheck(Event):
     return f"[{self.character.name}] rerolled a {self.check.check_type} check"
 
 
+@view_model.Changes()
 class RerollSpecific(Event):
 
   def __init__(self, character, check, reroll_indexes):
@@ -2772,8 +2837,11 @@ class RerollSpecific(Event):
     return f"[{self.character.name}] rerolled {len(self.reroll_indexes)} dice on their {ctype}"
 
 
+@view_model.Changes()
 class Conditional(Event):
 
+  __slots__ = ("character", "condition", "attribute", "result_map", "result")
+
   def __init__(self, character, condition, attribute, result_map):
     assert isinstance(condition, values.Value) or hasattr(condition, attribute)
     assert all(isinstance(key, int) for key in result_map)
@@ -2877,6 +2945,7 @@ class Arrested(Event):
     return f"[{self.character.name}] to be arrested"
 
 
+@view_model.Changes()
 class MultipleChoice(ChoiceEvent):
 
   def __init__(self, character, prompt, choices, prereqs=None, annotations=None):
@@ -2935,6 +3004,7 @@ class MultipleChoice(ChoiceEvent):
     return self.choices.index(self.choice)
 
 
+@view_model.Changes()
 class FightOrEvadeChoice(MultipleChoice):
 
   def __init__(self, character, prompt, evade_choice, monster, prereqs=None, annotations=None):
@@ -2942,6 +3012,7 @@ class FightOrEvadeChoice(MultipleChoice):
     self.monster = monster
 
 
+@view_model.Changes()
 class MonsterChoice(ChoiceEvent):
 
   def __init__(self, character, prompt, monsters, annotations, none_choice=None):
@@ -3146,10 +3217,12 @@ class SpendMultiChoiceMixin(SpendMixin):
     return [spend.annotation(state) for spend in self.spends]
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class SpendChoice(SpendMultiChoiceMixin, MultipleChoice):
   pass
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class ChangeMovementPoints(Event):
 
   def __init__(self, character, count):
@@ -3204,6 +3277,7 @@ def BinarySpend(
   return Sequence([choice, cond], character)
 
 
+@view_model.Changes()
 class ItemChoice(ChoiceEvent):
 
   def __init__(self, character, prompt, decks=None, item_type=None):
@@ -3276,6 +3350,7 @@ class ItemChoice(ChoiceEvent):
     return "check"
 
 
+@view_model.Changes()
 class CombatChoice(ItemChoice):
 
   def __init__(self, character, prompt, monster=None, combat_round=None):
@@ -3341,6 +3416,7 @@ class ItemCountChoice(ItemChoice):
     return self._select_type
 
 
+@view_model.Changes()
 class ItemLossChoice(ItemChoice):
 
   def __init__(self, character, prompt, count, decks=None, item_type=None):
@@ -3403,6 +3479,7 @@ class SinglePhysicalWeaponChoice(SpendItemChoiceMixin, ItemCountChoice):
     ]
 
 
+@view_model.Changes()
 class CardChoice(MultipleChoice):
 
   def __init__(self, *args, **kwargs):
@@ -3410,6 +3487,7 @@ class CardChoice(MultipleChoice):
     super().__init__(*args, **kwargs)
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class CardSpendChoice(SpendMultiChoiceMixin, CardChoice):
   pass
 
@@ -3579,22 +3657,15 @@ class NearestGateChoice(MapChoice):
       return
 
     self._choices = []
-    nearest = None
-    distances = {self.character.place.name: 0}
-    queue = [self.character.place]
-    while queue:
-      place = queue.pop(0)
-      distance = distances[place.name]
-      if nearest is not None and distance > nearest:
-        break
-      if getattr(place, "gate", None) is not None:
-        nearest = distance
-        self.choices.append(place.name)
-        continue
-      for nearby in place.connections:
-        if nearby.name not in distances:
-          distances[nearby.name] = distance + 1
-          queue.append(nearby)
+    distances = _board.DISTANCES[_board.IDS[self.character.place.name]]
+    gate_places = [
+        _board.IDS[place.name] for place in state.open_gates()
+        if place.name in _board.IDS and distances[_board.IDS[place.name]] is not None
+    ]
+    nearest = min((distances[place] for place in gate_places), default=None)
+    for place in sorted(gate_places):
+      if distances[place] == nearest:
+        self.choices.append(_board.NAMES[place])
 
     if not self.choices:
       self.cancelled = True
@@ -3650,6 +3721,7 @@ class MonsterOnBoardChoice(ChoiceEvent):
     return self._prompt
 
 
+@view_model.Changes()
 class EvadeOrFightAll(Event):
 
   def __init__(self, character, monsters, auto_evade=False):
@@ -3729,6 +3801,7 @@ class EvadeOrFightAll(Event):
     return f"[{self.character.name}] evaded or fought monsters"
 
 
+@view_model.Changes()
 class EvadeOrCombat(Event):
 
   def __init__(self, character, monster, auto_evade=False):
@@ -3784,6 +3857,7 @@ class EvadeOrCombat(Event):
     return f"[{self.character.name}] fought the [{self.monster.name}]"
 
 
+@view_model.Changes()
 class Combat(Event):
 
   def __init__(self, character, monster):
@@ -3846,6 +3920,7 @@ class Combat(Event):
     return f"[{self.character.name}] is fighting a [{self.monster.name}]"
 
 
+@view_model.Changes()
 class EvadeRound(Event):
 
   def __init__(self, character, monster):
@@ -3935,6 +4010,7 @@ class PassEvadeRound(Event):
     return self.log_message
 
 
+@view_model.Changes(view_model.CHARACTERS)
 class CombatRound(Event):
 
   def __init__(self, character, monster, deactivate=False):
@@ -4042,6 +4118,7 @@ class PassCheck(Event):
     return f"[{self.character.name}] to force-pass a {self.check.check_type} check"
 
 
+@view_model.Changes()
 class PassCombatRound(Event):
   def __init__(
       self,
@@ -4116,7 +4193,7 @@ class ForceTakeTrophy(Event):
         return
       self.monster = state.monsters[self.monster.monsters[0]]
 
-    self.monster.place = None
+    state.move_monster(self.monster, None)
     self.character.trophies.append(self.monster)
     self.done = True
 
@@ -4159,7 +4236,7 @@ class RespawnTrophies(Event):
 
     place = state.places[self.location_name]
     for monster in monsters:
-      monster.place = place
+      state.move_monster(monster, place)
       for char in state.characters:
         if monster in char.trophies:
           char.trophies.remove(monster)
@@ -4223,7 +4300,7 @@ class Travel(Event):
         self.cancelled = True
         return
       self.destination = self.character.place.gate.name
-    self.character.place = state.places[self.destination + "1"]
+    state.move_character(self.character, state.places[self.destination + "1"])
     self.character.explored = False  # just in case
     self.done = True
 
@@ -4267,7 +4344,7 @@ class Return(Event):
         return
       self.returned = False
       return
-    self.character.place = state.places[self.return_choice.choice]
+    state.move_character(self.character, state.places[self.return_choice.choice])
     self.character.explored = True
     self.returned = True
 
@@ -4390,7 +4467,7 @@ class CloseGate(Event):
         self.character.trophies.append(self.gate)
       else:
         state.gates.append(self.gate)
-      state.places[self.location_name].gate = None
+      state.set_gate(state.places[self.location_name], None)
       closed_until = state.places[self.location_name].closed_until or -1
       if closed_until > state.turn_number:
         state.event_stack.append(
@@ -4484,7 +4561,7 @@ class DrawMythosCard(Event):
       card = state.mythos.popleft()
       state.mythos.append(card)
       if card.name == "ShuffleMythos":
-        random.shuffle(state.mythos)
+        state.rng.shuffle(state.mythos)
         self.shuffled = True
         continue
       if self.require_gate and card.gate_location is None:
@@ -4537,7 +4614,7 @@ class OpenGate(Event):
           state.event_stack.append(Awaken())
           return
         # TODO: should drawing a gate be its own event?
-        state.places[self.location_name].gate = state.gates.popleft()
+        state.set_gate(state.places[self.location_name], state.gates.popleft())
         state.places[self.location_name].clues = 0
         self.add_doom = AddDoom()
         state.event_stack.append(self.add_doom)
@@ -4545,8 +4622,7 @@ class OpenGate(Event):
 
     if self.draw_monsters is None:
       if not self.opened:  # Monster surge
-        open_gates = [place for place in state.places.values() if getattr(place, "gate", None)]
-        count = max(len(open_gates), len(state.characters))
+        count = max(len(state.open_gates()), len(state.characters))
       else:  # Regular gate opening
         count = 2 if len(state.characters) > 4 else 1
       self.draw_monsters = DrawMonstersFromCup(count)
@@ -4764,15 +4840,14 @@ class DrawMonstersFromCup(Event):
 
   def resolve(self, state):
     monster_indexes = [
-        idx for idx, monster in enumerate(state.monsters)
-        if monster.place == state.monster_cup and (
-            not self.to_board or state.get_override(monster, "can_draw_to_board"))
+        idx for idx in state.monster_indexes_at(state.monster_cup)
+        if not self.to_board or state.get_override(state.monsters[idx], "can_draw_to_board")
     ]
     if len(monster_indexes) < self.count:
       self.awaken = Awaken()
       state.event_stack.append(self.awaken)
       return
-    self.monsters = random.sample(monster_indexes, self.count)
+    self.monsters = state.rng.sample(monster_indexes, self.count)
     assert len(self.monsters) == self.count, f"Should be {self.count}, drew {len(self.monsters)}"
 
   def is_resolved(self):
@@ -4946,15 +5021,14 @@ class MonsterSpawnChoice(ChoiceEvent):
     to_remove = set()
     for location_name, monster_indexes in choice.items():
       for monster_idx in monster_indexes:
-        state.monsters[monster_idx].place = state.places[location_name]
+        state.move_monster(state.monsters[monster_idx], state.places[location_name])
       to_remove |= set(monster_indexes)
 
     # Clear the outskirts if necessary.
-    in_outskirts = len([m for m in state.monsters if isinstance(m.place, places.Outskirts)])
-    if in_outskirts > state.outskirts_limit():
-      for monster in state.monsters:
-        if monster.place == state.places["Outskirts"]:
-          monster.place = state.monster_cup
+    in_outskirts = state.monsters_at(state.places["Outskirts"])
+    if len(in_outskirts) > state.outskirts_limit():
+      for monster in in_outskirts:
+        state.move_monster(monster, state.monster_cup)
       # If the outskirts were cleared, increase the terror level.
       self.terrors.append(IncreaseTerror())
       state.event_stack.append(self.terrors[-1])
@@ -5116,8 +5190,7 @@ class SpawnClue(Event):
       self.spawned = False
       return
 
-    self.eligible = [
-        char for char in state.characters if char.place == state.places[self.location_name]]
+    self.eligible = state.characters_at(state.places[self.location_name])
 
     if len(self.eligible) == 0:
       state.places[self.location_name].clues += 1
@@ -5175,6 +5248,19 @@ class MoveMonsters(Event):
         moves.append(MoveMonster(monster, move_color))
       self.moves = Sequence(moves)
 
+    # When nothing can react to a monster moving, move monsters together and animate them at once.
+    # Monsters with unique movement still move one at a time, in order, as their movement may
+    # change the state (e.g. by hurting characters) that later monsters move by.
+    pending = [move for move in self.moves.events if not move.is_done()]
+    if pending and isinstance(pending[0], MoveMonster) and not state.may_react(pending[0]):
+      together = []
+      for move in pending:
+        if move.monster.movement(state) == "unique":
+          break
+        together.append(move)
+      state.event_stack.append(MoveMonsterGroup(together) if together else pending[0])
+      return
+
     if not self.moves.is_done():
       state.event_stack.append(self.moves)
       return
@@ -5187,6 +5273,43 @@ class MoveMonsters(Event):
     return movement + ", ".join(self.black_dimensions) + " move on black"
 
 
+@view_model.Changes(view_model.MONSTERS)
+class MoveMonsterGroup(Event):
+  """Moves several monsters in one step, without interrupts or triggers for each monster.
+
+  Only for monsters without unique movement, and only when nothing can react to MoveMonster.
+  """
+
+  def __init__(self, moves):
+    super().__init__()
+    self.moves: List[MoveMonster] = moves
+    self.paths = None  # [monster idx, [names of the places it moved through]] for each move
+
+  def resolve(self, state):
+    self.paths = []
+    for move in self.moves:
+      path = move.move_now(state)
+      if len(path) > 1:
+        self.paths.append([move.monster.idx, [place.name for place in path]])
+
+  def is_resolved(self):
+    return self.paths is not None
+
+  def log(self, state):
+    if self.paths is None:
+      return "monsters move"
+    moved = [move for move in self.moves if move.destination]
+    if not moved:
+      return "no monsters moved"
+    return ", ".join(
+        f"[{move.monster.name}] moved from [{move.source.name}] to [{move.destination.name}]"
+        for move in moved
+    )
+
+  def animated(self):
+    return True
+
+
 class MoveMonster(Event):
 
   def __init__(self, monster, color):
@@ -5206,15 +5329,11 @@ class MoveMonster(Event):
 
     movement = self.monster.movement(state)
 
-    if movement == "stationary":
-      self.destination = False
-      return
-
     if movement == "unique":
       if hasattr(self.monster, "get_destination"):
         self.destination = self.monster.get_destination(state)
         if self.destination:
-          self.monster.place = self.destination
+          state.move_monster(self.monster, self.destination)
         return
       if self.move_event is None:
         self.move_event = self.monster.move_event(state)
@@ -5224,52 +5343,66 @@ class MoveMonster(Event):
       self.destination = False
       return
 
-    local_chars = [char for char in state.characters if char.place == self.monster.place]
-    if local_chars:
-      self.destination = False
+    self.destination = self.next_place(state, movement)
+    if self.destination:
+      state.move_monster(self.monster, self.destination)
+
+    # Hack: second move for fast monsters. Mark this event as not resolved, then append a Nothing()
+    # to the stack so that we attempt to resolve movement again. Use move_event to track this.
+    # We do it this way so that both of the monster's moves are animated.
+    if movement == "fast" and self.move_event is None:
+      if state.characters_at(self.monster.place):
+        return
+      self.destination = None
+      self.move_event = Animate()
+      state.event_stack.append(self.move_event)
       return
 
+  def move_now(self, state):
+    """Moves the monster without going through the event stack; returns the places it went through.
+
+    Both moves of a fast monster are made at once. Not for monsters with unique movement.
+    """
+    path = [self.monster.place]
+    if self.monster.place is not None:
+      movement = self.monster.movement(state)
+      assert movement != "unique"
+      for _ in range(2 if movement == "fast" else 1):
+        destination = self.next_place(state, movement)
+        if not destination:
+          break
+        state.move_monster(self.monster, destination)
+        path.append(destination)
+    self.source = path[0]
+    self.destination = path[-1] if len(path) > 1 else False
+    return path
+
+  def next_place(self, state, movement):
+    """Returns where the monster moves next, or False if it stays where it is."""
+    if movement == "stationary":
+      return False
+
+    if state.characters_at(self.monster.place):
+      return False
+
     if movement == "flying":
-      if self.monster.place.name == "Sky":
-        nearby_streets = [
-            street for street in state.places.values() if isinstance(street, places.Street)
-        ]
-      else:
-        nearby_streets = [
-            street for street in self.monster.place.connections if isinstance(street, places.Street)
-        ]
-      eligible_chars = [char for char in state.characters if char.place in nearby_streets]
+      nearby_streets = _board.NEARBY_STREETS.get(self.monster.place.name, frozenset())
+      eligible_chars = [
+          char for char in state.characters
+          if getattr(char.place, "name", None) in nearby_streets
+      ]
       if not eligible_chars:
         if self.monster.place.name == "Sky":
-          self.destination = False
-          return
-        self.destination = state.places["Sky"]
-        self.monster.place = self.destination
-        return
+          return False
+        return state.places["Sky"]
 
       # TODO: allow the first player to break ties
       eligible_chars.sort(key=lambda char: char.sneak(state))
-      self.destination = eligible_chars[0].place
-      self.monster.place = self.destination
-      return
+      return eligible_chars[0].place
 
     # TODO: other movement types (stalker, aquatic)
 
-    self.destination = False
-    if self.color in getattr(self.monster.place, "movement", {}):
-      self.destination = self.monster.place.movement[self.color]
-      self.monster.place = self.destination
-
-    # Hack: second move for fast monsters. Mark this event as not resolved, then append a Nothing()
-    # to the stack so that we attempt to resolve movement again. Use move_event to track this.
-    # We do it this way so that both of the monster's moves are animated.
-    if movement == "fast" and self.move_event is None:
-      if [char for char in state.characters if char.place == self.monster.place]:
-        return
-      self.destination = None
-      self.move_event = Animate()
-      state.event_stack.append(self.move_event)
-      return
+    return getattr(self.monster.place, "movement", {}).get(self.color, False)
 
   def is_resolved(self):
     return self.destination is not None
@@ -5318,12 +5451,12 @@ class ReturnToCup(Event):
 
       for monster in state.monsters:
         if getattr(monster.place, "name", None) in self.places:
-          monster.place = state.monster_cup
+          state.move_monster(monster, state.monster_cup)
           count += 1
     if self.names:
       for monster in state.monsters:
         if monster.name in self.names and isinstance(monster.place, places.CityPlace):
-          monster.place = state.monster_cup
+          state.move_monster(monster, state.monster_cup)
           count += 1
     self.returned = count
 
@@ -5359,8 +5492,8 @@ class CloseLocation(Event):
       place.closed_until = max(place.closed_until, until)
     else:
       place.closed_until = until
-    chars_in_place = [char for char in state.characters if char.place == place]
-    monsters_in_place = [mon for mon in state.monsters if mon.place == place]
+    chars_in_place = state.characters_at(place)
+    monsters_in_place = state.monsters_at(place)
 
     if place.closed and self.evict:
       # TODO: is it possible for a street to evict on close?
@@ -5369,7 +5502,7 @@ class CloseLocation(Event):
       for char in chars_in_place:
         evictions.append(ForceMovement(char, to_place.name))
       for monster in monsters_in_place:
-        monster.place = to_place
+        state.move_monster(monster, to_place)
       state.event_stack.append(Sequence(evictions))
       self.evict = False  # So we don't keep looping
       return
@@ -5553,7 +5686,7 @@ class Awaken(Event):
       # TODO: we can devour lost characters here instead of in global triggers
       for char in state.characters:
         if char.place != state.places["Lost"]:
-          char.place = state.places["Battle"]
+          state.move_character(char, state.places["Battle"])
       self.moved_chars = True
     self.done = True
 
@@ -3,6 +3,7 @@ import typing
 from eldritch import assets
 from eldritch import characters
 from eldritch import events
+from eldritch import listeners
 from eldritch import values
 
 if typing.TYPE_CHECKING:
@@ -13,6 +14,7 @@ class AbnormalFocus(assets.Asset):
   def __init__(self):
     super().__init__("Abnormal Focus")
 
+  @listeners.ReactsTo("Upkeep")
   def get_interrupt(self, event, owner: characters.BaseCharacter, state):
     if isinstance(event, events.Upkeep) and event.character == owner:
       # Allow Spy to keep the lore slider from the last turn for spellcasting
@@ -34,6 +36,7 @@ class BreakingTheLimits(assets.Asset):
     self.tokens["sanity"] = 0
     self.tokens["stamina"] = 0
 
+  @listeners.ReactsTo("Upkeep")
   def get_interrupt(self, event, owner, state):
     if isinstance(event, events.Upkeep) and event.character == owner:
       return events.Sequence([
@@ -42,6 +45,7 @@ class BreakingTheLimits(assets.Asset):
       ], owner)
     return None
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if (
         not isinstance(event, events.SliderInput)
@@ -72,6 +76,9 @@ class BreakingTheLimits(assets.Asset):
       return sum(self.tokens.values())
     return 0
 
+  def bonus_state(self, owner, state):
+    return sum(self.tokens.values())
+
 
 class Synergy(assets.Asset):
   def __init__(self):
@@ -94,11 +101,15 @@ class Synergy(assets.Asset):
       return 1
     return 0
 
+  def bonus_state(self, owner, state):
+    return tuple(char.place for char in state.characters if char != owner)
+
 
 class TeamPlayer(assets.Asset):
   def __init__(self):
     super().__init__("Team Player")
 
+  @listeners.ReactsTo("SliderInput")
   def get_interrupt(self, event, owner, state):
     in_same_place = [
         char for char in state.characters if char != owner and char.place == owner.place
@@ -140,6 +151,10 @@ class TeamPlayerBonus(assets.Card):
       return 1
     return 0
 
+  def bonus_state(self, owner, state):
+    return bool(state.event_stack) and isinstance(state.event_stack[-1], events.Check)
+
+  @listeners.ReactsTo("Mythos")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.Mythos) and event.is_done():
       return events.DiscardSpecific(owner, [self])
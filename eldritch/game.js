@@ -4,6 +4,9 @@ characterMarkers = {};
 characterSheets = {};
 portraits = {};
 monsters = {};
+catalog = null;  // Characters, ancient ones, cards and monsters; fetched once from the server.
+currentGameId = null;
+earlierLogPage = null;  // The next page of older turns to fetch from /history, or -1 when done.
 allAncients = {};
 chosenAncient = null;
 allCharacters = {};
@@ -181,13 +184,26 @@ function init() {
     return;
   }
   let gameId = params.get("game_id");
-  let promise = loadImages();
+  let promise = Promise.all([loadImages(), loadCatalog()]);
   promise.then(function() { continueInit(gameId); }, showError);
 }
 
+function loadCatalog() {
+  return fetch("/eldritch/catalog.json").then(function(response) {
+    if (!response.ok) {
+      throw new Error("Could not load the catalog: " + response.status);
+    }
+    return response.json();
+  }).then(function(data) {
+    catalog = data;
+  });
+}
+
 function continueInit(gameId) {
+  currentGameId = gameId;
   ws = new WebSocket("ws://" + window.location.hostname + ":8081/" + gameId);
   ws.onmessage = onmsg;
+  ws.onopen = requestSnapshot;
   document.getElementById("board").cnvScale = 4;
   renderAssetToDiv(document.getElementById("board"), "board");
   let width = document.getElementById("boardcanvas").width;
@@ -424,6 +440,10 @@ function onmsg(e) {
     setTimeout(clearError, 100);
     return;
   }
+  data = decodeState(data);
+  if (data == null) {
+    return;
+  }
   if (stepping || runningAnim.length || messageQueue.length) {
     messageQueue.push(data);
     updateStepButton();
@@ -446,8 +466,15 @@ function finishAnim() {
   }
 }
 function handleData(data) {
-  allCharacters = data.all_characters;
-  allAncients = data.all_ancients;
+  // Pushes only carry what can change about these; the rest comes from the catalog.
+  allCharacters = {};
+  for (let name in data.all_characters) {
+    allCharacters[name] = Object.assign({}, catalog.characters[name], data.all_characters[name]);
+  }
+  allAncients = {};
+  for (let name of data.all_ancients) {
+    allAncients[name] = catalog.ancients[name];
+  }
   pendingName = data.pending_name;
   chosenAncient = (data.ancient_one == null) ? null : data.ancient_one.name;
   let myChoice = data.chooser == data.player_idx ? data.choice : null;
@@ -466,14 +493,14 @@ function handleData(data) {
   updateSliderButton(data.sliders, data.chooser == data.player_idx);
   markVisualsForDeletion();
   updateChoices(data.choice, data.current, data.chooser == data.player_idx, data.characters[data.chooser], data.autochoose);
-  updateMonsters(data.choice, data.monsters);
+  updateMonsters(data.choice, data.monsters, data.monster_paths || {});
   updateMonsterChoices(data.choice, data.monsters, data.chooser == data.player_idx, data.characters[data.chooser]);
   updatePlaceBoxes(data.places, data.activity);
   updateUsables(data.usables, data.log, mySpendables, myChoice, data.sliders, data.dice);
   updateDice(data.dice, data.player_idx, data.monsters);
   updateCurrentCard(data.current);
   deleteUnusedVisuals();
-  updateEventLog(data.event_log);
+  updateEventLog(data.event_log, data.event_log_start, data.event_log_pages);
   if (!stepping && messageQueue.length && !runningAnim.length) {
     let msg = messageQueue.shift();
     updateStepButton();
@@ -1067,7 +1094,7 @@ function hideMonsters(e) {
   document.getElementById("monsterdetails").style.display = "none";
 }
 
-function updateMonsters(choice, monster_list) {
+function updateMonsters(choice, monster_list, paths) {
   for (let i = 0; i < monster_list.length; i++) {
     let monster = monster_list[i];
     let monsterPlace = null;
@@ -1101,11 +1128,27 @@ function updateMonsters(choice, monster_list) {
       renderAssetToDiv(monsters[i].getElementsByClassName("cnvcontainer")[0], monster.name);
     } else {
       monsters[i].monsterInfo = monster;
-      animateMovingDiv(monsters[i], place);
+      // Monsters that moved more than once (e.g. fast monsters) stop at each place on the way.
+      let stops = [];
+      for (let name of (paths[i] || []).slice(1, -1)) {
+        let stop = document.getElementById("place" + name + "monsters");
+        if (stop != null) {
+          stops.push(stop);
+        }
+      }
+      animateMonsterPath(monsters[i], stops, place);
     }
   }
 }
 
+function animateMonsterPath(div, stops, destParent) {
+  if (!stops.length) {
+    animateMovingDiv(div, destParent);
+    return;
+  }
+  animateMovingDiv(div, stops[0], function() { animateMonsterPath(div, stops.slice(1), destParent); });
+}
+
 function updateSliderButton(sliders, isMySliders) {
   if (sliders) {
     document.getElementById("uiprompt").innerText = formatServerString(sliders.prompt);
@@ -1821,8 +1864,11 @@ function updatePortraitDiv(charName, destName) {
   }
 }
 
-function animateMovingDiv(div, destParent) {
+// If given, then() is called once the div arrives, before this animation counts as finished.
+function animateMovingDiv(div, destParent, then) {
+  let next = then || function() {};
   if (div.parentNode == destParent) {
+    next();
     return;
   }
   let divToShow = null;
@@ -1835,16 +1881,16 @@ function animateMovingDiv(div, destParent) {
     // Moving from the board to the board. Just animate the marker's movement.
     moveAndTranslateNode(div, destParent);
     runningAnim.push(true);  // Doesn't really matter what we push.
-    div.ontransitionend = function() { div.classList.remove("moving"); doneAnimating(div); finishAnim(); };
-    div.ontransitioncancel = function() { div.classList.remove("moving"); doneAnimating(div); finishAnim(); };
+    div.ontransitionend = function() { div.classList.remove("moving"); doneAnimating(div); next(); finishAnim(); };
+    div.ontransitioncancel = function() { div.classList.remove("moving"); doneAnimating(div); next(); finishAnim(); };
     setTimeout(function() { div.classList.add("moving"); div.style.transform = "none"; }, 10);
     return;
   }
 
   // Moving from or to another world. Show the other world, then animate, then unshow.
   let lastAnim = function() {
-    divToShow.ontransitionend = function() { doneAnimating(divToShow); finishAnim(); };
-    divToShow.ontransitioncancel = function() { doneAnimating(divToShow); finishAnim(); };
+    divToShow.ontransitionend = function() { doneAnimating(divToShow); next(); finishAnim(); };
+    divToShow.ontransitioncancel = function() { doneAnimating(divToShow); next(); finishAnim(); };
     divToShow.classList.remove("shown");
   }
   let continueAnim = function() {
@@ -2450,32 +2496,85 @@ function updateDice(dice, playerIdx, monsterList) {
   }
 }
 
-function updateEventLog(eventLog) {
+function updateEventLog(eventLog, start, pages) {
   let logDiv = document.getElementById("eventlog");
+  if (earlierLogPage == null && pages != null) {
+    earlierLogPage = pages - 1;
+    let earlier = document.createElement("DIV");
+    earlier.id = "logearlier";
+    earlier.innerText = "Show earlier turn";
+    earlier.onclick = showEarlierLog;
+    logDiv.prepend(earlier);
+  }
+  updateEarlierLog();
   if (eventLog.length < 1) {
     return;
   }
-  if (logDiv.children.length == eventLog.length) {
+  // The server only sends the entries of the last few turns; start is the index of the first one.
+  // Entries before it that have already been rendered stay. The last entry rendered may still have
+  // been resolving, so it is rendered again.
+  let end = start + eventLog.length;
+  if (logDiv.lastChild != null && logDiv.lastChild.logIdx == end - 1) {
     logDiv.removeChild(logDiv.lastChild);
   }
-  while (logDiv.children.length < eventLog.length) {
-    if (logDiv.lastChild != null) {
-      logDiv.lastChild.classList.add("collapsed");
+  while (true) {
+    let last = logDiv.lastChild;
+    let idx = (last != null && last.logIdx != null) ? Math.max(last.logIdx + 1, start) : start;
+    if (idx >= end) {
+      break;
     }
-    createLogDiv(eventLog[logDiv.children.length], logDiv, 0);
-    logDiv.lastChild.onclick = function(e) {
-      let theDiv = e.target;
-      while (theDiv != null && theDiv.tagName != "DIV") {
-        theDiv = theDiv.parentNode;
-      }
-      if (theDiv != null) {
-        theDiv.classList.toggle("collapsed");
-      }
-    };
+    if (last != null && last.logIdx != null) {
+      last.classList.add("collapsed");
+    }
+    createLogDiv(eventLog[idx - start], logDiv, 0);
+    logDiv.lastChild.logIdx = idx;
+    logDiv.lastChild.onclick = toggleLogDiv;
   }
   logDiv.scrollTop = logDiv.scrollHeight;
 }
 
+function toggleLogDiv(e) {
+  let theDiv = e.target;
+  while (theDiv != null && theDiv.tagName != "DIV") {
+    theDiv = theDiv.parentNode;
+  }
+  if (theDiv != null) {
+    theDiv.classList.toggle("collapsed");
+  }
+}
+
+function updateEarlierLog() {
+  let earlier = document.getElementById("logearlier");
+  if (earlier != null) {
+    earlier.classList.toggle("notshown", earlierLogPage < 0);
+  }
+}
+
+function showEarlierLog() {
+  if (earlierLogPage == null || earlierLogPage < 0) {
+    return;
+  }
+  let page = earlierLogPage;
+  earlierLogPage--;
+  updateEarlierLog();
+  let url = "/history?game_id=" + encodeURIComponent(currentGameId) + "&page=" + page;
+  fetch(url).then(function(response) {
+    if (!response.ok) {
+      throw new Error("Could not load the log: " + response.status);
+    }
+    return response.json();
+  }).then(function(data) {
+    let earlier = document.getElementById("logearlier");
+    let holder = document.createElement("DIV");
+    for (let logEvent of data.entries) {
+      createLogDiv(logEvent, holder, 0);
+      holder.lastChild.classList.add("collapsed");
+      holder.lastChild.onclick = toggleLogDiv;
+    }
+    earlier.after(...holder.children);
+  }).catch(showError);
+}
+
 function createLogDiv(logEvent, parentNode, depth) {
   let logDiv = document.createElement("DIV");
   let textSpan = document.createElement("SPAN");
@@ -1,4 +1,5 @@
 from eldritch import events
+from eldritch import listeners
 from eldritch.assets import Card
 
 __all__ = ["Item", "Weapon", "OneshotWeapon", "Tome"]
@@ -32,6 +33,7 @@ class Weapon(Item):
 
 class OneshotWeapon(Weapon):
 
+  @listeners.ReactsTo("Check")
   def get_trigger(self, event, owner, state):
     if not isinstance(event, events.Check) or event.check_type != "combat":
       return None
@@ -46,6 +48,7 @@ class Tome(Item):
     super().__init__(name, idx, deck, {}, {}, None, price, "tome")
     self.movement_cost = movement_cost
 
+  @listeners.ReactsTo("CityMovement")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.CityMovement) or event.character != owner or event.is_done():
       return None
@@ -59,6 +62,7 @@ class Tome(Item):
         self.read_event(owner),
     ], owner)
 
+  @listeners.ReactsTo("WagonMove")
   def get_usable_trigger(self, event, owner, state):
     if not isinstance(event, events.WagonMove) or event.character != owner:
       return None
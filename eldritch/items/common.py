@@ -1,4 +1,5 @@
 from eldritch import events
+from eldritch import listeners
 from eldritch import values
 from .base import Item, Weapon, OneshotWeapon, Tome
 
@@ -41,6 +42,9 @@ class Axe(Weapon):
       bonus += 1
     return bonus
 
+  def bonus_state(self, owner, state):
+    return self._active, self._two_handed
+
   def deactivate(self):
     self._two_handed = False
 
@@ -59,6 +63,7 @@ class Bullwhip(Weapon):
   def __init__(self, idx):
     super().__init__("Bullwhip", idx, "common", {"physical": 1}, {}, 1, 2)
 
+  @listeners.ReactsTo("SpendChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.SpendChoice) or event.is_done() or event.character != owner:
       return None
@@ -154,6 +159,7 @@ class CigaretteCase(Item):
   def __init__(self, idx):
     super().__init__("Cigarette Case", idx, "common", {}, {}, None, 1)
 
+  @listeners.ReactsTo("SpendChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.SpendChoice) or event.is_done() or event.character != owner:
       return None
@@ -174,6 +180,7 @@ class Food(Item):
   def __init__(self, idx):
     super().__init__("Food", idx, "common", {}, {}, None, 1)
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.GainOrLoss) or owner != event.character:
       return None
@@ -197,6 +204,7 @@ class SpeedBoost(Item):
     super().__init__(name, idx, deck, {}, {}, None, price)
     self.boost_amount = boost_amount
 
+  @listeners.ReactsTo("CityMovement")
   def get_usable_interrupt(self, event, owner, state):
     if self.exhausted:
       return None
@@ -221,6 +229,7 @@ class ResearchMaterials(Item):
   def __init__(self, idx):
     super().__init__("Research Materials", idx, "common", {}, {}, None, 1)
 
+  @listeners.ReactsTo("SpendMixin")
   def get_spend_amount(self, event, owner, state):
     if not isinstance(event, events.SpendMixin) or event.is_done():
       return None
@@ -239,6 +248,7 @@ class Whiskey(Item):
   def __init__(self, idx):
     super().__init__("Whiskey", idx, "common", {}, {}, None, 1)
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.GainOrLoss) or owner != event.character:
       return None
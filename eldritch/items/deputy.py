@@ -1,6 +1,7 @@
 import operator
 from eldritch.assets import Card
 from eldritch import events
+from eldritch import listeners
 from eldritch import values
 from .base import Weapon
 
@@ -17,6 +18,7 @@ class PatrolWagon(Card):
   def __init__(self):
     super().__init__("Patrol Wagon", None, "tradables", {}, {})
 
+  @listeners.ReactsTo("CityMovement")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.CityMovement) or event.character != owner:
       return None
@@ -31,6 +33,7 @@ class PatrolWagon(Card):
     cond = events.Conditional(owner, was_cancelled, None, {0: move, 1: events.Nothing()})
     return events.Sequence([choice, cond], owner)
 
+  @listeners.ReactsTo("Combat", "Return")
   def get_trigger(self, event, owner, state):
     if not isinstance(event, (events.Combat, events.Return)) or event.character != owner:
       return None
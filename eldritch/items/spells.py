@@ -1,6 +1,7 @@
 import operator
 
 from eldritch import events
+from eldritch import listeners
 from eldritch import monsters
 from eldritch import places
 from eldritch import values
@@ -76,6 +77,7 @@ class CombatSpell(Spell):
         return True
     return False
 
+  @listeners.ReactsTo("CombatChoice", "MultipleChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not self.is_combat(event, owner):
       return None
@@ -92,6 +94,7 @@ class CombatSpell(Spell):
       return None
     return events.CastSpell(owner, self)
 
+  @listeners.ReactsTo("CombatRound", "EvadeRound")
   def get_trigger(self, event, owner, state):
     if not self.in_use:
       return None
@@ -131,6 +134,7 @@ class BindMonster(CombatSpell):
     # CombatRound[-3] > CombatChoice[-2] > CastSpell[-1]
     return self.combat_round.monster.toughness(state, self.combat_round.character)
 
+  @listeners.ReactsTo("CombatChoice")
   def get_usable_interrupt(self, event, owner, state):
     if (
         isinstance(event, events.CombatChoice)
@@ -157,6 +161,7 @@ class EnchantWeapon(CombatSpell):
     self.active_change = 0
     self.passive_change = 0
 
+  @listeners.ReactsTo("CombatChoice", "MultipleChoice")
   def get_usable_interrupt(self, event, owner, state):
     interrupt = super().get_usable_interrupt(event, owner, state)
     if not isinstance(interrupt, events.CastSpell):
@@ -170,6 +175,7 @@ class EnchantWeapon(CombatSpell):
     )
     return events.CastSpell(owner, self, choice=choice)
 
+  @listeners.ReactsTo("DiscardSpecific", "DiscardNamed")
   def get_interrupt(self, event, owner, state):
     if (
         isinstance(event, (events.DiscardSpecific, events.DiscardNamed))
@@ -216,11 +222,13 @@ class FleshWard(Spell):
     super().__init__("Flesh Ward", idx, {}, 0, -2, 1)
     self.loss = None
 
+  @listeners.ReactsTo("Awaken")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.Awaken):
       return events.DiscardSpecific(owner, [self])
     return None
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     if (
         not isinstance(event, events.GainOrLoss)
@@ -244,6 +252,7 @@ class Heal(Spell):
   def __init__(self, idx):
     super().__init__("Heal", idx, {}, 0, 1, 1)
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if not self.exhausted and isinstance(event, events.SliderInput) and event.character == owner:
       if not event.is_done():
@@ -251,7 +260,7 @@ class Heal(Spell):
     return None
 
   def get_cast_event(self, owner, state):
-    neighbors = [char for char in state.characters if char.place == owner.place]
+    neighbors = state.characters_at(owner.place)
     gains = {idx: events.Gain(char, {"stamina": self.check.successes})
              for idx, char in enumerate(neighbors)}
     choice = events.MultipleChoice(
@@ -265,6 +274,7 @@ class Mists(Spell):
     super().__init__("Mists", idx, {}, 0, None, 0)
     self.evade = None
 
+  @listeners.ReactsTo("EvadeRound", "SpendChoice")
   def get_usable_interrupt(self, event, owner, state):
     if event.is_done() or self.exhausted or getattr(event, "character", None) != owner:
       return None
@@ -296,6 +306,7 @@ class RedSign(CombatSpell):
   def __init__(self, idx):
     super().__init__("Red Sign", idx, {}, 1, -1, 1)
 
+  @listeners.ReactsTo("CombatChoice", "MultipleChoice")
   def get_usable_interrupt(self, event, owner, state):
     interrupt = super().get_usable_interrupt(event, owner, state)
     if not isinstance(interrupt, events.CastSpell):
@@ -328,6 +339,7 @@ class Voice(Spell):
   def __init__(self, idx):
     super().__init__("Voice", idx, {}, 0, -1, 1,)
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.SliderInput) or event.character != owner or event.is_done():
       return None
@@ -335,6 +347,7 @@ class Voice(Spell):
       return None
     return events.CastSpell(owner, self)
 
+  @listeners.ReactsTo("Mythos")
   def get_trigger(self, event, owner, state):
     if isinstance(event, events.Mythos) and self.active:
       return events.DeactivateSpell(owner, self)
@@ -356,6 +369,7 @@ class FindGate(Spell):
       return False
     return True
 
+  @listeners.ReactsTo("ForceMovement")
   def get_usable_interrupt(self, event, owner, state):
     if self.exhausted or owner.sanity < self.sanity_cost(state):
       return None
@@ -365,6 +379,7 @@ class FindGate(Spell):
       return None
     return events.CastSpell(owner, self)
 
+  @listeners.ReactsTo("Travel", "ForceMovement")
   def get_usable_trigger(self, event, owner, state):
     if self.exhausted or owner.sanity < self.sanity_cost(state):
       return None
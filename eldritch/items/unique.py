@@ -1,5 +1,5 @@
 import operator
-from eldritch import events, values
+from eldritch import events, listeners, values
 from .base import Item, Weapon, OneshotWeapon, Tome
 
 __all__ = [
@@ -65,6 +65,7 @@ class MagicPowder(Weapon):
   def __init__(self, idx):
     super().__init__("Magic Powder", idx, "unique", {"magical": 9}, {}, 2, 6)
 
+  @listeners.ReactsTo("Check")
   def get_trigger(self, event, owner, state):
     if not isinstance(event, events.Check) or event.check_type != "combat":
       return None
@@ -89,6 +90,7 @@ class AncientTablet(Item):
   def __init__(self, idx):
     super().__init__("Ancient Tablet", idx, "unique", {}, {}, None, 8)
 
+  @listeners.ReactsTo("CityMovement")
   def get_usable_interrupt(self, event, owner, state):
     movement_cost = 3
     if not isinstance(event, events.CityMovement) or event.character != owner or event.is_done():
@@ -122,6 +124,7 @@ class BlueWatcher(Item):
   def __init__(self, idx):
     super().__init__("Blue Watcher", idx, "unique", {}, {}, None, 4)
 
+  @listeners.ReactsTo("SpendChoice", "DiceRoll", "CombatChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, (events.SpendChoice, events.DiceRoll, events.CombatChoice)):
       return None
@@ -176,6 +179,7 @@ class EnchantedJewelry(Item):
     self.tokens["stamina"] = 0
     self.max_tokens["stamina"] = 3
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.GainOrLoss):
       return None
@@ -199,8 +203,7 @@ class GateBox(Item):
     super().__init__("Gate Box", idx, "unique", {}, {}, None, 4)
 
   def is_usable(self, event, owner, state, need_neighbors):
-    has_neighbors = len([
-        char for char in state.characters if char.place == owner.place and char != owner]) > 0
+    has_neighbors = len(state.characters_at(owner.place)) > 1
     return (
         isinstance(event, events.GateChoice)
         and event.character == owner
@@ -210,6 +213,7 @@ class GateBox(Item):
         and (bool(has_neighbors) == need_neighbors)
     )
 
+  @listeners.ReactsTo("GateChoice")
   def get_interrupt(self, event, owner, state):
     if self.is_usable(event, owner, state, False):
       return events.OverrideGateChoice(
@@ -217,6 +221,7 @@ class GateBox(Item):
       )
     return None
 
+  @listeners.ReactsTo("GateChoice")
   def get_usable_interrupt(self, event, owner, state):
     if self.is_usable(event, owner, state, True):
       return events.OverrideGateChoice(
@@ -229,6 +234,7 @@ class HealingStone(Item):
   def __init__(self, idx):
     super().__init__("Healing Stone", idx, "unique", {}, {}, None, 8)
 
+  @listeners.ReactsTo("SliderInput")
   def get_usable_interrupt(self, event, owner, state):
     if event.is_done() or not isinstance(event, events.SliderInput):
       return None
@@ -258,6 +264,7 @@ class HealingStone(Item):
     # you can keep gaining forever!
     return events.Sequence([events.ExhaustAsset(owner, self), gain], owner)
 
+  @listeners.ReactsTo("Awaken")
   def get_trigger(self, event, owner, state):
     # The original card did not specify "Discard Healing Stone if the Ancient One awakens."
     if isinstance(event, events.Awaken):
@@ -269,6 +276,7 @@ class ObsidianStatue(Item):
   def __init__(self, idx):
     super().__init__("Obsidian Statue", idx, "unique", {}, {}, None, 4)
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.GainOrLoss) or not event.character == owner:
       return None
@@ -303,6 +311,7 @@ class OuterGodlyFlute(Item):
   def __init__(self, idx):
     super().__init__("Flute", idx, "unique", {}, {}, None, 8)
 
+  @listeners.ReactsTo("CombatChoice")
   def get_usable_interrupt(self, event, owner, state):
     if not isinstance(event, events.CombatChoice) or event.character != owner or event.is_done():
       return None
@@ -330,6 +339,7 @@ class SilverKey(Item):
     self.tokens["stamina"] = 0
     self.max_tokens["stamina"] = 3
 
+  @listeners.ReactsTo("EvadeRound")
   def get_usable_interrupt(self, event, owner, state):
     # TODO: maybe it would make more sense to attach this usable to the FightOrEvadeChoice
     if (
@@ -348,6 +358,7 @@ class SunkenCityRuby(Item):
   def __init__(self, idx):
     super().__init__("Ruby", idx, "unique", {}, {}, None, 8)
 
+  @listeners.ReactsTo("CityMovement")
   def get_interrupt(self, event, owner, state):
     if isinstance(event, events.CityMovement) and event.character == owner:
       return events.ChangeMovementPoints(owner, 3)
@@ -358,6 +369,7 @@ class WardingStatue(Item):
   def __init__(self, idx):
     super().__init__("Warding Statue", idx, "unique", {}, {}, None, 6)
 
+  @listeners.ReactsTo("AncientAttack", "GainOrLoss")
   def get_usable_interrupt(self, event, owner, state):
     discard = events.DiscardSpecific(owner, [self])
     if isinstance(event, events.AncientAttack):
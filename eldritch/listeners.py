@@ -0,0 +1,48 @@
+"""Declares which events a possession, global effect or monster can react to.
+
+For every event, the game state asks each character's possessions, each global effect and the
+monster involved for interrupts, triggers, usables and spendables, but most of them only react to a
+handful of event classes. A get_interrupt, get_usable_interrupt, get_trigger, get_usable_trigger or
+get_spend_amount method decorated with ReactsTo is only called for events of the named classes and
+their subclasses; methods without a declaration are called for every event.
+
+Declarations belong to the class that defines the method, so an override that falls back to super()
+must also name the event classes that its parent reacts to. Event classes are named with strings
+because many of the modules that declare them are imported by events.py.
+"""
+
+import collections
+
+# (hook name, event class) -> {listener class: whether that class's hook can react to the event}
+_INDEX = collections.defaultdict(dict)
+
+
+def ReactsTo(*event_names):
+  """Declares that the decorated hook returns None for every event not of the named classes."""
+  def decorator(func):
+    func.event_names = event_names
+    return func
+  return decorator
+
+
+def EventTypes(listener_type, hook):
+  """Returns the event classes declared for listener_type's hook, or None if there are none."""
+  event_names = getattr(getattr(listener_type, hook, None), "event_names", None)
+  if event_names is None:
+    return None
+  # Imported here because events.py (through assets.py) imports this module.
+  from eldritch import events  # pylint: disable=import-outside-toplevel
+  return tuple(getattr(events, name) for name in event_names)
+
+
+def Listeners(candidates, hook, event):
+  """Returns the candidates, in order, whose hook may return something other than None for event."""
+  index = _INDEX[hook, type(event)]
+  try:
+    return [candidate for candidate in candidates if index[type(candidate)]]
+  except KeyError:
+    for candidate in candidates:
+      if type(candidate) not in index:
+        event_types = EventTypes(type(candidate), hook)
+        index[type(candidate)] = event_types is None or isinstance(event, event_types)
+    return [candidate for candidate in candidates if index[type(candidate)]]
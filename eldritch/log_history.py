@@ -0,0 +1,69 @@
+"""Keeps the event log of a game without holding all of it in memory.
+
+Every top-level EventLog is recorded with the turn it happened in. The entries of the last few
+turns are kept as they are, since events that are still resolving add to them; they are what gets
+pushed to clients. Older turns are encoded as JSON and compressed, one page per turn, and are only
+decoded again when a client asks for them (see EldritchGame.history()). A long game therefore keeps
+a few turns of log objects plus a small compressed page for every turn before them.
+"""
+
+import base64
+import json
+import zlib
+
+from game import CustomEncoder
+
+
+class LogHistory:
+
+  RECENT_TURNS = 2  # Number of turns whose entries are kept as EventLogs.
+
+  def __init__(self):
+    self.turns = []  # [turn number, [EventLog]] for each recent turn, oldest first
+    self.pages = []  # [turn number, compressed JSON list of its entries] for each older turn
+    self.spilled = 0  # Number of entries in the pages.
+
+  def __reduce__(self):
+    pages = [[turn, base64.b64encode(page).decode("ascii")] for turn, page in self.pages]
+    return Restore, (self.turns, pages, self.spilled)
+
+  def append(self, log, turn):
+    if not self.turns or self.turns[-1][0] != turn:
+      self.turns.append([turn, []])
+    self.turns[-1][1].append(log)
+    while len(self.turns) > self.RECENT_TURNS:
+      old_turn, entries = self.turns.pop(0)
+      data = json.dumps(entries, cls=CustomEncoder).encode("utf-8")
+      self.pages.append([old_turn, zlib.compress(data)])
+      self.spilled += len(entries)
+
+  def recent(self):
+    """Returns the entries that are kept in memory, in order.
+
+    Iterating over the history, indexing it and len() also only see these entries.
+    """
+    return [log for _, entries in self.turns for log in entries]
+
+  def __len__(self):
+    return sum(len(entries) for _, entries in self.turns)
+
+  def __getitem__(self, idx):
+    return self.recent()[idx]
+
+  def __iter__(self):
+    return iter(self.recent())
+
+  def page(self, idx):
+    """Returns the turn number and decoded entries of an older turn, or None if there is none."""
+    if not 0 <= idx < len(self.pages):
+      return None
+    turn, data = self.pages[idx]
+    return {"turn": turn, "entries": json.loads(zlib.decompress(data))}
+
+
+def Restore(turns, pages, spilled):
+  history = LogHistory()
+  history.turns = turns
+  history.pages = [[turn, base64.b64decode(page)] for turn, page in pages]
+  history.spilled = spilled
+  return history
@@ -1,5 +1,7 @@
-from collections import defaultdict
+from eldritch import board
 from eldritch import events
+from eldritch import listeners
+from eldritch import place_index
 from eldritch import places
 from eldritch import values
 
@@ -57,6 +59,11 @@ class Monster:
     self.idx = None
     self.place = None
 
+  def __setattr__(self, name, value):
+    if name == "place":
+      place_index.Changed(self)  # Moves that do not go through GameState.move_monster().
+    super().__setattr__(name, value)
+
   def __repr__(self):
     if self.place is None:
       return f"<Monster: {self.name} {id(self)} at nowhere>"
@@ -135,6 +142,7 @@ class Monster:
         return movement
     return "normal"
 
+  @listeners.ReactsTo("TakeTrophy")
   def get_interrupt(self, event, state):
     if (isinstance(event, events.TakeTrophy)
             and self.has_attribute("endless", state, event.character)):
@@ -147,6 +155,7 @@ class Monster:
       )
     return None
 
+  @listeners.ReactsTo()
   def get_trigger(self, event, state):  # pylint: disable=unused-argument
     return None
 
@@ -197,6 +206,7 @@ class DimensionalShambler(Monster):
         {"horror": 1, "combat": 0}, 1,
     )
 
+  @listeners.ReactsTo("CombatRound", "EvadeRound")
   def get_trigger(self, event, state):
     if not isinstance(event, (events.CombatRound, events.EvadeRound)):
       return None
@@ -229,6 +239,7 @@ class ElderThing(Monster):
         {"horror": 2, "combat": 1}, 2,
     )
 
+  @listeners.ReactsTo("CombatRound", "EvadeRound")
   def get_trigger(self, event, state):
     if not isinstance(event, (events.CombatRound, events.EvadeRound)):
       return None
@@ -306,23 +317,16 @@ class Hound(Monster):
     if any(char.place == self.place for char in state.characters):
       return self.place
 
-    candidates = defaultdict(list)
-    distances = {self.place.name: 0}
-    queue = [self.place]
-    while queue:
-      place = queue.pop(0)
-      if isinstance(place, places.Location) and place.name not in ["Hospital", "Asylum"]:
-        if any(char.place == place for char in state.characters):
-          candidates[distances[place.name]].append(place)
-      for conn in place.connections:
-        if conn.name in distances:
-          continue
-        distances[conn.name] = distances[place.name] + 1
-        queue.append(conn)
-    if not candidates:
+    distances = {}
+    for char in state.characters:
+      if isinstance(char.place, places.Location) and char.place.name not in ["Hospital", "Asylum"]:
+        distance = board.Distance(self.place.name, char.place.name)
+        if distance is not None:
+          distances[char.name] = distance
+    if not distances:
       return False
-    min_list = candidates[min(candidates.keys())]
-    char_list = [char for char in state.characters if char.place in min_list]
+    nearest = min(distances.values())
+    char_list = [char for char in state.characters if distances.get(char.name) == nearest]
     char_list.sort(key=lambda char: char.sneak(state))
 
     # TODO: allow the first player to break ties
@@ -342,6 +346,7 @@ class Pinata(Monster):
         {"horror": 2, "combat": 1}, 1,
     )
 
+  @listeners.ReactsTo("TakeTrophy")
   def get_interrupt(self, event, state):
     if not isinstance(event, events.TakeTrophy):
       return super().get_interrupt(event, state)
@@ -361,6 +366,7 @@ class DreamFlier(Monster):
         {"horror": 1, "combat": 0}, 2,
     )
 
+  @listeners.ReactsTo("CombatRound", "EvadeRound")
   def get_trigger(self, event, state):
     if not isinstance(event, (events.CombatRound, events.EvadeRound)):
       return None
@@ -416,6 +422,7 @@ class Warlock(Monster):
         {"horror": 1, "combat": 1}, 2, {"magical immunity"},
     )
 
+  @listeners.ReactsTo("TakeTrophy")
   def get_interrupt(self, event, state):
     if not isinstance(event, events.TakeTrophy):
       return super().get_interrupt(event, state)
@@ -458,11 +465,13 @@ class EventMonster(Monster):
   def visual_name(self):
     return None
 
+  @listeners.ReactsTo("TakeTrophy")
   def get_interrupt(self, event, state):
     if isinstance(event, events.TakeTrophy):
       return events.CancelEvent(event)
     return super().get_interrupt(event, state)
 
+  @listeners.ReactsTo("PassCombatRound", "CombatRound")
   def get_trigger(self, event, state):
     if isinstance(event, events.PassCombatRound):
       return self.pass_event
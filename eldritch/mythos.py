@@ -1,6 +1,7 @@
 import operator
 
 from eldritch import events
+from eldritch import listeners
 from eldritch import gates
 from eldritch import monsters
 from eldritch import places
@@ -18,15 +19,19 @@ class GlobalEffect:
   def get_override(self, thing, attribute):
     return None
 
+  @listeners.ReactsTo()
   def get_interrupt(self, event, state):
     return None
 
+  @listeners.ReactsTo()
   def get_usable_interrupt(self, event, state):
     return None
 
+  @listeners.ReactsTo()
   def get_trigger(self, event, state):
     return None
 
+  @listeners.ReactsTo()
   def get_usable_trigger(self, event, state):
     return None
 
@@ -101,6 +106,7 @@ class Rumor(MythosCard):
   def progress_event(self, state):  # pylint: disable=unused-argument
     return events.ProgressRumor(self)
 
+  @listeners.ReactsTo("Mythos")
   def get_trigger(self, event, state):
     if self.failed:
       return None
@@ -217,6 +223,7 @@ class CloseLocationsHeadline(Headline):
     )
     return seq
 
+  @listeners.ReactsTo("Mythos")
   def get_trigger(self, event, state):
     if (
             isinstance(event, events.Mythos)
@@ -275,6 +282,7 @@ class Mythos2(Environment):
       return 2
     return 0
 
+  @listeners.ReactsTo("DrawItems", "KeepDrawn")
   def get_interrupt(self, event, state):
     if len(state.event_stack) < 3:
       return None
@@ -293,6 +301,7 @@ class Mythos3(Environment):
   def __init__(self):
     super().__init__("Mythos3", "Square", "Unnamable", {"square", "diamond"}, {"circle"}, "mystic")
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_interrupt(self, event, state):
     if (
         isinstance(event, events.GainOrLoss)
@@ -328,6 +337,7 @@ class Mythos6(CityBonus):
         bonus_skill="sneak", penalty_skill="will"
     )
 
+  @listeners.ReactsTo("MoveMonster")
   def get_interrupt(self, event, state):
     if isinstance(event, events.MoveMonster) and event.monster.has_attribute("flying", state, None):
       return None  # TODO: prevent movement
@@ -349,11 +359,13 @@ class Mythos7(Headline):
     ))
     return seq
 
+  @listeners.ReactsTo("Arrested")
   def get_interrupt(self, event, state):
     if isinstance(event, events.Arrested):
       return events.CancelEvent(event)
     return None
 
+  @listeners.ReactsTo("Mythos")
   def get_trigger(self, event, state):
     if (self.active_until is not None
         and state.turn_number >= self.active_until
@@ -368,6 +380,7 @@ class Mythos8(Environment):
         "Mythos8", "Square", "Unnamable", {"square", "diamond"}, {"circle"}, "mystic", "Rivertown"
     )
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if isinstance(event, events.Movement) and event.character.place.name == self.activity_location:
       return HealthWager(
@@ -376,6 +389,7 @@ class Mythos8(Environment):
       )
     return None
 
+  @listeners.ReactsTo("InsaneOrUnconscious")
   def get_interrupt(self, event, state):
     if (
         isinstance(event, events.InsaneOrUnconscious)
@@ -429,6 +443,7 @@ class Mythos13(Rumor):
   def should_fail(self, state):
     return state.terror >= 10
 
+  @listeners.ReactsTo("EncounterPhase")
   def get_interrupt(self, event, state):
     if not self.failed and isinstance(event, events.EncounterPhase):
       return self.get_pass_interrupt(event, state)
@@ -445,6 +460,7 @@ class Mythos13(Rumor):
         "Yes", "No", seq
     )
 
+  @listeners.ReactsTo("IncreaseTerror", "Mythos")
   def get_trigger(self, event, state):
     if isinstance(event, events.IncreaseTerror) and self.should_fail(state):
       curses = [events.Curse(char) for char in state.characters if not char.gone]
@@ -471,6 +487,7 @@ class Mythos14(Environment):
         "Mythos14", "Unnamable", "Woods", {"square", "diamond"}, {"circle"}, "urban", "Northside"
     )
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if isinstance(event, events.Movement) and event.character.place.name == "Northside":
       clues = events.Gain(event.character, {"clues": 1})
@@ -488,6 +505,7 @@ class Mythos15(Environment):
   def __init__(self):
     super().__init__("Mythos15", "Isle", "Science", {"plus"}, {"moon"}, "urban")
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if isinstance(event, events.Movement) and isinstance(event.character.place, places.Street):
       is_deputy = values.ItemNameCount(event.character, "Deputy")
@@ -506,6 +524,7 @@ class Mythos16(Environment):
         "urban", activity_location="Uptown"
     )
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if not isinstance(event, events.Movement):
       return None
@@ -527,6 +546,7 @@ class Mythos17(Environment):
         "urban", activity_location="University"
     )
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if not isinstance(event, events.Movement):
       return None
@@ -541,6 +561,7 @@ class Mythos18(Environment):
   def __init__(self):
     super().__init__("Mythos18", "Square", "Unnamable", {"plus"}, {"moon"}, "mystic")
 
+  @listeners.ReactsTo("GainOrLoss")
   def get_interrupt(self, event, state):
     if (
         isinstance(event, events.GainOrLoss)
@@ -615,6 +636,7 @@ class Mythos26(Environment):
   def __init__(self):
     super().__init__("Mythos26", "Woods", "Society", {"square", "diamond"}, {"circle"}, "urban")
 
+  @listeners.ReactsTo("IncreaseTerror")
   def get_interrupt(self, event, state):
     if isinstance(event, events.IncreaseTerror):
       return events.CancelEvent(event)
@@ -628,6 +650,7 @@ class Mythos27(Rumor):
     self.progress = 6
     self._max_progress = 10
 
+  @listeners.ReactsTo("EncounterPhase")
   def get_interrupt(self, event, state):
     if not isinstance(event, events.EncounterPhase):
       return None
@@ -654,6 +677,7 @@ class Mythos27(Rumor):
     cond = events.Conditional(first_player, bad_count, "", {0: events.Nothing(), 1: prog})
     return events.Sequence([dice, cond])
 
+  @listeners.ReactsTo("ProgressRumor", "Mythos")
   def get_trigger(self, event, state):
     if isinstance(event, events.ProgressRumor) and event.rumor == self and self.should_fail(state):
       return events.Sequence([events.EndRumor(self, failed=True), events.RemoveAllSeals()])
@@ -686,6 +710,7 @@ class Mythos29(Environment):
       return False
     return None
 
+  @listeners.ReactsTo("CityMovement")
   def get_interrupt(self, event, state):
     if isinstance(event, events.CityMovement):
       return events.ChangeMovementPoints(event.character, -1)
@@ -810,6 +835,7 @@ class Mythos44(CityBonus):
     seq.events.append(events.ReturnToCup(names=["Flame Matrix"]))
     return seq
 
+  @listeners.ReactsTo("CityMovement")
   def get_interrupt(self, event, state):
     if isinstance(event, events.CityMovement):
       return events.ChangeMovementPoints(event.character, -1)
@@ -955,6 +981,7 @@ class Mythos58(Environment):
     super().__init__("Mythos58", "WitchHouse", "Cave", {"plus"}, {"moon"},
                      activity_location="FrenchHill", env_type="mystic")
 
+  @listeners.ReactsTo("Movement")
   def get_trigger(self, event, state):
     if isinstance(event, events.Movement) and event.character.place.name == self.activity_location:
       return HealthWager(
@@ -967,6 +994,7 @@ class Mythos58(Environment):
       )
     return None
 
+  @listeners.ReactsTo("InsaneOrUnconscious")
   def get_interrupt(self, event, state):
     if (
         isinstance(event, events.InsaneOrUnconscious)
@@ -993,6 +1021,7 @@ class Mythos59(Rumor):
       return {"toughness": 2}.get(attribute, 0)
     return 0
 
+  @listeners.ReactsTo("Mythos", "EncounterPhase")
   def get_interrupt(self, event, state):
     if self.failed and isinstance(event, events.Mythos):
       return self.get_failure_interrupt(event, state)
@@ -1023,6 +1052,7 @@ class Mythos59(Rumor):
         events.Sequence(success), events.Nothing(), prereq,
     )
 
+  @listeners.ReactsTo("ProgressRumor", "Mythos")
   def get_trigger(self, event, state):
     if isinstance(event, events.ProgressRumor) and event.rumor == self and self.should_fail(state):
       return events.EndRumor(self, failed=True, add_global=True)
@@ -0,0 +1,92 @@
+"""Keeps track of which monsters and characters are at each place, and which places have an open
+gate or are closed.
+
+Finding who is at a place used to mean comparing the place of every monster or character in the
+game. GameState keeps a PlaceIndex instead: a map of place to the monsters there and to the
+characters there (both in the order of state.monsters and state.characters), the list of places
+with an open gate (in the order of state.places), and the names of the closed places. The game
+moves monsters and characters with GameState.move_monster() and GameState.move_character(), and
+opens and closes gates with GameState.set_gate(), which update the index in place.
+
+Anything else that changes where a monster or character is, or whether a place has a gate or is
+closed (tests, debugging commands, loading a game, changes to state.monsters or state.characters),
+is noticed the next time the index is used, and the index is rebuilt from scratch. Each monster,
+character and place in the game points back at its game's index, and Monster, BaseCharacter and
+CityPlace call Changed() to count those changes on it; other games' indexes are not affected.
+"""
+
+import bisect
+
+
+def Changed(thing):
+  """Marks the index of thing's game as out of date."""
+  index = thing.__dict__.get("_place_index")
+  if index is not None:
+    index.changes += 1
+
+
+class PlaceIndex:
+
+  def __init__(self):
+    self.changes = 0  # Number of times something changed without going through the index.
+    self.key = None  # What the index was built from; see refresh().
+    self.monsters = {}  # place -> [monster]
+    self.characters = {}  # place -> [character]
+    self.gates = []  # places with an open gate
+    self.closed = frozenset()  # names of closed places
+    self.order = {}  # id of a monster or character -> its position in state.monsters/characters
+    self.place_order = {}  # id of a place -> its position in state.places
+
+  def __reduce__(self):
+    # Only holds data computed from the game, so a loaded game starts by rebuilding it.
+    return PlaceIndex, ()
+
+  def refresh(self, state):
+    key = (
+        self.changes, id(state.monsters), len(state.monsters), tuple(state.characters),
+        id(state.places),
+    )
+    if key == self.key:
+      return
+    self.key = key
+    self.monsters = {}
+    self.characters = {}
+    self.order = {}
+    for things, index in [(state.monsters, self.monsters), (state.characters, self.characters)]:
+      for pos, thing in enumerate(things):
+        self.order[id(thing)] = pos
+        index.setdefault(thing.place, []).append(thing)
+        thing.__dict__["_place_index"] = self
+    self.place_order = {}
+    for pos, place in enumerate(state.places.values()):
+      self.place_order[id(place)] = pos
+      place.__dict__["_place_index"] = self
+    self.gates = [place for place in state.places.values() if getattr(place, "gate", None)]
+    self.closed = frozenset(
+        name for name, place in state.places.items() if getattr(place, "closed", False)
+    )
+
+  def move(self, index, thing, place):
+    """Moves thing from its current place to place in the given index, keeping the order."""
+    if id(thing) not in self.order:
+      return  # Not part of the game; nothing to update.
+    here = index[thing.place]
+    here.remove(thing)
+    if not here:
+      del index[thing.place]
+    there = index.setdefault(place, [])
+    positions = [self.order[id(other)] for other in there]
+    there.insert(bisect.bisect(positions, self.order[id(thing)]), thing)
+
+  def gate_changed(self, place):
+    """Updates the open gates and closed places after the gate at place opened or closed."""
+    if id(place) not in self.place_order:
+      return  # Not part of the game; nothing to update.
+    self.gates = [other for other in self.gates if other is not place]
+    if getattr(place, "gate", None):
+      positions = [self.place_order[id(other)] for other in self.gates]
+      self.gates.insert(bisect.bisect(positions, self.place_order[id(place)]), place)
+    if getattr(place, "closed", False):
+      self.closed = self.closed | {place.name}
+    else:
+      self.closed = self.closed - {place.name}
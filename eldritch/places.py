@@ -1,5 +1,7 @@
 from collections import namedtuple
 
+from eldritch import place_index
+
 
 class Place:
 
@@ -53,6 +55,11 @@ class CityPlace(Place):
     self.encounters = None
     self.closed_until = None
 
+  def __setattr__(self, name, value):
+    if name in ("closed_until", "gate"):
+      place_index.Changed(self)  # Changes that do not go through GameState.set_gate().
+    super().__setattr__(name, value)
+
   def __eq__(self, other):
     return self.__class__ == other.__class__ and self.name == other.name
 
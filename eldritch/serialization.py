@@ -0,0 +1,556 @@
+"""Saves and restores a complete GameState, including the events that are in progress.
+
+There are two formats. Both keep every shared reference shared, so that e.g. the monster being
+fought by a Combat event is still the same object as the one in state.monsters after loading.
+
+The JSON format is what gets written to the game store. Places, characters, monsters, possessions,
+gates, mythos cards and ancient ones are written once in the "anchors" list, keyed by their name,
+idx or handle, and referred to by that key everywhere else. Other objects (events, globals, values)
+are written inline the first time they are seen and referred to by number afterwards; numbers are
+assigned in the order objects are encoded, so decoding must visit them in the same order.
+
+The binary format is pickle, at the highest protocol this Python has. It is faster and smaller,
+and is meant for moving a game between processes that run the same code. Never load a binary
+snapshot from an untrusted source.
+
+Encounter cards, gate cards and fixed encounters are made of functions and never change during a
+game, so both formats only store their names and look them up in a fresh catalog when loading.
+A seeded random generator is saved with its internal state, so a restored game makes the same
+random choices the original would have made.
+
+JSON snapshots may come from clients (POST /load), so they can only name the classes of the game
+itself and a few builtins (see AllowedNames()), and only a few functions may be called to rebuild
+an object (see RECONSTRUCTORS). Anything else is a SerializationError, when saving or loading.
+"""
+
+import collections
+import copyreg
+import functools
+import io
+import json
+import operator
+import pickle
+import random
+import types
+
+from eldritch import abilities
+from eldritch import ancient_ones
+from eldritch import assets
+from eldritch import bonus_cache
+from eldritch import characters
+from eldritch import encounters
+from eldritch import events
+from eldritch import gate_encounters
+from eldritch import gates
+from eldritch import location_specials
+from eldritch import log_history
+from eldritch import monsters
+from eldritch import mythos
+from eldritch import place_index
+from eldritch import places
+from eldritch import values
+from eldritch import view_model
+import metrics
+
+VERSION = 1
+
+# Checked in order; the first matching class decides the kind of anchor.
+ANCHOR_TYPES = [
+    ("place", places.Place, "name"),
+    ("character", characters.BaseCharacter, "name"),
+    ("monster", monsters.Monster, "idx"),
+    ("possession", assets.Asset, "handle"),
+    ("gate", gates.Gate, "handle"),
+    ("ancient", ancient_ones.AncientOne, "name"),
+    ("mythos", mythos.MythosCard, "name"),
+]
+SCALAR_TYPES = frozenset([str, int, float, bool, type(None)])
+STATIC_TYPES = (
+    encounters.EncounterCard, gate_encounters.GateCard, location_specials.FixedEncounter,
+)
+# Saved the way pickle would save them; the caches among them are saved empty, and events.DONE
+# is loaded as itself.
+REDUCE_TYPES = (
+    random.Random, metrics.Profile, bonus_cache.BonusCache, log_history.LogHistory,
+    place_index.PlaceIndex, view_model.ViewCache, events.AlreadyDone,
+)
+CALLABLE_TYPES = frozenset([
+    types.FunctionType, types.BuiltinFunctionType, types.MethodType, types.BuiltinMethodType,
+])
+# Builtins that game state may refer to, e.g. as the factory of a defaultdict or the operation of a
+# values.Calculation.
+SAFE_BUILTINS = (dict, list, set, frozenset, tuple, int, float, str, bool) + tuple(
+    func for func in map(functools.partial(getattr, operator), operator.__all__)
+    if isinstance(func, types.BuiltinFunctionType)
+)
+
+
+class SerializationError(Exception):
+  pass
+
+
+@functools.lru_cache(maxsize=None)
+def StaticCatalog():
+  """Returns a map of (kind, name) to every immutable card that is made of functions."""
+  catalog = {}
+  for cards in encounters.CreateEncounterCards().values():
+    catalog.update({("encounter", card.name): card for card in cards})
+  catalog.update({("gate_card", card.name): card for card in gate_encounters.CreateGateCards()})
+  for fixed_encounters in location_specials.CreateFixedEncounters().values():
+    catalog.update({("fixed", fixed.name): fixed for fixed in fixed_encounters})
+  return catalog
+
+
+def StaticKey(obj):
+  if isinstance(obj, encounters.EncounterCard):
+    return ("encounter", obj.name)
+  if isinstance(obj, gate_encounters.GateCard):
+    return ("gate_card", obj.name)
+  if isinstance(obj, location_specials.FixedEncounter):
+    return ("fixed", obj.name)
+  return None
+
+
+def IsGameClass(cls):
+  parts = cls.__module__.split(".")
+  return parts[0] == "eldritch" and len(parts) > 1 and not any(
+      part.startswith("test_") or part in ("serialization", "simulation") for part in parts
+  )
+
+
+@functools.lru_cache(maxsize=None)
+def AllowedNames():
+  """Returns a map of name to every class or function that a snapshot may refer to by name.
+
+  These are the classes of the eldritch modules and their subclasses, including the items and
+  expansions, along with SAFE_BUILTINS and RECONSTRUCTORS.
+  """
+  from eldritch import eldritch  # pylint: disable=import-outside-toplevel
+  modules = [
+      abilities, ancient_ones, assets, bonus_cache, characters, eldritch, encounters, events,
+      gate_encounters, gates, location_specials, log_history, monsters, mythos, place_index,
+      places, values, view_model,
+  ]
+  allowed = {}
+  for module in modules:
+    for obj in vars(module).values():
+      if isinstance(obj, type) and IsGameClass(obj):
+        for cls in Subclasses(obj):
+          if IsGameClass(cls) and "<" not in cls.__qualname__:
+            allowed[f"{cls.__module__}:{cls.__qualname__}"] = cls
+  for obj in SAFE_BUILTINS + RECONSTRUCTORS:
+    allowed[f"{obj.__module__}:{obj.__qualname__}"] = obj
+  return allowed
+
+
+@functools.lru_cache(maxsize=None)
+def QualifiedName(obj):
+  name = f"{obj.__module__}:{obj.__qualname__}"
+  if AllowedNames().get(name) is not obj:
+    raise SerializationError(f"{name} cannot be looked up by name")
+  return name
+
+
+def LookupName(name, base=None):
+  """Returns the class or function with the given name if a snapshot may refer to it.
+
+  If base is given, the name must be of a subclass of base.
+  """
+  obj = AllowedNames().get(name) if isinstance(name, str) else None
+  if obj is None or (base is not None and not (isinstance(obj, type) and issubclass(obj, base))):
+    raise SerializationError(f"{name!r} may not be loaded")
+  return obj
+
+
+@functools.lru_cache(maxsize=None)
+def SlotNames(cls):
+  return frozenset(
+      slot for klass in cls.__mro__ for slot in getattr(klass, "__slots__", ())
+      if slot not in ("__dict__", "__weakref__")
+  )
+
+
+def ObjectState(obj):
+  state = dict(getattr(obj, "__dict__", {}))
+  for slot in SlotNames(type(obj)):
+    if hasattr(obj, slot):
+      state[slot] = getattr(obj, slot)
+  return state
+
+
+def RestoreState(obj, state):
+  slots = SlotNames(type(obj))
+  if not slots:
+    obj.__dict__.update(state)
+    return
+  for attr, value in state.items():
+    if attr in slots:
+      object.__setattr__(obj, attr, value)
+    else:
+      obj.__dict__[attr] = value
+
+
+class Encoder:
+
+  # Map of type to the method used to encode values of that type, filled in lazily.
+  HANDLERS = {}
+
+  def __init__(self, hide_random=False):
+    self.hide_random = hide_random
+    self.memo = {}  # id(obj) -> number, for objects and mutable containers.
+    self.keep_alive = []  # So that ids in memo are not reused while encoding.
+    self.anchor_keys = {}  # id(obj) -> [kind, key]
+    self.anchors = {}  # (kind, key) -> obj
+    self.anchor_queue = []
+
+  def encode_document(self, root):
+    output = {"version": VERSION, "root": self.encode(root), "anchors": []}
+    idx = 0
+    while idx < len(self.anchor_queue):
+      kind, key = self.anchor_queue[idx]
+      obj = self.anchors[(kind, key)]
+      output["anchors"].append({
+          "kind": kind, "key": key, "class": QualifiedName(type(obj)),
+          "state": self.encode_state(obj),
+      })
+      idx += 1
+    return output
+
+  def remember(self, obj):
+    self.memo[id(obj)] = len(self.memo)
+    self.keep_alive.append(obj)
+
+  def encode(self, obj):
+    obj_type = type(obj)
+    if obj_type in SCALAR_TYPES:
+      return obj
+    obj_id = id(obj)
+    if obj_id in self.memo:
+      return {"$ref": self.memo[obj_id]}
+    if obj_id in self.anchor_keys:
+      return {"$anchor": self.anchor_keys[obj_id]}
+    handler = self.HANDLERS.get(obj_type)
+    if handler is None:
+      handler = self.HANDLERS[obj_type] = self.handler_for(obj_type)
+    return handler(self, obj)
+
+  @classmethod
+  def handler_for(cls, obj_type):
+    # pylint: disable=too-many-return-statements
+    containers = {
+        list: cls.encode_list, dict: cls.encode_dict, set: cls.encode_set,
+        collections.defaultdict: cls.encode_defaultdict, collections.deque: cls.encode_deque,
+        frozenset: cls.encode_frozenset, tuple: cls.encode_tuple,
+    }
+    if obj_type in containers:
+      return containers[obj_type]
+    if issubclass(obj_type, STATIC_TYPES):
+      return cls.encode_static
+    if issubclass(obj_type, tuple) and hasattr(obj_type, "_fields"):
+      return cls.encode_namedtuple
+    if issubclass(obj_type, type) or obj_type in CALLABLE_TYPES:
+      return cls.encode_callable
+    if issubclass(obj_type, tuple(anchor_type[1] for anchor_type in ANCHOR_TYPES)):
+      return cls.encode_anchor
+    if issubclass(obj_type, REDUCE_TYPES):
+      return cls.encode_reduce
+    if not obj_type.__dictoffset__ and not hasattr(obj_type, "__slots__"):
+      return cls.encode_reduce
+    return cls.encode_object
+
+  def encode_list(self, obj):
+    self.remember(obj)
+    return [self.encode(item) for item in obj]
+
+  def encode_dict(self, obj):
+    self.remember(obj)
+    if all(isinstance(key, str) and not key.startswith("$") for key in obj):
+      return {key: self.encode(value) for key, value in obj.items()}
+    return {"$dict": self.encode_items(obj)}
+
+  def encode_defaultdict(self, obj):
+    self.remember(obj)
+    return {"$defaultdict": self.encode(obj.default_factory), "items": self.encode_items(obj)}
+
+  def encode_deque(self, obj):
+    self.remember(obj)
+    return {"$deque": [self.encode(item) for item in obj], "maxlen": obj.maxlen}
+
+  def encode_set(self, obj):
+    self.remember(obj)
+    return {"$set": [self.encode(item) for item in obj]}
+
+  def encode_frozenset(self, obj):
+    return {"$frozenset": [self.encode(item) for item in obj]}
+
+  def encode_tuple(self, obj):
+    return {"$tuple": [self.encode(item) for item in obj]}
+
+  def encode_static(self, obj):
+    return {"$static": list(StaticKey(obj))}
+
+  def encode_namedtuple(self, obj):
+    return {"$namedtuple": QualifiedName(type(obj)), "items": [self.encode(item) for item in obj]}
+
+  def encode_callable(self, obj):
+    owner = getattr(obj, "__self__", None)
+    if owner is not None and not isinstance(owner, types.ModuleType):
+      return {"$method": [self.encode(owner), obj.__name__]}
+    return {"$name": QualifiedName(obj)}
+
+  def encode_anchor(self, obj):
+    for kind, cls, attr in ANCHOR_TYPES:
+      if not isinstance(obj, cls):
+        continue
+      key = getattr(obj, attr, None)
+      if not isinstance(key, (str, int)) or (kind, key) in self.anchors:
+        break  # Fall back to an anonymous object.
+      self.anchors[(kind, key)] = obj
+      self.anchor_keys[id(obj)] = [kind, key]
+      self.anchor_queue.append((kind, key))
+      self.keep_alive.append(obj)
+      return {"$anchor": [kind, key]}
+    return self.encode_object(obj)
+
+  def encode_object(self, obj):
+    self.remember(obj)
+    return {"$obj": QualifiedName(type(obj)), "state": self.encode_state(obj)}
+
+  def encode_reduce(self, obj):
+    """Encodes builtin objects such as operator.methodcaller the same way pickle would."""
+    reducer = REDUCERS.get(type(obj))
+    if self.hide_random and isinstance(obj, random.Random):
+      reducer = ReduceSystemRandom
+    reduced = reducer(obj) if reducer is not None else obj.__reduce_ex__(4)
+    if isinstance(reduced, str) or reduced[0] not in RECONSTRUCTORS:
+      raise SerializationError(f"cannot encode {obj!r}")
+    func, args = self.encode(reduced[0]), self.encode(tuple(reduced[1]))
+    self.remember(obj)
+    state = reduced[2] if len(reduced) > 2 else None
+    return {"$reduce": [func, args, self.encode(state)]}
+
+  def encode_items(self, obj):
+    return [[self.encode(key), self.encode(value)] for key, value in obj.items()]
+
+  def encode_state(self, obj):
+    state = ObjectState(obj)
+    try:
+      return {attr: self.encode(value) for attr, value in state.items()}
+    except SerializationError as err:
+      raise SerializationError(f"{type(obj).__name__}: {err}") from err
+
+
+class Decoder:
+
+  def __init__(self, anchors):
+    self.memo = []
+    self.anchors = {}
+    anchor_types = {kind: cls for kind, cls, _ in ANCHOR_TYPES}
+    for anchor in anchors:
+      if anchor["kind"] not in anchor_types:
+        raise SerializationError(f"Unknown kind of anchor {anchor['kind']!r}")
+      cls = LookupName(anchor["class"], anchor_types[anchor["kind"]])
+      self.anchors[(anchor["kind"], anchor["key"])] = cls.__new__(cls)
+    # Objects such as places are hashed by name, and may be put in a set before their own state
+    # has been decoded. Fill in all the simple attributes first.
+    for anchor in anchors:
+      obj = self.anchors[(anchor["kind"], anchor["key"])]
+      RestoreState(obj, {
+          attr: value for attr, value in anchor["state"].items() if type(value) in SCALAR_TYPES
+      })
+
+  def decode_document(self, doc):
+    root = self.decode(doc["root"])
+    for anchor in doc["anchors"]:
+      obj = self.anchors[(anchor["kind"], anchor["key"])]
+      RestoreState(obj, self.decode_state(anchor["state"]))
+    return root
+
+  def decode(self, data):
+    data_type = type(data)
+    if data_type is list:
+      output = []
+      self.memo.append(output)
+      output.extend([self.decode(item) for item in data])
+      return output
+    if data_type is not dict:
+      return data
+    # Markers are always the first key. The keys of plain dicts never start with $.
+    handler = self.MARKERS.get(next(iter(data), None))
+    if handler is not None:
+      return handler(self, data)
+    output = {}
+    self.memo.append(output)
+    for key, value in data.items():
+      output[key] = self.decode(value)
+    return output
+
+  def decode_ref(self, data):
+    return self.memo[data["$ref"]]
+
+  def decode_anchor(self, data):
+    return self.anchors[tuple(data["$anchor"])]
+
+  def decode_object(self, data):
+    cls = LookupName(data["$obj"], object)
+    obj = cls.__new__(cls)
+    self.memo.append(obj)
+    RestoreState(obj, self.decode_state(data["state"]))
+    return obj
+
+  def decode_dict(self, data):
+    output = {}
+    self.memo.append(output)
+    self.decode_items(output, data["$dict"])
+    return output
+
+  def decode_defaultdict(self, data):
+    output = collections.defaultdict()
+    self.memo.append(output)
+    output.default_factory = self.decode(data["$defaultdict"])
+    self.decode_items(output, data["items"])
+    return output
+
+  def decode_deque(self, data):
+    output = collections.deque(maxlen=data["maxlen"])
+    self.memo.append(output)
+    output.extend([self.decode(item) for item in data["$deque"]])
+    return output
+
+  def decode_set(self, data):
+    output = set()
+    self.memo.append(output)
+    output.update([self.decode(item) for item in data["$set"]])
+    return output
+
+  def decode_frozenset(self, data):
+    return frozenset([self.decode(item) for item in data["$frozenset"]])
+
+  def decode_tuple(self, data):
+    return tuple(self.decode(item) for item in data["$tuple"])
+
+  def decode_static(self, data):
+    return LookupStatic(*data["$static"])
+
+  def decode_namedtuple(self, data):
+    cls = LookupName(data["$namedtuple"], tuple)
+    return cls(*[self.decode(item) for item in data["items"]])
+
+  def decode_method(self, data):
+    owner, name = data["$method"]
+    if not isinstance(name, str) or name.startswith("_"):
+      raise SerializationError(f"Method {name!r} may not be loaded")
+    return getattr(self.decode(owner), name)
+
+  def decode_name(self, data):
+    return LookupName(data["$name"])
+
+  def decode_reduce(self, data):
+    func, args, state = data["$reduce"]
+    func = self.decode(func)
+    if not any(func is reconstructor for reconstructor in RECONSTRUCTORS):
+      raise SerializationError(f"{func!r} may not be called to load an object")
+    obj = func(*self.decode(args))
+    self.memo.append(obj)
+    state = self.decode(state)
+    if state is not None:
+      obj.__setstate__(state)
+    return obj
+
+  MARKERS = {
+      "$ref": decode_ref, "$anchor": decode_anchor, "$obj": decode_object, "$dict": decode_dict,
+      "$defaultdict": decode_defaultdict, "$deque": decode_deque, "$set": decode_set,
+      "$frozenset": decode_frozenset, "$tuple": decode_tuple, "$static": decode_static,
+      "$namedtuple": decode_namedtuple, "$method": decode_method, "$name": decode_name,
+      "$reduce": decode_reduce,
+  }
+
+  def decode_items(self, output, items):
+    for key, value in items:
+      key = self.decode(key)
+      output[key] = self.decode(value)
+
+  def decode_state(self, state):
+    return {attr: self.decode(value) for attr, value in state.items()}
+
+
+def EncodeJson(obj, hide_random=False):
+  """Returns a JSON string that DecodeJson() turns back into a copy of obj.
+
+  With hide_random, random generators are saved as the generator that states share by default,
+  so that the snapshot does not tell what they will draw next.
+  """
+  return json.dumps(Encoder(hide_random).encode_document(obj), separators=(",", ":"))
+
+
+def DecodeJson(json_str):
+  doc = json.loads(json_str)
+  if doc.get("version") != VERSION:
+    raise SerializationError(f"Unsupported snapshot version {doc.get('version')}")
+  return Decoder(doc["anchors"]).decode_document(doc)
+
+
+def LookupStatic(kind, name):
+  return StaticCatalog()[(kind, name)]
+
+
+def ReduceStatic(obj):
+  return LookupStatic, StaticKey(obj)
+
+
+def NewPlace(cls, name):
+  place = cls.__new__(cls)
+  place.name = name
+  return place
+
+
+def ReducePlace(place):
+  # Places are hashed by name and may be added to a set (e.g. connections) before the rest of
+  # their state is restored, so create them with their name already set.
+  return NewPlace, (type(place), place.name), place.__dict__
+
+
+def SharedRandom():
+  return events.random
+
+
+def ReduceSystemRandom(rng):  # pylint: disable=unused-argument
+  # A SystemRandom has no state to save, so it is restored as the generator states share by default.
+  return SharedRandom, ()
+
+
+# Used by both formats in place of __reduce_ex__.
+REDUCERS = {random.SystemRandom: ReduceSystemRandom}
+# The only functions that a JSON snapshot may call to rebuild an object; see REDUCE_TYPES.
+RECONSTRUCTORS = (
+    random.Random, SharedRandom, metrics.Profile, bonus_cache.BonusCache, log_history.Restore,
+    place_index.PlaceIndex, view_model.ViewCache, events.Done,
+)
+
+
+def Subclasses(cls):
+  return [cls] + [sub for direct in cls.__subclasses__() for sub in Subclasses(direct)]
+
+
+class StaticPickler(pickle.Pickler):
+
+  dispatch_table = copyreg.dispatch_table.copy()
+  dispatch_table.update(REDUCERS)
+  dispatch_table.update({cls: ReducePlace for cls in Subclasses(places.CityPlace)})
+  dispatch_table.update({
+      cls: ReduceStatic for static_type in STATIC_TYPES for cls in Subclasses(static_type)
+  })
+
+
+def EncodeBinary(obj):
+  """Returns bytes that DecodeBinary() turns back into a copy of obj."""
+  output = io.BytesIO()
+  StaticPickler(output, protocol=pickle.HIGHEST_PROTOCOL).dump((VERSION, obj))
+  return output.getvalue()
+
+
+def DecodeBinary(data):
+  version, obj = pickle.loads(data)
+  if version != VERSION:
+    raise SerializationError(f"Unsupported snapshot version {version}")
+  return obj
@@ -0,0 +1,370 @@
+"""Plays eldritch games without any clients attached.
+
+Moves are chosen by a policy that looks at the server-side GameState and returns the same
+(char_idx, data) messages a browser would send. Used by benchmarks (see
+benchmarks/engine_bench.py) and to produce realistic mid-game states for tests.
+"""
+
+import collections
+import functools
+import math
+import random
+import time
+
+from eldritch import eldritch
+from eldritch import events
+from eldritch import places
+from eldritch import serialization
+from game import GameException
+
+
+class Stuck(Exception):
+  pass
+
+
+class MoveLimit(Stuck):
+  pass
+
+
+class RandomPolicy:
+  """Picks uniformly among the moves that look plausible for the event on top of the stack."""
+
+  def __init__(self, rng):
+    self.rng = rng
+
+  def candidates(self, state):
+    """Returns candidate moves, most preferred first. Some of them may be invalid.
+
+    Each candidate is a list of (char_idx, data) messages to be sent in order.
+    """
+    for char_idx, usables in state.usables.items():
+      if state.done_using.get(char_idx):
+        continue
+      handles = [handle for handle in usables if handle != "trade"]
+      moves = [[(char_idx, {"type": "done_using"})]]
+      handle = self.pick_usable(handles)
+      if handle is not None:
+        moves.insert(0, [(char_idx, {"type": "use", "handle": handle})])
+      return moves
+
+    if not state.event_stack:
+      return []
+    event = state.event_stack[-1]
+    char = getattr(event, "character", None)
+    char_idx = state.characters.index(char) if char in state.characters else None
+
+    if isinstance(event, events.SliderInput):
+      return [[(char_idx, {"type": "set_slider", "name": "done"})]]
+    if isinstance(event, events.DiceRoll):
+      return [[(char_idx, {"type": "roll"})]]
+    if not isinstance(event, events.ChoiceEvent):
+      return []
+    if isinstance(event, events.MonsterSpawnChoice):
+      return self.spawn_moves(state, event)
+
+    choices = self.choice_values(event)
+    self.order(choices)
+    moves = [[(char_idx, {"type": "choice", "choice": choice})] for choice in choices]
+    if isinstance(event, events.SpendMixin):
+      spends = sorted(event.spendable & {"stamina", "sanity", "dollars", "clues"})
+      self.order(spends)
+      moves.extend([(char_idx, {"type": "spend", "spend_type": spend})] for spend in spends)
+    return moves
+
+  def pick_usable(self, handles):
+    if handles and self.rng.random() < 0.3:
+      return self.rng.choice(handles)
+    return None
+
+  def order(self, options):
+    self.rng.shuffle(options)
+
+  def choice_values(self, event):
+    if isinstance(event, events.ItemChoice):
+      if event.choices and self.rng.random() < 0.5:
+        return [self.rng.choice(event.choices), "done"]
+      return ["done"]
+    if isinstance(event, events.MonsterChoice):
+      choices = [monster.handle for monster in event.monsters]
+    else:
+      choices = list(event.choices or [])
+    invalid = getattr(event, "invalid_choices", {})
+    choices = [choice for idx, choice in enumerate(choices) if idx not in invalid]
+    if getattr(event, "none_choice", None) is not None:
+      choices.append(event.none_choice)
+    return choices
+
+  def spawn_moves(self, state, event):
+    gates = sorted(event.open_gates, key=lambda name: name != event.location_name)
+    to_spawn = list(event.to_spawn)
+    choices = ["reset"]
+    for idx in range(event.spawn_count):
+      choices.append({gates[idx % len(gates)]: to_spawn[idx]})
+    for monster_idx in to_spawn[event.spawn_count:event.spawn_count + event.outskirts_count]:
+      choices.append({"Outskirts": monster_idx})
+    choices.append("confirm")
+    char_idx = state.characters.index(event.character)
+    return [[(char_idx, {"type": "choice", "choice": choice}) for choice in choices]]
+
+
+class GreedyPolicy(RandomPolicy):
+  """Takes the first option the game offers and never uses an item unless asked to.
+
+  Apart from picking replacement characters, it makes no random choices of its own, so a game
+  played with it depends only on the game's seed.
+  """
+
+  def __init__(self, rng):
+    super().__init__(rng)
+    self.last_event = None
+
+  def pick_usable(self, handles):
+    return None
+
+  def order(self, options):
+    pass
+
+  def choice_values(self, event):
+    if isinstance(event, events.ItemChoice):
+      chosen = {pos.handle for pos in event.chosen}
+      unchosen = [handle for handle in event.choices or [] if handle not in chosen]
+      # Choose one item, then add more only if the game does not accept that.
+      if not chosen:
+        return unchosen[:1] + ["done"]
+      return ["done"] + unchosen[:1]
+    choices = super().choice_values(event)
+    # Some events (e.g. movement) take choices until told to stop; only make one of them.
+    none_choice = getattr(event, "none_choice", None)
+    if event is self.last_event and none_choice in choices:
+      choices.remove(none_choice)
+      choices.insert(0, none_choice)
+    self.last_event = event
+    return choices
+
+
+POLICIES = {"random": RandomPolicy, "greedy": GreedyPolicy}
+
+
+def NewGame(players, rng, ancient=None):
+  """Returns a started GameState with the given number of randomly chosen characters.
+
+  The game gets its own generator, seeded from rng, so that a seeded game can be played again.
+  """
+  state = eldritch.GameState(random.Random(rng.getrandbits(64)))
+  state.handle_ancient(ancient or rng.choice(sorted(state.all_ancients)))
+  for name in rng.sample(sorted(state.all_characters), players):
+    state.handle_join(None, name)
+  for _ in state.handle(None, {"type": "start"}):
+    pass
+  return state
+
+
+def ReplaceDevoured(state, rng):
+  """Picks new characters for players whose characters were devoured."""
+  if state.game_stage != "slumber":
+    return
+  for idx, char in enumerate(state.characters):
+    if not char.gone or idx in state.pending_chars.values():
+      continue
+    available = [
+        name for name, other in state.all_characters.items()
+        if not other.gone and other not in state.characters and name not in state.pending_chars
+    ]
+    if not available:
+      return
+    state.handle_choose_char(idx, rng.choice(sorted(available)))
+
+
+def Step(state, policy, attempts=50):
+  """Makes one move. Returns the number of invalid moves tried before a valid one was found."""
+  failures = 0
+  for _ in range(attempts):
+    candidates = policy.candidates(state)
+    if not candidates:
+      raise Stuck(f"no moves for {state.event_stack[-1] if state.event_stack else None}")
+    for messages in candidates:
+      try:
+        for char_idx, data in messages:
+          for _ in state.handle(char_idx, data):
+            pass
+      except (GameException, AssertionError):
+        failures += 1
+        continue
+      return failures
+  raise Stuck(f"no valid moves for {state.event_stack[-1]} after {failures} tries")
+
+
+def PlayMoves(state, policy, rng, until_turn, max_moves=100000):
+  """Plays until the given turn number starts or the game ends, yielding after every move."""
+  moves = 0
+  while state.game_stage not in ("victory", "defeat") and state.turn_number < until_turn:
+    if moves >= max_moves:
+      raise MoveLimit(f"game did not reach turn {until_turn} in {max_moves} moves")
+    ReplaceDevoured(state, rng)
+    if not state.event_stack:
+      for _ in state.resolve_loop():
+        pass
+      if not state.event_stack:
+        break
+      continue
+    Step(state, policy)
+    moves += 1
+    yield moves
+
+
+def Play(state, policy, rng, until_turn, max_moves=100000):
+  """Like PlayMoves, but returns the number of moves."""
+  return sum(1 for _ in PlayMoves(state, policy, rng, until_turn, max_moves))
+
+
+def PlayRandomGame(seed, players, until_turn):
+  rng = random.Random(seed)
+  state = NewGame(players, rng)
+  Play(state, RandomPolicy(rng), rng, until_turn)
+  return state
+
+
+def PlayTestGame(seed, players, until_turn, max_moves):
+  """Plays a seeded random game for tests, yielding the state after every move.
+
+  The game ends quietly if it gets stuck, runs out of moves, or runs into the known bug where a
+  character in another world is moved as if they were in the city (e.g. 3 players, seed 1).
+  Any other error is raised.
+  """
+  rng = random.Random(seed)
+  state = NewGame(players, rng)
+  try:
+    for _ in PlayMoves(state, RandomPolicy(rng), rng, until_turn, max_moves):
+      yield state
+  except Stuck:
+    return
+  except AttributeError as err:
+    # AttributeError only has obj and name from Python 3.10, so match the message instead.
+    if str(err) != f"'{places.OtherWorld.__name__}' object has no attribute 'connections'":
+      raise
+
+
+class EventTimer:
+  """Counts and times calls to resolve() by event class while active.
+
+  This replaces resolve() on every event class, so it is only meant for benchmarks. A resolve()
+  called from inside another one (e.g. through super()) is counted as part of the outer one.
+  """
+
+  def __init__(self):
+    self.counts = collections.Counter()
+    self.seconds = collections.Counter()
+    self.originals = {}
+    self.depth = 0
+
+  def __enter__(self):
+    for cls in serialization.Subclasses(events.Event):
+      if cls not in self.originals and "resolve" in vars(cls):
+        self.originals[cls] = vars(cls)["resolve"]
+        cls.resolve = self.wrap(vars(cls)["resolve"])
+    return self
+
+  def __exit__(self, *exc_info):
+    for cls, resolve in self.originals.items():
+      cls.resolve = resolve
+    self.originals.clear()
+
+  def wrap(self, resolve):
+    timer = self
+
+    @functools.wraps(resolve)
+    def timed(event, *args, **kwargs):
+      if timer.depth:
+        return resolve(event, *args, **kwargs)
+      timer.depth += 1
+      start = time.perf_counter()
+      try:
+        return resolve(event, *args, **kwargs)
+      finally:
+        timer.depth -= 1
+        timer.seconds[type(event).__name__] += time.perf_counter() - start
+        timer.counts[type(event).__name__] += 1
+    return timed
+
+
+class EventCounter:
+  """Counts the events and event logs created, by class, while active.
+
+  Like EventTimer, this replaces methods on classes in the events module and is only meant for
+  benchmarks. An event is counted when Event.__init__ runs, so every subclass must call it.
+  """
+
+  def __init__(self):
+    self.counts = collections.Counter()
+    self.originals = {}
+
+  def __enter__(self):
+    for cls in [events.Event, events.EventLog]:
+      self.originals[cls] = vars(cls)["__init__"]
+      cls.__init__ = self.wrap(vars(cls)["__init__"])
+    return self
+
+  def __exit__(self, *exc_info):
+    for cls, init in self.originals.items():
+      cls.__init__ = init
+    self.originals.clear()
+
+  def wrap(self, init):
+    counts = self.counts
+
+    @functools.wraps(init)
+    def counted(obj, *args, **kwargs):
+      counts[type(obj).__name__] += 1
+      init(obj, *args, **kwargs)
+    return counted
+
+  @property
+  def events(self):
+    return sum(count for name, count in self.counts.items() if name != "EventLog")
+
+
+class GameResult:
+
+  def __init__(self, seed, players, policy):
+    self.seed = seed
+    self.players = players
+    self.policy = policy
+    self.outcome = None  # victory, defeat, limit (ran out of moves), stuck or error
+    self.error = None
+    self.turns = 0
+    self.moves = 0
+    self.seconds = 0.0
+    self.event_counts = collections.Counter()
+    self.event_seconds = collections.Counter()
+
+  @property
+  def events(self):
+    return sum(self.event_counts.values())
+
+
+def RunGame(seed, players=4, policy="random", max_moves=20000):
+  """Plays one whole game, to victory or defeat if possible, and returns a GameResult.
+
+  Errors raised by the game are recorded in the result instead of being raised, since random play
+  finds bugs in rarely used cards. Meant to be called from a multiprocessing pool.
+  """
+  result = GameResult(seed, players, policy)
+  rng = random.Random(seed)
+  state = None
+  start = time.perf_counter()
+  with EventTimer() as timer:
+    try:
+      state = NewGame(players, rng)
+      for result.moves in PlayMoves(state, POLICIES[policy](rng), rng, math.inf, max_moves):
+        pass
+      result.outcome = state.game_stage
+    except MoveLimit as err:
+      result.outcome, result.error = "limit", str(err)
+    except Stuck as err:
+      result.outcome, result.error = "stuck", str(err)
+    except Exception as err:  # pylint: disable=broad-except
+      result.outcome, result.error = "error", f"{type(err).__name__}: {err}"
+  result.seconds = time.perf_counter() - start
+  result.turns = state.turn_number if state is not None else 0
+  result.event_counts, result.event_seconds = timer.counts, timer.seconds
+  return result
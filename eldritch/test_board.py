@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+
+import collections
+import os
+import random
+import sys
+import unittest
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import board
+from eldritch import eldritch
+from eldritch import places
+
+
+def SearchRoutes(start, movement_points, closed, blocked):
+  """Finds routes by walking the connections of the places themselves, as the game used to."""
+  routes = {start.name: []}
+  if start.closed:
+    return routes
+  queue = collections.deque((place, []) for place in start.connections if not place.closed)
+  while queue:
+    place, route = queue.popleft()
+    if place.name in routes or place.name in closed:
+      continue
+    routes[place.name] = route + [place.name]
+    if len(routes[place.name]) == movement_points or place.name in blocked:
+      continue
+    queue.extend((nearby, routes[place.name]) for nearby in place.connections)
+  return routes
+
+
+class BoardTest(unittest.TestCase):
+
+  def setUp(self):
+    self.places = places.CreatePlaces()
+
+  def testDistances(self):
+    self.assertEqual(board.Distance("Diner", "Diner"), 0)
+    self.assertEqual(board.Distance("Diner", "Easttown"), 1)
+    self.assertEqual(board.Distance("Diner", "Rivertown"), 2)
+    self.assertEqual(board.Distance("Library", "Newspaper"), 4)
+    self.assertIsNone(board.Distance("Diner", "Sky"))
+    self.assertIsNone(board.Distance("Diner", "Dreamlands1"))
+    for source in range(len(board.NAMES)):
+      for destination in range(len(board.NAMES)):
+        self.assertEqual(board.DISTANCES[source][destination], board.DISTANCES[destination][source])
+
+  def testNearbyStreets(self):
+    self.assertEqual(board.NEARBY_STREETS["Diner"], {"Easttown"})
+    self.assertEqual(board.NEARBY_STREETS["Easttown"], {"Downtown", "Rivertown"})
+    self.assertEqual(board.NEARBY_STREETS["Sky"], board.STREETS)
+    self.assertEqual(len(board.STREETS), 9)
+    self.assertNotIn("Sky", board.LOCATIONS)
+
+  def testRoutes(self):
+    routes = dict(board.Routes("Diner", 3, frozenset(), frozenset({"Downtown"})))
+    self.assertEqual(routes["Diner"], ())
+    self.assertEqual(routes["Downtown"], ("Easttown", "Downtown"))
+    self.assertEqual(routes["Graveyard"], ("Easttown", "Rivertown", "Graveyard"))
+    self.assertNotIn("Bank", routes)  # Would have to move through the monster at Downtown.
+    self.assertNotIn("Store", dict(board.Routes("Diner", 2, frozenset(), frozenset())))
+    closed = dict(board.Routes("Diner", 3, frozenset({"Police", "Rivertown"}), frozenset()))
+    self.assertNotIn("Police", closed)
+    self.assertNotIn("Graveyard", closed)
+    self.assertEqual(dict(board.Routes("Diner", 3, frozenset({"Diner"}), frozenset())), {
+        "Diner": (),
+    })
+
+  def testMatchesSearch(self):
+    rng = random.Random(0)
+    city = [self.places[name] for name in board.NAMES if board.NEIGHBORS[board.IDS[name]]]
+    for _ in range(300):
+      closed = frozenset(rng.sample(sorted(board.LOCATIONS), rng.randint(0, 3)))
+      blocked = frozenset(place.name for place in rng.sample(city, rng.randint(0, 10)))
+      for place in city:
+        place.closed_until = 1 if place.name in closed else None
+      start = rng.choice(city)
+      points = rng.randint(1, 6)
+      with self.subTest(start=start.name, points=points, closed=closed, blocked=blocked):
+        expected = SearchRoutes(start, points, closed, blocked)
+        routes = dict(board.Routes(start.name, points, closed, blocked))
+        self.assertEqual(routes.keys(), expected.keys())
+        for dest, route in routes.items():
+          self.assertEqual(len(route), len(expected[dest]))
+          for here, there in zip((start.name,) + route, route):
+            self.assertIn(self.places[there], self.places[here].connections)
+
+
+class ClosedPlacesTest(unittest.TestCase):
+
+  def setUp(self):
+    self.state = eldritch.GameState()
+    self.state.initialize_for_tests()
+
+  def testNoticesClosing(self):
+    self.assertEqual(self.state.closed_places(), frozenset())
+    self.state.places["Woods"].closed_until = 3
+    self.assertEqual(self.state.closed_places(), {"Woods"})
+    self.state.places["Woods"].gate = object()  # A gate keeps a location open.
+    self.assertEqual(self.state.closed_places(), frozenset())
+    self.state.places["Woods"].gate = None
+    self.state.places["Woods"].closed_until = None
+    self.assertEqual(self.state.closed_places(), frozenset())
+
+  def testMonsterPlaces(self):
+    self.state.monsters[0].place = self.state.places["Woods"]
+    self.assertIn("Woods", self.state.monster_places())
+    self.state.move_monster(self.state.monsters[0], self.state.places["Diner"])
+    self.assertIn("Diner", self.state.monster_places())
+    self.assertNotIn("Woods", self.state.monster_places())
+
+
+if __name__ == "__main__":
+  unittest.main()
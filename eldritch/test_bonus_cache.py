@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch.expansions.seaside import abilities as seaside_abilities
+from eldritch import abilities
+from eldritch import characters
+from eldritch import eldritch
+from eldritch import events
+from eldritch import items
+from eldritch import mythos
+from eldritch import serialization
+from eldritch import simulation
+
+
+class BonusCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.char = characters.Character("Dummy", 5, 5, 4, 4, 4, 4, 4, 4, 2, "Diner")
+    self.state = eldritch.GameState()
+    self.state.initialize_for_tests()
+    self.state.all_characters["Dummy"] = self.char
+    self.state.characters = [self.char]
+    self.char.place = self.state.places["Diner"]
+
+  def testReusesBonuses(self):
+    self.char.possessions.append(abilities.Fight(0))
+    compute_bonus = characters.BaseCharacter.compute_bonus
+    with mock.patch.object(
+        characters.BaseCharacter, "compute_bonus", autospec=True, side_effect=compute_bonus,
+    ) as computed:
+      self.assertEqual(self.char.fight(self.state), 5)
+      self.assertEqual(self.char.fight(self.state), 5)
+      self.char.get_json(self.state)
+      self.char.get_json(self.state)
+    fights = [call for call in computed.call_args_list if call[0][1] == "fight"]
+    self.assertEqual(len(fights), 1)
+
+  def testPossessions(self):
+    self.assertEqual(self.char.fight(self.state), 4)
+    self.char.possessions.append(abilities.Fight(0))
+    self.assertEqual(self.char.fight(self.state), 5)
+    self.char.possessions.clear()
+    self.assertEqual(self.char.fight(self.state), 4)
+
+  def testActiveItems(self):
+    axe = items.Axe(0)
+    self.char.possessions.append(axe)
+    self.assertEqual(self.char.combat(self.state, set()), 4)
+    axe._active = True  # pylint: disable=protected-access
+    self.assertEqual(self.char.combat(self.state, set()), 6)
+    axe._two_handed = True  # pylint: disable=protected-access
+    self.assertEqual(self.char.combat(self.state, set()), 7)
+
+  def testAttributes(self):
+    cross = items.Cross(0)
+    cross._active = True  # pylint: disable=protected-access
+    self.char.possessions.append(cross)
+    self.assertEqual(self.char.combat(self.state, set()), 4)
+    self.assertEqual(self.char.combat(self.state, {"undead"}), 7)
+    self.assertEqual(self.char.combat(self.state, {"undead", "magical immunity"}), 4)
+
+  def testGlobalsAndPlace(self):
+    self.assertEqual(self.char.will(self.state), 1)
+    self.state.environment = mythos.Mythos6()
+    self.assertEqual(self.char.will(self.state), 0)
+    self.char.place = self.state.places["Outskirts"]  # Only applies in Arkham.
+    self.assertEqual(self.char.will(self.state), 1)
+    self.char.place = self.state.places["Easttown"]
+    self.assertEqual(self.char.will(self.state), 0)
+    self.state.environment = None
+    self.assertEqual(self.char.will(self.state), 1)
+
+  def testOtherCharacters(self):
+    self.char.possessions.append(seaside_abilities.Synergy())
+    self.assertEqual(self.char.lore(self.state), 4)
+    nun = self.state.all_characters["Nun"]
+    nun.place = self.state.places["Diner"]
+    self.state.characters.append(nun)
+    self.assertEqual(self.char.lore(self.state), 5)
+
+  def testEventStack(self):
+    self.char.possessions.append(seaside_abilities.TeamPlayerBonus(0))
+    self.assertEqual(self.char.luck(self.state), 1)
+    self.state.event_stack.append(events.Check(self.char, "luck", 0))
+    self.assertEqual(self.char.luck(self.state), 2)
+
+  def testNotSaved(self):
+    self.char.get_json(self.state)
+    loaded = serialization.DecodeJson(serialization.EncodeJson(self.state))
+    self.assertEqual(loaded.bonus_cache.characters, {})
+
+
+class RandomGameTest(unittest.TestCase):
+  """Plays random games, checking every cached bonus against one computed from scratch."""
+
+  def setUp(self):
+    self.checked = 0
+    self.wrong = []
+
+  def checking_bonus(self):
+    original = characters.BaseCharacter.bonus
+
+    def bonus(char, check_name, state, attributes=None, check=True):
+      cached = original(char, check_name, state, attributes, check)
+      if cached != char.compute_bonus(check_name, state, attributes, check):
+        top = state.event_stack[-1] if state and state.event_stack else None
+        self.wrong.append(f"stale {check_name} at {type(top).__name__}")
+      self.checked += 1
+      return cached
+    return bonus
+
+  def testCachedBonusesMatch(self):
+    with mock.patch.object(characters.BaseCharacter, "bonus", new=self.checking_bonus()):
+      for seed in [0, 2]:
+        for state in simulation.PlayTestGame(seed, 3, until_turn=3, max_moves=80):
+          state.public_state()
+    self.assertEqual(self.wrong, [])
+    self.assertGreater(self.checked, 1000)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -1971,7 +1971,7 @@ class DevouredPlayerJoinTest(PlayerTest):
 
   def startDevoured(self):
     with mock.patch.object(mythos, "CreateMythos", return_value=[DevourFirstPlayer(), NoMythos()]):
-      with mock.patch.object(eldritch.random, "shuffle"):
+      with mock.patch.object(events.random, "shuffle"):
         self.handle("A", {"type": "start"})
     self.handle("A", {"type": "set_slider", "name": "done"})
     self.handle("B", {"type": "set_slider", "name": "done"})
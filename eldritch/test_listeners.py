@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import assets
+from eldritch import eldritch
+from eldritch import events
+from eldritch import listeners
+from eldritch import monsters
+from eldritch import mythos
+from eldritch import simulation
+
+HOOKS = [
+    "get_interrupt", "get_usable_interrupt", "get_trigger", "get_usable_trigger",
+    "get_spend_amount",
+]
+
+
+def Subclasses(cls):
+  found = [cls]
+  for subclass in cls.__subclasses__():
+    found.extend(Subclasses(subclass))
+  return found
+
+
+class SequenceListener(assets.Asset):
+
+  def __init__(self):
+    super().__init__("Sequence Listener")
+
+  @listeners.ReactsTo("Sequence")
+  def get_trigger(self, event, owner, state):
+    return events.Nothing()
+
+
+class AnyListener(assets.Asset):
+
+  def __init__(self):
+    super().__init__("Any Listener")
+
+  def get_trigger(self, event, owner, state):
+    return None
+
+
+class ListenersTest(unittest.TestCase):
+
+  def testDeclarationsNameEventClasses(self):
+    eldritch.GameState()  # Imports every module that defines listeners.
+    for base in [assets.Asset, mythos.GlobalEffect, monsters.Monster]:
+      for cls in Subclasses(base):
+        for hook in HOOKS:
+          if not hasattr(cls, hook):
+            continue
+          with self.subTest(cls=cls.__name__, hook=hook):
+            event_types = listeners.EventTypes(cls, hook)
+            for event_type in event_types or ():
+              self.assertIsInstance(event_type, type)
+
+  def testSkipsUndeclaredEvents(self):
+    candidates = [SequenceListener(), AnyListener(), assets.Asset("Plain")]
+    found = listeners.Listeners(candidates, "get_trigger", events.Sequence([]))
+    self.assertEqual([pos.name for pos in found], ["Sequence Listener", "Any Listener"])
+    found = listeners.Listeners(candidates, "get_trigger", events.Nothing())
+    self.assertEqual([pos.name for pos in found], ["Any Listener"])
+    found = listeners.Listeners(candidates, "get_interrupt", events.Sequence([]))
+    self.assertEqual(found, [])
+
+
+class DeclarationTest(unittest.TestCase):
+  """Plays random games, checking that every skipped hook would have returned None."""
+
+  def setUp(self):
+    self.state = None
+    self.checked = 0
+    self.wrong = []
+    self.listeners = listeners.Listeners
+
+  def check_skipped(self, candidates, hook, event):
+    candidates = list(candidates)
+    found = self.listeners(candidates, hook, event)
+    for candidate in candidates:
+      if any(candidate is pos for pos in found):
+        continue
+      if isinstance(candidate, assets.Asset):
+        owner = next(
+            (char for char in self.state.characters if candidate in char.possessions),
+            getattr(event, "character", None),
+        )
+        result = getattr(candidate, hook)(event, owner, self.state)
+      else:
+        result = getattr(candidate, hook)(event, self.state)
+      # Failed assertions inside the game are treated as invalid moves, so collect them instead.
+      if result is not None:
+        self.wrong.append(f"{type(candidate).__name__}.{hook} for {type(event).__name__}")
+      self.checked += 1
+    return found
+
+  def testSkippedHooksReturnNone(self):
+    for seed in range(3):
+      rng = random.Random(seed)
+      self.state = simulation.NewGame(3, rng)
+      policy = simulation.RandomPolicy(rng)
+      with mock.patch.object(listeners, "Listeners", new=self.check_skipped):
+        try:
+          for _ in simulation.PlayMoves(self.state, policy, rng, until_turn=4, max_moves=300):
+            pass
+        except Exception:  # pylint: disable=broad-except
+          pass  # Random play runs into unrelated bugs; the hooks checked until then still count.
+    self.assertEqual(self.wrong, [])
+    self.assertGreater(self.checked, 1000)
+
+
+if __name__ == "__main__":
+  unittest.main()
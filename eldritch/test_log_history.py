@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import pickle
+import random
+import sys
+import unittest
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import events
+from eldritch import log_history
+from eldritch import serialization
+from eldritch import simulation
+import game
+
+
+def Log(text, *sub_texts):
+  log = events.EventLog(text, False)
+  log.sub_events.extend(events.EventLog(sub_text, False) for sub_text in sub_texts)
+  return log
+
+
+class FakeHttpHandler:
+
+  def __init__(self):
+    self.body = b""
+    self.status = None
+
+  def send_response(self, code):
+    self.status = code
+
+  def end_headers(self):
+    pass
+
+  def send_error(self, code, message=None):  # pylint: disable=unused-argument
+    self.status = code
+
+  @property
+  def wfile(self):
+    return self
+
+  def write(self, data):
+    self.body += data
+
+
+class LogHistoryTest(unittest.TestCase):
+
+  def setUp(self):
+    self.history = log_history.LogHistory()
+    self.history.append(Log("one", "one a"), 1)
+    self.history.append(Log("two"), 1)
+    self.history.append(Log("three"), 2)
+
+  def testKeepsRecentTurns(self):
+    self.assertEqual([log.text for log in self.history], ["one", "two", "three"])
+    self.assertEqual(len(self.history), 3)
+    self.assertEqual(self.history[-1].text, "three")
+    self.assertEqual(self.history.pages, [])
+    self.assertIsNone(self.history.page(0))
+
+  def testSpillsOlderTurns(self):
+    self.history.append(Log("four"), 3)
+    self.assertEqual([log.text for log in self.history], ["three", "four"])
+    self.assertEqual(len(self.history), 2)
+    self.assertEqual(self.history[0].text, "three")
+    self.assertEqual(self.history.spilled, 2)
+    self.assertEqual(self.history.page(0), {
+        "turn": 1,
+        "entries": [
+            {"text": "one", "sub_events": [{"text": "one a", "sub_events": []}]},
+            {"text": "two", "sub_events": []},
+        ],
+    })
+    self.assertIsNone(self.history.page(1))
+    self.assertIsNone(self.history.page(-1))
+
+    self.history.append(Log("five"), 5)
+    self.assertEqual([log.text for log in self.history], ["four", "five"])
+    self.assertEqual(self.history.spilled, 3)
+    self.assertEqual(self.history.page(1)["turn"], 2)
+
+  def testSaved(self):
+    self.history.append(Log("four"), 3)
+    for loaded in [
+        serialization.DecodeJson(serialization.EncodeJson(self.history)),
+        pickle.loads(pickle.dumps(self.history)),
+    ]:
+      self.assertEqual([log.text for log in loaded], ["three", "four"])
+      self.assertEqual(loaded.spilled, 2)
+      self.assertEqual(loaded.page(0), self.history.page(0))
+      loaded.append(Log("five"), 4)
+      self.assertEqual(loaded.page(1)["entries"], [{"text": "three", "sub_events": []}])
+
+
+class GameLogTest(unittest.TestCase):
+
+  def setUp(self):
+    rng = random.Random(0)
+    self.state = simulation.NewGame(4, rng)
+    policy = simulation.RandomPolicy(rng)
+    for _ in simulation.PlayMoves(self.state, policy, rng, until_turn=6, max_moves=2000):
+      pass
+
+  def testKeepsFewEntries(self):
+    history = self.state.event_log
+    self.assertGreaterEqual(self.state.turn_number, 5)
+    self.assertGreater(len(history.pages), 2)
+    self.assertLessEqual(len({turn for turn, _ in history.turns}), history.RECENT_TURNS)
+    self.assertEqual(history.turns[-1][0], self.state.turn_number)
+    spilled = sum(len(history.page(idx)["entries"]) for idx in range(len(history.pages)))
+    self.assertEqual(spilled, history.spilled)
+
+    data = self.state.json_repr()
+    self.assertEqual(data["event_log"], history.recent())
+    self.assertEqual(data["event_log_start"], history.spilled)
+    self.assertEqual(data["event_log_pages"], len(history.pages))
+
+  def testHistoryRequest(self):
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    handler.game.game = self.state
+    http_handler = FakeHttpHandler()
+    handler.handle_get(http_handler, "/history", {"page": ["0"]})
+    self.assertEqual(http_handler.status, 200)
+    self.assertEqual(json.loads(http_handler.body), self.state.event_log.page(0))
+
+    for page, status in [["100", 404], ["x", 400]]:
+      http_handler = FakeHttpHandler()
+      handler.handle_get(http_handler, "/history", {"page": [page]})
+      self.assertEqual(http_handler.status, status)
+
+  def testLoadsOldSaves(self):
+    old = eldritch.EldritchGame()
+    old.game = self.state
+    self.state.event_log = self.state.event_log.recent()
+    loaded = eldritch.EldritchGame.parse_json(old.json_str())
+    self.assertIsInstance(loaded.game.event_log, log_history.LogHistory)
+    self.assertEqual(len(loaded.game.event_log), len(self.state.event_log))
+
+
+if __name__ == "__main__":
+  unittest.main()
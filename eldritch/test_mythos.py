@@ -1440,6 +1440,65 @@ class MoveMonsterTest(EventTest):
     self.assertEqual(self.state.monsters[2].place.name, "Rivertown")
     self.assertEqual(self.state.monsters[3].place.name, "Easttown")
 
+  def testMonstersMoveTogether(self):
+    self.state.monsters.clear()
+    self.state.monsters.extend([
+        monsters.Cultist(),  # moon, moves on black
+        monsters.DimensionalShambler(),  # square, fast, moves on white
+        monsters.Ghost(),  # moon, stationary
+    ])
+    for idx, monster in enumerate(self.state.monsters):
+      monster.idx = idx
+      monster.place = self.state.places["Rivertown"]
+
+    move = MoveMonsters({"square"}, {"circle", "moon"})
+    self.state.event_stack.append(move)
+    frames = []
+    for _ in self.state.resolve_loop():
+      frames.append(self.state.event_stack[-1])
+    self.assertFalse(self.state.event_stack)
+
+    self.assertEqual(len(frames), 1)
+    self.assertIsInstance(frames[0], MoveMonsterGroup)
+    self.assertEqual(frames[0].paths, [
+        [0, ["Rivertown", "Easttown"]], [1, ["Rivertown", "FrenchHill", "Southside"]],
+    ])
+    self.assertEqual(self.state.monsters[0].place.name, "Easttown")
+    self.assertEqual(self.state.monsters[1].place.name, "Southside")
+    self.assertEqual(self.state.monsters[2].place.name, "Rivertown")
+    self.assertTrue(all(event.is_resolved() for event in move.moves.events))
+
+  def testMonsterPathsInState(self):
+    self.state.monsters.clear()
+    self.state.monsters.append(monsters.Cultist())
+    self.state.monsters[0].idx = 0
+    self.state.monsters[0].place = self.state.places["Rivertown"]
+    self.state.event_stack.append(MoveMonsters({"square"}, {"circle", "moon"}))
+    for _ in self.state.resolve_loop():
+      self.assertEqual(self.state.public_state()["monster_paths"], {0: ["Rivertown", "Easttown"]})
+      break
+    self.resolve_until_done()
+    self.assertNotIn("monster_paths", self.state.public_state())
+
+  def testUniqueMovementInOrder(self):
+    self.state.monsters.clear()
+    self.state.monsters.extend([monsters.Cultist(), monsters.Hound(), monsters.Maniac()])
+    for idx, monster in enumerate(self.state.monsters):
+      monster.idx = idx
+      monster.place = self.state.places["Rivertown"]
+    self.char.place = self.state.places["Newspaper"]
+
+    self.state.event_stack.append(MoveMonsters({"square"}, {"circle", "moon"}))
+    moved = []
+    for _ in self.state.resolve_loop():
+      moved.append([monster.place.name for monster in self.state.monsters])
+    self.assertFalse(self.state.event_stack)
+    self.assertEqual(moved, [
+        ["Easttown", "Rivertown", "Rivertown"],
+        ["Easttown", "Newspaper", "Rivertown"],
+        ["Easttown", "Newspaper", "Easttown"],
+    ])
+
   def testMovementAfterSpawn(self):
     self.state.mythos.append(Mythos3())
     self.state.monsters.clear()
@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import gates
+from eldritch import monsters
+from eldritch import serialization
+from eldritch import simulation
+
+
+class PlaceIndexTest(unittest.TestCase):
+
+  def setUp(self):
+    self.state = eldritch.GameState()
+    self.state.initialize_for_tests()
+    self.state.monsters.extend([monsters.Ghost(), monsters.Zombie()])
+    self.cultist, self.maniac, self.ghost, self.zombie = self.state.monsters
+    self.nun = self.state.all_characters["Nun"]
+    self.doctor = self.state.all_characters["Doctor"]
+    self.state.characters = [self.nun, self.doctor]
+    self.diner = self.state.places["Diner"]
+    self.woods = self.state.places["Woods"]
+
+  def testMovesKeepOrder(self):
+    for monster in [self.zombie, self.maniac, self.ghost]:
+      self.state.move_monster(monster, self.woods)
+    self.assertEqual(self.state.monsters_at(self.woods), [self.maniac, self.ghost, self.zombie])
+    self.assertEqual(self.state.monsters_at(self.state.monster_cup), [self.cultist])
+    self.assertEqual(self.state.monster_indexes_at(self.woods), [1, 2, 3])
+    self.state.move_monster(self.ghost, None)
+    self.assertEqual(self.state.monsters_at(self.woods), [self.maniac, self.zombie])
+    self.assertEqual(self.state.monsters_at(None), [self.ghost])
+    self.assertIs(self.ghost.place, None)
+
+    self.state.move_character(self.doctor, self.diner)
+    self.state.move_character(self.nun, self.diner)
+    self.assertEqual(self.state.characters_at(self.diner), [self.nun, self.doctor])
+    self.assertEqual(self.state.characters_at(self.woods), [])
+
+  def testNoticesOtherChanges(self):
+    self.state.monsters_at(self.woods)
+    self.ghost.place = self.woods
+    self.nun.place = self.woods
+    self.assertEqual(self.state.monsters_at(self.woods), [self.ghost])
+    self.assertEqual(self.state.characters_at(self.woods), [self.nun])
+
+    self.state.characters.remove(self.nun)
+    self.assertEqual(self.state.characters_at(self.woods), [])
+    extra = monsters.Ghoul()
+    extra.place = self.woods
+    self.state.monsters.append(extra)
+    self.assertEqual(self.state.monsters_at(self.woods), [self.ghost, extra])
+
+  def testOpenGates(self):
+    self.assertEqual(self.state.open_gates(), [])
+    self.woods.gate = gates.Gate("Pluto", 0, -2, "circle")
+    self.assertEqual(self.state.open_gates(), [self.woods])
+    self.woods.gate = None
+    self.assertEqual(self.state.open_gates(), [])
+
+  def testSetGateKeepsIndex(self):
+    self.state.open_gates()
+    key = self.state.place_index.key
+    lodge = self.state.places["Lodge"]
+    self.state.set_gate(self.woods, gates.Gate("Pluto", 0, -2, "circle"))
+    self.state.set_gate(lodge, gates.Gate("Abyss", 0, -2, "circle"))
+    self.assertEqual(self.state.open_gates(), [lodge, self.woods])  # The order of state.places.
+    self.woods.closed_until = 3
+    self.assertNotIn("Woods", self.state.closed_places())
+    self.state.set_gate(self.woods, None)
+    self.assertEqual(self.state.open_gates(), [lodge])
+    self.assertIn("Woods", self.state.closed_places())
+    self.assertIsNone(self.woods.gate)
+    self.state.set_gate(lodge, None)
+    self.assertEqual(self.state.open_gates(), [])
+    self.assertEqual(self.state.place_index.key[1:], key[1:])
+
+  def testOtherGamesDoNotRebuild(self):
+    self.state.monsters_at(self.woods)
+    key = self.state.place_index.key
+    other = eldritch.GameState()
+    other.initialize_for_tests()
+    other.monsters_at(None)
+    other.monsters[0].place = other.places["Woods"]
+    other.places["Woods"].gate = gates.Gate("Pluto", 0, -2, "circle")
+    self.assertEqual(self.state.monsters_at(self.woods), [])
+    self.assertEqual(self.state.place_index.key, key)
+    self.assertEqual(other.monsters_at(other.places["Woods"]), [other.monsters[0]])
+    self.assertEqual(other.open_gates(), [other.places["Woods"]])
+
+  def testNotSaved(self):
+    self.state.move_monster(self.ghost, self.woods)
+    loaded = serialization.DecodeJson(serialization.EncodeJson(self.state))
+    self.assertIsNone(loaded.place_index.key)
+    self.assertEqual([mon.name for mon in loaded.monsters_at(loaded.places["Woods"])], ["Ghost"])
+
+
+class RandomGameTest(unittest.TestCase):
+  """Plays random games, checking the index against every monster and character after each step."""
+
+  def setUp(self):
+    self.checked = 0
+    self.wrong = []
+
+  def check(self, state):
+    cup = state.monster_cup
+    for place in [None, cup] + list(state.places.values()):
+      name = getattr(place, "name", None)
+      if state.monsters_at(place) != [mon for mon in state.monsters if mon.place == place]:
+        self.wrong.append(f"monsters at {name}")
+      if state.characters_at(place) != [char for char in state.characters if char.place == place]:
+        self.wrong.append(f"characters at {name}")
+    gate_places = [place for place in state.places.values() if getattr(place, "gate", None)]
+    if state.open_gates() != gate_places:
+      self.wrong.append("open gates")
+    self.checked += 1
+
+  def checking_loop(self):
+    original = eldritch.GameState.resolve_loop
+
+    def resolve_loop(state):
+      for val in original(state):
+        self.check(state)
+        yield val
+    return resolve_loop
+
+  def testIndexMatches(self):
+    with mock.patch.object(eldritch.GameState, "resolve_loop", new=self.checking_loop()):
+      for seed in [0, 2]:
+        for _ in simulation.PlayTestGame(seed, 4, until_turn=3, max_moves=80):
+          pass
+    self.assertEqual(self.wrong, [])
+    self.assertGreater(self.checked, 100)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+
+import json
+import os
+import random
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import events
+from eldritch import items
+from eldritch import monsters
+from eldritch import serialization
+from eldritch import simulation
+from eldritch.test_events import EventTest
+from game import CustomEncoder
+
+
+def Normalize(data):
+  """Sorts lists that came from sets (e.g. place connections) so that states can be compared."""
+  if isinstance(data, dict):
+    output = {key: Normalize(value) for key, value in data.items()}
+    if isinstance(output.get("connections"), list):
+      output["connections"] = sorted(output["connections"])
+    return output
+  if isinstance(data, list):
+    return [Normalize(value) for value in data]
+  return data
+
+
+def PublicState(state):
+  return Normalize(json.loads(json.dumps(state.public_state(), cls=CustomEncoder)))
+
+
+class RoundTripTest(EventTest):
+
+  def assertRoundTrips(self, state):
+    for encode, decode in [
+        (serialization.EncodeJson, serialization.DecodeJson),
+        (serialization.EncodeBinary, serialization.DecodeBinary),
+    ]:
+      with self.subTest(encode=encode.__name__):
+        copy = decode(encode(state))
+        self.assertIsInstance(copy, eldritch.GameState)
+        self.assertEqual(PublicState(copy), PublicState(state))
+        self.assertEqual([type(event) for event in copy.event_stack],
+                         [type(event) for event in state.event_stack])
+    return serialization.DecodeJson(serialization.EncodeJson(state))
+
+  def testMidCombat(self):
+    self.char.fight_will_slider = 0
+    cultist = self.state.monsters[0]
+    cultist.place = self.char.place
+    self.state.event_stack.append(events.Combat(self.char, cultist))
+    self.resolve_to_choice(events.FightOrEvadeChoice)
+
+    self.state = self.assertRoundTrips(self.state)
+    combat = self.state.event_stack[0]
+    self.char = self.state.characters[0]
+    self.assertIs(combat.character, self.char)
+    self.assertIs(combat.monster, self.state.monsters[0])
+    self.assertIs(combat.monster.place, self.state.places["Diner"])
+    self.assertIs(self.char.place, self.state.places["Diner"])
+
+    self.state.event_stack[-1].resolve(self.state, "Fight")
+    choose_weapons = self.resolve_to_choice(events.CombatChoice)
+    self.choose_items(choose_weapons, [])
+    with mock.patch.object(events.random, "randint", new=mock.MagicMock(side_effect=[5, 1])):
+      self.resolve_until_done()
+    self.assertEqual([trophy.handle for trophy in self.char.trophies], [cultist.handle])
+
+  def testPossessionsAndDecks(self):
+    self.char.possessions.extend([items.Revolver38(0), items.Food(0)])
+    self.char.possessions[0]._exhausted = True  # pylint: disable=protected-access
+    self.state.common.extend([items.Food(1), items.Dynamite(0)])
+    self.state.event_stack.append(events.Draw(self.char, "common", 2))
+    self.resolve_to_choice(events.CardChoice)
+
+    copy = self.assertRoundTrips(self.state)
+    handles = [pos.handle for pos in copy.characters[0].possessions]
+    self.assertEqual(handles, [pos.handle for pos in self.char.possessions])
+    self.assertTrue(copy.characters[0].possessions[0].exhausted)
+    self.assertEqual(copy.event_stack[-1].choices, self.state.event_stack[-1].choices)
+    self.assertIs(copy.event_stack[-1].character, copy.characters[0])
+
+  def testStaticCards(self):
+    state = simulation.NewGame(2, random.Random(0))
+    copy = self.assertRoundTrips(state)
+    catalog = serialization.StaticCatalog()
+    bank = copy.places["Bank"]
+    self.assertIs(bank.fixed_encounters[0], catalog[("fixed", "Bank Loan")])
+    self.assertEqual(
+        [card.name for card in bank.neighborhood.encounters],
+        [card.name for card in state.places["Downtown"].encounters],
+    )
+    self.assertIn(catalog[("gate_card", "ShuffleGate")], copy.gate_cards)
+    self.assertEqual([card.name for card in copy.mythos], [card.name for card in state.mythos])
+
+  def testRandomState(self):
+    state = simulation.NewGame(2, random.Random(0))
+    state.rng = random.Random(3)
+    state.rng.random()
+    copies = [
+        serialization.DecodeJson(serialization.EncodeJson(state)),
+        serialization.DecodeBinary(serialization.EncodeBinary(state)),
+    ]
+    expected = [state.rng.random() for _ in range(3)]
+    for copy in copies:
+      self.assertEqual([copy.rng.random() for _ in range(3)], expected)
+
+  def testSlottedEvents(self):
+    check = events.Check(self.char, "luck", 1, difficulty=2)
+    self.state.event_stack.append(events.Sequence([events.Sequence([], self.char), check]))
+    self.assertFalse(hasattr(check, "__dict__"))
+    with self.assertRaises(AttributeError):
+      events.DONE.cancelled = True
+    for encode, decode in [
+        (serialization.EncodeJson, serialization.DecodeJson),
+        (serialization.EncodeBinary, serialization.DecodeBinary),
+    ]:
+      with self.subTest(encode=encode.__name__):
+        copy = decode(encode(self.state))
+        empty, copied = copy.event_stack[-1].events
+        self.assertIs(empty.events[0], events.DONE)
+        self.assertEqual((copied.check_type, copied.modifier, copied.difficulty), ("luck", 1, 2))
+        self.assertIs(copied.character, copy.characters[0])
+        self.assertIsNone(copied.dice)
+        self.assertFalse(copied.cancelled)
+
+  def testSharedRandom(self):
+    copy = self.assertRoundTrips(self.state)
+    self.assertIs(copy.rng, events.random)
+
+  def testUnsupportedVersion(self):
+    doc = json.loads(serialization.EncodeJson(self.state))
+    doc["version"] = serialization.VERSION + 1
+    with self.assertRaises(serialization.SerializationError):
+      serialization.DecodeJson(json.dumps(doc))
+
+  def testUnencodable(self):
+    self.state.other_globals.append(monsters.Cultist())
+    self.state.other_globals[0].get_interrupt = lambda event, state: None
+    with self.assertRaises(serialization.SerializationError):
+      serialization.EncodeJson(self.state)
+
+
+class HostileSnapshotTest(unittest.TestCase):
+
+  def assertRejected(self, root, anchors=()):
+    doc = {"version": serialization.VERSION, "root": root, "anchors": list(anchors)}
+    with mock.patch("builtins.print") as printed:
+      with self.assertRaises(serialization.SerializationError):
+        eldritch.EldritchGame.parse_json(json.dumps(doc))
+    printed.assert_not_called()
+
+  def testCallsOnlyReconstructors(self):
+    self.assertRejected(
+        {"$reduce": [{"$name": "builtins:print"}, {"$tuple": ["ARBITRARY CALL EXECUTED"]}, None]})
+    self.assertRejected({"$reduce": [{"$name": "eldritch.events:Sequence"}, {"$tuple": []}, None]})
+    self.assertRejected({"$reduce": [
+        {"$method": [{"$name": "builtins:print"}, "__call__"]}, {"$tuple": ["called"]}, None,
+    ]})
+
+  def testNamesOnlyGameClasses(self):
+    self.assertRejected({"$name": "os:system"})
+    self.assertRejected({"$name": "builtins:print"})
+    self.assertRejected({"$name": "eldritch.serialization:LookupStatic"})
+    self.assertRejected({"$obj": "subprocess:Popen", "state": {}})
+    self.assertRejected({"$obj": "builtins:print", "state": {}})
+    self.assertRejected({"$namedtuple": "eldritch.events:Sequence", "items": []})
+    self.assertRejected({"$method": [{"$name": "builtins:int"}, "__subclasses__"]})
+
+  def testAnchorsMustMatchTheirKind(self):
+    self.assertRejected(None, [{"kind": "place", "key": "x", "class": "os:system", "state": {}}])
+    self.assertRejected(None, [
+        {"kind": "place", "key": "x", "class": "eldritch.events:Sequence", "state": {}},
+    ])
+    self.assertRejected(None, [
+        {"kind": "module", "key": "x", "class": "eldritch.places:Street", "state": {}},
+    ])
+
+
+class RandomGameTest(unittest.TestCase):
+
+  def testRoundTripThroughoutGame(self):
+    checked = 0
+    for move, state in enumerate(simulation.PlayTestGame(0, 3, until_turn=3, max_moves=60)):
+      if move % 10:
+        continue
+      for copy in [
+          serialization.DecodeJson(serialization.EncodeJson(state)),
+          serialization.DecodeBinary(serialization.EncodeBinary(state)),
+      ]:
+        self.assertEqual(PublicState(copy), PublicState(state))
+      checked += 1
+    self.assertGreater(checked, 2)
+
+
+class EldritchGameTest(unittest.TestCase):
+
+  def testJsonStr(self):
+    game = eldritch.EldritchGame()
+    game.connect_user("a")
+    game.connect_user("b")
+    for _ in game.handle("a", {"type": "ancient", "ancient": "Wendigo"}):
+      pass
+    for _ in game.handle("a", {"type": "join", "char": "Nun"}):
+      pass
+    for _ in game.handle("a", {"type": "start"}):
+      pass
+    for _ in game.handle("b", {"type": "join", "char": "Doctor"}):
+      pass
+
+    restored = eldritch.EldritchGame.parse_json(game.json_str())
+    self.assertEqual(restored.player_sessions, {"a": 0})
+    self.assertEqual(restored.pending_sessions, {"b": "Doctor"})
+    self.assertEqual(restored.game.pending_chars, {"Doctor": None})
+    self.assertEqual(restored.game.ancient_one.name, "Wendigo")
+    self.assertEqual(PublicState(restored.game), PublicState(game.game))
+
+    later = game.snapshot_later()
+    game.connect_user("c")
+    for _ in game.handle("c", {"type": "join", "char": "Student"}):
+      pass
+    snapshot = eldritch.EldritchGame.parse_json(later())
+    self.assertEqual(snapshot.pending_sessions, {"b": "Doctor"})
+    self.assertEqual(PublicState(snapshot.game), PublicState(restored.game))
+
+
+if __name__ == "__main__":
+  unittest.main()
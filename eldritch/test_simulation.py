@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+
+import os
+import random
+import subprocess
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import events
+from eldritch import simulation
+
+
+class RunGameTest(unittest.TestCase):
+
+  def testSameSeedSameGame(self):
+    for policy in simulation.POLICIES:
+      with self.subTest(policy=policy):
+        first = simulation.RunGame(3, players=2, policy=policy, max_moves=150)
+        second = simulation.RunGame(3, players=2, policy=policy, max_moves=150)
+        self.assertIn(first.outcome, {"limit", "victory", "defeat", "stuck", "error"})
+        self.assertGreater(first.moves, 0)
+        self.assertEqual((first.outcome, first.moves, first.turns),
+                         (second.outcome, second.moves, second.turns))
+        self.assertEqual(first.event_counts, second.event_counts)
+
+  def testSameSeedInOtherProcesses(self):
+    # Set iteration order changes with the hash seed, so it must never decide what the rng draws.
+    script = (
+        "from eldritch import simulation; "
+        "result = simulation.RunGame(5, players=2, max_moves=300); "
+        "print(result.outcome, result.moves, result.turns, sorted(result.event_counts.items()))"
+    )
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    outputs = set()
+    for hash_seed in ["1", "2"]:
+      env = dict(os.environ, PYTHONHASHSEED=hash_seed)
+      proc = subprocess.run(
+          [sys.executable, "-c", script], cwd=root, env=env, capture_output=True, text=True,
+          check=True,
+      )
+      outputs.add(proc.stdout)
+    self.assertEqual(len(outputs), 1)
+
+  def testMoveLimit(self):
+    result = simulation.RunGame(0, players=2, policy="greedy", max_moves=20)
+    self.assertEqual(result.outcome, "limit")
+    self.assertEqual(result.moves, 20)
+
+
+class PlayTestGameTest(unittest.TestCase):
+
+  def testStopsAtKnownBug(self):
+    # In this game, a character in another world is moved as if they were in the city.
+    states = list(simulation.PlayTestGame(1, 3, until_turn=4, max_moves=200))
+    self.assertLess(states[-1].turn_number, 4)
+
+  def testRaisesOtherErrors(self):
+    with mock.patch.object(events.DiceRoll, "resolve", side_effect=AttributeError("connections")):
+      with self.assertRaises(AttributeError):
+        for _ in simulation.PlayTestGame(0, 2, until_turn=2, max_moves=50):
+          pass
+
+
+class EventTimerTest(unittest.TestCase):
+
+  def testCountsOutermostResolve(self):
+    original = events.DiceRoll.resolve
+    with simulation.EventTimer() as timer:
+      self.assertIsNot(events.DiceRoll.resolve, original)
+      simulation.NewGame(1, random.Random(0))
+    self.assertIs(events.DiceRoll.resolve, original)
+    self.assertGreater(timer.counts["Sequence"], 0)
+    self.assertEqual(timer.counts.keys(), timer.seconds.keys())
+
+
+class EventCounterTest(unittest.TestCase):
+
+  def testCountsCreatedEvents(self):
+    original = events.Event.__init__
+    with simulation.EventCounter() as counter:
+      self.assertIsNot(events.Event.__init__, original)
+      simulation.NewGame(1, random.Random(0))
+    self.assertIs(events.Event.__init__, original)
+    self.assertGreater(counter.counts["Sequence"], 0)
+    self.assertGreater(counter.counts["EventLog"], 0)
+    self.assertEqual(counter.events, sum(counter.counts.values()) - counter.counts["EventLog"])
+    total = sum(counter.counts.values())
+    events.Nothing()
+    self.assertEqual(sum(counter.counts.values()), total)
+
+
+if __name__ == "__main__":
+  unittest.main()
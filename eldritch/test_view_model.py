@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+# Hack to allow the test to be run directly instead of invoking python from the base dir.
+if os.path.abspath(sys.path[0]) == os.path.dirname(os.path.abspath(__file__)):
+  sys.path[0] = os.path.dirname(sys.path[0])
+
+from eldritch import eldritch
+from eldritch import events
+from eldritch import serialization
+from eldritch import simulation
+from eldritch import view_model
+
+
+class ViewCacheTest(unittest.TestCase):
+
+  def setUp(self):
+    self.cache = view_model.ViewCache()
+    self.calls = []
+
+  def compute(self, name):
+    def compute():
+      self.calls.append(name)
+      return name
+    return compute
+
+  def testReusesUntilMarked(self):
+    for _ in range(2):
+      self.assertEqual(self.cache.get("monsters", self.compute("m")), "m")
+      self.assertEqual(self.cache.get("places", self.compute("p")), "p")
+    self.assertEqual(self.calls, ["m", "p"])
+    self.cache.mark({"monsters"})
+    self.cache.get("monsters", self.compute("m"))
+    self.cache.get("places", self.compute("p"))
+    self.assertEqual(self.calls, ["m", "p", "m"])
+
+  def testGlobalsMarkEverything(self):
+    self.cache.get("monsters", self.compute("m"))
+    self.cache.get("places", self.compute("p"))
+    self.cache.mark({"globals"})
+    self.cache.get("monsters", self.compute("m"))
+    self.cache.get("places", self.compute("p"))
+    self.assertEqual(self.calls, ["m", "p", "m", "p"])
+
+  def testKey(self):
+    self.cache.get("characters", self.compute("c"), key=False)
+    self.cache.get("characters", self.compute("c"), key=False)
+    self.cache.get("characters", self.compute("c"), key=True)
+    self.assertEqual(self.calls, ["c", "c"])
+
+  def testUndeclaredEventsChangeEverything(self):
+    self.assertEqual(view_model.Sections(events.Sequence([])), set())
+    self.assertEqual(view_model.Sections(events.AddDoom()), view_model.SECTIONS)
+
+
+class GameStateViewTest(unittest.TestCase):
+
+  def setUp(self):
+    self.state = eldritch.GameState()
+    self.state.initialize_for_tests()
+    self.char = self.state.all_characters["Nun"]
+    self.char.place = self.state.places["Diner"]
+    self.state.characters = [self.char]
+
+  def resolve(self, event):
+    self.state.event_stack.append(event)
+    for _ in self.state.resolve_loop():
+      pass
+
+  def testReusesSections(self):
+    first = self.state.json_repr()
+    second = self.state.json_repr()
+    self.assertIs(first["characters"][0], second["characters"][0])
+    self.assertIs(first["monsters"][0], second["monsters"][0])
+    self.assertIs(first["other_globals"], second["other_globals"])
+
+  def testEventMarksItsSections(self):
+    self.char.dollars = 3
+    monster_json = self.state.json_repr()["monsters"]
+    self.resolve(events.Gain(self.char, {"dollars": 1}))
+    output = self.state.json_repr()
+    self.assertEqual(output["characters"][0]["dollars"], 4)
+    self.assertIs(output["monsters"][0], monster_json[0])
+
+  def testMovesMarkWhatTheyChange(self):
+    clues = self.state.places["Diner"].clues
+    self.state.json_repr()
+    for _ in self.state.handle(0, {"type": "clue", "place": "Diner"}):
+      pass
+    self.assertEqual(self.state.json_repr()["places"]["Diner"]["clues"], clues + 1)
+
+    self.state.json_repr()
+    self.state.mark_move("spend")
+    self.char.dollars = 2  # Spending changes the character as soon as the choice is made.
+    self.assertEqual(self.state.json_repr()["characters"][0]["dollars"], 2)
+
+  def testOnlyNamesOfCatalogEntries(self):
+    self.char.gone = True
+    output = self.state.json_repr()
+    self.assertEqual(output["all_characters"]["Nun"], {"gone": True})
+    self.assertEqual(output["all_characters"]["Doctor"], {"gone": False})
+    self.assertIn("Wendigo", output["all_ancients"])
+    catalog = eldritch.Catalog()
+    self.assertEqual(catalog["characters"].keys(), output["all_characters"].keys())
+    self.assertEqual(sorted(catalog["ancients"]), output["all_ancients"])
+    self.assertEqual(catalog["characters"]["Nun"]["dollars"], 0)
+
+  def testNotSaved(self):
+    self.state.json_repr()
+    loaded = serialization.DecodeJson(serialization.EncodeJson(self.state))
+    self.assertEqual(loaded.view.sections, {})
+
+
+class RandomGameTest(unittest.TestCase):
+  """Plays random games, checking that every pushed state matches one computed from scratch."""
+
+  def setUp(self):
+    self.checked = 0
+    self.wrong = []
+
+  def checking_loop(self):
+    original = eldritch.GameState.resolve_loop
+
+    def resolve_loop(state):
+      for val in original(state):
+        cached = state.public_state()
+        state.view.mark_all()
+        if cached != state.public_state():
+          top = state.event_stack[-1] if state.event_stack else None
+          self.wrong.append(f"stale view at {type(top).__name__}")
+        self.checked += 1
+        yield val
+    return resolve_loop
+
+  def testCachedViewMatches(self):
+    with mock.patch.object(eldritch.GameState, "resolve_loop", new=self.checking_loop()):
+      for _ in simulation.PlayTestGame(0, 3, until_turn=3, max_moves=40):
+        pass
+    self.assertEqual(self.wrong, [])
+    self.assertGreater(self.checked, 100)
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,67 @@
+"""Caches the parts of GameState.json_repr() that have not changed since the last push.
+
+json_repr() is split into sections (the characters in play, the monsters, the places, and the
+global effects with everything that depends on them). Each section is computed once and reused
+until the game marks it dirty. Resolving an event marks the sections declared for its class with
+Changes; events without a declaration mark every section, so only events known to leave parts of
+the game alone need one. Moves that change the state without resolving an event (spending,
+trading, debugging commands) are marked by GameState.handle().
+
+A declaration belongs to exactly the class it decorates; subclasses must be declared separately.
+"""
+
+CHARACTERS = "characters"
+MONSTERS = "monsters"
+PLACES = "places"
+# Ancient ones, the rumor, the environment and other global effects. They modify characters and
+# monsters, so changing them makes every other section dirty too.
+GLOBALS = "globals"
+SECTIONS = frozenset([CHARACTERS, MONSTERS, PLACES, GLOBALS])
+
+_CHANGES = {}  # event class -> frozenset of sections
+
+
+def Changes(*sections):
+  """Declares that resolving an event of the decorated class only changes the given sections."""
+  assert not set(sections) - SECTIONS, f"unknown sections {sections}"
+
+  def decorator(cls):
+    _CHANGES[cls] = frozenset(sections)
+    return cls
+  return decorator
+
+
+def Sections(event):
+  """Returns the sections that resolving (or choosing an answer to) event may change."""
+  return _CHANGES.get(type(event), SECTIONS)
+
+
+class ViewCache:
+
+  def __init__(self):
+    self.sections = {}
+
+  def __reduce__(self):
+    # Only holds data computed from the game, so a loaded game starts with an empty cache.
+    return ViewCache, ()
+
+  def mark(self, sections):
+    if GLOBALS in sections:
+      self.sections.clear()
+      return
+    for section in sections:
+      self.sections.pop(section, None)
+
+  def mark_all(self):
+    self.sections.clear()
+
+  def get(self, section, compute, key=None):
+    """Returns the cached value of section, calling compute() if it is dirty.
+
+    key describes anything else the section depends on; a cached value computed with a different
+    key is treated as dirty.
+    """
+    cached = self.sections.get(section)
+    if cached is None or cached[0] != key:
+      cached = self.sections[section] = (key, compute())
+    return cached[1]
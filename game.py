@@ -1,13 +1,34 @@
 import abc
 import asyncio
 import collections
+import concurrent.futures
+import contextlib
 import dataclasses
 import enum
 from http import HTTPStatus
 import json
+import os
+import random
 import sys
+import time
 import traceback
 
+import metrics
+
+
+# Snapshots are written one at a time, off the event loop.
+SNAPSHOT_EXECUTOR = concurrent.futures.ThreadPoolExecutor(1, thread_name_prefix="snapshot")
+# Game code runs on these threads, so that the event loop is left to the websockets. A game only
+# runs one thing at a time, in the order it was asked for (see GameHandler.lane), but different
+# games run side by side.
+GAME_EXECUTOR = concurrent.futures.ThreadPoolExecutor(thread_name_prefix="game")
+# When set, games draw from the operating system's generator instead of a seeded one. Their move
+# logs can still be replayed, but the replay will not roll the same dice.
+SECURE_RANDOM = False
+# Whether /log, /dump and /json include the seed and the state of each game's random generator.
+# With them, a player could predict every roll of a running game; see server.py --operator.
+OPERATOR = False
+
 
 class GameException(Exception):
   pass
@@ -50,6 +71,45 @@ def ValidatePlayer(playerdata):
     raise InvalidPlayer("Player name must be printable.")
 
 
+def NewRandom(secure=False):
+  """Returns a (seed, generator) pair. The seed is None for a secure generator."""
+  if secure:
+    return None, random.SystemRandom()
+  seed = int.from_bytes(os.urandom(8), "big")
+  return seed, random.Random(seed)
+
+
+class MoveLog:
+  """Everything a game has been given since it was created or loaded.
+
+  A game can be rebuilt by loading the snapshot (or creating a new game if there is none), seeding
+  it with the seed, and applying the entries in order; see replay.py. Entries are lists of
+  ["connect", session], ["disconnect", session] or ["move", session, data].
+  """
+
+  def __init__(self, game_type, seed, snapshot=None):
+    self.game_type = game_type
+    self.seed = seed
+    self.snapshot = snapshot
+    self.entries = []
+
+  def record(self, *entry):
+    self.entries.append(list(entry))
+
+  def json_str(self, with_seed=True):
+    return json.dumps({
+        "game_type": self.game_type, "seed": self.seed if with_seed else None,
+        "snapshot": self.snapshot, "entries": self.entries,
+    })
+
+  @classmethod
+  def parse_json(cls, data):
+    parsed = json.loads(data, object_pairs_hook=collections.OrderedDict)
+    log = cls(parsed["game_type"], parsed["seed"], parsed["snapshot"])
+    log.entries.extend(parsed["entries"])
+    return log
+
+
 class CustomEncoder(json.JSONEncoder):
 
   def default(self, o):
@@ -62,6 +122,52 @@ class CustomEncoder(json.JSONEncoder):
     return json.JSONEncoder.default(self, o)
 
 
+def SpliceJson(public_json, overlay_json):
+  """Merges two encoded JSON objects without decoding and re-encoding them.
+
+  The keys of the overlay must not already be present in the public object.
+  """
+  if overlay_json.strip() == "{}":
+    return public_json
+  if public_json.strip() == "{}":
+    return overlay_json
+  return public_json[:public_json.rindex("}")] + ", " + overlay_json[overlay_json.index("{")+1:]
+
+
+def _PointerToken(key):
+  return str(key).replace("~", "~0").replace("/", "~1")
+
+
+def JsonDiff(old, new, path=""):
+  """Returns a list of RFC 6902 operations that turn one decoded JSON document into another."""
+  if isinstance(old, dict) and isinstance(new, dict):
+    ops = [{"op": "remove", "path": f"{path}/{_PointerToken(key)}"} for key in old.keys() - new]
+    for key, val in new.items():
+      subpath = f"{path}/{_PointerToken(key)}"
+      if key not in old:
+        ops.append({"op": "add", "path": subpath, "value": val})
+      else:
+        ops.extend(JsonDiff(old[key], val, subpath))
+    return ops
+  if isinstance(old, list) and isinstance(new, list):
+    ops = []
+    common = min(len(old), len(new))
+    for idx in range(common):
+      ops.extend(JsonDiff(old[idx], new[idx], f"{path}/{idx}"))
+    for idx in range(common, len(new)):
+      ops.append({"op": "add", "path": f"{path}/{idx}", "value": new[idx]})
+    for idx in reversed(range(common, len(old))):
+      ops.append({"op": "remove", "path": f"{path}/{idx}"})
+    # When most of the list has shifted around, it is cheaper to send the new list.
+    if ops and len(ops) >= len(new):
+      return [{"op": "replace", "path": path, "value": new}]
+    return ops
+  # Note that True == 1 and 1 == 1.0 in python, but not in JSON.
+  if type(old) is type(new) and old == new:  # pylint: disable=unidiomatic-typecheck
+    return []
+  return [{"op": "replace", "path": path, "value": new}]
+
+
 class BaseGame(metaclass=abc.ABCMeta):
 
   @abc.abstractmethod
@@ -83,10 +189,68 @@ class BaseGame(metaclass=abc.ABCMeta):
   def json_str(self):
     return "{}"
 
+  def snapshot_later(self):
+    """Returns a function that returns json_str() as it is now, even after the game has changed.
+
+    GameHandler calls this while the game is held, and calls the function on the snapshot thread
+    while moves carry on, so this should be much cheaper than json_str(). By default it encodes
+    the game right away, which is fine for games whose json_str() is cheap.
+    """
+    encoded = self.json_str()
+    return lambda: encoded
+
+  def shared_json_str(self):
+    """Returns json_str() without anything that lets players predict the game's random choices.
+
+    This is what /dump and /json serve unless the server runs with --operator. Loading it gives
+    the game a new random generator, as loading any snapshot through /load does.
+    """
+    return self.json_str()
+
   @abc.abstractmethod
   def for_player(self, session):
     pass
 
+  def public_state(self):
+    """Returns the part of for_player() that is the same for every session.
+
+    Games that return a dict here must also implement player_overlay(). GameHandler will encode
+    the public state once per push and splice each session's overlay into it. Returning None
+    makes GameHandler fall back to calling for_player() once per session.
+    """
+    return None
+
+  def player_overlay(self, session):  # pylint: disable=unused-argument
+    """Returns the keys of for_player() that differ between sessions (hand, usables, etc)."""
+    return {}
+
+  def set_random(self, rng):
+    """Makes every random choice in the game come from rng, e.g. a seeded random.Random."""
+
+  def set_profile(self, profile):
+    """Gives the game a metrics.Profile to record its own counters into when metrics are enabled."""
+
+  @classmethod
+  def catalog(cls):
+    """Returns data that is the same for every game of this type, or None if there is none.
+
+    The server serves it as JSON at /<game type>/catalog.json with an ETag, so clients only
+    download it once and pushed states can refer to its entries by name.
+    """
+    return None
+
+  def history(self, page):  # pylint: disable=unused-argument
+    """Returns a page of log entries that are no longer pushed, or None if there is no such page.
+
+    The server serves it as JSON at /history?page=<page>, so that clients can fetch the log of
+    earlier turns when they need it instead of every push carrying all of it.
+    """
+    return None
+
+  def spliced_for_player(self, session):
+    public_json = json.dumps(self.public_state(), cls=CustomEncoder)
+    return SpliceJson(public_json, json.dumps(self.player_overlay(session), cls=CustomEncoder))
+
   @abc.abstractmethod
   def handle(self, session, data):
     pass
@@ -99,11 +263,39 @@ class BaseGame(metaclass=abc.ABCMeta):
 
 class GameHandler:
 
-  def __init__(self, game_id, game_class):
+  SNAPSHOT_INTERVAL = 5  # Minimum number of seconds between two snapshots of the same game.
+
+  def __init__(self, game_id, game_class, store=None):
     self.game_id = game_id
     self.game = game_class()
     self.game_class = game_class
     self.websockets = collections.defaultdict(set)
+    # Websockets that asked for patches, mapped to the (version, public, overlay) they last saw.
+    self.patch_bases = {}
+    self.version = 0
+    self.store = store
+    self.dirty = False
+    self._lane = None  # See lane.
+    self.last_snapshot = float("-inf")
+    self.snapshot_timer = None
+    self.snapshot_future = None
+    self.move_log = None
+    self.profile = metrics.Profile()
+    self.game.set_profile(self.profile)
+    self.start_log()
+
+  def start_log(self, snapshot=None):
+    """Reseeds the game and starts a new move log from the given snapshot of it."""
+    if isinstance(snapshot, bytes):
+      snapshot = snapshot.decode("utf-8")
+    seed, rng = NewRandom(SECURE_RANDOM)
+    self.game.set_random(rng)
+    self.move_log = MoveLog(self.game_class.__name__, seed, snapshot)
+
+  def restore(self, game, snapshot):
+    self.game = game
+    self.game.set_profile(self.profile)
+    self.start_log(snapshot)
 
   def game_url(self):
     return self.game.game_url(self.game_id)
@@ -112,56 +304,130 @@ class GameHandler:
     return self.game.game_status()
 
   def get_urls(self):
-    return {"/dump", "/save", "/json"}
+    return {"/dump", "/save", "/json", "/log", "/profile", "/history"}
 
   def post_urls(self):
     return {"/load"}
 
-  def handle_get(self, event_loop, http_handler, path, args):  # pylint: disable=unused-argument
-    if path not in ["/dump", "/save", "/json"]:
+  async def get(self, http_handler, path, args):
+    async with self.holding_lane():
+      await self.off_loop(self.handle_get, http_handler, path, args)
+
+  def handle_get(self, http_handler, path, args):  # pylint: disable=unused-argument
+    if path not in ["/dump", "/save", "/json", "/log", "/profile", "/history"]:
       http_handler.send_error(HTTPStatus.NOT_FOUND.value, f"Unknown path {path}")
       return
-    value = self.game.json_str().encode("ascii")
+    if path == "/history":
+      self.send_history(http_handler, args)
+      return
+    if path == "/log":
+      value = self.move_log.json_str(with_seed=OPERATOR).encode("ascii")
+    elif path == "/profile":
+      value = json.dumps(self.profile, cls=CustomEncoder).encode("ascii")
+    elif OPERATOR:
+      value = self.game.json_str().encode("ascii")
+    else:
+      value = self.game.shared_json_str().encode("ascii")
     http_handler.send_response(HTTPStatus.OK.value)
     http_handler.end_headers()
     http_handler.wfile.write(value)
 
-  def handle_post(self, event_loop, http_handler, path, args, data):
+  def send_history(self, http_handler, args):
+    try:
+      page = int(args.get("page", [""])[0])
+    except ValueError:
+      http_handler.send_error(HTTPStatus.BAD_REQUEST.value, "page must be a number")
+      return
+    history = self.game.history(page)
+    if history is None:
+      http_handler.send_error(HTTPStatus.NOT_FOUND.value, f"No history page {page}")
+      return
+    http_handler.send_response(HTTPStatus.OK.value)
+    http_handler.end_headers()
+    http_handler.wfile.write(json.dumps(history, cls=CustomEncoder).encode("utf-8"))
+
+  async def handle_post(self, http_handler, path, args, data):  # pylint: disable=unused-argument
     if path not in ["/load"]:
       http_handler.send_error(HTTPStatus.NOT_FOUND.value, f"Unknown path {path}")
       return
     try:
-      new_game = self.game_class.parse_json(data)
+      new_game = await self.off_loop(self.game_class.parse_json, data)
     except Exception as err:  # pylint: disable=broad-except
       print(sys.exc_info()[0])
       print(sys.exc_info()[1])
       traceback.print_tb(sys.exc_info()[2])
       http_handler.send_error(HTTPStatus.BAD_REQUEST.value, str(err))
       return
-    self.game = new_game
+    async with self.holding_lane():
+      await self.off_loop(self.load, new_game, data)
+      http_handler.send_response(HTTPStatus.NO_CONTENT.value)
+      http_handler.end_headers()
+      await self.push()
+    self.schedule_snapshot()
+
+  def load(self, new_game, data):
+    self.restore(new_game, data)
     for session in self.websockets:
+      self.move_log.record("connect", session)
       self.game.connect_user(session)
-    http_handler.send_response(HTTPStatus.NO_CONTENT.value)
-    http_handler.end_headers()
-    fut = asyncio.run_coroutine_threadsafe(self.push(), event_loop)
-    fut.result(10)
 
   async def connect_user(self, session, websocket):
-    is_new_user = not self.websockets[session]
-    self.websockets[session].add(websocket)
-    if is_new_user:
-      print(f"added {session} to the game {self.game_id}")
-      self.game.connect_user(session)
-    # Need to push, since the new connection needs data too.
-    await self.push()
+    async with self.holding_lane():
+      is_new_user = not self.websockets[session]
+      self.websockets[session].add(websocket)
+      if is_new_user:
+        print(f"added {session} to the game {self.game_id}")
+        self.move_log.record("connect", session)
+        await self.off_loop(self.game.connect_user, session)
+      # Need to push, since the new connection needs data too.
+      await self.push()
 
   async def disconnect_user(self, session, websocket):
-    self.websockets[session].remove(websocket)
-    if not self.websockets[session]:
-      print(f"{session} has left game {self.game_id}")
-      del self.websockets[session]
-      self.game.disconnect_user(session)
-      await self.push()
+    async with self.holding_lane():
+      self.websockets[session].remove(websocket)
+      self.patch_bases.pop(websocket, None)
+      if not self.websockets[session]:
+        print(f"{session} has left game {self.game_id}")
+        del self.websockets[session]
+        self.move_log.record("disconnect", session)
+        await self.off_loop(self.game.disconnect_user, session)
+        await self.push()
+
+  @property
+  def lane(self):
+    """The lock held while anything reads or changes the game; see holding_lane().
+
+    It is made on first use, from inside the event loop. Before Python 3.10, a lock belongs to the
+    loop that is current when it is made, and games are loaded before the server's loop starts.
+    """
+    if self._lane is None:
+      self._lane = asyncio.Lock()
+    return self._lane
+
+  @contextlib.asynccontextmanager
+  async def holding_lane(self):
+    """Waits for everything asked of this game before.
+
+    Nothing else reads or changes the game until the block ends, including snapshots.
+    """
+    start = time.perf_counter()
+    async with self.lane:
+      if metrics.ENABLED:
+        self.profile.observe("game_lane_wait_seconds", time.perf_counter() - start)
+      yield
+    if self.dirty and self.snapshot_timer is None:
+      # A snapshot may have been put off because the lane was held.
+      self.schedule_snapshot()
+
+  async def off_loop(self, func, *args):
+    """Runs func(*args) on GAME_EXECUTOR. Anything that uses the game must hold the lane."""
+    future = asyncio.get_running_loop().run_in_executor(GAME_EXECUTOR, func, *args)
+    try:
+      return await asyncio.shield(future)
+    except asyncio.CancelledError:
+      # Keep the lane until the game is no longer in use.
+      await asyncio.wait([future])
+      raise
 
   async def handle(self, websocket, session, raw_data):
     try:
@@ -169,14 +435,38 @@ class GameHandler:
     except Exception as err:  # pylint: disable=broad-except
       await self.push_error(websocket, str(err))
       return
+    async with self.holding_lane():
+      if isinstance(data, dict) and data.get("type") == "resync":
+        await self.push_snapshot(websocket, session)
+        return
+      if metrics.ENABLED:
+        await self.profiled_handle_data(websocket, session, data)
+      else:
+        await self.handle_data(websocket, session, data)
+    self.schedule_snapshot()
+
+  async def profiled_handle_data(self, websocket, session, data):
+    events = self.profile.total("game_events_total")
+    start = time.perf_counter()
+    try:
+      await self.handle_data(websocket, session, data)
+    finally:
+      self.profile.observe("game_move_seconds", time.perf_counter() - start)
+      self.profile.observe("game_events_per_move", self.profile.total("game_events_total") - events)
+
+  async def handle_data(self, websocket, session, data):
     pushed = False
+    self.move_log.record("move", session, data)
     try:
-      result = self.game.handle(session, data)
+      result = await self.off_loop(self.game.handle, session, data)
       if isinstance(result, collections.abc.Iterable):
         # TODO: investigate what happens when one of these websockets disconnects or throws an
         # error in the middle of handling this input.
-        for _ in result:
-          await self.push()
+        while True:
+          messages = await self.off_loop(self.advance, result)
+          if messages is None:
+            break
+          await self.send_all(messages)
         # Avoid pushing the last state twice.
         pushed = True
     except (GameException, AssertionError) as err:
@@ -188,7 +478,7 @@ class GameHandler:
       else:
         await self.push_error(websocket, str(err))
       # Intentionally fall through so that we can push the new state.
-    except Exception as err:  # pylint: disable=broad-except
+    except Exception:  # pylint: disable=broad-except
       print(sys.exc_info()[0])
       print(sys.exc_info()[1])
       traceback.print_tb(sys.exc_info()[2])
@@ -198,13 +488,129 @@ class GameHandler:
     if not pushed:
       await self.push()
 
+  def encode_parts(self):
+    """Returns the encoded public state and a map of session to encoded overlay."""
+    if metrics.ENABLED:
+      start = time.perf_counter()
+      try:
+        return self.encode_parts_unprofiled()
+      finally:
+        self.profile.observe("game_encode_seconds", time.perf_counter() - start)
+    return self.encode_parts_unprofiled()
+
+  def encode_parts_unprofiled(self):
+    public = self.game.public_state()
+    if public is None:
+      return "{}", {session: self.game.for_player(session) for session in self.websockets}
+    # Encode the shared state once; each session only pays for its own overlay.
+    public_json = json.dumps(public, cls=CustomEncoder)
+    return public_json, {
+        session: json.dumps(self.game.player_overlay(session), cls=CustomEncoder)
+        for session in self.websockets
+    }
+
+  def encode_for_sessions(self):
+    public_json, overlays = self.encode_parts()
+    return {session: SpliceJson(public_json, overlay) for session, overlay in overlays.items()}
+
+  def advance(self, moves):
+    """Runs the game until its next update. Returns what push() would send, or None at the end."""
+    for _ in moves:
+      return self.encode_messages()
+    return None
+
   async def push(self):
-    callbacks = []
+    await self.send_all(await self.off_loop(self.encode_messages))
+
+  @staticmethod
+  async def send_all(messages):
+    await asyncio.gather(*[websocket.send(message) for websocket, message in messages])
+
+  def encode_messages(self):
+    """Returns (websocket, message) pairs that bring every websocket up to date."""
+    self.version += 1
+    public_json, overlays = self.encode_parts()
+    public_doc = json.loads(public_json) if self.patch_bases else None
+    # Most patch websockets saw the same previous public state; only diff it once.
+    public_patches = {}
+    messages = []
     for session, ws_list in self.websockets.items():
-      data = self.game.for_player(session)
+      full_state = None
+      overlay_doc = None
       for websocket in ws_list:
-        callbacks.append(websocket.send(data))
-    await asyncio.gather(*callbacks)
+        if websocket not in self.patch_bases:
+          if full_state is None:
+            full_state = SpliceJson(public_json, overlays[session])
+          messages.append((websocket, full_state))
+          continue
+        if overlay_doc is None:
+          overlay_doc = json.loads(overlays[session])
+        base_version, base_public, base_overlay = self.patch_bases[websocket]
+        if id(base_public) not in public_patches:
+          public_patches[id(base_public)] = JsonDiff(base_public, public_doc)
+        patch = public_patches[id(base_public)] + JsonDiff(base_overlay, overlay_doc)
+        message = {"type": "patch", "base": base_version, "version": self.version, "patch": patch}
+        self.patch_bases[websocket] = (self.version, public_doc, overlay_doc)
+        messages.append((websocket, json.dumps(message)))
+    return messages
+
+  async def push_snapshot(self, websocket, session):
+    """Sends the full state and switches this websocket to receiving patches."""
+    await websocket.send(await self.off_loop(self.encode_snapshot, websocket, session))
+
+  def encode_snapshot(self, websocket, session):
+    public = self.game.public_state()
+    if public is None:
+      public_json, overlay_json = "{}", self.game.for_player(session)
+    else:
+      public_json = json.dumps(public, cls=CustomEncoder)
+      overlay_json = json.dumps(self.game.player_overlay(session), cls=CustomEncoder)
+    self.patch_bases[websocket] = (self.version, json.loads(public_json), json.loads(overlay_json))
+    state = SpliceJson(public_json, overlay_json)
+    return f'{{"type": "snapshot", "version": {self.version}, "state": {state}}}'
+
+  async def settle_snapshot(self):
+    """Waits for any snapshot in progress to be written."""
+    while self.snapshot_future is not None:
+      await asyncio.wait([self.snapshot_future])
+
+  def schedule_snapshot(self):
+    if self.store is None:
+      return
+    self.dirty = True
+    if self.snapshot_timer is not None or self.snapshot_future is not None:
+      return
+    delay = max(0, self.last_snapshot + self.SNAPSHOT_INTERVAL - time.monotonic())
+    self.snapshot_timer = asyncio.get_running_loop().call_later(delay, self.start_snapshot)
+
+  def start_snapshot(self):
+    self.snapshot_timer = None
+    if self.lane.locked():
+      # The game is in use; holding_lane() will reschedule when it is done.
+      return
+    self.dirty = False
+    self.last_snapshot = time.monotonic()
+    self.snapshot_future = asyncio.ensure_future(self.snapshot())
+    self.snapshot_future.add_done_callback(self.finish_snapshot)
+
+  async def snapshot(self):
+    # Moves only wait for the copy (see BaseGame.snapshot_later()), not for the encoding and the
+    # write that follow.
+    async with self.lane:
+      encode = await self.off_loop(self.game.snapshot_later)
+    await asyncio.get_running_loop().run_in_executor(SNAPSHOT_EXECUTOR, self.write_snapshot, encode)
+
+  def write_snapshot(self, encode):
+    self.store.save(self.game_id, self.game_class.__name__, encode())
+
+  def finish_snapshot(self, future):
+    self.snapshot_future = None
+    if future.cancelled():
+      return
+    if future.exception() is not None:
+      print(f"failed to snapshot game {self.game_id}: {future.exception()}")
+    if self.dirty:
+      self.schedule_snapshot()
 
   async def push_error(self, websocket, err):
     await websocket.send(json.dumps({"type": "error", "message": err}))
@@ -92,6 +92,11 @@ function draw() {
   }
   context.restore();
   context.save();
+  for (let loc of robberTiles) {
+    drawRobberTarget(loc, context);
+  }
+  context.restore();
+  context.save();
   drawHover(context);
   context.restore();
   context.save();
@@ -391,6 +396,15 @@ function drawHover(ctx) {
   }
   canvas.style.cursor = "auto";
 }
+function drawRobberTarget(loc, ctx) {
+  let canvasLoc = coordToCanvasLoc(loc);
+  ctx.strokeStyle = "rgba(255, 255, 255, 0.6)";
+  ctx.lineWidth = 4;
+  ctx.setLineDash([8, 8]);
+  ctx.beginPath();
+  ctx.arc(canvasLoc.x, canvasLoc.y, 40, 0, 2 * Math.PI);
+  ctx.stroke();
+}
 function drawRobber(ctx, loc, alpha) {
   if (loc == null) {
     return;
@@ -418,6 +432,33 @@ function drawRobber(ctx, loc, alpha) {
     ctx.drawImage(robimg, canvasLoc.x - robwidth/2, canvasLoc.y - robheight/2, robwidth, robheight);
   }
 }
+// Fills in the corners and edges that can be clicked from the legal moves sent by the server.
+function updateTargets() {
+  corners = [];
+  edges = [];
+  robberTiles = [];
+  if (legalMoves == null) {
+    return;
+  }
+  robberTiles = legalMoves.robber.concat(legalMoves.pirate);
+  for (let loc of legalMoves.settle.concat(legalMoves.city)) {
+    corners.push({location: loc});
+  }
+  if (moveShipFromLocation != null) {
+    for (let ship of legalMoves.move_ship) {
+      if (locationsEqual(ship.location, moveShipFromLocation)) {
+        for (let loc of ship.to) {
+          edges.push({location: loc, edge_type: "ship"});
+        }
+      }
+    }
+    return;
+  }
+  edges = legalMoves.edges.slice();
+  for (let ship of legalMoves.move_ship) {
+    edges.push({location: ship.location, edge_type: "ship"});
+  }
+}
 function getEdge(eventX, eventY) {
   for (let i = 0; i < edges.length; i++) {
     let edgeCenter = coordsToEdgeCenter(edges[i].location);
@@ -446,8 +487,15 @@ function getCorner(eventX, eventY, cList) {
     }
   }
 }
+function isRobberTarget(loc) {
+  return robberTiles.some(target => locationsEqual(target, loc));
+}
 function getTile(eventX, eventY) {
+  // Only the tiles where the robber or pirate may go can be clicked.
   for (let i = 0; i < tiles.length; i++) {
+    if (!isRobberTarget(tiles[i].location)) {
+      continue;
+    }
     let canvasLoc = coordToCanvasLoc(tiles[i].location);
     let centerX = canvasLoc.x * scale + offsetX + dX;
     let centerY = canvasLoc.y * scale + offsetY + dY;
@@ -511,6 +559,7 @@ function onclick(event) {
       };
       ws.send(JSON.stringify(msg));
       moveShipFromLocation = null;
+      updateTargets();
       return;
     }
     if (edges[clickEdge].edge_type && edges[clickEdge].edge_type.startsWith("coast")) {
@@ -524,6 +573,7 @@ function onclick(event) {
         if (locationsEqual(road.location, edges[clickEdge].location)) {
           if (road.player == myIdx && road.road_type == "ship") {
             moveShipFromLocation = road.location;
+            updateTargets();
           }
           break;
         }
@@ -538,6 +588,7 @@ function onclick(event) {
     }
   } else if (moveShipFromLocation != null) {
     moveShipFromLocation = null;
+    updateTargets();
   }
 }
 function onmove(event) {
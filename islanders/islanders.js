@@ -73,6 +73,8 @@ corners = [];
 pieces = [];
 landings = [];
 edges = [];
+robberTiles = [];
+legalMoves = null;
 roads = [];
 cards = {};
 devCardCount = 0;
@@ -1060,6 +1062,10 @@ function onmsg(event) {
     setTimeout(clearerror, 100);
     return;
   }
+  data = decodeState(data);
+  if (data == null) {
+    return;
+  }
   let firstMsg = false;
   if (tiles.length < 1) {
     firstMsg = true; // TODO: update this.
@@ -1076,11 +1082,11 @@ function onmsg(event) {
   turnPhase = data.turn_phase;
   tiles = data.tiles;
   ports = data.ports;
-  corners = data.corners;
-  edges = data.edges;
   robberLoc = data.robber;
   pirateLoc = data.pirate;
   cards = data.cards;
+  legalMoves = data.legal_moves ?? null;
+  updateTargets();
   devCardCount = data.dev_cards;
   diceRoll = data.dice_roll;
   pieces = data.pieces;
@@ -1946,6 +1952,7 @@ function continueInit(gameId) {
   window.onresize = sizeThings;
   ws = new WebSocket("ws://" + window.location.hostname + ":8081/" + gameId);
   ws.onmessage = onmsg;
+  ws.onopen = requestSnapshot;
 }
 function onBodyClick(event) {
   // Ignore right/middle-click.
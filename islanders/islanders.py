@@ -1,5 +1,6 @@
 import abc
 import collections
+import functools
 import json
 from random import SystemRandom
 from typing import List, Dict, Optional, Tuple
@@ -17,6 +18,14 @@ random = SystemRandom()
 RESOURCES = ["rsrc1", "rsrc2", "rsrc3", "rsrc4", "rsrc5"]
 PLAYABLE_DEV_CARDS = ["yearofplenty", "monopoly", "roadbuilding", "knight"]
 VICTORY_CARDS = ["palace", "chapel", "university", "market", "library"]
+COSTS = {
+    "road": [("rsrc2", 1), ("rsrc4", 1)],
+    "ship": [("rsrc1", 1), ("rsrc2", 1)],
+    "settle": [("rsrc1", 1), ("rsrc2", 1), ("rsrc3", 1), ("rsrc4", 1)],
+    "city": [("rsrc3", 2), ("rsrc5", 3)],
+    "buy_dev": [("rsrc1", 1), ("rsrc3", 1), ("rsrc5", 1)],
+}
+PIECES_PER_PLAYER = {"road": 15, "ship": 15, "settlement": 5, "city": 4}
 TILE_NUMBERS = [5, 2, 6, 3, 8, 10, 9, 12, 11, 4, 8, 10, 9, 4, 5, 6, 3, 11]
 EXTRA_NUMBERS = [
     2, 5, 4, 6, 3, 9, 8, 11, 11, 10, 6, 3, 8, 4, 8, 10, 11, 12, 10, 5, 4, 9, 5, 9, 12, 3, 12, 6]
@@ -314,6 +323,104 @@ def parse_location(location, location_type):
   return location_type(*location)
 
 
+class Topology:
+  """Numbers every tile, corner and edge of a map, and records which of them touch.
+
+  Locations are numbered in sorted order: self.tiles[idx] is the tile numbered idx, and
+  self.tile_ids maps it back, and likewise for corners and edges. The corners are those of the
+  tiles, and the edges are those between two of these corners. Adjacency is stored per number, as
+  tuples of numbers, and only includes locations on the map:
+    tile_corners: the six corners of each tile, in get_corner_locations() order.
+    tile_neighbors: the six tiles next to each tile, in get_adjacent_tiles() order, or None.
+    corner_tiles, corner_corners and corner_edges: what touches each corner.
+    edge_corners: the (left, right) corners of each edge.
+    edge_tiles: the tiles on either side of each edge, upper tile first.
+  A Topology depends only on where the tiles are, so maps with tiles in the same places share
+  one (see get_topology). It must not be changed once built.
+  """
+
+  def __init__(self, tile_locations):
+    self.tiles = tuple(sorted(tile_locations))
+    self.tile_ids = {loc: idx for idx, loc in enumerate(self.tiles)}
+    self.corners = tuple(sorted({
+        corner for tile in self.tiles for corner in tile.get_corner_locations()
+    }))
+    self.corner_ids = {loc: idx for idx, loc in enumerate(self.corners)}
+    self.edges = tuple(sorted({
+        edge for corner in self.corners for edge in corner.get_edges()
+        if edge.corner_left in self.corner_ids and edge.corner_right in self.corner_ids
+    }))
+    self.edge_ids = {loc: idx for idx, loc in enumerate(self.edges)}
+
+    self.tile_corners = tuple(
+        tuple(self.corner_ids[corner] for corner in tile.get_corner_locations())
+        for tile in self.tiles
+    )
+    self.tile_neighbors = tuple(
+        tuple(self.tile_ids.get(other) for other in tile.get_adjacent_tiles())
+        for tile in self.tiles
+    )
+    self.corner_tiles = tuple(
+        tuple(self.tile_ids[tile] for tile in corner.get_tiles() if tile in self.tile_ids)
+        for corner in self.corners
+    )
+    self.corner_corners = tuple(
+        tuple(self.corner_ids[other] for other in corner.get_adjacent_corners()
+              if other in self.corner_ids)
+        for corner in self.corners
+    )
+    self.corner_edges = tuple(
+        tuple(self.edge_ids[edge] for edge in corner.get_edges() if edge in self.edge_ids)
+        for corner in self.corners
+    )
+    self.edge_corners = tuple(
+        (self.corner_ids[edge.corner_left], self.corner_ids[edge.corner_right])
+        for edge in self.edges
+    )
+    self.edge_tiles = tuple(
+        tuple(self.tile_ids[tile] for tile in sorted(edge.get_adjacent_tiles(), key=_tile_order)
+              if tile in self.tile_ids)
+        for edge in self.edges
+    )
+    # Edges with a tile on both sides; only these can have roads or ships.
+    self.inner_edges = tuple(idx for idx, tiles in enumerate(self.edge_tiles) if len(tiles) == 2)
+
+    # The same tables by location, for callers that start from a location. These keep neighbors
+    # that are off the map, so that they give the same answers as the location methods.
+    self.corners_of_tile = {tile: tuple(tile.get_corner_locations()) for tile in self.tiles}
+    self.corners_next_to = {corner: tuple(corner.get_adjacent_corners()) for corner in self.corners}
+    self.edges_of_corner = {corner: tuple(corner.get_edges()) for corner in self.corners}
+
+  def tile_corner_locations(self, tile):
+    corners = self.corners_of_tile.get(tile)
+    return corners if corners is not None else tile.get_corner_locations()
+
+  def adjacent_corners(self, corner):
+    corners = self.corners_next_to.get(corner)
+    return corners if corners is not None else corner.get_adjacent_corners()
+
+  def corner_edge_locations(self, corner):
+    edges = self.edges_of_corner.get(corner)
+    return edges if edges is not None else corner.get_edges()
+
+
+def _tile_order(tile):
+  return tile.y, tile.x
+
+
+@functools.lru_cache(maxsize=32)
+def get_topology(tile_locations):
+  """Returns the Topology for a frozenset of tile locations, shared between maps."""
+  return Topology(tile_locations)
+
+
+@functools.lru_cache(maxsize=None)
+def get_map_template(filename):
+  """Returns the parsed contents of a map file, which is only read once. Do not change it."""
+  with open(os.path.join(os.path.dirname(__file__), filename), encoding="ascii") as data:
+    return json.load(data)
+
+
 class Road:
 
   TYPES = ["road", "ship"]
@@ -409,7 +516,7 @@ class Tile:
     return Tile(
         value["location"][0], value["location"][1], value["tile_type"], value["is_land"],
         value["number"], value["rotation"], value.get("variant") or "",
-        value.get("land_rotations") or [],
+        list(value.get("land_rotations") or []),
     )
 
   def __str__(self):
@@ -497,7 +604,10 @@ class IslandersState:
       "dev_cards", "played_dev", "ships_moved", "built_this_turn",
       "home_corners", "foreign_landings", "placement_islands",
   }
-  COMPUTED_ATTRIBUTES = {"port_corners", "corners_to_islands"}
+  COMPUTED_ATTRIBUTES = {
+      "port_corners", "corners_to_islands", "topology", "edge_types", "route_lengths",
+      "legal_move_cache", "production",
+  }
   INDEXED_ATTRIBUTES = {
       "discard_players", "collect_counts", "home_corners", "foreign_landings", "counter_offers",
   }
@@ -517,6 +627,14 @@ class IslandersState:
     self.port_corners: Dict[CornerLocation, str] = {}
     self.pieces: Dict[CornerLocation, Piece] = {}
     self.roads: Dict[EdgeLocation, Road] = {}  # includes ships
+    self.topology: Optional[Topology] = None  # See board_topology().
+    self.edge_types: Optional[List[Optional[str]]] = None  # See board_edge_types().
+    # Player -> the longest route in each of their route components; see _calculate_longest_road.
+    self.route_lengths: Dict[int, Dict[tuple, int]] = {}
+    # Player -> (what their legal moves depend on, their legal moves); see legal_moves.
+    self.legal_move_cache: Dict[int, Tuple[tuple, Dict[str, list]]] = {}
+    # Dice total -> (player, resource) -> cards; see production_index().
+    self.production: Optional[Dict[int, Dict[Tuple[int, str], int]]] = None
     self.robber: Optional[TileLocation] = None
     self.pirate: Optional[TileLocation] = None
     self.dev_cards: List[str] = []
@@ -554,6 +672,8 @@ class IslandersState:
     self.event_log = collections.deque([], 50)
     # Game Options
     self.options = Options()
+    # Dice rolls, robberies and map setup all draw from this; see IslandersGame.set_random.
+    self.rng = random
 
   @classmethod
   def parse_json(cls, gamedata):
@@ -639,7 +759,7 @@ class IslandersState:
       self._add_road(road)
 
   def json_repr(self):
-    custom = {"player_data", "event_log"}
+    custom = {"player_data", "event_log", "rng"}
     ret = {
         name: getattr(self, name) for name in
         self.__dict__.keys() - self.LOCATION_ATTRIBUTES - self.COMPUTED_ATTRIBUTES - custom
@@ -653,14 +773,24 @@ class IslandersState:
     return ret
 
   def for_player(self, player_idx):
+    data = self.public_state()
+    data.update(self.player_overlay(player_idx))
+    return data
+
+  def public_state(self):
     data = self.json_for_player()
+    del data["event_log"]
+    return data
+
+  def player_overlay(self, player_idx):
+    data = {}
     if player_idx is not None:
       data["you"] = player_idx
       data["cards"] = self.player_data[player_idx].cards
       data["trade_ratios"] = self.player_data[player_idx].trade_ratios
-    events = data.pop("event_log")
+      data["legal_moves"] = self.legal_moves(player_idx)
     data["event_log"] = []
-    for event in events:
+    for event in self.event_log:
       text = event.public_text
       if event.secret_text and event.visible_players and player_idx in event.visible_players:
         text = event.secret_text
@@ -676,27 +806,6 @@ class IslandersState:
     del ret["player_data"]
     ret["dev_cards"] = len(self.dev_cards)
 
-    land_corners = set()
-    all_corners = set()
-    # TODO: instead of sending a list of corners, we should send something like
-    # a list of legal moves for tiles, corners, and edges.
-    for tile in self.tiles.values():
-      # Triple-count each corner and dedup.
-      for corner_loc in tile.location.get_corner_locations():
-        all_corners.add(corner_loc)
-        if not tile.is_land:
-          continue
-        land_corners.add(corner_loc)
-    ret["corners"] = [{"location": loc} for loc in land_corners]
-    edges = {}
-    for corner in all_corners:
-      # Double-count each edge and dedup.
-      for edge in corner.get_edges():
-        edge_type = self._get_edge_type(edge)
-        if edge_type is not None:
-          edges[edge] = {"location": edge, "edge_type": edge_type}
-    ret["edges"] = list(edges.values())
-
     ret["landings"] = []
     for idx, corner_list in self.foreign_landings.items():
       ret["landings"].extend([{"location": corner, "player": idx} for corner in corner_list])
@@ -708,6 +817,216 @@ class IslandersState:
       ret["player_data"][idx]["points"] = self.player_points(idx, visible=not is_over)
     return ret
 
+  def legal_moves(self, player_idx):
+    """Returns where the player may build, move a ship, or move the robber or pirate right now.
+
+    There are lists of corners to settle and to upgrade to a city, and of tiles for the robber
+    and the pirate. There are the edges to build on, each with the type of road or ship that can
+    go there (a coast type if either can), and the ships that can be moved, each with the edges
+    it can move to.
+
+    Building anything the player cannot pay for is left out. The moves are kept in
+    legal_move_cache along with everything they depend on, so they are only worked out again
+    once that changes.
+    """
+    key = self._legal_move_key(player_idx)
+    cached = self.legal_move_cache.get(player_idx)
+    if cached is not None and cached[0] == key:
+      return cached[1]
+    moves = self._compute_legal_moves(player_idx)
+    self.legal_move_cache[player_idx] = (key, moves)
+    return moves
+
+  def _legal_move_key(self, player_idx):
+    return (
+        self.game_phase, self.turn_phase, self.turn_idx, self.extra_build_idx, self.ships_moved,
+        tuple(self.built_this_turn), self.placement_islands, self.robber, self.pirate,
+        self.board_edge_types(), len(self.discoverable_tiles),
+        self.largest_army_player, self.longest_route_player,
+        tuple(len(corners) for corners in self.foreign_landings.values()),
+        tuple(self.player_data[player_idx].cards[rsrc] for rsrc in RESOURCES),
+        tuple((loc, piece.player, piece.piece_type) for loc, piece in self.pieces.items()),
+        tuple(
+            (loc, road.player, road.road_type, road.closed, road.movable)
+            for loc, road in self.roads.items()
+        ),
+    )
+
+  def _compute_legal_moves(self, player_idx):
+    topology = self.board_topology()
+    moves = {"settle": [], "city": [], "edges": [], "move_ship": [], "robber": [], "pirate": []}
+    phase = self.turn_phase
+    current = self.extra_build_idx if phase == "extra_build" else self.turn_idx
+    if self.game_phase == "victory" or player_idx != current:
+      return moves
+    if phase == "robber":
+      moves["robber"] = self._legal_robber_tiles(player_idx, "robber")
+      if self.options.seafarers:
+        moves["pirate"] = self._legal_robber_tiles(player_idx, "pirate")
+      return moves
+
+    placing = self.game_phase.startswith("place")
+    counts = collections.Counter()
+    for road in self.roads.values():
+      if road.player == player_idx:
+        counts[road.road_type] += 1
+    for piece in self.pieces.values():
+      if piece.player == player_idx:
+        counts[piece.piece_type] += 1
+    road_types = [
+        kind for kind in (["road", "ship"] if self.options.seafarers else ["road"])
+        if counts[kind] < PIECES_PER_PLAYER[kind]
+    ]
+
+    if placing and phase == "settle":
+      moves["settle"] = self._legal_settlements(topology, player_idx, placing=True)
+    elif (placing and phase == "road") or phase == "dev_road":
+      moves["edges"] = self._legal_edges(topology, player_idx, road_types, placing=placing)
+    elif phase in ["main", "extra_build"]:
+      road_types = [kind for kind in road_types if self._can_afford(player_idx, COSTS[kind])]
+      moves["edges"] = self._legal_edges(topology, player_idx, road_types)
+      if counts["settlement"] < PIECES_PER_PLAYER["settlement"]:
+        if self._can_afford(player_idx, COSTS["settle"]):
+          moves["settle"] = self._legal_settlements(topology, player_idx)
+      if counts["city"] < PIECES_PER_PLAYER["city"]:
+        if self._can_afford(player_idx, COSTS["city"]):
+          moves["city"] = [
+              loc for loc, piece in self.pieces.items()
+              if piece.player == player_idx and piece.piece_type == "settlement"
+          ]
+      if phase == "main" and self.options.seafarers and not self.ships_moved:
+        moves["move_ship"] = self._legal_ship_moves(topology, player_idx)
+    return moves
+
+  def _can_afford(self, player_idx, resources):
+    cards = self.player_data[player_idx].cards
+    return all(cards[resource] >= count for resource, count in resources)
+
+  def _legal_robber_tiles(self, player_idx, robber_type):
+    land = robber_type == "robber"
+    legal = []
+    for location, tile in self.tiles.items():
+      if tile.is_land != land or tile.tile_type == "discover":
+        continue
+      if location == getattr(self, robber_type):
+        continue
+      if self.options.friendly_robber:
+        try:
+          self.check_friendly_robber(
+              player_idx, self.robber_victims(location, robber_type), robber_type)
+        except InvalidMove:
+          continue
+      legal.append(location)
+    return legal
+
+  def _legal_settlements(self, topology, player_idx, placing=False):
+    owners = {}  # Corner number -> player, for the pieces on the map.
+    for location, piece in self.pieces.items():
+      corner_id = topology.corner_ids.get(location)
+      if corner_id is not None:
+        owners[corner_id] = piece.player
+    if placing:
+      candidates = range(len(topology.corners))
+    else:
+      # Settlements must be next to one of the player's roads or ships.
+      candidates = set()
+      for location, road in self.roads.items():
+        edge_id = topology.edge_ids.get(location)
+        if road.player == player_idx and edge_id is not None:
+          candidates.update(topology.edge_corners[edge_id])
+    legal = []
+    for corner_id in sorted(candidates):
+      if corner_id in owners:
+        continue
+      if any(other in owners for other in topology.corner_corners[corner_id]):
+        continue
+      # handle_settle allows any corner, but only corners on an island are any use, and add_piece
+      # needs the island to count foreign landings.
+      location = topology.corners[corner_id]
+      if location not in self.corners_to_islands:
+        continue
+      if placing and self.placement_islands is not None:
+        if self.corners_to_islands.get(location) not in self.placement_islands:
+          continue
+      legal.append(location)
+    return legal
+
+  def _legal_edges(self, topology, player_idx, road_types, placing=False, without=None):
+    """Returns edges where the player may build one of road_types, as _check_road_building allows.
+
+    Edges are only looked for next to the player's pieces and at the ends of their roads and ships.
+    During placement, the road must also be next to the settlement that has no road yet. without
+    is the location of a ship being moved, which counts as empty.
+    """
+    owners = {}  # Corner number -> player, for the pieces on the map.
+    for location, piece in self.pieces.items():
+      corner_id = topology.corner_ids.get(location)
+      if corner_id is not None:
+        owners[corner_id] = piece.player
+    # Empty corners at the ends of the player's roads and ships of each type.
+    road_ends = {kind: set() for kind in road_types}
+    own_edges = set()
+    for location, road in self.roads.items():
+      edge_id = topology.edge_ids.get(location)
+      if road.player != player_idx or edge_id is None or location == without:
+        continue
+      own_edges.add(edge_id)
+      if road.road_type in road_ends:
+        road_ends[road.road_type].update(
+            corner for corner in topology.edge_corners[edge_id] if corner not in owners)
+    edge_types = self.board_edge_types()
+    pirate_id = topology.tile_ids.get(self.pirate)
+    legal = {}  # Edge number -> the types that may be built there.
+    for road_type in road_types:
+      corners = road_ends[road_type] | {
+          corner for corner, player in owners.items() if player == player_idx
+      }
+      for corner in corners:
+        for edge_id in topology.corner_edges[corner]:
+          location = topology.edges[edge_id]
+          if location in self.roads and location != without:
+            continue
+          edge_type = edge_types[edge_id]
+          if edge_type is None or not (edge_type == road_type or edge_type.startswith("coast")):
+            continue
+          if road_type == "ship" and pirate_id in topology.edge_tiles[edge_id]:
+            continue
+          if placing:
+            if not self._next_to_new_settlement(topology, player_idx, edge_id, owners, own_edges):
+              continue
+          if road_type not in legal.setdefault(edge_id, []):
+            legal[edge_id].append(road_type)
+    return [
+        {
+            "location": topology.edges[edge_id],
+            "edge_type": types[0] if len(types) == 1 else edge_types[edge_id],
+        }
+        for edge_id, types in sorted(legal.items())
+    ]
+
+  @staticmethod
+  def _next_to_new_settlement(topology, player_idx, edge_id, owners, own_edges):
+    # Like _check_road_next_to_empty_settlement, this only looks at the first of the corners.
+    for corner in topology.edge_corners[edge_id]:
+      if owners.get(corner) == player_idx:
+        return not own_edges.intersection(topology.corner_edges[corner])
+    return False
+
+  def _legal_ship_moves(self, topology, player_idx):
+    moves = []
+    for location, road in self.roads.items():
+      if road.player != player_idx or road.road_type != "ship" or road.closed:
+        continue
+      if not road.movable or location in self.built_this_turn:
+        continue
+      if self.pirate in location.get_adjacent_tiles():
+        continue
+      edges = self._legal_edges(topology, player_idx, ["ship"], without=location)
+      destinations = [edge["location"] for edge in edges if edge["location"] != location]
+      if destinations:
+        moves.append({"location": location, "to": destinations})
+    return moves
+
   def player_points(self, idx, visible):
     count = 0
     for piece in self.pieces.values():
@@ -824,9 +1143,9 @@ class IslandersState:
     if move_type == "collect":
       return self.handle_collect(player_idx, data.get("selection"))
     if move_type == "road":
-      return self.handle_road(location, player_idx, move_type, [("rsrc2", 1), ("rsrc4", 1)])
+      return self.handle_road(location, player_idx, move_type, COSTS["road"])
     if move_type == "ship" and self.options.seafarers:
-      return self.handle_road(location, player_idx, move_type, [("rsrc1", 1), ("rsrc2", 1)])
+      return self.handle_road(location, player_idx, move_type, COSTS["ship"])
     if move_type == "move_ship" and self.options.seafarers:
       return self.handle_move_ship(data.get("from"), data.get("to"), player_idx)
     if move_type == "buy_dev":
@@ -929,8 +1248,8 @@ class IslandersState:
       white = (self.next_die_roll + 1) // 2
       self.next_die_roll = None
     else:
-      red = random.randint(1, 6)
-      white = random.randint(1, 6)
+      red = self.rng.randint(1, 6)
+      white = self.rng.randint(1, 6)
     self.dice_roll = (red, white)
     self.event_log.append(Event("dice", "{player%s} rolled a %s" % (self.turn_idx, red + white)))
     self.action_stack.pop()
@@ -952,27 +1271,69 @@ class IslandersState:
     if not self.options.debug:
       raise InvalidMove("You may only force dice rolls when debug mode is enabled.")
     for _ in range(count):
-      red = random.randint(1, 6)
-      white = random.randint(1, 6)
+      red = self.rng.randint(1, 6)
+      white = self.rng.randint(1, 6)
       self.distribute_resources((red, white))
 
   def remaining_resources(self, rsrc):
     return 19 - sum(p.cards[rsrc] for p in self.player_data)
 
+  def production_index(self):
+    """Returns dice total -> (player, resource) -> the cards that the player's pieces produce.
+
+    The index is built the first time it is needed. After that, _add_piece, handle_city,
+    handle_robber and discover_tiles keep it up to date through _change_production. recompute()
+    and add_tile() throw it away.
+    """
+    if self.production is None:
+      self.production = collections.defaultdict(dict)
+      for location in self.tiles:
+        self._change_production(location, 1)
+    return self.production
+
+  def _change_production(self, tile_loc, sign, corner=None):
+    """Adds what the tile produces for the pieces around it to the index, or takes it out.
+
+    Only counts the piece at corner if one is given. Does nothing while there is no index.
+    """
+    if self.production is None:
+      return
+    tile = self.tiles[tile_loc]
+    if tile.number is None or tile_loc == self.robber:
+      return
+    yields = self.production[tile.number]
+    if corner is not None:
+      corners = [corner]
+    else:
+      corners = self.board_topology().tile_corner_locations(tile_loc)
+    for corner_loc in corners:
+      piece = self.pieces.get(corner_loc)
+      if piece and piece.piece_type in ["settlement", "city"]:
+        key = (piece.player, tile.tile_type)
+        yields[key] = yields.get(key, 0) + sign * (2 if piece.piece_type == "city" else 1)
+        if not yields[key]:
+          del yields[key]
+
+  def _change_corner_production(self, corner_loc, sign):
+    for tile_loc in corner_loc.get_tiles():
+      if tile_loc in self.tiles:
+        self._change_production(tile_loc, sign, corner_loc)
+
+  def expected_income(self, player_idx):
+    """Returns resource -> the cards the player's pieces produce per roll on average."""
+    income = collections.defaultdict(float)
+    for number, yields in self.production_index().items():
+      chance = (6 - abs(7 - number)) / 36
+      for (player, rsrc), count in yields.items():
+        if player == player_idx:
+          income[rsrc] += chance * count
+    return dict(income)
+
   def calculate_resource_distribution(self, dice_roll):
     # Figure out which players are due how many resources.
     to_receive = collections.defaultdict(lambda: collections.defaultdict(int))
-    for tile in self.tiles.values():
-      if tile.number != sum(dice_roll):
-        continue
-      if self.robber == tile.location:
-        continue
-      for corner_loc in tile.location.get_corner_locations():
-        piece = self.pieces.get(corner_loc)
-        if piece and piece.piece_type == "settlement":
-          to_receive[tile.tile_type][piece.player] += 1
-        elif piece and piece.piece_type == "city":
-          to_receive[tile.tile_type][piece.player] += 2
+    for (player, rsrc), count in self.production_index().get(sum(dice_roll), {}).items():
+      to_receive[rsrc][player] += count
 
     self.collect_counts = to_receive.pop("anyrsrc", {})
     return to_receive
@@ -1120,22 +1481,33 @@ class IslandersState:
     if set(poor_players) - {current_player}:
       raise InvalidMove("%ss refuse to rob such poor people." % robber_type.capitalize())
 
+  def robber_victims(self, location, robber_type):
+    """Returns the players that a robber or pirate on this tile could rob."""
+    if robber_type == "robber":
+      return {
+          self.pieces[loc].player for loc in self.board_topology().tile_corner_locations(location)
+          if loc in self.pieces
+      }
+    return {
+        self.roads[edge].player for edge in location.get_edge_locations()
+        if edge in self.roads and self.roads[edge].road_type == "ship"
+    }
+
   def handle_robber(self, location, current_player):
     robber_loc = self.validate_robber_location(location, "robber", land=True)
-    adjacent_players = {
-        self.pieces[loc].player for loc in robber_loc.get_corner_locations() if loc in self.pieces
-    }
+    adjacent_players = self.robber_victims(robber_loc, "robber")
     self.check_friendly_robber(current_player, adjacent_players, "robber")
     self.event_log.append(Event("robber", "{player%s} moved the robber" % current_player))
+    old_loc = self.robber
+    self._change_production(robber_loc, -1)
     self.robber = robber_loc
+    if old_loc is not None:
+      self._change_production(old_loc, 1)
     self.activate_robber(current_player, adjacent_players)
 
   def handle_pirate(self, player_idx, location):
     pirate_loc = self.validate_robber_location(location, "pirate", land=False)
-    adjacent_players = {
-        self.roads[edge].player for edge in pirate_loc.get_edge_locations()
-        if edge in self.roads and self.roads[edge].road_type == "ship"
-    }
+    adjacent_players = self.robber_victims(pirate_loc, "pirate")
     self.check_friendly_robber(player_idx, adjacent_players, "pirate")
     self.event_log.append(Event("pirate", "{player%s} moved the pirate" % player_idx))
     self.pirate = pirate_loc
@@ -1163,7 +1535,7 @@ class IslandersState:
       all_rsrc_cards.extend([rsrc] * self.player_data[rob_player].cards[rsrc])
     if len(all_rsrc_cards) <= 0:
       raise InvalidMove("You cannot rob from a player without any resources.")
-    chosen_rsrc = random.choice(all_rsrc_cards)
+    chosen_rsrc = self.rng.choice(all_rsrc_cards)
     self.player_data[rob_player].cards[chosen_rsrc] -= 1
     self.player_data[current_player].cards[chosen_rsrc] += 1
     self.event_log.append(Event(
@@ -1227,8 +1599,7 @@ class IslandersState:
           # Owned by another player - continue to the next corner.
           continue
       # If no settlement at this corner, check for other roads to this corner.
-      other_edges = corner.get_edges()
-      for edge in other_edges:
+      for edge in self.board_topology().corner_edge_locations(corner):
         if edge == location:
           continue
         maybe_road = self.roads.get(edge)
@@ -1250,19 +1621,32 @@ class IslandersState:
     raise InvalidInput(f"Unknown road type {road_type}")
 
   def _get_edge_type(self, edge_location):
-    # First verify that there are tiles on both sides of this edge.
-    tile_locations = edge_location.get_adjacent_tiles()
-    if len(tile_locations) != 2:
+    topology = self.board_topology()
+    edge_id = topology.edge_ids.get(edge_location)
+    if edge_id is None:
+      # Edges that are not between two corners of the map cannot have tiles on both sides.
       return None
-    if not all(loc in self.tiles for loc in tile_locations):
+    return self._edge_type(topology, edge_id)
+
+  def _edge_type(self, topology, edge_id):
+    # First verify that there are tiles on both sides of this edge.
+    tile_ids = topology.edge_tiles[edge_id]
+    if len(tile_ids) != 2:
       return None
 
     # If there is a road/ship here, just return the type of that road/ship.
-    if edge_location in self.roads:
-      return self.roads[edge_location].road_type
+    road = self.roads.get(topology.edges[edge_id])
+    if road is not None:
+      return road.road_type
+    return self.board_edge_types()[edge_id]
+
+  def _tile_edge_type(self, topology, edge_id):
+    tile_ids = topology.edge_tiles[edge_id]
+    if len(tile_ids) != 2:
+      return None  # Checked by _edge_type too, before it looks for a road.
 
     # Calculate how many of the two tiles are land.
-    are_lands = [self.tiles[loc].is_land for loc in tile_locations]
+    are_lands = [self.tiles[topology.tiles[tile_id]].is_land for tile_id in tile_ids]
 
     # If we are not playing with seafarers, then only edges next to at least one land are valid.
     if not self.options.seafarers:
@@ -1275,9 +1659,8 @@ class IslandersState:
       return "road"
     if not any(are_lands):
       return "ship"
-    # For the coast, it matters whether the sea is on top or on bottom.
-    tile_locations.sort(key=lambda loc: loc.y)
-    if self.tiles[tile_locations[0]].is_land:
+    # For the coast, it matters whether the sea is on top or on bottom. The upper tile is first.
+    if are_lands[0]:
       return "coastdown"
     return "coastup"
 
@@ -1290,7 +1673,7 @@ class IslandersState:
       if piece and piece.player == player:
         # They have a settlement/city here - make sure it's not the one that
         # they built before (by checking to see if it has no roads).
-        for edge in corner.get_edges():
+        for edge in self.board_topology().corner_edge_locations(corner):
           road = self.roads.get(edge)
           if road and road.player == player:
             # No good - this is the settlement that already has a road.
@@ -1316,7 +1699,7 @@ class IslandersState:
     road_count = len([
         r for r in self.roads.values() if r.player == player and r.road_type == road_type
     ])
-    if road_count >= 15:
+    if road_count >= PIECES_PER_PLAYER[road_type]:
       raise InvalidMove(f"You have no {road_type}s remaining.")
     # Handle special settlement phase.
     if self.turn_phase == "road":
@@ -1396,23 +1779,172 @@ class IslandersState:
       self.longest_route_player = None
 
   def _calculate_longest_road(self, player):
-    # Get all corners of all roads for this player.
-    all_corners = set()
-    for road in self.roads.values():
+    """Returns the length of the player's longest route.
+
+    A route can only go from one edge to the next through a corner with the player's own piece,
+    or through an empty corner between two edges of the same type. The player's edges are split
+    into components that are joined this way, since every route stays inside one of them. The
+    length of each component's longest route is remembered under a key that holds everything
+    that it depends on, so only the components that changed since the last call are searched.
+    A component that only gained one edge is searched going on from that edge.
+    """
+    topology = self.board_topology()
+    road_types = {}  # Edge number -> type, for this player's roads and ships.
+    for location, road in self.roads.items():
       if road.player != player:
         continue
-      all_corners.add(road.location.corner_left)
-      all_corners.add(road.location.corner_right)
+      edge_id = topology.edge_ids.get(location)
+      if edge_id is not None:  # Roads off the map cannot be built, and are not part of routes.
+        road_types[edge_id] = road.road_type
+    owners = {}  # Corner number -> player, for corners with a piece.
+    for location, piece in self.pieces.items():
+      corner_id = topology.corner_ids.get(location)
+      if corner_id is not None:  # Pieces off the map are not next to any road.
+        owners[corner_id] = piece.player
+
+    previous = self.route_lengths.get(player, {})
+    lengths = {}
+    for component in self._route_components(topology, player, road_types, owners):
+      key = self._route_key(topology, player, component, road_types, owners)
+      length = previous.get(key)
+      if length is None:
+        length = self._extended_route_length(
+            topology, player, component, road_types, owners, previous,
+        )
+      if length is None:
+        component_types = {edge: road_types[edge] for edge in component}
+        corners = sorted({corner for edge in component for corner in topology.edge_corners[edge]})
+        length = max(
+            self._route_depth(topology, player, component_types, owners, corner, set(), None)
+            for corner in corners
+        )
+      lengths[key] = length
+    # Only keep the current components, so that this never holds more than the board does.
+    self.route_lengths[player] = lengths
+    return max(lengths.values(), default=0)
 
-    # For each corner, do a DFS and find the depth.
-    max_length = 0
-    for corner in all_corners:
-      seen = set()
-      max_length = max(max_length, self._dfs_depth(player, corner, seen, None))
+  @staticmethod
+  def _route_key(topology, player, component, road_types, owners):
+    """Returns everything that the longest route in component depends on."""
+    corners = sorted({corner for edge in component for corner in topology.edge_corners[edge]})
+    return (
+        tuple((edge, road_types[edge]) for edge in component),
+        tuple((corner, owners[corner] == player) for corner in corners if corner in owners),
+    )
+
+  def _extended_route_length(self, topology, player, component, road_types, owners, previous):
+    """Returns the length of the longest route in component if it is made of remembered
+    components and one new edge, or None otherwise.
+
+    A route either stays inside one of the remembered components or goes through the new edge.
+    If the new edge joins two components, the routes going on from its two corners never meet, so
+    they are searched separately. Otherwise, each route going on from one corner is searched for
+    how far it can then go on from the other.
+    """
+    remembered = {edge: key for key in previous for edge, _ in key[0]}
+    new_edges = [edge for edge in component if edge not in remembered]
+    if len(new_edges) != 1:
+      return None
+    new_edge = new_edges[0]
+    keys = {remembered[edge] for edge in component if edge != new_edge}
+    if sum(len(key[0]) for key in keys) != len(component) - 1:
+      return None  # Some edges of a remembered component are no longer part of this one.
+    for key in keys:
+      edges = [edge for edge, _ in key[0]]
+      if self._route_key(topology, player, edges, road_types, owners) != key:
+        return None  # A remembered component has changed.
+    left, right = topology.edge_corners[new_edge]
+    component_types = {edge: road_types[edge] for edge in component}
+    new_type = road_types[new_edge]
+    if len(keys) == 2:
+      # The new edge joins two components, so the routes on either side of it never meet.
+      through = 1 + sum(
+          self._route_depth(topology, player, component_types, owners, corner, {new_edge}, new_type)
+          for corner in [left, right]
+      )
+    else:
+      through = 1 + self._loop_depth(
+          topology, player, component_types, owners, right, {new_edge}, new_type, left, new_type,
+      )
+    return max([previous[key] for key in keys] + [through])
+
+  def _loop_depth(self, topology, player, road_types, owners, corner, seen_edges, prev_type,
+                  other_end, new_type):
+    """Like _route_depth, but wherever the route could end, it may instead go on from other_end
+    after arriving there by an edge of new_type. Finds routes through a new edge to other_end."""
+    rest = self._route_depth(topology, player, road_types, owners, other_end, seen_edges, new_type)
+    owner = owners.get(corner)
+    if owner is not None and owner != player:
+      return rest
+    same_type = owner is None
+    max_depth = rest
+    for edge in topology.corner_edges[corner]:
+      road_type = road_types.get(edge)
+      if road_type is None or edge in seen_edges or (same_type and road_type != prev_type):
+        continue
+      left, right = topology.edge_corners[edge]
+      seen_edges.add(edge)
+      sub_depth = self._loop_depth(
+          topology, player, road_types, owners, right if left == corner else left, seen_edges,
+          road_type, other_end, new_type,
+      )
+      max_depth = max(max_depth, 1 + sub_depth)
+      seen_edges.remove(edge)
+    return max_depth
 
-    return max_length
+  @staticmethod
+  def _route_components(topology, player, road_types, owners):
+    """Yields sorted lists of edges that a route can pass between; see _calculate_longest_road."""
+    unvisited = set(road_types)
+    while unvisited:
+      start = min(unvisited)
+      unvisited.remove(start)
+      component = [start]
+      stack = [start]
+      while stack:
+        edge = stack.pop()
+        for corner in topology.edge_corners[edge]:
+          owner = owners.get(corner)
+          if owner is not None and owner != player:
+            continue
+          for other in topology.corner_edges[corner]:
+            if other not in unvisited:
+              continue
+            if owner is None and road_types[other] != road_types[edge]:
+              continue
+            unvisited.remove(other)
+            component.append(other)
+            stack.append(other)
+      component.sort()
+      yield component
+
+  def _route_depth(self, topology, player, road_types, owners, corner, seen_edges, prev_type):
+    """Like _dfs_depth, with locations replaced by their numbers in the topology."""
+    owner = owners.get(corner)
+    if prev_type is not None and owner is not None and owner != player:
+      return 0
+    # Without a piece here, the route must go on with the same type (except at the start).
+    same_type = prev_type is not None and owner is None
+    max_depth = 0
+    for edge in topology.corner_edges[corner]:
+      road_type = road_types.get(edge)
+      if road_type is None or edge in seen_edges or (same_type and road_type != prev_type):
+        continue
+      left, right = topology.edge_corners[edge]
+      seen_edges.add(edge)
+      sub_depth = self._route_depth(
+          topology, player, road_types, owners, right if left == corner else left, seen_edges,
+          road_type,
+      )
+      max_depth = max(max_depth, 1 + sub_depth)
+      seen_edges.remove(edge)
+    return max_depth
 
   def _dfs_depth(self, player, corner, seen_edges, prev_edge):
+    """Returns the length of the longest route for player that starts at corner.
+
+    This is the simple version of _route_depth, working on locations, kept to check it against.
+    """
     # First, use the type of the piece at this corner to set a baseline. If it belongs to
     # another player, the route ends. If it belongs to this player, the next edge in the route
     # may be either a road or a ship. If there is no piece, then the type of the next edge
@@ -1453,11 +1985,12 @@ class IslandersState:
 
   def get_ship_source(self, location, player_idx):
     edges = []
+    topology = self.board_topology()
     for corner in [location.corner_left, location.corner_right]:
       maybe_piece = self.pieces.get(corner)
       if maybe_piece and maybe_piece.player == player_idx:
         return maybe_piece.location
-      edges.extend(corner.get_edges())
+      edges.extend(topology.corner_edge_locations(corner))
     for edge in edges:
       if edge == location:
         continue
@@ -1467,32 +2000,35 @@ class IslandersState:
     raise InvalidMove("Ships must be connected to your ship network.")
 
   def recalculate_ships(self, source, player_idx):
-    self._ship_dfs_helper(source, player_idx, [], set(), source, None)
-
-  def _ship_dfs_helper(self, source, player_idx, path, seen, corner, prev):
+    topology = self.board_topology()
+    source_id = topology.corner_ids.get(source)
+    if source_id is None:
+      return  # Ships are always between two tiles, so they never reach a corner off the map.
+    ships = {}  # Edge number -> this player's ship on it.
+    for location, road in self.roads.items():
+      if road.player == player_idx and road.road_type == "ship" and location in topology.edge_ids:
+        ships[topology.edge_ids[location]] = road
+    self._ship_dfs_helper(topology, ships, source_id, [], set(), source_id, None)
+
+  def _ship_dfs_helper(self, topology, ships, source, path, seen, corner, prev):
+    """Marks the ships reachable from source as movable or not, and closed if they connect two
+    settlements. Corners and edges are numbered as in topology, and path is a list of edges."""
     seen.add(corner)
-    edges = corner.get_edges()
     outgoing_edges = []
 
     # First, calculate all the outgoing edges.
-    for edge in edges:
-      # This is the edge we just walked down, ignore it.
-      if edge == prev:
-        continue
-      other_corner = edge.corner_left if edge.corner_right == corner else edge.corner_right
-      # If this edge does not have this player's ship on it, skip it.
-      maybe_ship = self.roads.get(edge)
-      if not maybe_ship or maybe_ship.road_type != "ship" or maybe_ship.player != player_idx:
+    for edge in topology.corner_edges[corner]:
+      # This is the edge we just walked down, ignore it. If this edge does not have this player's
+      # ship on it, skip it.
+      if edge == prev or edge not in ships:
         continue
       # Now we know there is a ship from corner to other_corner.
-      outgoing_edges.append((edge, other_corner))
+      left, right = topology.edge_corners[edge]
+      outgoing_edges.append((edge, right if left == corner else left))
 
     # Then, mark this ship as either movable or unmovable based on number of outgoing edges.
     if path:  # Skipped for the very first corner, since there is no previous edge.
-      if len(outgoing_edges) == 0:
-        self.roads[path[-1]].movable = True
-      else:
-        self.roads[path[-1]].movable = False
+      ships[path[-1]].movable = not outgoing_edges
 
     # Lastly, continue the DFS. Order matters: this may mark some ships as movable that were
     # previous considered unmovable, overriding that decision (because of cycles).
@@ -1500,31 +2036,31 @@ class IslandersState:
       if other_corner == source:
         # Here, we have circled back around to the start. We must mark the two edges at the
         # beginning and end of the path as movable. We do not touch the rest.
-        self.roads[path[0]].movable = True
-        self.roads[edge].movable = True
+        ships[path[0]].movable = True
+        ships[edge].movable = True
         continue
       if other_corner in seen:
         # Here, we have created a loop. Every ship on this loop may be movable.
         start_idx = None
-        for idx, rloc in reversed(list(enumerate(path))):
-          if other_corner in [rloc[:2], rloc[2:]]:
+        for idx in reversed(range(len(path))):
+          if other_corner in topology.edge_corners[path[idx]]:
             start_idx = idx
             break
         else:
           raise RuntimeError("What happened here? This shouldn't be physically possible.")
         for idx in range(start_idx, len(path)):
-          self.roads[path[idx]].movable = True
-        self.roads[edge].movable = True
+          ships[path[idx]].movable = True
+        ships[edge].movable = True
         continue
-      maybe_piece = self.pieces.get(other_corner)
-      if maybe_piece and maybe_piece.player == player_idx:
+      maybe_piece = self.pieces.get(topology.corners[other_corner])
+      if maybe_piece and maybe_piece.player == ships[edge].player:
         # Here, we know that there is a shipping route from one of the player's settlements to
         # another. Every ship on this shipping route is considered closed.
-        for rloc in path + [edge]:
-          self.roads[rloc].closed = True
+        for ship_edge in path + [edge]:
+          ships[ship_edge].closed = True
       # Now we know this ship does not create a loop, so we continue to explore the far corner.
       path.append(edge)
-      self._ship_dfs_helper(source, player_idx, path, seen, other_corner, edge)
+      self._ship_dfs_helper(topology, ships, source, path, seen, other_corner, edge)
       path.pop()
     seen.remove(corner)
 
@@ -1575,11 +2111,14 @@ class IslandersState:
   def discover_tiles(self, road):
     maybe_tiles = [self.tiles.get(loc) for loc in road.location.get_end_tiles()]
     discovered = [tile for tile in maybe_tiles if tile is not None and tile.tile_type == "discover"]
+    for tile in discovered:
+      self._change_production(tile.location, -1)
     collect_counts = collections.defaultdict(int)
     for tile in discovered:
       if self.discoverable_tiles:
         tile.tile_type = self.discoverable_tiles.pop()
         tile.is_land = tile.tile_type != "space"
+        self.edge_types = None
         self._compute_coast()
         event_text = "{player%s} discovered {%s}" % (road.player, tile.tile_type)
         self.event_log.append(Event("discover", event_text))
@@ -1591,6 +2130,8 @@ class IslandersState:
           self.player_data[road.player].cards[tile.tile_type] += 1
         if tile.tile_type == "anyrsrc":
           collect_counts[road.player] += 1
+    for tile in discovered:
+      self._change_production(tile.location, 1)
     if collect_counts:
       self.collect_counts.update(collect_counts)
       self.action_stack.append("collect")
@@ -1607,7 +2148,8 @@ class IslandersState:
     # Check nothing else is already there.
     if loc in self.pieces:
       raise InvalidMove("You cannot settle on top of another player's settlement.")
-    for adjacent in loc.get_adjacent_corners():
+    topology = self.board_topology()
+    for adjacent in topology.adjacent_corners(loc):
       if adjacent in self.pieces:
         raise InvalidMove("You cannot place a settlement next to existing settlement.")
     # Handle special settlement phase.
@@ -1624,7 +2166,7 @@ class IslandersState:
         self.give_second_resources(player, loc)
       return
     # Check connected to one of the player's roads.
-    for edge_loc in loc.get_edges():
+    for edge_loc in topology.corner_edge_locations(loc):
       maybe_road = self.roads.get(edge_loc)
       if maybe_road and maybe_road.player == player:
         break
@@ -1634,17 +2176,18 @@ class IslandersState:
     settle_count = len([
         p for p in self.pieces.values() if p.player == player and p.piece_type == "settlement"
     ])
-    if settle_count >= 5:
+    if settle_count >= PIECES_PER_PLAYER["settlement"]:
       raise InvalidMove("You have no settlements remaining.")
     # Check resources and deduct from player.
-    resources = [("rsrc1", 1), ("rsrc2", 1), ("rsrc3", 1), ("rsrc4", 1)]
-    self._remove_resources(resources, player, "build a settlement")
+    self._remove_resources(COSTS["settle"], player, "build a settlement")
 
     self.event_log.append(Event("settlement", "{player%s} built a settlement" % player))
     self.add_piece(Piece(loc.x, loc.y, "settlement", player))
 
   def _add_piece(self, piece):
+    self._change_corner_production(piece.location, -1)  # In case this replaces a piece.
     self.pieces[piece.location] = piece
+    self._change_corner_production(piece.location, 1)
 
   def add_piece(self, piece):
     self._add_piece(piece)
@@ -1654,7 +2197,7 @@ class IslandersState:
     # Check for breaking an existing longest road.
     # Start by calculating any players with an adjacent road/ship.
     players_to_check = set()
-    for edge in piece.location.get_edges():
+    for edge in self.board_topology().corner_edge_locations(piece.location):
       if edge in self.roads:
         players_to_check.add(self.roads[edge].player)
 
@@ -1724,19 +2267,20 @@ class IslandersState:
     city_count = len([
         p for p in self.pieces.values() if p.player == player and p.piece_type == "city"
     ])
-    if city_count >= 4:
+    if city_count >= PIECES_PER_PLAYER["city"]:
       raise InvalidMove("You have no cities remaining.")
     # Check resources and deduct from player.
-    resources = [("rsrc3", 2), ("rsrc5", 3)]
-    self._remove_resources(resources, player, "build a city")
+    self._remove_resources(COSTS["city"], player, "build a city")
 
+    self._change_corner_production(loc, -1)
     self.pieces[loc].piece_type = "city"
+    self._change_corner_production(loc, 1)
     self.event_log.append(Event("city", "{player%s} upgraded a settlement to a city" % player))
 
   def handle_buy_dev(self, player):
     # Check that this is the right part of the turn.
     self._check_main_phase("buy_dev", "buy a development card")
-    resources = [("rsrc1", 1), ("rsrc3", 1), ("rsrc5", 1)]
+    resources = COSTS["buy_dev"]
     if len(self.dev_cards) < 1:
       raise InvalidMove("There are no development cards left.")
     self._remove_resources(resources, player, "buy a development card")
@@ -1955,6 +2499,28 @@ class IslandersState:
 
   def add_tile(self, tile):
     self.tiles[tile.location] = tile
+    self.topology = None
+    self.edge_types = None
+    self.production = None
+
+  def board_topology(self):
+    """Returns the Topology for the tiles on the map, which recompute() and add_tile() reset."""
+    if self.topology is None:
+      self.topology = get_topology(frozenset(self.tiles))
+    return self.topology
+
+  def board_edge_types(self):
+    """Returns the type of each edge number as the tiles alone make it; see _edge_type.
+
+    This only changes when a tile changes between land and water, so it is reset along with the
+    topology, and by anything that changes is_land.
+    """
+    if self.edge_types is None:
+      topology = self.board_topology()
+      self.edge_types = [
+          self._tile_edge_type(topology, edge_id) for edge_id in range(len(topology.edges))
+      ]
+    return self.edge_types
 
   def add_port(self, port):
     self.ports[port.location] = port
@@ -1979,10 +2545,15 @@ class IslandersState:
           tile_data.variant = "edgeright"
 
   def _compute_coast(self):
-    for location, tile_data in self.tiles.items():
+    topology = self.board_topology()
+    for tile_id, location in enumerate(topology.tiles):
+      tile_data = self.tiles[location]
       if tile_data.is_land:
         continue
-      adjacent_tiles = [self.tiles.get(loc) for loc in location.get_adjacent_tiles()]
+      adjacent_tiles = [
+          None if other is None else self.tiles[topology.tiles[other]]
+          for other in topology.tile_neighbors[tile_id]
+      ]
       lands = [
           idx for idx, tile in enumerate(adjacent_tiles)
           if tile and tile.is_land and tile.tile_type != "discover"
@@ -1999,7 +2570,7 @@ class IslandersState:
 
   def init_dev_cards(self):
     dev_cards = sum([[card] * count for card, count in self.dev_card_counts().items()], [])
-    random.shuffle(dev_cards)
+    self.rng.shuffle(dev_cards)
     self.dev_cards = dev_cards
 
   def init_robber(self):
@@ -2028,7 +2599,7 @@ class IslandersState:
 
   def shuffle_land_tiles(self, tile_locs):
     tile_types = [self.tiles[tile_loc].tile_type for tile_loc in tile_locs]
-    random.shuffle(tile_types)
+    self.rng.shuffle(tile_types)
     for idx, tile_loc in enumerate(tile_locs):
       self.tiles[tile_loc].tile_type = tile_types[idx]
 
@@ -2061,7 +2632,7 @@ class IslandersState:
 
   def shuffle_ports(self):
     port_types = [port.port_type for port in self.ports.values()]
-    random.shuffle(port_types)
+    self.rng.shuffle(port_types)
     for idx, port in enumerate(self.ports.values()):
       port.port_type = port_types[idx]
 
@@ -2105,6 +2676,10 @@ class IslandersState:
         self.corners_to_islands[corner] = canonical_corner
 
   def recompute(self):
+    self.topology = None
+    self.edge_types = None
+    self.production = None
+    self.board_topology()
     self._compute_contiguous_islands()
     self._compute_coast()
     self._compute_edges()
@@ -2129,10 +2704,9 @@ class Scenario(metaclass=abc.ABCMeta):
 
   @classmethod
   def load_file(cls, state, filename):
-    with open(os.path.join(os.path.dirname(__file__), filename), encoding="ascii") as data:
-      json_data = json.load(data)
-      state.parse_tiles(json_data["tiles"])
-      state.parse_ports(json_data["ports"])
+    json_data = get_map_template(filename)
+    state.parse_tiles(json_data["tiles"])
+    state.parse_ports(json_data["ports"])
     state.recompute()
 
 
@@ -2164,7 +2738,7 @@ class StandardMap(Scenario):
     if len(state.player_data) <= 4:
       state.init_numbers((7, 1), TILE_NUMBERS)
     else:
-      corner_choice = random.choice([(7, 1), (-2, 4), (-2, 8)])
+      corner_choice = state.rng.choice([(7, 1), (-2, 4), (-2, 8)])
       state.init_numbers(corner_choice, EXTRA_NUMBERS)
     state.shuffle_ports()
     state.recompute()
@@ -2177,12 +2751,11 @@ class BeginnerMap(Scenario):
   @classmethod
   def preview(cls, state):
     filename = "beginner4.json" if len(state.player_data) >= 4 else "beginner3.json"
-    with open(os.path.join(os.path.dirname(__file__), filename), encoding="ascii") as data:
-      json_data = json.load(data)
-      state.parse_tiles(json_data["tiles"])
-      state.parse_ports(json_data["ports"])
-      state.parse_pieces(json_data["pieces"])
-      state.parse_roads(json_data["roads"])
+    json_data = get_map_template(filename)
+    state.parse_tiles(json_data["tiles"])
+    state.parse_ports(json_data["ports"])
+    state.parse_pieces(json_data["pieces"])
+    state.parse_roads(json_data["roads"])
     state.recompute()
 
   @classmethod
@@ -2190,12 +2763,11 @@ class BeginnerMap(Scenario):
     if len(state.player_data) < 3 or len(state.player_data) > 4:
       raise InvalidPlayer("Must have between 3 and 4 players.")
     filename = "beginner4.json" if len(state.player_data) == 4 else "beginner3.json"
-    with open(os.path.join(os.path.dirname(__file__), filename), encoding="ascii") as data:
-      json_data = json.load(data)
-      state.parse_tiles(json_data["tiles"])
-      state.parse_ports(json_data["ports"])
-      state.parse_pieces(json_data["pieces"])
-      state.parse_roads(json_data["roads"])
+    json_data = get_map_template(filename)
+    state.parse_tiles(json_data["tiles"])
+    state.parse_ports(json_data["ports"])
+    state.parse_pieces(json_data["pieces"])
+    state.parse_roads(json_data["roads"])
     state.recompute()
     state.init_dev_cards()
     state.init_robber()
@@ -2392,8 +2964,8 @@ class SeafarerFog(SeafarerScenario):
     ]
     state.recompute()
     state.init_dev_cards()
-    random.shuffle(state.discoverable_tiles)
-    random.shuffle(state.discoverable_numbers)
+    state.rng.shuffle(state.discoverable_tiles)
+    state.rng.shuffle(state.discoverable_numbers)
 
   @classmethod
   def mutate_options(cls, options):
@@ -2463,6 +3035,7 @@ class MapMakerState(IslandersState):
     else:
       self.tiles[loc].is_land = False
       self.tiles[loc].number = None
+    self.edge_types = None
     for location in loc.get_adjacent_tiles():
       if location not in self.tiles:
         self.add_tile(Tile(location.x, location.y, "space", False, None))
@@ -2507,6 +3080,7 @@ class IslandersGame(BaseGame):
     self.choices = Options()
     self.connected = set()
     self.host = None
+    self.rng = random
     # player_sessions starts as a map of session to Player. once the game
     # starts, it becomes a map of session to player_index. TODO: cleanup.
     self.player_sessions = collections.OrderedDict()
@@ -2519,6 +3093,11 @@ class IslandersGame(BaseGame):
       return "unstarted islanders game (%s players)" % len(self.player_sessions)
     return self.game.game_status()
 
+  def set_random(self, rng):
+    self.rng = rng
+    if self.game is not None:
+      self.game.rng = rng
+
   @classmethod
   def parse_json(cls, data):
     gamedata = json.loads(data)
@@ -2545,24 +3124,44 @@ class IslandersGame(BaseGame):
     return json.dumps(output, cls=CustomEncoder)
 
   def for_player(self, session):
+    return self.spliced_for_player(session)
+
+  @classmethod
+  @functools.lru_cache(maxsize=64)
+  def preview(cls, scenario, options, player_count):  # pylint: disable=unused-argument
+    """Returns the state shown before the game starts, encoded and decoded again.
+
+    Only depends on the scenario, the options it sets (passed in as (name, value) pairs, only to
+    tell cache entries apart) and the number of players, so it is built once for each of those
+    and shared between games. Callers must not change it.
+    """
+    # TODO: update the javascript to handle undefined values for all of the attributes of
+    # the state object that we don't have before the game starts.
+    tmp_game = cls.get_game_class(scenario)()
+    tmp_game.player_data = [Player(None, None) for _ in range(player_count)]
+    try:
+      cls.SCENARIOS[scenario].mutate_options(tmp_game.options)
+      cls.SCENARIOS[scenario].preview(tmp_game)
+    except Exception:  # pylint: disable=broad-except
+      tmp_game.add_tile(Tile(1, 1, "randomized", True, None))
+    return json.loads(json.dumps(tmp_game.for_player(None), cls=CustomEncoder))
+
+  def public_state(self):
     if self.game is None:
-      player_idx = None
-      if session in self.player_sessions:
-        player_idx = list(self.player_sessions.keys()).index(session)
-      # TODO: update the javascript to handle undefined values for all of the attributes of
-      # the state object that we don't have before the game starts.
-      tmp_game = self.game_class()
-      tmp_game.player_data = list(self.player_sessions.values())
-      try:
-        self.SCENARIOS[self.scenario].mutate_options(tmp_game.options)
-        self.SCENARIOS[self.scenario].preview(tmp_game)
-      except Exception:  # pylint: disable=broad-except
-        tmp_game.add_tile(Tile(1, 1, "randomized", True, None))
-      data = tmp_game.for_player(None)
+      options = Options()
+      self.SCENARIOS[self.scenario].mutate_options(options)
+      preview = self.preview(
+          self.scenario, tuple((key, option.value) for key, option in options.items()),
+          len(self.player_sessions),
+      )
+      data = dict(preview)
+      # The preview's players are placeholders; only their points come from the board.
+      data["player_data"] = [
+          dict(player.json_for_player(False), points=preview["player_data"][idx]["points"])
+          for idx, player in enumerate(self.player_sessions.values())
+      ]
       data.update({
           "type": "game_state",
-          "host": self.host == session,
-          "you": player_idx,
           "started": False,
           "colors": sorted(self.COLORS - {p.color for p in self.player_sessions.values()}),
       })
@@ -2572,15 +3171,22 @@ class IslandersGame(BaseGame):
           name="Scenario", default=list(self.SCENARIOS.keys())[0],
           choices=list(self.SCENARIOS.keys()), value=self.scenario,
       )
+      return data
 
-      return json.dumps(data, cls=CustomEncoder)
-
-    output = self.game.for_player(self.player_sessions.get(session))
+    output = self.game.public_state()
     output["started"] = True
     is_connected = {idx: sess in self.connected for sess, idx in self.player_sessions.items()}
     for idx in range(len(output["player_data"])):
       output["player_data"][idx]["disconnected"] = not is_connected.get(idx, False)
-    return json.dumps(output, cls=CustomEncoder)
+    return output
+
+  def player_overlay(self, session):
+    if self.game is None:
+      player_idx = None
+      if session in self.player_sessions:
+        player_idx = list(self.player_sessions.keys()).index(session)
+      return {"host": self.host == session, "you": player_idx}
+    return self.game.player_overlay(self.player_sessions.get(session))
 
   def connect_user(self, session):
     self.connected.add(session)
@@ -2650,7 +3256,7 @@ class IslandersGame(BaseGame):
     if color is not None and color not in unused_colors:
       raise InvalidPlayer(f"Invalid color {color}")
     if color is None:
-      color = random.choice(list(unused_colors))
+      color = self.rng.choice(sorted(unused_colors))
 
     # TODO: just use some arguments and stop creating fake players. This requires that we clean
     # up the javascript to know what to do with undefined values.
@@ -2690,8 +3296,9 @@ class IslandersGame(BaseGame):
     self.update_rulesets_and_choices(data["options"])
 
     game = self.game_class()
+    game.rng = self.rng
     new_sessions = {}
-    random.shuffle(player_data)
+    self.rng.shuffle(player_data)
     for idx, (player_session, player_info) in enumerate(player_data):
       game.add_player(player_info.color, player_info.name)
       new_sessions[player_session] = idx
@@ -3,8 +3,8 @@
 import collections
 import json
 import os
+import random
 import sys
-import threading
 import unittest
 from unittest import mock
 
@@ -173,12 +173,9 @@ class TestLoadState(unittest.TestCase):
 class BreakpointTestMixin(unittest.TestCase):
 
   def breakpoint(self):
-    t = threading.Thread(target=server.ws_main, args=(server.GLOBAL_LOOP,))
-    t.start()
     server.GAMES["test"] = game.GameHandler("test", islanders.IslandersGame)
     server.GAMES["test"].game = self.g
     server.main(8001)
-    t.join()
 
 
 class CornerComputationTest(unittest.TestCase):
@@ -547,6 +544,74 @@ class DebugRulesOnTest(BaseInputHandlerTest):
       self.fail("Dice roll did not reset")
 
 
+class TopologyTest(unittest.TestCase):
+
+  MAPS = [
+      (islanders.StandardMap, "standard6.json"), (islanders.SeafarerShores, "shores4.json"),
+      (islanders.SeafarerIslands, "islands4.json"), (islanders.SeafarerDesert, "desert4.json"),
+  ]
+
+  def load(self, scenario, filename):
+    c = islanders.IslandersState()
+    scenario.mutate_options(c.options)
+    scenario.load_file(c, filename)
+    return c
+
+  def testMatchesLocationMethods(self):
+    for scenario, filename in self.MAPS:
+      with self.subTest(map=filename):
+        topology = self.load(scenario, filename).board_topology()
+        tile_ids = topology.tile_ids
+        self.assertEqual(
+            sorted(topology.tiles), sorted(self.load(scenario, filename).tiles.keys()))
+        for tile_id, tile in enumerate(topology.tiles):
+          corners = [topology.corners[corner] for corner in topology.tile_corners[tile_id]]
+          self.assertEqual(corners, tile.get_corner_locations())
+          neighbors = [
+              None if other is None else topology.tiles[other]
+              for other in topology.tile_neighbors[tile_id]
+          ]
+          expected = [loc if loc in tile_ids else None for loc in tile.get_adjacent_tiles()]
+          self.assertEqual(neighbors, expected)
+        for corner_id, corner in enumerate(topology.corners):
+          edges = {topology.edges[edge] for edge in topology.corner_edges[corner_id]}
+          self.assertEqual(edges, set(corner.get_edges()) & set(topology.edges))
+          others = {topology.corners[other] for other in topology.corner_corners[corner_id]}
+          self.assertEqual(others, set(corner.get_adjacent_corners()) & set(topology.corners))
+          tiles = {topology.tiles[tile] for tile in topology.corner_tiles[corner_id]}
+          self.assertEqual(tiles, set(corner.get_tiles()) & set(topology.tiles))
+        for edge_id, edge in enumerate(topology.edges):
+          left, right = topology.edge_corners[edge_id]
+          self.assertEqual((topology.corners[left], topology.corners[right]),
+                           (edge.corner_left, edge.corner_right))
+          tiles = [topology.tiles[tile] for tile in topology.edge_tiles[edge_id]]
+          self.assertCountEqual(tiles, set(edge.get_adjacent_tiles()) & set(topology.tiles))
+          self.assertEqual(tiles, sorted(tiles, key=lambda loc: loc.y))
+
+  def testEdgeTypes(self):
+    for scenario, filename in self.MAPS:
+      with self.subTest(map=filename):
+        c = self.load(scenario, filename)
+        topology = c.board_topology()
+        edge_types = c.board_edge_types()
+        self.assertEqual(len(edge_types), len(topology.edges))
+        for edge_id, edge in enumerate(topology.edges):
+          self.assertEqual(edge_types[edge_id], c._get_edge_type(edge))
+        self.assertIs(c.board_edge_types(), edge_types)
+        data = c.json_for_player()
+        self.assertNotIn("edge_types", data)
+        self.assertNotIn("edges", data)
+
+  def testSharedAndReset(self):
+    first = self.load(islanders.StandardMap, "standard6.json")
+    second = self.load(islanders.StandardMap, "standard6.json")
+    self.assertIs(first.board_topology(), second.board_topology())
+    first.add_tile(islanders.Tile(-8, 4, "space", False, None))
+    self.assertIn(islanders.TileLocation(-8, 4), first.board_topology().tile_ids)
+    self.assertNotIn(islanders.TileLocation(-8, 4), second.board_topology().tile_ids)
+    self.assertNotIn("topology", first.json_repr())
+
+
 class TestGetEdgeType(BaseInputHandlerTest):
 
   TEST_FILE = "sea_test.json"
@@ -570,6 +635,204 @@ class TestGetEdgeType(BaseInputHandlerTest):
     self.assertEqual(self.c._get_edge_type(islanders.EdgeLocation(3, 5, 5, 5)), "ship")
     self.assertEqual(self.c._get_edge_type(islanders.EdgeLocation(2, 6, 3, 5)), "ship")
 
+  def testEdgeTypeAfterDiscovery(self):
+    self.assertEqual(self.c._get_edge_type(islanders.EdgeLocation(-1, 3, 0, 4)), "road")
+    self.c.tiles[(-2, 4)].tile_type = "discover"
+    self.c.discoverable_tiles = ["space"]
+    self.c.discover_tiles(Road([0, 4, 2, 4], "road", 0))
+    self.assertFalse(self.c.tiles[(-2, 4)].is_land)
+    self.assertEqual(self.c._get_edge_type(islanders.EdgeLocation(-1, 3, 0, 4)), "coastdown")
+
+
+class RandomGameMixin:
+  """Plays random games, calling self.check(state) along the way."""
+
+  SCENARIOS = [islanders.StandardMap, islanders.SeafarerShores, islanders.SeafarerDesert]
+
+  def play(self, scenario, seed, steps, check_every):
+    rng = random.Random(seed)
+    c = islanders.IslandersState()
+    for idx in range(4):
+      c.add_player(f"color{idx}", f"player{idx}")
+    scenario.mutate_options(c.options)
+    c.options["friendly_robber"].value = bool(seed % 2)
+    c.options["extra_build"].value = seed == 0
+    scenario.init(c)
+    c.rng = rng
+    for step in range(steps):
+      phase = c.turn_phase
+      if step % check_every == 0 or phase in ["robber", "dev_road", "extra_build"]:
+        self.check(c)
+      if c.game_phase == "victory":
+        break
+      if phase == "dice":
+        c.handle(c.turn_idx, {"type": "roll_dice"})
+      elif phase == "discard":
+        player, count = next(iter(c.discard_players.items()))
+        hand = c.player_data[player].cards
+        cards = [rsrc for rsrc in islanders.RESOURCES for _ in range(hand[rsrc])]
+        selection = collections.Counter(rng.sample(cards, count))
+        c.handle(player, {"type": "discard", "selection": dict(selection)})
+      elif phase == "collect":
+        player = c.collect_idx if c.collect_idx is not None else min(c.collect_counts)
+        c.handle(player, {"type": "collect", "selection": {"rsrc3": c.collect_counts[player]}})
+      elif phase == "rob":
+        c.handle(c.turn_idx, {"type": "rob", "player": rng.choice(c.rob_players)})
+      else:
+        self.move(c, rng)
+    return c
+
+  def move(self, c, rng):
+    player = c.extra_build_idx if c.turn_phase == "extra_build" else c.turn_idx
+    if c.turn_phase == "main":
+      # Keep everyone building, and now and then let them build roads for free.
+      c.player_data[player].cards.update({rsrc: 3 for rsrc in islanders.RESOURCES})
+      if rng.random() < 0.05:
+        c.action_stack.extend(["dev_road", "dev_road"])
+    moves = c.legal_moves(player)
+    choices = [{"type": "settle", "location": loc} for loc in moves["settle"]]
+    choices += [{"type": "city", "location": loc} for loc in moves["city"]]
+    choices += [{"type": "robber", "location": loc} for loc in moves["robber"]]
+    choices += [{"type": "pirate", "location": loc} for loc in moves["pirate"]]
+    for edge in moves["edges"]:
+      edge_type = edge["edge_type"]
+      kind = rng.choice(["road", "ship"]) if edge_type.startswith("coast") else edge_type
+      choices.append({"type": kind, "location": edge["location"]})
+    for ship in moves["move_ship"]:
+      choices.append({"type": "move_ship", "from": ship["location"], "to": rng.choice(ship["to"])})
+    if c.turn_phase == "main":
+      choices += [{"type": "end_turn"}] * max(1, len(choices) // 4)
+    elif c.turn_phase == "extra_build":
+      choices += [{"type": "end_extra_build"}] * max(1, len(choices))
+    elif c.turn_phase == "dev_road" and not choices:
+      c.action_stack.pop()
+      return
+    c.handle(player, rng.choice(choices))
+
+
+class LegalMovesTest(RandomGameMixin, unittest.TestCase):
+  """Checks legal_moves() against what the handlers accept, in random games."""
+
+  @staticmethod
+  def summarize(moves):
+    edges = {}
+    for edge in moves["edges"]:
+      edge_type = edge["edge_type"]
+      edges[edge["location"]] = {"road", "ship"} if edge_type.startswith("coast") else {edge_type}
+    summary = {name: set(moves[name]) for name in ["settle", "city", "robber", "pirate"]}
+    summary["edges"] = edges
+    summary["move_ship"] = {ship["location"]: set(ship["to"]) for ship in moves["move_ship"]}
+    return summary
+
+  def accepted(self, c, player):
+    """Tries every move on a copy of c, and returns the ones that work as summarize() would."""
+    saved = json.dumps(c.json_repr(), cls=game.CustomEncoder)
+    copies = [islanders.IslandersState.parse_json(json.loads(saved))]
+
+    def Accepts(move):
+      try:
+        copies[0].handle(player, move)
+      except game.GameException:
+        return False
+      copies[0] = islanders.IslandersState.parse_json(json.loads(saved))
+      return True
+
+    topology = c.board_topology()
+    island_corners = [loc for loc in topology.corners if loc in c.corners_to_islands]
+    edges = [topology.edges[edge] for edge in topology.inner_edges]
+    road_types = ["road", "ship"] if c.options.seafarers else ["road"]
+    summary = {
+        "settle": {loc for loc in island_corners if Accepts({"type": "settle", "location": loc})},
+        "city": {loc for loc in c.pieces if Accepts({"type": "city", "location": loc})},
+        "robber": {loc for loc in c.tiles if Accepts({"type": "robber", "location": loc})},
+        "pirate": set(),
+        "edges": {},
+        "move_ship": {},
+    }
+    if c.options.seafarers:
+      summary["pirate"] = {loc for loc in c.tiles if Accepts({"type": "pirate", "location": loc})}
+    for edge in edges:
+      types = {kind for kind in road_types if Accepts({"type": kind, "location": edge})}
+      if types:
+        summary["edges"][edge] = types
+    for loc, road in c.roads.items():
+      if road.player == player and road.road_type == "ship":
+        to = {
+            edge for edge in edges
+            if edge != loc and Accepts({"type": "move_ship", "from": loc, "to": edge})
+        }
+        if to:
+          summary["move_ship"][loc] = to
+    return summary
+
+  def check(self, c):
+    for player in range(len(c.player_data)):
+      with self.subTest(phase=c.turn_phase, player=player):
+        self.assertEqual(self.summarize(c.legal_moves(player)), self.accepted(c, player))
+
+  def testMatchesHandlers(self):
+    for seed, scenario in enumerate(self.SCENARIOS):
+      c = self.play(scenario, seed, steps=120, check_every=20)
+      self.assertGreater(len(c.roads), 12)
+
+  def testCached(self):
+    c = self.play(islanders.SeafarerShores, 3, steps=60, check_every=100)
+    moves = c.legal_moves(c.turn_idx)
+    with mock.patch.object(c, "_compute_legal_moves") as compute:
+      self.assertIs(c.legal_moves(c.turn_idx), moves)
+      c.trade_offer = {"want": {"rsrc1": 1}}
+      self.assertIs(c.legal_moves(c.turn_idx), moves)
+      compute.assert_not_called()
+      c.player_data[c.turn_idx].cards["rsrc1"] += 1
+      c.legal_moves(c.turn_idx)
+      compute.assert_called_once()
+
+  def testSentToPlayers(self):
+    c = self.play(islanders.StandardMap, 4, steps=10, check_every=100)
+    self.assertEqual(c.for_player(c.turn_idx)["legal_moves"], c.legal_moves(c.turn_idx))
+    self.assertNotIn("legal_moves", c.for_player(None))
+
+
+def ScanProduction(c):
+  """Works out what every dice total produces by looking at every tile, as a reference."""
+  production = collections.defaultdict(dict)
+  for location, tile in c.tiles.items():
+    if tile.number is None or location == c.robber:
+      continue
+    for corner in location.get_corner_locations():
+      piece = c.pieces.get(corner)
+      if piece is not None:
+        key = (piece.player, tile.tile_type)
+        production[tile.number][key] = production[tile.number].get(key, 0) + (
+            2 if piece.piece_type == "city" else 1)
+  return production
+
+
+class ProductionIndexTest(RandomGameMixin, unittest.TestCase):
+  """Checks the production index, kept up to date through random games, against the board."""
+
+  def check(self, c):
+    index = c.production_index()  # Built at the start, so the game has to keep it up to date.
+    self.assertEqual({number: yields for number, yields in index.items() if yields},
+                     ScanProduction(c))
+
+  def testMatchesBoard(self):
+    for seed, scenario in enumerate(self.SCENARIOS):
+      self.play(scenario, seed, steps=150, check_every=5)
+
+  def testExpectedIncome(self):
+    c = self.play(islanders.StandardMap, 1, steps=80, check_every=10)
+    for player in range(len(c.player_data)):
+      expected = collections.defaultdict(float)
+      for number, yields in ScanProduction(c).items():
+        for (idx, rsrc), count in yields.items():
+          if idx == player:
+            expected[rsrc] += count * (6 - abs(7 - number)) / 36
+      income = c.expected_income(player)
+      self.assertEqual(income.keys(), expected.keys())
+      for rsrc, cards in expected.items():
+        self.assertAlmostEqual(income[rsrc], cards)
+
 
 class TestDistributeResources(BaseInputHandlerTest):
 
@@ -892,6 +1155,18 @@ class TestDiscovery(BaseInputHandlerTest):
     self.assertEqual(self.c.turn_phase, "main")
     self.assertEqual(self.c.event_log[-1].public_text, "{player0} discovered {rsrc3}")
 
+  def testDiscoveredTileProduces(self):
+    self.c._add_piece(islanders.Piece(2, 4, "settlement", 1))
+    self.assertNotIn((1, "rsrc3"), self.c.production_index().get(10, {}))
+    self.c.handle_road([2, 4, 3, 5], 0, "road", [("rsrc2", 1), ("rsrc4", 1)])
+    self.assertEqual(self.c.production_index()[10][(1, "rsrc3")], 1)
+    index = self.c.production_index()
+    self.assertEqual({number: yields for number, yields in index.items() if yields},
+                     ScanProduction(self.c))
+    count = self.c.player_data[1].cards["rsrc3"]
+    self.c.distribute_resources((4, 6))
+    self.assertEqual(self.c.player_data[1].cards["rsrc3"], count + 1)
+
   def testDiscoverByShip(self):
     old_rsrcs = collections.Counter(self.c.player_data[0].cards)
     self.c.handle_road([2, 4, 3, 5], 0, "ship", [("rsrc1", 1), ("rsrc2", 1)])
@@ -2142,6 +2417,114 @@ class TestLongestRouteCalculation(BaseInputHandlerTest):
     self.assertEqual(val, 4, "cannot go through someone else's port")
 
 
+class LongestRouteDifferentialTest(unittest.TestCase):
+  """Checks _calculate_longest_road against _dfs_depth while random edges and pieces change."""
+
+  MAPS = [
+      (islanders.StandardMap, "standard6.json"), (islanders.SeafarerShores, "shores4.json"),
+      (islanders.SeafarerDesert, "desert4.json"),
+  ]
+
+  def expected(self, c, player):
+    corners = {
+        corner for road in c.roads.values() if road.player == player
+        for corner in [road.location.corner_left, road.location.corner_right]
+    }
+    return max((c._dfs_depth(player, corner, set(), None) for corner in corners), default=0)
+
+  def play(self, scenario, filename, seed, steps=120):
+    rng = random.Random(seed)
+    c = islanders.IslandersState()
+    scenario.mutate_options(c.options)
+    scenario.load_file(c, filename)
+    topology = c.board_topology()
+    edges = [
+        topology.edges[edge] for edge in topology.inner_edges
+        if c._get_edge_type(topology.edges[edge]) is not None
+    ]
+    for step in range(steps):
+      player = rng.randrange(3)
+      action = rng.random()
+      if action < 0.75:
+        # Mostly grow a player's network, so that routes get long.
+        owned = [road.location for road in c.roads.values() if road.player == player]
+        nearby = [
+            edge for loc in owned for corner in [loc.corner_left, loc.corner_right]
+            for edge in corner.get_edges()
+            if edge in topology.edge_ids and edge not in c.roads and c._get_edge_type(edge)
+        ]
+        free = [edge for edge in edges if edge not in c.roads]
+        edge = rng.choice(nearby if nearby and rng.random() < 0.9 else free)
+        edge_type = c._get_edge_type(edge)
+        road_type = rng.choice(["road", "ship"]) if edge_type.startswith("coast") else edge_type
+        c._add_road(Road(edge, road_type, player))
+      elif action < 0.85 and c.roads:
+        # Take one away, as moving a ship does.
+        del c.roads[rng.choice(sorted(c.roads))]
+      else:
+        corner = rng.choice(topology.corners)
+        if corner in c.pieces:
+          del c.pieces[corner]
+        else:
+          c._add_piece(islanders.Piece(corner.x, corner.y, "settlement", player))
+      for idx in range(3):
+        with self.subTest(seed=seed, step=step, player=idx):
+          self.assertEqual(c._calculate_longest_road(idx), self.expected(c, idx))
+    return c
+
+  def testMatchesDfsDepth(self):
+    for scenario, filename in self.MAPS:
+      for seed in range(2):
+        c = self.play(scenario, filename, seed, steps=80)
+        self.assertGreater(max(c._calculate_longest_road(idx) for idx in range(3)), 4)
+
+  def testOnlySearchesChangedComponents(self):
+    c = self.play(islanders.StandardMap, "standard6.json", 0, steps=60)
+    lengths = {idx: dict(c.route_lengths[idx]) for idx in range(3)}
+    with mock.patch.object(c, "_route_depth", side_effect=AssertionError("searched")):
+      for idx in range(3):
+        c._calculate_longest_road(idx)
+    self.assertEqual({idx: c.route_lengths[idx] for idx in range(3)}, lengths)
+
+    # A new edge far from everything else only searches its own component.
+    topology = c.board_topology()
+    taken = {corner for loc in c.roads for corner in [loc.corner_left, loc.corner_right]}
+    edge = next(
+        topology.edges[edge] for edge in topology.inner_edges
+        if not taken & {topology.edges[edge].corner_left, topology.edges[edge].corner_right}
+    )
+    c._add_road(Road(edge, "road", 0))
+    with mock.patch.object(c, "_route_depth", wraps=c._route_depth) as route_depth:
+      c._calculate_longest_road(0)
+    # Only the new road was searched.
+    self.assertEqual(route_depth.call_count, 1)
+    self.assertEqual({len(call[0][2]) for call in route_depth.call_args_list}, {1})
+
+  def testExtendsRemembered(self):
+    c = self.play(islanders.StandardMap, "standard6.json", 0, steps=60)
+    for player in range(3):
+      c._calculate_longest_road(player)
+    topology = c.board_topology()
+    for step in range(20):
+      player = step % 3
+      owned = [road.location for road in c.roads.values() if road.player == player]
+      edge = next(
+          edge for loc in owned for corner in [loc.corner_left, loc.corner_right]
+          for edge in corner.get_edges()
+          if edge in topology.edge_ids and edge not in c.roads and c._get_edge_type(edge)
+      )
+      edge_type = c._get_edge_type(edge)
+      road_type = "road" if edge_type.startswith("coast") else edge_type
+      c._add_road(Road(edge, road_type, player))
+      with mock.patch.object(c, "_route_depth", wraps=c._route_depth) as route_depth:
+        length = c._calculate_longest_road(player)
+      with self.subTest(step=step):
+        self.assertEqual(length, self.expected(c, player))
+        # Routes only go on from the new edge, instead of starting from every corner.
+        self.assertNotIn(None, [call[0][6] for call in route_depth.call_args_list])
+        self.assertTrue(route_depth.called)
+
+
 class TestLongestRouteAssignment(BreakpointTestMixin):
 
   def setUp(self):
@@ -2499,6 +2882,61 @@ class TestUnstartedGame(unittest.TestCase):
         {"player1", "player2", "3player"},
     )
 
+  def oldPreview(self):
+    """Builds the state shown before the game starts from scratch, as a reference."""
+    tmp_game = self.c.game_class()
+    tmp_game.player_data = list(self.c.player_sessions.values())
+    try:
+      self.c.SCENARIOS[self.c.scenario].mutate_options(tmp_game.options)
+      self.c.SCENARIOS[self.c.scenario].preview(tmp_game)
+    except Exception:  # pylint: disable=broad-except
+      tmp_game.add_tile(islanders.Tile(1, 1, "randomized", True, None))
+    return tmp_game.for_player(None)
+
+  def testPreview(self):
+    sessions = ["one", "two", "three", "four", "five", "six"]
+    for scenario in self.c.SCENARIOS:
+      for session in list(self.c.connected):
+        self.c.disconnect_user(session)
+      self.c.handle_change_scenario(None, {"scenario": scenario})
+      for count, session in enumerate([None] + sessions):
+        if session is not None:
+          self.c.connect_user(session)
+          self.c.handle_join(session, {"name": f"player {session}"})
+        with self.subTest(scenario=scenario, players=count):
+          data = self.c.public_state()
+          expected = self.oldPreview()
+          for key in ["type", "started", "colors", "options", "scenario"]:
+            del data[key]
+          del expected["options"], expected["type"]
+          self.assertEqual(
+              json.dumps(data, cls=islanders.CustomEncoder),
+              json.dumps(expected, cls=islanders.CustomEncoder),
+          )
+
+  def testPreviewCached(self):
+    self.c.connect_user("one")
+    self.c.handle_join("one", {"name": "player1"})
+    self.c.public_state()
+    other = islanders.IslandersGame()
+    other.connect_user("two")
+    other.handle_join("two", {"name": "player2"})
+    with mock.patch.object(islanders.StandardMap, "preview") as preview:
+      self.c.handle_join("one", {"name": "renamed"})
+      data = self.c.public_state()
+      other_data = other.public_state()
+    preview.assert_not_called()
+    self.assertEqual([player["name"] for player in data["player_data"]], ["renamed"])
+    self.assertEqual([player["name"] for player in other_data["player_data"]], ["player2"])
+    self.assertEqual(data["tiles"], other_data["tiles"])
+
+  def testMapFilesReadOnce(self):
+    islanders.get_map_template("shores4.json")
+    state = islanders.IslandersState()
+    with mock.patch("builtins.open", side_effect=AssertionError("map file read again")):
+      islanders.SeafarerShores.load_file(state, "shores4.json")
+    self.assertGreater(len(state.tiles), 0)
+
   def testChooseBadScenario(self):
     self.assertIsNone(self.c.game)
     self.c.connect_user("one")
@@ -35,13 +35,26 @@ class GameState:
     self.rooms = rooms.CreateRooms()
     self.deck = cards.CreateCards()
     self.doctor = [idx for idx, room in enumerate(self.rooms) if room.name == "Gallery"][0]
+    self.rng = random
 
   def json_repr(self):
-    return copy.copy(self.__dict__)
+    data = copy.copy(self.__dict__)
+    del data["rng"]
+    return data
 
   def for_player(self, idx):
+    data = self.public_state()
+    data.update(self.player_overlay(idx))
+    return data
+
+  def public_state(self):
     data = self.json_repr()
+    del data["players"]
     data["doctor"] = self.rooms[self.doctor].short_name
+    return data
+
+  def player_overlay(self, idx):
+    data = {}
     if idx is not None:
       current = self.players[idx].room
       data["reachable"] = [room.short_name for room in current.connections] + [current.short_name]
@@ -132,7 +145,7 @@ class GameState:
         "blue", "red", "darkgreen", "orange", "blueviolet", "limegreen", "deepskyblue", "violet",
     ]
     self.players = [Player(self.rooms[0], colors[idx]) for idx in range(num_players)]
-    random.shuffle(self.deck)
+    self.rng.shuffle(self.deck)
     for player in self.players:
       for _ in range(6):
         player.cards.append(self.deck.pop())
@@ -153,6 +166,9 @@ class MansionGame(BaseGame):
   def game_status(self):
     return "mansion game"  # TODO
 
+  def set_random(self, rng):
+    self.game.rng = rng
+
   @classmethod
   def parse_json(cls, json_str):  # pylint: disable=arguments-renamed,unused-argument
     return None  # TODO
@@ -163,11 +179,17 @@ class MansionGame(BaseGame):
     return json.dumps(output, cls=CustomEncoder)
 
   def for_player(self, session):
-    output = self.game.for_player(self.sessions.get(session))
+    return self.spliced_for_player(session)
+
+  def public_state(self):
     # TODO: send connection information somehow
+    return self.game.public_state()
+
+  def player_overlay(self, session):
+    output = self.game.player_overlay(self.sessions.get(session))
     output["player_idx"] = self.sessions.get(session)
     output["host"] = self.host == session
-    return json.dumps(output, cls=CustomEncoder)
+    return output
 
   def connect_user(self, session):
     self.connected.add(session)
@@ -188,7 +210,7 @@ class MansionGame(BaseGame):
     if session not in self.sessions and data.get("type") not in ["start", "join"]:
       raise InvalidPlayer("Unknown player")
     if data.get("type") == "start":
-      sessions = {sess: idx for idx, sess in enumerate(self.connected)}
+      sessions = {sess: idx for idx, sess in enumerate(sorted(self.connected))}
       self.game.handle_start(len(sessions))
       self.sessions = sessions
       yield None
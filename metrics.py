@@ -0,0 +1,240 @@
+"""Opt-in counters and histograms describing where games spend their time.
+
+Every GameHandler owns a Profile and hands it to its game with set_profile(). Nothing is recorded
+until Enable() is called (server.py --metrics); until then, profiled code only pays for checking
+ENABLED, and methods marked with @Timed are left exactly as they were written. Enable() swaps
+them for timing wrappers.
+
+Profiles are served as JSON at /profile?game_id=<id>, and all of them together in the Prometheus
+text format at /metrics. SERVER holds what is not about any one game, such as how far behind the
+event loop is running (see WatchLoop).
+"""
+
+import asyncio
+import bisect
+import collections
+import functools
+import multiprocessing
+import time
+
+ENABLED = False
+
+# Upper bounds, in seconds, of the histogram buckets for anything that is timed.
+TIME_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0,
+)
+COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+# Name -> (type, help text, label name, buckets). Only metrics listed here are exported.
+METRICS = {
+    "game_move_seconds": (
+        "histogram", "Time to handle one move, including pushes to clients.", None, TIME_BUCKETS,
+    ),
+    "game_encode_seconds": (
+        "histogram", "Time to encode the state pushed to all clients after a change.", None,
+        TIME_BUCKETS,
+    ),
+    "game_events_total": ("counter", "Game events started.", None, None),
+    "game_events_per_move": (
+        "histogram", "Game events started while handling one move.", None, COUNT_BUCKETS,
+    ),
+    "game_lane_wait_seconds": (
+        "histogram", "Time spent waiting for the game to finish what it was asked to do before.",
+        None, TIME_BUCKETS,
+    ),
+    "server_loop_lag_seconds": (
+        "histogram", "How late the event loop woke up a sleeping task; every websocket in the "
+        "process waits this long.", "process", TIME_BUCKETS,
+    ),
+    "eldritch_resolve_total": ("counter", "Calls to resolve() by event class.", "event", None),
+    "eldritch_resolve_seconds_total": (
+        "counter", "Time spent in resolve() by event class.", "event", None,
+    ),
+    "eldritch_collect_seconds": (
+        "histogram", "Time spent collecting interrupts, triggers, usables and spendables.", "kind",
+        TIME_BUCKETS,
+    ),
+    "eldritch_possessions_scanned_total": (
+        "counter", "Possessions looked at while collecting interrupts, triggers and usables.",
+        "kind", None,
+    ),
+}
+_TIMED = []  # (class, method name, undecorated method)
+LOOP_LAG_INTERVAL = 0.1
+
+
+class Histogram:
+
+  def __init__(self, buckets):
+    self.buckets = buckets
+    self.counts = [0] * (len(buckets) + 1)
+    self.sum = 0
+    self.count = 0
+
+  def observe(self, value):
+    self.counts[bisect.bisect_left(self.buckets, value)] += 1
+    self.sum += value
+    self.count += 1
+
+  def merge(self, other):
+    for idx, count in enumerate(other.counts):
+      self.counts[idx] += count
+    self.sum += other.sum
+    self.count += other.count
+
+  def json_repr(self):
+    return {"count": self.count, "sum": self.sum, "buckets": dict(zip(self.buckets, self.counts))}
+
+
+class Profile:
+  """Counters and histograms for a single game. Labels are optional and are always strings."""
+
+  def __init__(self):
+    self.counters = collections.defaultdict(collections.Counter)
+    self.histograms = collections.defaultdict(dict)
+
+  def __reduce__(self):
+    # A profile describes the process a game ran in, so a saved game gets a new one when loaded.
+    return Profile, ()
+
+  def count(self, name, amount=1, label=""):
+    self.counters[name][label] += amount
+
+  def observe(self, name, value, label=""):
+    histograms = self.histograms[name]
+    if label not in histograms:
+      histograms[label] = Histogram(METRICS[name][3])
+    histograms[label].observe(value)
+
+  def total(self, name):
+    return sum(self.counters[name].values()) if name in self.counters else 0
+
+  def json_repr(self):
+    output = {name: dict(values) for name, values in self.counters.items()}
+    for name, histograms in self.histograms.items():
+      output[name] = {label: hist.json_repr() for label, hist in histograms.items()}
+    return output
+
+
+SERVER = Profile()
+
+
+async def WatchLoop(profile=None, interval=LOOP_LAG_INTERVAL):
+  """Sleeps for interval over and over, and records how much later than that it wakes up."""
+  profile = profile or SERVER
+  name = multiprocessing.current_process().name
+  loop = asyncio.get_running_loop()
+  while True:
+    start = loop.time()
+    await asyncio.sleep(interval)
+    if ENABLED:
+      profile.observe("server_loop_lag_seconds", max(0, loop.time() - start - interval), name)
+
+
+def Timed(metric, label, scanned=None):
+  """Marks a method to be timed into self.profile while ENABLED.
+
+  If given, scanned is the name of a method of self that returns the number of possessions that
+  one call looks at.
+  """
+  def decorator(func):
+    func.timed = (metric, label, scanned)
+    return func
+  return decorator
+
+
+def Instrumented(cls):
+  """Class decorator that lets Enable() swap in timing wrappers for @Timed methods."""
+  for name, func in vars(cls).items():
+    if hasattr(func, "timed"):
+      _TIMED.append((cls, name, func))
+  return cls
+
+
+def _TimingWrapper(func):
+  metric, label, scanned = func.timed
+
+  @functools.wraps(func)
+  def timed(self, *args, **kwargs):
+    profile = self.profile
+    if profile is None:
+      return func(self, *args, **kwargs)
+    if scanned is not None:
+      profile.count("eldritch_possessions_scanned_total", getattr(self, scanned)(), label)
+    start = time.perf_counter()
+    try:
+      return func(self, *args, **kwargs)
+    finally:
+      profile.observe(metric, time.perf_counter() - start, label)
+  return timed
+
+
+def Enable():
+  global ENABLED  # pylint: disable=global-statement
+  if ENABLED:
+    return
+  ENABLED = True
+  for cls, name, func in _TIMED:
+    setattr(cls, name, _TimingWrapper(func))
+
+
+def Disable():
+  global ENABLED  # pylint: disable=global-statement
+  ENABLED = False
+  for cls, name, func in _TIMED:
+    setattr(cls, name, func)
+
+
+def _Labels(labels):
+  if not labels:
+    return ""
+  escaped = (
+      (key, str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n"))
+      for key, value in labels
+  )
+  return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+def _GameLabels(game_type):
+  return [] if game_type is None else [("game_type", game_type)]
+
+
+def Render(profiles):
+  """Returns the Prometheus text format for a list of (game type, profile), summed by game type.
+
+  The game type is None for SERVER, whose metrics are not labelled with one.
+  """
+  counters = collections.defaultdict(collections.Counter)
+  histograms = collections.defaultdict(dict)
+  for game_type, profile in profiles:
+    for name, values in profile.counters.items():
+      for label, value in values.items():
+        counters[name][(game_type, label)] += value
+    for name, by_label in profile.histograms.items():
+      for label, hist in by_label.items():
+        key = (game_type, label)
+        if key not in histograms[name]:
+          histograms[name][key] = Histogram(hist.buckets)
+        histograms[name][key].merge(hist)
+
+  lines = []
+  for name, (kind, help_text, label_name, _) in METRICS.items():
+    if name not in counters and name not in histograms:
+      continue
+    lines.append(f"# HELP {name} {help_text}")
+    lines.append(f"# TYPE {name} {kind}")
+    if kind == "counter":
+      for (game_type, label), value in sorted(counters[name].items()):
+        labels = _GameLabels(game_type) + ([(label_name, label)] if label_name else [])
+        lines.append(f"{name}{_Labels(labels)} {value}")
+      continue
+    for (game_type, label), hist in sorted(histograms[name].items(), key=lambda item: item[0]):
+      labels = _GameLabels(game_type) + ([(label_name, label)] if label_name else [])
+      cumulative = 0
+      for bound, count in zip(hist.buckets + ("+Inf",), hist.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_Labels(labels + [('le', bound)])} {cumulative}")
+      lines.append(f"{name}_sum{_Labels(labels)} {hist.sum}")
+      lines.append(f"{name}_count{_Labels(labels)} {hist.count}")
+  return "\n".join(lines) + "\n"
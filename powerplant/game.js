@@ -63,6 +63,7 @@ function init() {
 function continueInit(gameId) {
   ws = new WebSocket("ws://" + window.location.hostname + ":8081/" + gameId);
   ws.onmessage = onmsg;
+  ws.onopen = requestSnapshot;
 
   document.getElementById("board").cnvScale = 4;
   moveBoard();
@@ -787,6 +788,10 @@ function onmsg(e) {
     setTimeout(clearError, 100);
     return;
   }
+  data = decodeState(data);
+  if (data == null) {
+    return;
+  }
   if (runningAnim.length || messageQueue.length) {
     messageQueue.push(data);
   } else {
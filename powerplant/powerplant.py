@@ -84,7 +84,9 @@ class GameState:
 
   PHASES = [TurnPhase.AUCTION, TurnPhase.MATERIALS, TurnPhase.BUILDING, TurnPhase.BUREAUCRACY]
 
-  def __init__(self, players, region, plantlist):
+  def __init__(self, players, region, plantlist, rng=None):
+    # Used to shuffle the plant deck; see PowerPlantGame.set_random.
+    self.rng = rng if rng is not None else random
     self.region = region
     self.players = players
     self.cities = cities.CreateCities(region)
@@ -133,7 +135,7 @@ class GameState:
       raise RuntimeError(f"Incorrect initial market size {self.market}")
 
     self.market.sort()
-    random.shuffle(to_randomize)
+    self.rng.shuffle(to_randomize)
     for _ in range(COUNTS[len(self.players)].plants_removed):
       to_randomize.pop()
     self.plants = [top_plant] + to_randomize + [plantinfo.Plant(STAGE_3_COST, GREEN, 0, 0)]
@@ -141,6 +143,8 @@ class GameState:
   def json_repr(self):
     data = {}
     for attr, val in self.__dict__.items():
+      if attr == "rng":
+        continue
       if isinstance(val, set):
         data[attr] = sorted(list(val))
       elif attr == "resources":
@@ -166,21 +170,30 @@ class GameState:
 
     handled = {
         "players", "cities", "plants", "resources", "colors", "auction_passed", "market",
-        "pending_buy",
+        "pending_buy", "rng",
     }
     for attr in state.__dict__.keys() - handled:
       setattr(state, attr, gamedata[attr])
     return state
 
   def for_player(self, player_idx):
+    data = self.public_state()
+    data.update(self.player_overlay(player_idx))
+    return data
+
+  def public_state(self):
     data = self.json_repr()
-    data["players"] = [asdict(player) for player in self.players]
-    for idx, playerdict in enumerate(data["players"]):
-      if idx != player_idx and not self.winner:
-        playerdict["money"] = None
+    del data["players"]
     data["plants"] = len(self.plants)
     del data["phase_idx"]
     data["phase"] = self.PHASES[self.phase_idx]
+    return data
+
+  def player_overlay(self, player_idx):
+    data = {"players": [asdict(player) for player in self.players]}
+    for idx, playerdict in enumerate(data["players"]):
+      if idx != player_idx and not self.winner:
+        playerdict["money"] = None
     data["player_idx"] = player_idx
     return data
 
@@ -364,7 +377,7 @@ class GameState:
       next_plant = self.plants.pop(0)
       if next_plant.cost >= STAGE_3_COST:
         self.begin_stage_3 = True
-        random.shuffle(self.plants)
+        self.rng.shuffle(self.plants)
         self.market.append(next_plant)
         changed = True
         yield None
@@ -772,6 +785,7 @@ class PowerPlantGame(BaseGame):
     self.options = {"region": "Germany", "plantlist": "old"}
     self.player_sessions = {}
     self.pending_players = {}
+    self.rng = random
 
   def game_url(self, game_id):
     return f"/powerplant/game.html?game_id={game_id}"
@@ -781,6 +795,11 @@ class PowerPlantGame(BaseGame):
       return f"unstarted power plant game ({len(self.pending_players)} players)"
     return "power plant game"  # TODO
 
+  def set_random(self, rng):
+    self.rng = rng
+    if self.game is not None:
+      self.game.rng = rng
+
   @classmethod
   def parse_json(cls, data):
     gamedata = json.loads(data)
@@ -801,14 +820,12 @@ class PowerPlantGame(BaseGame):
     return json.dumps(output, cls=CustomEncoder)
 
   def for_player(self, session):
+    return self.spliced_for_player(session)
+
+  def public_state(self):
     if self.game is None:
-      idx = None
-      if session in self.pending_players:
-        idx = sorted(self.pending_players).index(session)
       data = {
           "type": "game_state",
-          "host": self.host == session,
-          "player_idx": idx,
           "started": False,
           "options": self.options,
           "players": [],
@@ -816,13 +833,23 @@ class PowerPlantGame(BaseGame):
       }
       for sess in sorted(self.pending_players):
         data["players"].append(self.pending_players[sess])
-      return json.dumps(data, cls=CustomEncoder)
+      return data
+
+    data = self.game.public_state()
+    data["started"] = True
+    return data
 
-    output = self.game.for_player(self.player_sessions.get(session))
-    output["started"] = True
+  def player_overlay(self, session):
+    if self.game is None:
+      idx = None
+      if session in self.pending_players:
+        idx = sorted(self.pending_players).index(session)
+      return {"host": self.host == session, "player_idx": idx}
+
+    output = self.game.player_overlay(self.player_sessions.get(session))
     for sess, idx in self.player_sessions.items():
       output["players"][idx]["disconnected"] = sess not in self.connected
-    return json.dumps(output, cls=CustomEncoder)
+    return output
 
   def connect_user(self, session):
     self.connected.add(session)
@@ -922,12 +949,12 @@ class PowerPlantGame(BaseGame):
     for player_data in self.pending_players.values():
       if not player_data["color"]:
         available_colors = self.COLORS - {data["color"] for data in self.pending_players.values()}
-        player_data["color"] = list(available_colors)[0]
+        player_data["color"] = sorted(available_colors)[0]
     sessions = list(self.pending_players.keys())
-    random.shuffle(sessions)
+    self.rng.shuffle(sessions)
 
     players = [Player(**self.pending_players[session]) for session in sessions]
-    game = GameState(players=players, **self.options)
+    game = GameState(players=players, rng=self.rng, **self.options)
     # NOTE: only update internal state after computing all new states so that internal state
     # remains consistent if something above throws an exception.
     self.player_sessions = {session: idx for idx, session in enumerate(sessions)}
@@ -0,0 +1,83 @@
+// Reassembles game state from the snapshot and patch messages sent by the server.
+// Usage: set ws.onopen = requestSnapshot, then pass each parsed non-error message through
+// decodeState(); it returns the full state to render, or null if there is nothing to render.
+// Patches follow RFC 6902 (add, remove and replace only). States returned by decodeState are
+// never modified afterwards, so they can safely be queued for animation.
+
+stateVersion = null;
+latestState = null;
+resyncPending = false;
+
+function requestSnapshot() {
+  resyncPending = true;
+  ws.send(JSON.stringify({"type": "resync"}));
+}
+
+function decodeState(data) {
+  if (data.type == "snapshot") {
+    resyncPending = false;
+    stateVersion = data.version;
+    latestState = data.state;
+    return latestState;
+  }
+  if (data.type == "patch") {
+    if (latestState == null || data.base !== stateVersion) {
+      // We missed an update somewhere; throw away patches until we get a new snapshot.
+      if (!resyncPending) {
+        requestSnapshot();
+      }
+      return null;
+    }
+    latestState = applyPatch(latestState, data.patch);
+    stateVersion = data.version;
+    return latestState;
+  }
+  // A full state sent before the server received our resync request.
+  return data;
+}
+
+function unescapePointer(token) {
+  return token.replace(/~1/g, "/").replace(/~0/g, "~");
+}
+
+// Copies only the containers along each patched path; everything else is shared with doc.
+function applyPatch(doc, patch) {
+  let copies = new Set();
+  let copyOf = function(obj) {
+    if (copies.has(obj)) {
+      return obj;
+    }
+    let copy = Array.isArray(obj) ? obj.slice() : Object.assign({}, obj);
+    copies.add(copy);
+    return copy;
+  };
+  for (let op of patch) {
+    let keys = op.path.split("/").slice(1).map(unescapePointer);
+    if (!keys.length) {
+      doc = op.value;
+      continue;
+    }
+    doc = copyOf(doc);
+    let parent = doc;
+    for (let key of keys.slice(0, -1)) {
+      parent[key] = copyOf(parent[key]);
+      parent = parent[key];
+    }
+    let last = keys[keys.length - 1];
+    if (Array.isArray(parent)) {
+      let idx = (last == "-") ? parent.length : parseInt(last);
+      if (op.op == "add") {
+        parent.splice(idx, 0, op.value);
+      } else if (op.op == "remove") {
+        parent.splice(idx, 1);
+      } else {
+        parent[idx] = op.value;
+      }
+    } else if (op.op == "remove") {
+      delete parent[last];
+    } else {
+      parent[last] = op.value;
+    }
+  }
+  return doc;
+}
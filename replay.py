@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""Rebuilds a game from its move log by handing the recorded inputs to the game again.
+
+Download the log of a running game from /log?game_id=<id>, then e.g.
+
+  ./replay.py game.log --until 120 --errors
+
+to see the game as it was before the 120th entry, along with every move that the game rejected.
+Games only make the same random choices when the log has a seed (i.e. the server was started with
+--operator and without --secure-random), and only when they are replayed with the same code.
+"""
+
+import argparse
+import collections.abc
+import json
+import random
+
+import game as game_handler
+import server
+
+
+def NewGame(log):
+  classes = {game_class.__name__: game_class for game_class in server.GAME_TYPES.values()}
+  if log.game_type not in classes:
+    raise ValueError(f"Unknown game type {log.game_type}")
+  game_class = classes[log.game_type]
+  game = game_class() if log.snapshot is None else game_class.parse_json(log.snapshot)
+  if game is None:
+    raise ValueError(f"{log.game_type} does not support loading snapshots")
+  if log.seed is not None:
+    game.set_random(random.Random(log.seed))
+  return game
+
+
+def Apply(game, entry):
+  """Applies one log entry the way GameHandler does. Returns the error message, if any."""
+  if entry[0] == "connect":
+    game.connect_user(entry[1])
+    return None
+  if entry[0] == "disconnect":
+    game.disconnect_user(entry[1])
+    return None
+  _, session, data = entry
+  try:
+    result = game.handle(session, data)
+    if isinstance(result, collections.abc.Iterable):
+      for _ in result:
+        pass
+  except Exception as err:  # pylint: disable=broad-except
+    return f"{type(err).__name__}: {err}"
+  return None
+
+
+def Replay(log, until=None):
+  """Returns the game after applying the first until entries, and a list of (idx, error)."""
+  game = NewGame(log)
+  errors = []
+  for idx, entry in enumerate(log.entries[:until]):
+    error = Apply(game, entry)
+    if error is not None:
+      errors.append((idx, error))
+  return game, errors
+
+
+def main(path, until, show_errors, session):
+  with open(path, encoding="utf-8") as reader:
+    log = game_handler.MoveLog.parse_json(reader.read())
+  game, errors = Replay(log, until)
+  applied = len(log.entries) if until is None else min(until, len(log.entries))
+  print(f"{log.game_type}, seed {log.seed}: applied {applied} of {len(log.entries)} entries, "
+        f"{len(errors)} rejected")
+  if show_errors:
+    for idx, error in errors:
+      print(f"  {idx:6} {json.dumps(log.entries[idx])}: {error}")
+  if session is not None:
+    print(game.for_player(session))
+  else:
+    print(game.json_str())
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser()
+  parser.add_argument("log", help="A move log downloaded from /log")
+  parser.add_argument("--until", type=int, default=None, help="Stop before this entry")
+  parser.add_argument("--errors", action="store_true", help="Print the moves that were rejected")
+  parser.add_argument(
+      "--session", default=None, help="Print what this session would see instead of the full game")
+  flags = parser.parse_args()
+  main(flags.log, flags.until, flags.errors, flags.session)
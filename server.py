@@ -2,14 +2,13 @@
 
 import argparse
 import asyncio
+import http.client
 from http import HTTPStatus
-from http.server import HTTPServer, BaseHTTPRequestHandler
+import io
 import json
 import os
 import random
-from socketserver import ThreadingMixIn
 import string
-import threading
 import urllib
 import uuid
 import websockets
@@ -20,13 +19,32 @@ from islanders import islanders
 from mansion import mansion
 from powerplant import powerplant
 import game as game_handler
+import metrics
+import shards
+import static
+import store as game_store
 
 
 ROOT_DIR = os.path.abspath(os.path.dirname(__file__))
-GLOBAL_LOOP = asyncio.get_event_loop()
-GLOBAL_WS_SERVER = None
+ALLOWABLE_DIRS = frozenset([
+    ROOT_DIR + "/eldritch/images",
+    ROOT_DIR + "/eldritch",
+    ROOT_DIR + "/islanders",
+    ROOT_DIR + "/islanders/images",
+    ROOT_DIR + "/islanders/sounds",
+    ROOT_DIR + "/mansion",
+    ROOT_DIR + "/powerplant",
+    ROOT_DIR + "/powerplant/images",
+    ROOT_DIR,
+])
+STATIC_FILES = static.AssetCache(ALLOWABLE_DIRS)
+WS_PORT = 8081  # TODO: this is hard-coded into various .js files.
+MAX_BODY_SIZE = 16 * 1024 * 1024
 INDEX_WEBSOCKETS = set()
-GAMES = {}
+GAMES = {}  # In a sharded server, only the front end's workers have games; see shards.py.
+STORE = None
+SHARDS = []  # The front end's connections to its workers, if sharded.
+RING = None  # shards.HashRing for SHARDS.
 GAME_TYPES = {
     "islanders": islanders.IslandersGame,
     "eldritch": eldritch.EldritchGame,
@@ -35,53 +53,109 @@ GAME_TYPES = {
 }
 # Check to make sure abstract base classes are satisfied.
 [game_class() for game_class in GAME_TYPES.values()]  # pylint: disable=expression-not-assigned
+CATALOGS = None  # Map of path (e.g. /eldritch/catalog.json) to static.StaticFile; see Catalogs().
 
 
-class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+class BadRequest(Exception):
   pass
 
 
-class MyHandler(BaseHTTPRequestHandler):
+class MyHandler:
+  """Handles a single HTTP request.
 
-  def do_GET(self):
+  The response methods mirror the parts of http.server.BaseHTTPRequestHandler that the game
+  handlers use; the response is buffered and written out by HandleHttp once the handler returns.
+  """
+
+  def __init__(self, command, path, headers, body):
+    self.command = command
+    self.path = path
+    self.headers = headers
+    self.body = body
+    self.status = None
+    self.response_headers = []
+    self.wfile = io.BytesIO()
+    # (path, offset, count) of a file to send from disk after the buffered response.
+    self.file_range = None
+
+  def send_response(self, code):
+    self.status = HTTPStatus(code)
+
+  def send_header(self, keyword, value):
+    self.response_headers.append((keyword, str(value)))
+
+  def end_headers(self):
+    pass
+
+  def send_error(self, code, message=None):
+    self.status = HTTPStatus(code)
+    self.response_headers = [("Content-Type", "text/plain; charset=utf-8")]
+    self.wfile = io.BytesIO()
+    self.wfile.write((message or self.status.phrase).encode("utf-8"))
+
+  def encode_response(self, keep_alive):
+    body = self.wfile.getvalue()
+    length = len(body) if self.file_range is None else self.file_range[2]
+    lines = [f"HTTP/1.1 {self.status.value} {self.status.phrase}"]
+    lines.extend(f"{keyword}: {value}" for keyword, value in self.response_headers)
+    if self.status not in (HTTPStatus.NO_CONTENT, HTTPStatus.NOT_MODIFIED):
+      lines.append(f"Content-Length: {length}")
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+  async def write_file(self, writer):
+    path, offset, count = self.file_range
+    await writer.drain()
+    with open(path, "rb") as reader:
+      await asyncio.get_running_loop().sendfile(writer.transport, reader, offset, count)
+
+  async def do_GET(self):
     parsed_url = urllib.parse.urlparse(self.path)
     path = parsed_url.path
     args = urllib.parse.parse_qs(parsed_url.query)
-    game_id_arg = args.get("game_id", [])
-    game = GAMES.get(game_id_arg[0]) if game_id_arg else None
-
-    if game_id_arg and not game:
-      self.send_error(HTTPStatus.BAD_REQUEST.value, f"Unknown game_id {game_id_arg[0]}")
+    if args.get("game_id") and await self.game_request():
       return
-    if game and path.rstrip("/") in game.get_urls():
-      game.handle_get(GLOBAL_LOOP, self, path.rstrip("/"), args)
+    if path == "/metrics":
+      profiles = await Profiles()
+      self.send_response(HTTPStatus.OK.value)
+      self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+      self.end_headers()
+      self.wfile.write(metrics.Render(profiles).encode("utf-8"))
       return
 
-    if path == "/":
-      filepath = "/".join([ROOT_DIR, "index.html"])
-    else:
-      filepath = "/".join([ROOT_DIR, path])
-    filepath = os.path.abspath(filepath)
-    allowable_dirs = [
-        ROOT_DIR + "/eldritch/images",
-        ROOT_DIR + "/eldritch",
-        ROOT_DIR + "/islanders",
-        ROOT_DIR + "/islanders/images",
-        ROOT_DIR + "/islanders/sounds",
-        ROOT_DIR + "/mansion",
-        ROOT_DIR + "/powerplant",
-        ROOT_DIR + "/powerplant/images",
-        ROOT_DIR,
-    ]
-    if os.path.dirname(filepath) not in allowable_dirs:
-      print(f"dirname is {os.path.dirname(filepath)} but roots are {allowable_dirs}")
-      self.send_error(HTTPStatus.FORBIDDEN.value, f"Access to {path} forbidden")
-      return
-    if not os.path.exists(filepath):
+    static_file = Catalogs().get(path)
+    if static_file is None:
+      if path == "/":
+        filepath = "/".join([ROOT_DIR, "index.html"])
+      else:
+        filepath = "/".join([ROOT_DIR, path])
+      filepath = os.path.abspath(filepath)
+      if not STATIC_FILES.is_allowed(filepath):
+        print(f"dirname is {os.path.dirname(filepath)} but roots are {ALLOWABLE_DIRS}")
+        self.send_error(HTTPStatus.FORBIDDEN.value, f"Access to {path} forbidden")
+        return
+      static_file = STATIC_FILES.get(filepath)
+    if static_file is None:
       self.send_error(HTTPStatus.NOT_FOUND.value, f"File {path} not found")
       return
 
-    self.send_response(HTTPStatus.OK.value)
+    try:
+      byte_range = static_file.byte_range(self.headers["Range"])
+    except static.RangeNotSatisfiable:
+      self.send_error(HTTPStatus.REQUESTED_RANGE_NOT_SATISFIABLE.value, f"Bad range for {path}")
+      self.send_header("Content-Range", f"bytes */{static_file.size}")
+      return
+    if byte_range is None:
+      encoding, etag, body = static_file.variant(self.headers["Accept-Encoding"])
+    else:
+      encoding, etag, body = None, static_file.etag, static_file.body
+
+    if static.EtagMatches(self.headers["If-None-Match"], etag):
+      self.send_response(HTTPStatus.NOT_MODIFIED.value)
+    elif byte_range is not None:
+      self.send_response(HTTPStatus.PARTIAL_CONTENT.value)
+    else:
+      self.send_response(HTTPStatus.OK.value)
 
     session = None
     cookie_str = self.headers["Cookie"]
@@ -96,45 +170,153 @@ class MyHandler(BaseHTTPRequestHandler):
       new_session = f"session={uuid.uuid4()}"
       self.send_header("Set-Cookie", new_session)
       print(f"setting session cookie {new_session}")
-    if filepath.endswith(".jpg") or filepath.endswith(".jpeg") or filepath.endswith(".png"):
+    if static_file.is_image():
       self.send_header("Cache-Control", "public, max-age=604800")
+    else:
+      self.send_header("Cache-Control", "no-cache")
+    self.send_header("ETag", etag)
+    self.send_header("Vary", "Accept-Encoding")
+    self.send_header("Accept-Ranges", "bytes")
+    if self.status == HTTPStatus.NOT_MODIFIED:
+      self.end_headers()
+      return
 
+    self.send_header("Content-Type", static_file.content_type)
+    if encoding is not None:
+      self.send_header("Content-Encoding", encoding)
+    offset, count = byte_range or (0, static_file.size)
+    if byte_range is not None:
+      self.send_header("Content-Range", f"bytes {offset}-{offset + count - 1}/{static_file.size}")
     self.end_headers()
 
-    with open(filepath, "rb") as reader:
-      self.wfile.write(reader.read())
+    if body is None:
+      self.file_range = (static_file.path, offset, count)
+    else:
+      self.wfile.write(body[offset:offset + count] if byte_range is not None else body)
 
-  def do_POST(self):
+  async def do_POST(self):
     parsed_url = urllib.parse.urlparse(self.path)
     path = parsed_url.path
     args = urllib.parse.parse_qs(parsed_url.query)
-    data = b""
-    if self.headers["content-length"]:
-      data = self.rfile.read(int(self.headers["content-length"]))
+    data = self.body
 
     if path.rstrip("/") == "/new":
       # TODO: extract a content encoding from content-type header.
-      CreateGame(self, urllib.parse.parse_qs(data.decode("ascii", "strict")))
+      await CreateGame(self, urllib.parse.parse_qs(data.decode("ascii", "strict")))
       return
 
-    game_id_arg = args.get("game_id", [])
-    if not game_id_arg:
+    if not args.get("game_id"):
       self.send_error(HTTPStatus.BAD_REQUEST.value, "Missing required param game_id")
       return
 
-    game = GAMES.get(game_id_arg[0])
+    await self.game_request()
+
+  async def game_request(self):
+    """Handles a request that has a game_id. Returns False if it is for a static file instead."""
+    if not SHARDS:
+      return await self.local_game_request()
+    game_id = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["game_id"][0]
+    headers = list(self.headers.items())
+    try:
+      result = await SHARDS[RING.shard(game_id)].call(
+          "http", self.command, self.path, headers, self.body,
+      )
+    except ConnectionError as err:
+      result = None
+      print(f"could not pass {self.path} on to its shard: {err}")
+    if result is None:
+      self.send_error(HTTPStatus.INTERNAL_SERVER_ERROR.value, f"Could not reach game {game_id}")
+      return True
+    handled, status, self.response_headers, body = result
+    if handled:
+      self.status = HTTPStatus(status)
+      self.wfile.write(body)
+    return handled
+
+  async def local_game_request(self):
+    """Like game_request(), for a game in GAMES."""
+    parsed_url = urllib.parse.urlparse(self.path)
+    path = parsed_url.path.rstrip("/")
+    args = urllib.parse.parse_qs(parsed_url.query)
+    game_id = args["game_id"][0]
+    game = GAMES.get(game_id)
+    if self.command == "POST":
+      if not game:
+        self.send_error(HTTPStatus.BAD_REQUEST.value, f"Game not found: {game_id}")
+      elif path not in game.post_urls():
+        self.send_error(HTTPStatus.NOT_FOUND.value, f"Unknown path {parsed_url.path}")
+      else:
+        await game.handle_post(self, path, args, self.body)
+      return True
     if not game:
-      self.send_error(HTTPStatus.BAD_REQUEST.value, f"Game not found: {game_id_arg[0]}")
-      return
+      self.send_error(HTTPStatus.BAD_REQUEST.value, f"Unknown game_id {game_id}")
+      return True
+    if path in game.get_urls():
+      await game.get(self, path, args)
+      return True
+    return False
 
-    if path.rstrip("/") not in game.post_urls():
-      self.send_error(HTTPStatus.NOT_FOUND.value, f"Unknown path {path}")
-      return
 
-    game.handle_post(GLOBAL_LOOP, self, path.rstrip("/"), args, data)
+async def ReadRequest(reader):
+  """Reads one request from the stream. Returns None if the client closed the connection."""
+  try:
+    head = await reader.readuntil(b"\r\n\r\n")
+  except asyncio.IncompleteReadError as err:
+    if not err.partial.strip():
+      return None
+    raise BadRequest("Incomplete request")
+  except asyncio.LimitOverrunError:
+    raise BadRequest("Request headers too large")
+  request_line, _, header_bytes = head.partition(b"\r\n")
+  try:
+    command, path, version = request_line.decode("latin-1").split()
+  except ValueError:
+    raise BadRequest(f"Bad request line {request_line!r}")
+  headers = http.client.parse_headers(io.BytesIO(header_bytes))
+  length = int(headers["content-length"] or 0)
+  if length < 0 or length > MAX_BODY_SIZE:
+    raise BadRequest(f"Bad content length {length}")
+  body = await reader.readexactly(length) if length else b""
+  return command, path, version, headers, body
+
+
+async def HandleHttp(reader, writer):
+  try:
+    while True:
+      try:
+        request = await ReadRequest(reader)
+      except (BadRequest, ValueError) as err:
+        handler = MyHandler(None, None, None, None)
+        handler.send_error(HTTPStatus.BAD_REQUEST.value, str(err))
+        writer.write(handler.encode_response(keep_alive=False))
+        await writer.drain()
+        return
+      if request is None:
+        return
+      command, path, version, headers, body = request
+      connection = (headers["connection"] or "").lower()
+      keep_alive = connection == "keep-alive" or (version == "HTTP/1.1" and connection != "close")
+
+      handler = MyHandler(command, path, headers, body)
+      if command == "GET":
+        await handler.do_GET()
+      elif command == "POST":
+        await handler.do_POST()
+      else:
+        handler.send_error(HTTPStatus.NOT_IMPLEMENTED.value, f"Unsupported method {command}")
+      writer.write(handler.encode_response(keep_alive))
+      if handler.file_range is not None:
+        await handler.write_file(writer)
+      await writer.drain()
+      if not keep_alive:
+        return
+  except (ConnectionError, asyncio.IncompleteReadError):
+    pass
+  finally:
+    writer.close()
 
 
-def CreateGame(http_handler, data):
+async def CreateGame(http_handler, data):
   if not data.get("type"):
     http_handler.send_error(HTTPStatus.BAD_REQUEST.value, "Missing game type")
     return
@@ -142,18 +324,37 @@ def CreateGame(http_handler, data):
   if game_type not in GAME_TYPES:
     http_handler.send_error(HTTPStatus.BAD_REQUEST.value, f"Unknown game type {game_type}")
     return
-  generated_id = GenerateId(2)
-  if not generated_id:
+  url = None
+  for _ in range(5):
+    generated_id = GenerateId(2)
+    if not generated_id:
+      break
+    if SHARDS:
+      # Only the worker knows whether the id is taken.
+      url = await SHARDS[RING.shard(generated_id)].call("create", generated_id, game_type)
+    else:
+      url = CreateLocalGame(generated_id, game_type)
+    if url is not None:
+      break
+  if url is None:
     http_handler.send_error(
         HTTPStatus.INTERNAL_SERVER_ERROR,
         "no unique game ids left. probably. i didn't try very hard",
     )
     return
-  GAMES[generated_id] = game_handler.GameHandler(generated_id, GAME_TYPES[game_type])
   http_handler.send_response(301)
-  http_handler.send_header("Location", GAMES[generated_id].game_url())
+  http_handler.send_header("Location", url)
   http_handler.end_headers()
-  print(f"Created new game of type {game_type} with id {generated_id}")
+
+
+def CreateLocalGame(game_id, game_type):
+  """Adds a new game to GAMES and returns its url, or returns None if the id is taken."""
+  if game_id in GAMES:
+    return None
+  GAMES[game_id] = game_handler.GameHandler(game_id, GAME_TYPES[game_type], STORE)
+  GAMES[game_id].schedule_snapshot()
+  print(f"Created new game of type {game_type} with id {game_id}")
+  return GAMES[game_id].game_url()
 
 
 def GenerateId(length):
@@ -179,7 +380,7 @@ async def HandleWebsocket(websocket, path):
     await SendGames(websocket)
     return
   game = GAMES.get(game_id)
-  if game is None:
+  if game is None and not SHARDS:
     await PushError(websocket, f"Unknown game {game_id}")
     return
   # TODO: possible cross-site request forgery of websocket data
@@ -192,7 +393,10 @@ async def HandleWebsocket(websocket, path):
     await PushError(
         websocket, "Session cookie not set; you will not be able to resume if you close this tab.",
     )
-  await GameLoop(websocket, session, game)
+  if SHARDS:
+    await ShardLoop(websocket, session, game_id)
+  else:
+    await GameLoop(websocket, session, game)
 
 
 async def GameLoop(websocket, session, game):
@@ -208,7 +412,29 @@ async def GameLoop(websocket, session, game):
     await game.disconnect_user(session, websocket)
 
 
-async def SendGames(websocket):
+async def ShardLoop(websocket, session, game_id):
+  """Like GameLoop, for a game in one of the workers."""
+  shard = SHARDS[RING.shard(game_id)]
+  print(f"new websocket connection by {session} from {websocket.remote_address}")
+  try:
+    if not await shard.relay(websocket, game_id, session, websocket):
+      await PushError(websocket, f"Unknown game {game_id}")
+  except websockets.exceptions.ConnectionClosed:
+    print(f"connection for {session} from {websocket.remote_address} closed unexpectedly")
+  except ConnectionError as err:
+    print(f"lost the worker for game {game_id}: {err}")
+  finally:
+    print(f"closed websocket connection for {session} from {websocket.remote_address}")
+
+
+def GameList():
+  """Returns the games to list in the lobby. A sharded front end uses what its workers last sent."""
+  if SHARDS:
+    return [game for shard in SHARDS for game in shard.games]
+  return LocalGames()
+
+
+def LocalGames():
   game_data = []
   for game_id, game in GAMES.items():
     game_data.append({
@@ -216,7 +442,27 @@ async def SendGames(websocket):
         "status": game.game_status(),
         "url": game.game_url(),
     })
-  await websocket.send(json.dumps({"games": game_data}))
+  return game_data
+
+
+async def Profiles():
+  """Returns a (game type, profile) for each game, and the server's own, for metrics.Render()."""
+  if not SHARDS:
+    return [(None, metrics.SERVER)] + [
+        (handler.game_class.__name__, handler.profile) for handler in GAMES.values()
+    ]
+  profiles = [(None, metrics.SERVER)]
+  for results in await asyncio.gather(*[shard.call("profiles") for shard in SHARDS]):
+    for game_type, counters, histograms in results or []:
+      profile = metrics.Profile()
+      profile.counters.update(counters)
+      profile.histograms.update(histograms)
+      profiles.append((game_type, profile))
+  return profiles
+
+
+async def SendGames(websocket):
+  await websocket.send(json.dumps({"games": GameList()}))
   INDEX_WEBSOCKETS.add(websocket)
   try:
     async for _ in websocket:
@@ -229,52 +475,193 @@ async def SendGames(websocket):
 
 async def SendGameUpdates():
   while True:
-    game_data = []
-    for game_id, game in GAMES.items():
-      game_data.append({
-          "game_id": game_id,
-          "status": game.game_status(),
-          "url": game.game_url(),
-      })
+    game_data = GameList()
     coroutines = [ws.send(json.dumps({"games": game_data})) for ws in INDEX_WEBSOCKETS]
     asyncio.gather(*coroutines)
     await asyncio.sleep(1)
 
 
-def ws_main(loop):
-  port = 8081  # TODO: this is hard-coded into various .js files.
-  global GLOBAL_WS_SERVER  # pylint: disable=global-statement
-  asyncio.set_event_loop(loop)
-  asyncio.ensure_future(SendGameUpdates())
-  start_server = websockets.server.serve(HandleWebsocket, "", port)
-  GLOBAL_WS_SERVER = loop.run_until_complete(start_server)
-  print(f"Websocket server started on port {port}")
-  loop.run_forever()
-
+def LoadGames(store, records=None):
+  """Recreates GAMES from the latest snapshot of each game in the store, or from records.
+
+  records are (game_id, game_type, data) as returned by store.load_all().
+  """
+  classes = {game_class.__name__: game_class for game_class in GAME_TYPES.values()}
+  if records is None:
+    records = store.load_all()
+  for game_id, type_name, data in records:
+    game_class = classes.get(type_name)
+    if game_class is None:
+      print(f"Not restoring game {game_id} of unknown type {type_name}")
+      continue
+    try:
+      game = game_class.parse_json(data)
+    except Exception as err:  # pylint: disable=broad-except
+      print(f"Could not restore game {game_id}: {err}")
+      continue
+    if game is None:
+      print(f"Game type {type_name} does not support loading; not restoring {game_id}")
+      continue
+    GAMES[game_id] = game_handler.GameHandler(game_id, game_class, store)
+    GAMES[game_id].restore(game, data)
+    print(f"Restored game {game_id} of type {type_name}")
+
+
+def Catalogs():
+  """Builds each game type's catalog the first time it is needed; see BaseGame.catalog()."""
+  global CATALOGS  # pylint: disable=global-statement
+  if CATALOGS is None:
+    CATALOGS = {}
+    for name, game_class in GAME_TYPES.items():
+      catalog = game_class.catalog()
+      if catalog is None:
+        continue
+      body = json.dumps(catalog, cls=game_handler.CustomEncoder, sort_keys=True).encode("utf-8")
+      path = f"/{name}/catalog.json"
+      CATALOGS[path] = static.StaticFile.generated(path, body)
+  return CATALOGS
+
+
+class ShardBackend:
+  """What a shard worker does for the front end; see shards.Worker."""
+
+  def __init__(self):
+    self.watcher = asyncio.ensure_future(metrics.WatchLoop()) if metrics.ENABLED else None
+
+  def game(self, game_id):
+    return GAMES.get(game_id)
+
+  def games(self):
+    return LocalGames()
+
+  def create(self, game_id, game_type):
+    return CreateLocalGame(game_id, game_type)
+
+  async def http(self, command, path, headers, body):
+    """Returns whether the request was handled, and the status, headers and body if it was."""
+    header_bytes = "".join(f"{keyword}: {value}\r\n" for keyword, value in headers)
+    handler = MyHandler(command, path, http.client.parse_headers(
+        io.BytesIO(header_bytes.encode("latin-1") + b"\r\n")), body)
+    handled = await handler.local_game_request()
+    if not handled:
+      return False, None, [], b""
+    return True, handler.status.value, handler.response_headers, handler.wfile.getvalue()
+
+  def profiles(self):
+    return [(None, dict(metrics.SERVER.counters), dict(metrics.SERVER.histograms))] + [
+        (handler.game_class.__name__, dict(handler.profile.counters),
+         dict(handler.profile.histograms))
+        for handler in GAMES.values()
+    ]
 
-def main(port):
+  def close(self):
+    if self.watcher is not None:
+      self.watcher.cancel()
+    SaveAll()
+
+
+def StartShard(store_path, records):
+  """Runs in a new worker: restores its games, and returns its ShardBackend."""
+  global STORE  # pylint: disable=global-statement
+  if store_path:
+    STORE = game_store.OpenStore(store_path)
+    LoadGames(STORE, records)
+  return ShardBackend()
+
+
+def StartShards(count, store_path):
+  """Starts the workers for a sharded front end, giving each one its games from the store."""
+  global RING  # pylint: disable=global-statement
+  RING = shards.HashRing(count)
+  records = []
+  if store_path:
+    # Read the store once here, instead of in every worker; the workers only write to it.
+    store = game_store.OpenStore(store_path)
+    records = store.load_all()
+    store.close()
+  return shards.StartWorkers(count, StartShard, lambda idx: (
+      store_path, [record for record in records if RING.shard(record[0]) == idx],
+  ))
+
+
+async def Serve(http_port, ws_port, workers=()):
+  SHARDS.extend(await shards.ConnectWorkers(workers))
+  STATIC_FILES.warm()
+  Catalogs()
+  http_server = await asyncio.start_server(HandleHttp, "", http_port)
+  print(f"Started server on port {http_port}")
+  async with websockets.server.serve(HandleWebsocket, "", ws_port):
+    print(f"Websocket server started on port {ws_port}")
+    tasks = [asyncio.ensure_future(SendGameUpdates())]
+    if metrics.ENABLED:
+      tasks.append(asyncio.ensure_future(metrics.WatchLoop()))
+    try:
+      async with http_server:
+        await http_server.serve_forever()
+    finally:
+      for task in tasks:
+        task.cancel()
+      for shard in SHARDS:
+        await shard.stop()
+
+
+def SaveAll():
+  """Writes any unsaved changes to the store before exiting."""
+  game_handler.GAME_EXECUTOR.shutdown(wait=True)
+  game_handler.SNAPSHOT_EXECUTOR.shutdown(wait=True)
+  if STORE is not None:
+    for game in GAMES.values():
+      if game.dirty:
+        game.write_snapshot(game.game.snapshot_later())
+    STORE.close()
+
+
+def main(port, store_path=None, secure_random=False, enable_metrics=False, *, shard_count=0,
+         ws_port=WS_PORT, operator=False):
+  global STORE  # pylint: disable=global-statement
+  game_handler.SECURE_RANDOM = secure_random
+  game_handler.OPERATOR = operator
+  if enable_metrics:
+    metrics.Enable()
+  workers = []
+  if shard_count:
+    workers = StartShards(shard_count, store_path)
+  elif store_path:
+    STORE = game_store.OpenStore(store_path)
+    LoadGames(STORE)
   try:
-    server = ThreadingHTTPServer(("", port), MyHandler)
-    print(f"Started server on port {port}")
-    server.serve_forever()
-  except (KeyboardInterrupt, Exception) as err:  # pylint: disable=broad-except
-    if isinstance(err, KeyboardInterrupt):
-      print("keyboard interrupt received; shutting down")
-    else:
-      print(f"{err} {err.__class__} occurred; shutting down")
-    server.socket.close()
-    GLOBAL_WS_SERVER.close()
-    fut = asyncio.run_coroutine_threadsafe(GLOBAL_WS_SERVER.wait_closed(), GLOBAL_LOOP)
-    fut.result(10)
-    GLOBAL_LOOP.stop()
+    asyncio.run(Serve(port, ws_port, workers))
+  except KeyboardInterrupt:
+    print("keyboard interrupt received; shutting down")
+  finally:
+    SaveAll()
 
 
 if __name__ == "__main__":
   parser = argparse.ArgumentParser()
   parser.add_argument(
       "--http-port", type=int, help="HTTP port", metavar="PORT", default=8001)
+  parser.add_argument(
+      "--store", help="Save games to this file (.db for sqlite, anything else for an append-only "
+      "log) and restore them on startup", metavar="PATH", default=None)
+  parser.add_argument(
+      "--secure-random", action="store_true", help="Use the operating system's random number "
+      "generator instead of seeding one per game; move logs will not replay dice rolls")
+  parser.add_argument(
+      "--operator", action="store_true", help="Include each game's seed in /log and its random "
+      "generator in /dump and /json, so that running games can be replayed; anyone who knows a "
+      "game id can then predict its dice")
+  parser.add_argument(
+      "--metrics", action="store_true", help="Record timings and counters for every game, served "
+      "at /metrics and /profile?game_id=<id>")
+  parser.add_argument(
+      "--shards", type=int, help="Run games in this many worker processes, each game always in "
+      "the same one; the main process only passes requests on", metavar="N", default=0)
+  parser.add_argument(
+      "--ws-port", type=int, help="Websocket port; the pages always connect to the default",
+      metavar="PORT", default=WS_PORT)
   flags = parser.parse_args()
-  t2 = threading.Thread(target=ws_main, args=(GLOBAL_LOOP,))
-  t2.start()
-  main(flags.http_port)
-  t2.join()
+  if flags.shards and flags.store and not flags.store.endswith(game_store.SQLITE_SUFFIXES):
+    parser.error("--shards needs an sqlite --store, since every worker writes to it")
+  main(flags.http_port, flags.store, flags.secure_random, flags.metrics,
+       shard_count=flags.shards, ws_port=flags.ws_port, operator=flags.operator)
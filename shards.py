@@ -0,0 +1,322 @@
+"""Runs games in worker processes behind one front end (server.py --shards).
+
+Every game lives in exactly one worker, chosen by hashing its id onto a ring (see HashRing), so a
+slow move only holds up the games that share its worker. The front process keeps the listening
+sockets. It serves static files itself and passes websocket messages and game requests on to the
+worker that owns the game, over a socket pair. Workers run the same server code as an unsharded
+server, with server.GAMES holding only their own games.
+
+Workers tell the front about their games every second, so that the lobby can be sent without
+waiting on a worker that is busy with a move.
+
+Messages in either direction are pickled dicts with an "op", each preceded by its length.
+From the front to a worker:
+  open (id, conn, game_id, session): a websocket connected to a game. The reply says whether the
+    game exists.
+  frame (conn, data): a message from that websocket.
+  close (conn): the websocket closed.
+  call (id, name, args): calls backend.<name>(*args) and replies with the result.
+From a worker to the front:
+  send (conn, data): sends data to a websocket.
+  reply (id, result): the answer to an open or call.
+  games (games): the worker's games, as listed in the lobby.
+"""
+
+import asyncio
+import bisect
+import hashlib
+import itertools
+import multiprocessing
+import pickle
+import socket
+import struct
+import sys
+import traceback
+
+_LENGTH = struct.Struct("!I")
+
+
+class HashRing:
+  """Maps game ids to shards with consistent hashing.
+
+  Each shard owns many points on a ring of 64-bit hashes, and a game belongs to the shard that owns
+  the first point at or after the hash of its id. Adding a shard only moves the games that land
+  on its points. The hash does not depend on PYTHONHASHSEED, so every process agrees.
+  """
+
+  def __init__(self, shard_count, points_per_shard=64):
+    points = sorted(
+        (self.hash(f"{shard}:{point}"), shard)
+        for shard in range(shard_count) for point in range(points_per_shard)
+    )
+    self.hashes = [point_hash for point_hash, _ in points]
+    self.shards = [shard for _, shard in points]
+
+  @staticmethod
+  def hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "big")
+
+  def shard(self, game_id):
+    idx = bisect.bisect_left(self.hashes, self.hash(game_id))
+    return self.shards[idx % len(self.shards)]
+
+
+async def ReadMessage(reader):
+  """Returns the next message, or None if the other end has closed the connection."""
+  try:
+    header = await reader.readexactly(_LENGTH.size)
+    return pickle.loads(await reader.readexactly(_LENGTH.unpack(header)[0]))
+  except (asyncio.IncompleteReadError, ConnectionError):
+    return None
+
+
+def WriteMessage(writer, message):
+  data = pickle.dumps(message, protocol=pickle.HIGHEST_PROTOCOL)
+  writer.write(_LENGTH.pack(len(data)) + data)
+
+
+class ProxyWebsocket:
+  """Stands in for a websocket connected to the front end, as far as a GameHandler can tell."""
+
+  def __init__(self, worker, conn):
+    self.worker = worker
+    self.conn = conn
+
+  async def send(self, data):
+    await self.worker.write({"op": "send", "conn": self.conn, "data": data})
+
+
+class Worker:
+  """The worker's end of the socket pair.
+
+  backend is asked for games by id, and has the methods that the front end may call; see
+  server.ShardBackend. Each websocket gets a queue and a task, so that its messages are handled in
+  order, as they would be by server.GameLoop, while other websockets carry on.
+  """
+
+  PUBLISH_INTERVAL = 1
+
+  def __init__(self, reader, writer, backend):
+    self.reader = reader
+    self.writer = writer
+    self.backend = backend
+    self.queues = {}
+    self.tasks = set()
+    self.write_lock = asyncio.Lock()  # Before Python 3.10, only one drain() may wait at a time.
+
+  async def write(self, message):
+    async with self.write_lock:
+      WriteMessage(self.writer, message)
+      await self.writer.drain()
+
+  def start(self, coroutine):
+    task = asyncio.ensure_future(coroutine)
+    self.tasks.add(task)
+    task.add_done_callback(self.tasks.discard)
+
+  async def run(self):
+    publisher = asyncio.ensure_future(self.publish_games())
+    try:
+      while True:
+        message = await ReadMessage(self.reader)
+        if message is None:
+          return
+        self.dispatch(message)
+    finally:
+      publisher.cancel()
+      for queue in self.queues.values():
+        queue.put_nowait(None)
+      self.writer.close()
+
+  def dispatch(self, message):
+    if message["op"] == "open":
+      game = self.backend.game(message["game_id"])
+      self.start(self.write({"op": "reply", "id": message["id"], "result": game is not None}))
+      if game is not None:
+        self.queues[message["conn"]] = asyncio.Queue()
+        self.start(self.play(game, message["conn"], message["session"]))
+    elif message["op"] in ("frame", "close"):
+      queue = self.queues.get(message["conn"])
+      if queue is not None:
+        queue.put_nowait(message.get("data"))
+    elif message["op"] == "call":
+      self.start(self.call(message["id"], message["name"], message["args"]))
+
+  async def play(self, game, conn, session):
+    websocket = ProxyWebsocket(self, conn)
+    queue = self.queues[conn]
+    await game.connect_user(session, websocket)
+    try:
+      while True:
+        data = await queue.get()
+        if data is None:
+          return
+        await game.handle(websocket, session, data)
+    finally:
+      del self.queues[conn]
+      await game.disconnect_user(session, websocket)
+
+  async def call(self, call_id, name, args):
+    try:
+      result = getattr(self.backend, name)(*args)
+      if asyncio.iscoroutine(result):
+        result = await result
+    except Exception:  # pylint: disable=broad-except
+      traceback.print_exc()
+      result = None
+    await self.write({"op": "reply", "id": call_id, "result": result})
+    if name == "create":
+      await self.write({"op": "games", "games": self.backend.games()})
+
+  async def publish_games(self):
+    while True:
+      await self.write({"op": "games", "games": self.backend.games()})
+      await asyncio.sleep(self.PUBLISH_INTERVAL)
+
+
+class Shard:
+  """The front end's connection to one worker process."""
+
+  def __init__(self, process, reader, writer):
+    self.process = process
+    self.reader = reader
+    self.writer = writer
+    self.ids = itertools.count()
+    self.replies = {}
+    self.outboxes = {}  # conn -> queue of data to send to that websocket
+    self.games = []
+    self.reading = None
+    self.write_lock = asyncio.Lock()  # See Worker.write_lock.
+
+  def start(self):
+    self.reading = asyncio.ensure_future(self.read())
+
+  async def read(self):
+    while True:
+      message = await ReadMessage(self.reader)
+      if message is None:
+        break
+      if message["op"] == "reply":
+        future = self.replies.pop(message["id"], None)
+        if future is not None and not future.done():
+          future.set_result(message["result"])
+      elif message["op"] == "send":
+        outbox = self.outboxes.get(message["conn"])
+        if outbox is not None:
+          outbox.put_nowait(message["data"])
+      elif message["op"] == "games":
+        self.games = message["games"]
+    for future in self.replies.values():
+      if not future.done():
+        future.set_exception(ConnectionError("shard worker exited"))
+    self.replies.clear()
+
+  async def write(self, message):
+    async with self.write_lock:
+      WriteMessage(self.writer, message)
+      await self.writer.drain()
+
+  async def request(self, message):
+    message["id"] = next(self.ids)
+    future = asyncio.get_running_loop().create_future()
+    self.replies[message["id"]] = future
+    await self.write(message)
+    return await future
+
+  async def call(self, name, *args):
+    return await self.request({"op": "call", "name": name, "args": args})
+
+  async def relay(self, websocket, game_id, session, messages):
+    """Connects websocket to a game in this shard. Returns False if there is no such game.
+
+    Forwards everything from messages (an async iterator, usually the websocket itself) until it
+    ends, and sends the game's pushes to the websocket until then.
+    """
+    conn = next(self.ids)
+    outbox = asyncio.Queue()
+    self.outboxes[conn] = outbox
+    sender = asyncio.ensure_future(self.send_all(websocket, outbox))
+    try:
+      if not await self.request({"op": "open", "conn": conn, "game_id": game_id,
+                                 "session": session}):
+        return False
+      try:
+        async for data in messages:
+          await self.write({"op": "frame", "conn": conn, "data": data})
+      finally:
+        WriteMessage(self.writer, {"op": "close", "conn": conn})
+      return True
+    finally:
+      del self.outboxes[conn]
+      sender.cancel()
+
+  @staticmethod
+  async def send_all(websocket, outbox):
+    while True:
+      data = await outbox.get()
+      await websocket.send(data)
+
+  async def stop(self):
+    """Closes the connection, which tells the worker to save its games and exit, and waits."""
+    self.writer.close()
+    try:
+      await self.writer.wait_closed()
+    except ConnectionError:
+      pass
+    if self.reading is not None:
+      self.reading.cancel()
+    await asyncio.get_running_loop().run_in_executor(None, self.process.join, 10)
+    if self.process.is_alive():
+      self.process.terminate()
+
+
+def _RunWorker(sock, inherited, target, args):
+  for other in inherited:
+    other.close()
+
+  async def Serve():
+    reader, writer = await asyncio.open_connection(sock=sock)
+    backend = target(*args)
+    try:
+      await Worker(reader, writer, backend).run()
+    finally:
+      backend.close()
+  try:
+    asyncio.run(Serve())
+  except KeyboardInterrupt:
+    pass
+  finally:
+    sys.stdout.flush()
+
+
+def StartWorkers(count, target, args_for_shard):
+  """Forks count workers, and returns (socket, process) pairs to pass to ConnectWorkers().
+
+  Call this before starting an event loop. The workers are forked, so they start with everything
+  this process has loaded. Each worker calls target(*args_for_shard(idx)) from inside its own
+  event loop to get its backend, and closes the backend when the front end goes away.
+  """
+  context = multiprocessing.get_context("fork")
+  pairs = []
+  for idx in range(count):
+    front, back = socket.socketpair()
+    inherited = [pair[0] for pair in pairs] + [front]
+    process = context.Process(
+        target=_RunWorker, args=(back, inherited, target, args_for_shard(idx)),
+        name=f"shard{idx}", daemon=True,
+    )
+    process.start()
+    back.close()
+    pairs.append((front, process))
+  return pairs
+
+
+async def ConnectWorkers(pairs):
+  """Returns a started Shard for each worker from StartWorkers()."""
+  shards = []
+  for sock, process in pairs:
+    reader, writer = await asyncio.open_connection(sock=sock)
+    shard = Shard(process, reader, writer)
+    shard.start()
+    shards.append(shard)
+  return shards
@@ -0,0 +1,166 @@
+import gzip
+import hashlib
+import io
+import mimetypes
+import os
+import re
+import stat as statlib
+import time
+
+try:
+  import brotli
+except ImportError:
+  brotli = None
+
+
+COMPRESSIBLE_TYPES = {
+    "application/javascript", "application/json", "image/svg+xml", "text/css", "text/html",
+    "text/javascript", "text/plain",
+}
+MIN_COMPRESS_SIZE = 512
+# Files at least this big are not kept in memory; they are sent straight from disk.
+SENDFILE_SIZE = 1024 * 1024
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+WARM_EXTENSIONS = {".css", ".html", ".jpeg", ".jpg", ".js", ".json", ".mp3", ".png", ".svg"}
+
+
+class RangeNotSatisfiable(Exception):
+  pass
+
+
+class StaticFile:
+
+  def __init__(self, path, stat):
+    self.path = path
+    self.size = stat.st_size
+    self.mtime_ns = stat.st_mtime_ns
+    self.checked = time.monotonic()
+    self.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if self.content_type.startswith("text/") or self.content_type == "application/javascript":
+      self.content_type += "; charset=utf-8"
+    self.body = None
+    self.encoded = {}  # Map of content-encoding to compressed body.
+    if self.size >= SENDFILE_SIZE:
+      self.etag = f'"{self.size:x}-{self.mtime_ns:x}"'
+      return
+    with open(path, "rb") as reader:
+      self.set_body(reader.read())
+
+  def set_body(self, body):
+    self.body = body
+    self.size = len(body)
+    self.etag = '"' + hashlib.sha1(self.body).hexdigest()[:20] + '"'
+    self.encoded = {}
+    if self.size < MIN_COMPRESS_SIZE or self.content_type.split(";")[0] not in COMPRESSIBLE_TYPES:
+      return
+    compressed = {"gzip": Gzip(self.body)}
+    if brotli is not None:
+      compressed["br"] = brotli.compress(self.body)
+    # Only keep the variants that are actually smaller.
+    self.encoded = {enc: data for enc, data in compressed.items() if len(data) < self.size}
+
+  @classmethod
+  def generated(cls, path, body):
+    """Returns a StaticFile for a body built by the server, e.g. a game's catalog.
+
+    path is only used to guess the content type; nothing is read from disk.
+    """
+    static_file = cls.__new__(cls)
+    static_file.path = path
+    static_file.mtime_ns = 0
+    static_file.checked = time.monotonic()
+    static_file.content_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    static_file.set_body(body)
+    return static_file
+
+  def is_image(self):
+    return self.content_type.startswith("image/")
+
+  def variant(self, accept_encoding):
+    """Returns (content-encoding, etag, body) of the best variant for this Accept-Encoding."""
+    accepted = {
+        token.split(";")[0].strip().lower() for token in (accept_encoding or "").split(",")
+        if not token.replace(" ", "").endswith(";q=0")
+    }
+    for encoding in ["br", "gzip"]:
+      if encoding in self.encoded and encoding in accepted:
+        return encoding, self.etag[:-1] + "-" + encoding + '"', self.encoded[encoding]
+    return None, self.etag, self.body
+
+  def byte_range(self, range_header):
+    """Parses a single-range Range header. Returns (offset, count), or None for the whole file."""
+    match = RANGE_RE.match((range_header or "").strip())
+    if not match or match.groups() == ("", ""):
+      return None
+    first, last = match.groups()
+    if not first:  # A suffix range: the last N bytes.
+      count = min(int(last), self.size)
+      if count == 0:
+        raise RangeNotSatisfiable()
+      return self.size - count, count
+    first = int(first)
+    last = min(int(last), self.size - 1) if last else self.size - 1
+    if first >= self.size or last < first:
+      raise RangeNotSatisfiable()
+    return first, last - first + 1
+
+
+def Gzip(body):
+  """Returns body gzipped without a timestamp, so the same body always gives the same bytes."""
+  output = io.BytesIO()
+  with gzip.GzipFile(fileobj=output, mode="wb", mtime=0) as writer:
+    writer.write(body)
+  return output.getvalue()
+
+
+def EtagMatches(if_none_match, etag):
+  if not if_none_match:
+    return False
+  if if_none_match.strip() == "*":
+    return True
+  tags = [tag.strip() for tag in if_none_match.split(",")]
+  return etag in tags or etag in [tag[2:] for tag in tags if tag.startswith("W/")]
+
+
+class AssetCache:
+  """Caches static files in memory, keyed by absolute path.
+
+  Entries are loaded lazily and reloaded when the file's mtime or size changes. The file is only
+  stat()ed again after recheck_seconds, so bursts of requests for the same file hit memory only.
+  """
+
+  def __init__(self, allowed_dirs, recheck_seconds=1.0):
+    self.allowed_dirs = frozenset(allowed_dirs)
+    self.recheck_seconds = recheck_seconds
+    self.files = {}
+
+  def is_allowed(self, filepath):
+    return os.path.dirname(filepath) in self.allowed_dirs
+
+  def get(self, filepath):
+    """Returns the StaticFile for the given absolute path, or None if it does not exist."""
+    cached = self.files.get(filepath)
+    now = time.monotonic()
+    if cached is not None and now - cached.checked < self.recheck_seconds:
+      return cached
+    try:
+      stat = os.stat(filepath)
+    except OSError:
+      stat = None
+    if stat is None or not statlib.S_ISREG(stat.st_mode):
+      self.files.pop(filepath, None)
+      return None
+    if cached is not None and (cached.mtime_ns, cached.size) == (stat.st_mtime_ns, stat.st_size):
+      cached.checked = now
+      return cached
+    self.files[filepath] = StaticFile(filepath, stat)
+    return self.files[filepath]
+
+  def warm(self):
+    """Loads every web asset in the allowed directories."""
+    for dirname in self.allowed_dirs:
+      if not os.path.isdir(dirname):
+        continue
+      for name in os.listdir(dirname):
+        if os.path.splitext(name)[1] in WARM_EXTENSIONS:
+          self.get(os.path.join(dirname, name))
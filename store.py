@@ -0,0 +1,132 @@
+import abc
+import json
+import os
+import sqlite3
+import threading
+import time
+
+
+class GameStore(metaclass=abc.ABCMeta):
+  """Persists serialized games so that they survive a server restart.
+
+  save() is called from a snapshot worker thread; load_all() is called once at startup.
+  """
+
+  @abc.abstractmethod
+  def save(self, game_id, game_type, data):
+    pass
+
+  @abc.abstractmethod
+  def load_all(self):
+    """Returns a list of (game_id, game_type, data) for the latest snapshot of every game."""
+    return []
+
+  def close(self):
+    pass
+
+
+class SqliteStore(GameStore):
+
+  def __init__(self, path):
+    self.lock = threading.Lock()
+    self.conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    self.conn.execute("PRAGMA journal_mode=WAL")
+    self.conn.execute(
+        "CREATE TABLE IF NOT EXISTS games ("
+        "game_id TEXT PRIMARY KEY, game_type TEXT NOT NULL, data TEXT NOT NULL, updated REAL)"
+    )
+
+  def save(self, game_id, game_type, data):
+    with self.lock:
+      self.conn.execute(
+          "INSERT OR REPLACE INTO games (game_id, game_type, data, updated) VALUES (?, ?, ?, ?)",
+          (game_id, game_type, data, time.time()),
+      )
+
+  def load_all(self):
+    with self.lock:
+      return list(self.conn.execute("SELECT game_id, game_type, data FROM games ORDER BY updated"))
+
+  def close(self):
+    with self.lock:
+      self.conn.close()
+
+
+class AppendOnlyStore(GameStore):
+  """Appends one JSON line per snapshot, and compacts the file to the latest snapshots.
+
+  The file is compacted on load, and whenever it has grown to twice its size after the last
+  compaction (and to at least MIN_COMPACT_BYTES), so it stays within a small multiple of the size
+  of the latest snapshots however long the server runs.
+  """
+
+  MIN_COMPACT_BYTES = 16 << 20
+
+  def __init__(self, path):
+    self.path = path
+    self.lock = threading.Lock()
+    self.writer = None
+    self.compact_at = None
+
+  def save(self, game_id, game_type, data):
+    line = json.dumps({"game_id": game_id, "game_type": game_type, "data": data}) + "\n"
+    with self.lock:
+      if self.writer is None:
+        self.writer = open(self.path, "a", encoding="utf-8")  # pylint: disable=consider-using-with
+      if self.compact_at is None:
+        self.compact_at = max(self.MIN_COMPACT_BYTES, 2 * self.writer.tell())
+      self.writer.write(line)
+      self.writer.flush()
+      os.fsync(self.writer.fileno())
+      if self.writer.tell() >= self.compact_at:
+        self.compact(self.read_latest().values())
+
+  def load_all(self):
+    with self.lock:
+      if not os.path.exists(self.path):
+        return []
+      latest = self.read_latest()
+      self.compact(latest.values())
+    return [(rec["game_id"], rec["game_type"], rec["data"]) for rec in latest.values()]
+
+  def read_latest(self):
+    """Returns the latest record of every game in the file, oldest first."""
+    latest = {}
+    with open(self.path, encoding="utf-8") as reader:
+      for line in reader:
+        try:
+          record = json.loads(line)
+        except json.JSONDecodeError:
+          # Most likely a partial line written right before a crash.
+          continue
+        latest.pop(record["game_id"], None)
+        latest[record["game_id"]] = record
+    return latest
+
+  def compact(self, records):
+    if self.writer is not None:
+      self.writer.close()
+      self.writer = None
+    tmp_path = self.path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as writer:
+      for record in records:
+        writer.write(json.dumps(record) + "\n")
+      writer.flush()
+      os.fsync(writer.fileno())
+      self.compact_at = max(self.MIN_COMPACT_BYTES, 2 * writer.tell())
+    os.replace(tmp_path, self.path)
+
+  def close(self):
+    with self.lock:
+      if self.writer is not None:
+        self.writer.close()
+        self.writer = None
+
+
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+
+
+def OpenStore(path):
+  if path.endswith(SQLITE_SUFFIXES):
+    return SqliteStore(path)
+  return AppendOnlyStore(path)
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import threading
+import time
+import unittest
+
+from eldritch import ancient_ones
+from eldritch import eldritch
+from islanders import islanders
+from mansion import mansion
+from powerplant import powerplant
+import game
+
+
+class FakeWebsocket:
+
+  def __init__(self):
+    self.sent = []
+
+  async def send(self, data):
+    self.sent.append(data)
+
+
+def ApplyPatch(doc, patch):
+  for operation in patch:
+    keys = [
+        key.replace("~1", "/").replace("~0", "~") for key in operation["path"].split("/")[1:]
+    ]
+    if not keys:
+      doc = operation["value"]
+      continue
+    parent = doc
+    for key in keys[:-1]:
+      parent = parent[int(key)] if isinstance(parent, list) else parent[key]
+    last = int(keys[-1]) if isinstance(parent, list) else keys[-1]
+    if operation["op"] == "remove":
+      del parent[last]
+    elif operation["op"] == "add" and isinstance(parent, list):
+      parent.insert(last, operation["value"])
+    else:
+      parent[last] = operation["value"]
+  return doc
+
+
+class SpliceJsonTest(unittest.TestCase):
+
+  def testSplice(self):
+    spliced = game.SpliceJson(json.dumps({"a": 1, "b": [2]}), json.dumps({"c": None}))
+    self.assertDictEqual(json.loads(spliced), {"a": 1, "b": [2], "c": None})
+
+  def testEmptyOverlay(self):
+    self.assertEqual(game.SpliceJson('{"a": 1}', "{}"), '{"a": 1}')
+
+  def testEmptyPublic(self):
+    self.assertDictEqual(json.loads(game.SpliceJson("{}", '{"c": 3}')), {"c": 3})
+
+
+class JsonDiffTest(unittest.TestCase):
+
+  def assertPatches(self, old, new):
+    patch = game.JsonDiff(old, new)
+    self.assertEqual(ApplyPatch(json.loads(json.dumps(old)), patch), new)
+    return patch
+
+  def testIdentical(self):
+    self.assertEqual(self.assertPatches({"a": [1, {"b": None}]}, {"a": [1, {"b": None}]}), [])
+
+  def testNestedChange(self):
+    patch = self.assertPatches({"a": {"b": 1, "c": 2}}, {"a": {"b": 1, "c": 3}})
+    self.assertEqual(patch, [{"op": "replace", "path": "/a/c", "value": 3}])
+
+  def testAddRemoveKeys(self):
+    self.assertPatches({"a": 1, "b/c": 2, "d~": 3}, {"a": 1, "e": 4})
+    self.assertPatches({}, {"x": {"y": [1]}})
+
+  def testLists(self):
+    self.assertPatches({"a": [1, 2, 3, 4, 5]}, {"a": [1, 2, 9, 4, 5, 6, 7]})
+    self.assertPatches({"a": [1, 2, 3, 4, 5]}, {"a": [1, 2]})
+    patch = self.assertPatches({"a": [1, 2, 3, 4]}, {"a": [0, 1, 2, 3, 4]})
+    self.assertEqual(patch, [{"op": "replace", "path": "/a", "value": [0, 1, 2, 3, 4]}])
+
+  def testTypeChanges(self):
+    self.assertEqual(len(self.assertPatches({"a": 1}, {"a": True})), 1)
+    self.assertEqual(len(self.assertPatches({"a": 1}, {"a": 1.0})), 1)
+    self.assertPatches({"a": [1]}, {"a": {"0": 1}})
+    self.assertPatches([1], {"a": 1})
+
+
+class PushTest(unittest.TestCase):
+
+  def connect(self, handler, sessions):
+    websockets = {}
+    for session in sessions:
+      websockets[session] = FakeWebsocket()
+      asyncio.run(handler.connect_user(session, websockets[session]))
+    return websockets
+
+  def assertPushMatchesForPlayer(self, handler, websockets):
+    for websocket in websockets.values():
+      websocket.sent.clear()
+    asyncio.run(handler.push())
+    for session, websocket in websockets.items():
+      self.assertEqual(len(websocket.sent), 1)
+      expected = json.loads(handler.game.for_player(session))
+      self.assertDictEqual(json.loads(websocket.sent[0]), expected)
+
+  def testEldritch(self):
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    handler.game.game.ancient_one = ancient_ones.DummyAncient()
+    websockets = self.connect(handler, ["A", "B", "C"])
+    for session, char in [("A", "Nun"), ("B", "Doctor")]:
+      for _ in handler.game.handle(session, {"type": "join", "char": char}):
+        pass
+    self.assertPushMatchesForPlayer(handler, websockets)
+    for _ in handler.game.handle("A", {"type": "start"}):
+      pass
+    self.assertPushMatchesForPlayer(handler, websockets)
+    self.assertEqual(json.loads(websockets["B"].sent[0])["player_idx"], 1)
+    self.assertIsNone(json.loads(websockets["C"].sent[0])["player_idx"])
+
+  def testIslanders(self):
+    handler = game.GameHandler("test", islanders.IslandersGame)
+    websockets = self.connect(handler, ["A", "B", "C"])
+    handler.game.handle("A", {"type": "join", "name": "A", "color": "red"})
+    handler.game.handle("B", {"type": "join", "name": "B", "color": "blue"})
+    self.assertPushMatchesForPlayer(handler, websockets)
+    handler.game.handle("A", {"type": "start", "options": {}})
+    self.assertPushMatchesForPlayer(handler, websockets)
+    data = json.loads(websockets["B"].sent[0])
+    self.assertIsNotNone(data["you"])
+    self.assertIn("cards", data)
+    self.assertNotIn("cards", json.loads(websockets["C"].sent[0]))
+
+  def testPowerPlant(self):
+    handler = game.GameHandler("test", powerplant.PowerPlantGame)
+    websockets = self.connect(handler, ["A", "B", "C", "D"])
+    for session, color in [("A", "red"), ("B", "blue"), ("C", "deepskyblue")]:
+      handler.game.handle(session, {"type": "join", "name": session, "color": color})
+    self.assertPushMatchesForPlayer(handler, websockets)
+    handler.game.handle("A", {"type": "start"})
+    self.assertPushMatchesForPlayer(handler, websockets)
+    moneys = [player["money"] for player in json.loads(websockets["A"].sent[0])["players"]]
+    self.assertEqual(moneys.count(None), 2)
+
+  def testMansion(self):
+    handler = game.GameHandler("test", mansion.MansionGame)
+    websockets = self.connect(handler, ["A", "B"])
+    for _ in handler.game.handle("A", {"type": "start"}):
+      pass
+    self.assertPushMatchesForPlayer(handler, websockets)
+
+  def testPublicStateComputedOncePerPush(self):
+    handler = game.GameHandler("test", mansion.MansionGame)
+    websockets = self.connect(handler, ["A", "B", "C"])
+    calls = []
+    orig = handler.game.public_state
+
+    def public_state():
+      calls.append(None)
+      return orig()
+
+    handler.game.public_state = public_state
+    self.assertPushMatchesForPlayer(handler, websockets)
+    # for_player() is called once per session by the assertion; push() calls it once in total.
+    self.assertEqual(len(calls), 1 + len(websockets))
+
+
+class PatchPushTest(unittest.TestCase):
+
+  def setUp(self):
+    self.handler = game.GameHandler("test", powerplant.PowerPlantGame)
+    self.websockets = {session: FakeWebsocket() for session in ["A", "B", "C"]}
+    for session, websocket in self.websockets.items():
+      asyncio.run(self.handler.connect_user(session, websocket))
+    self.states = {}
+
+  def handle(self, session, data):
+    asyncio.run(self.handler.handle(self.websockets[session], session, json.dumps(data)))
+
+  def resync(self, session):
+    self.websockets[session].sent.clear()
+    self.handle(session, {"type": "resync"})
+    self.assertEqual(len(self.websockets[session].sent), 1)
+    message = json.loads(self.websockets[session].sent[0])
+    self.assertEqual(message["type"], "snapshot")
+    self.states[session] = (message["version"], message["state"])
+    self.websockets[session].sent.clear()
+
+  def assertClientsUpToDate(self):
+    for session, websocket in self.websockets.items():
+      expected = json.loads(self.handler.game.for_player(session))
+      if session not in self.states:
+        self.assertDictEqual(json.loads(websocket.sent[-1]), expected)
+        continue
+      version, state = self.states[session]
+      for raw in websocket.sent:
+        message = json.loads(raw)
+        self.assertEqual(message["type"], "patch")
+        self.assertEqual(message["base"], version)
+        version, state = message["version"], ApplyPatch(state, message["patch"])
+      self.states[session] = (version, state)
+      websocket.sent.clear()
+      self.assertDictEqual(state, expected)
+
+  def testPatchesRebuildState(self):
+    self.resync("A")
+    self.resync("B")
+    self.websockets["C"].sent.clear()
+    for session, color in [("A", "red"), ("B", "blue"), ("C", "deepskyblue")]:
+      self.handle(session, {"type": "join", "name": session, "color": color})
+      self.assertClientsUpToDate()
+    self.handle("A", {"type": "start"})
+    self.assertClientsUpToDate()
+    self.assertEqual(self.states["A"][0], self.handler.version)
+
+  def testPatchesAreSmall(self):
+    for session, color in [("A", "red"), ("B", "blue"), ("C", "deepskyblue")]:
+      self.handle(session, {"type": "join", "name": session, "color": color})
+    self.handle("A", {"type": "start"})
+    self.resync("A")
+    self.handle("C", {"type": "join", "name": "C", "color": "red"})
+    self.assertLess(len(self.websockets["A"].sent[-1]), len(self.websockets["C"].sent[-1]) / 10)
+    self.assertClientsUpToDate()
+
+  def testResyncAfterDisconnect(self):
+    self.resync("A")
+    asyncio.run(self.handler.disconnect_user("A", self.websockets["A"]))
+    self.assertNotIn(self.websockets["A"], self.handler.patch_bases)
+
+
+class SlowGame(game.BaseGame):
+  """Records when each move starts and ends. Moves of type "wait" block until release is set."""
+
+  def __init__(self):
+    self.moves = []
+    self.release = threading.Event()
+
+  def game_url(self, game_id):
+    return f"/slow?game_id={game_id}"
+
+  def connect_user(self, session):
+    pass
+
+  def disconnect_user(self, session):
+    pass
+
+  def json_str(self):
+    return json.dumps({"moves": self.moves})
+
+  def for_player(self, session):
+    return self.json_str()
+
+  def handle(self, session, data):
+    self.moves.append(("start", data["move"], threading.current_thread().name))
+    if data["type"] == "wait":
+      self.release.wait(5)
+    else:
+      time.sleep(0.01)
+    self.moves.append(("end", data["move"], threading.current_thread().name))
+
+  @classmethod
+  def parse_json(cls, data):
+    return cls()
+
+
+class LaneTest(unittest.TestCase):
+
+  def testMovesRunInOrderOffTheLoop(self):
+    handler = game.GameHandler("test", SlowGame)
+    websocket = FakeWebsocket()
+
+    async def Play():
+      await handler.connect_user("A", websocket)
+      await asyncio.gather(*[
+          handler.handle(websocket, "A", json.dumps({"type": "sleep", "move": idx}))
+          for idx in range(5)
+      ])
+    asyncio.run(Play())
+    moves = handler.game.moves
+    self.assertEqual(
+        [(kind, idx) for kind, idx, _ in moves],
+        [(kind, idx) for idx in range(5) for kind in ["start", "end"]],
+    )
+    self.assertNotIn(threading.main_thread().name, {thread for _, _, thread in moves})
+    self.assertEqual(json.loads(websocket.sent[-1])["moves"], [list(move) for move in moves])
+
+  def testGamesRunSideBySide(self):
+    waiting, other = game.GameHandler("waiting", SlowGame), game.GameHandler("other", SlowGame)
+    websocket = FakeWebsocket()
+
+    async def Play():
+      stuck = asyncio.ensure_future(
+          waiting.handle(websocket, "A", json.dumps({"type": "wait", "move": 0})))
+      await other.handle(websocket, "A", json.dumps({"type": "sleep", "move": 1}))
+      # The other game and the event loop carried on while the first game was still busy.
+      self.assertFalse(stuck.done())
+      self.assertEqual(len(waiting.game.moves), 1)
+      self.assertTrue(waiting.lane.locked())
+      waiting.game.release.set()
+      await stuck
+    asyncio.run(Play())
+    self.assertEqual([kind for kind, _, _ in waiting.game.moves], ["start", "end"])
+    self.assertEqual([kind for kind, _, _ in other.game.moves], ["start", "end"])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import random
+import time
+import unittest
+
+from eldritch import eldritch
+from eldritch import serialization
+from eldritch import simulation
+from islanders import islanders
+import game
+import metrics
+
+
+class FakeWebsocket:
+
+  async def send(self, data):
+    pass
+
+
+class FakeHttpHandler:
+
+  def __init__(self):
+    self.body = b""
+    self.status = None
+
+  def send_response(self, code):
+    self.status = code
+
+  def end_headers(self):
+    pass
+
+  def send_error(self, code, message=None):  # pylint: disable=unused-argument
+    self.status = code
+
+  @property
+  def wfile(self):
+    return self
+
+  def write(self, data):
+    self.body += data
+
+
+class ProfileTest(unittest.TestCase):
+
+  def testCountsAndHistograms(self):
+    profile = metrics.Profile()
+    profile.count("eldritch_resolve_total", label="DiceRoll")
+    profile.count("eldritch_resolve_total", 2, label="Sequence")
+    profile.observe("game_move_seconds", 0.003)
+    profile.observe("game_move_seconds", 7)
+    self.assertEqual(profile.total("eldritch_resolve_total"), 3)
+    self.assertEqual(profile.total("game_events_total"), 0)
+
+    data = json.loads(json.dumps(profile, cls=game.CustomEncoder))
+    self.assertEqual(data["eldritch_resolve_total"], {"DiceRoll": 1, "Sequence": 2})
+    move = data["game_move_seconds"][""]
+    self.assertEqual(move["count"], 2)
+    self.assertEqual(move["buckets"]["0.005"], 1)
+    self.assertEqual(sum(move["buckets"].values()), 1)  # 7 seconds only goes in +Inf.
+
+  def testRender(self):
+    first, second = metrics.Profile(), metrics.Profile()
+    first.count("eldritch_resolve_total", label="DiceRoll")
+    second.count("eldritch_resolve_total", 4, label="DiceRoll")
+    first.observe("game_events_per_move", 3)
+    second.observe("game_events_per_move", 30)
+    text = metrics.Render([("EldritchGame", first), ("EldritchGame", second)])
+    lines = text.splitlines()
+
+    self.assertIn("# TYPE eldritch_resolve_total counter", lines)
+    self.assertIn('eldritch_resolve_total{game_type="EldritchGame",event="DiceRoll"} 5', lines)
+    self.assertIn("# TYPE game_events_per_move histogram", lines)
+    self.assertIn('game_events_per_move_bucket{game_type="EldritchGame",le="5"} 1', lines)
+    self.assertIn('game_events_per_move_bucket{game_type="EldritchGame",le="50"} 2', lines)
+    self.assertIn('game_events_per_move_bucket{game_type="EldritchGame",le="+Inf"} 2', lines)
+    self.assertIn('game_events_per_move_sum{game_type="EldritchGame"} 33', lines)
+    self.assertIn('game_events_per_move_count{game_type="EldritchGame"} 2', lines)
+    self.assertNotIn("game_move_seconds", text)
+
+  def testServerProfile(self):
+    profile = metrics.Profile()
+    profile.observe("server_loop_lag_seconds", 0.2, "MainProcess")
+    lines = metrics.Render([(None, profile)]).splitlines()
+    self.assertIn('server_loop_lag_seconds_count{process="MainProcess"} 1', lines)
+
+  def testEscapesLabels(self):
+    profile = metrics.Profile()
+    profile.count("eldritch_resolve_total", label='a"b\\c')
+    text = metrics.Render([("EldritchGame", profile)])
+    self.assertIn('event="a\\"b\\\\c"', text)
+
+  def testNotSaved(self):
+    state = eldritch.GameState()
+    state.profile = metrics.Profile()
+    state.profile.count("game_events_total")
+    loaded = serialization.DecodeJson(serialization.EncodeJson(state))
+    self.assertIsInstance(loaded.profile, metrics.Profile)
+    self.assertEqual(loaded.profile.total("game_events_total"), 0)
+
+
+class EnableTest(unittest.TestCase):
+
+  def tearDown(self):
+    metrics.Disable()
+
+  def testSwapsMethods(self):
+    original = eldritch.GameState.get_triggers
+    metrics.Enable()
+    self.assertIsNot(eldritch.GameState.get_triggers, original)
+    self.assertEqual(eldritch.GameState.get_triggers.__name__, "get_triggers")
+    metrics.Disable()
+    self.assertIs(eldritch.GameState.get_triggers, original)
+
+  def play(self):
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    websocket = FakeWebsocket()
+    for session in ["A", "B"]:
+      asyncio.run(handler.connect_user(session, websocket))
+    moves = [
+        ("A", {"type": "ancient", "ancient": "Wendigo"}),
+        ("A", {"type": "join", "char": "Nun"}),
+        ("B", {"type": "join", "char": "Doctor"}),
+        ("A", {"type": "start"}),
+    ]
+    for session, data in moves:
+      asyncio.run(handler.handle(websocket, session, json.dumps(data)))
+    state = handler.game.game
+    sessions = {idx: session for session, idx in handler.game.player_sessions.items()}
+    policy = simulation.RandomPolicy(random.Random(0))
+    for _ in range(20):
+      char_idx, data = policy.candidates(state)[0][0]
+      asyncio.run(handler.handle(websocket, sessions[char_idx], json.dumps(data)))
+    return handler
+
+  def testDisabled(self):
+    handler = self.play()
+    self.assertIs(handler.game.game.profile, handler.profile)
+    self.assertEqual(handler.profile.json_repr(), {})
+
+  def testEnabled(self):
+    metrics.Enable()
+    handler = self.play()
+    profile = handler.profile
+    self.assertGreater(profile.total("game_events_total"), 10)
+    self.assertGreater(profile.total("eldritch_resolve_total"), profile.total("game_events_total"))
+    self.assertIn("Mythos", profile.counters["eldritch_resolve_total"])
+    self.assertGreater(profile.total("eldritch_possessions_scanned_total"), 0)
+    self.assertEqual(profile.histograms["game_move_seconds"][""].count, 24)
+    self.assertEqual(
+        profile.histograms["game_events_per_move"][""].sum, profile.total("game_events_total"),
+    )
+    self.assertGreater(profile.histograms["game_encode_seconds"][""].count, 0)
+    self.assertIn("triggers", profile.histograms["eldritch_collect_seconds"])
+
+    http_handler = FakeHttpHandler()
+    handler.handle_get(http_handler, "/profile", {})
+    data = json.loads(http_handler.body)
+    self.assertEqual(data["game_events_total"][""], profile.total("game_events_total"))
+
+  def testLoopLag(self):
+    metrics.Enable()
+    profile = metrics.Profile()
+
+    async def Block():
+      watcher = asyncio.ensure_future(metrics.WatchLoop(profile, interval=0.01))
+      await asyncio.sleep(0.02)
+      time.sleep(0.1)  # Holds up the event loop, as a slow move handled on it would.
+      await asyncio.sleep(0.02)
+      watcher.cancel()
+    asyncio.run(Block())
+    lag = profile.histograms["server_loop_lag_seconds"]["MainProcess"]
+    self.assertGreater(lag.count, 1)
+    self.assertGreater(lag.sum, 0.05)
+
+  def testLaneWait(self):
+    metrics.Enable()
+    handler = game.GameHandler("test", islanders.IslandersGame)
+    websocket = FakeWebsocket()
+    asyncio.run(handler.connect_user("A", websocket))
+    self.assertEqual(handler.profile.histograms["game_lane_wait_seconds"][""].count, 1)
+
+  def testOtherGames(self):
+    metrics.Enable()
+    handler = game.GameHandler("test", islanders.IslandersGame)
+    websocket = FakeWebsocket()
+    asyncio.run(handler.connect_user("A", websocket))
+    asyncio.run(handler.handle(websocket, "A", json.dumps({"type": "join", "name": "A"})))
+    self.assertEqual(handler.profile.histograms["game_move_seconds"][""].count, 1)
+    self.assertNotIn("game_events_total", handler.profile.counters)
+
+
+if __name__ == "__main__":
+  unittest.main()
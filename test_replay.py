@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import random
+import unittest
+from unittest import mock
+
+from eldritch import eldritch
+from eldritch import events
+from eldritch import simulation
+from islanders import islanders
+from powerplant import powerplant
+import game
+import replay
+from test_metrics import FakeHttpHandler
+
+
+class FakeWebsocket:
+
+  def __init__(self):
+    self.errors = 0
+
+  async def send(self, data):
+    if json.loads(data).get("type") == "error":
+      self.errors += 1
+
+
+class ReplayTest(unittest.TestCase):
+
+  def setUp(self):
+    self.websocket = FakeWebsocket()
+
+  def connect(self, handler, sessions):
+    for session in sessions:
+      asyncio.run(handler.connect_user(session, self.websocket))
+
+  def send(self, handler, session, data):
+    """Returns True if the move was accepted."""
+    errors = self.websocket.errors
+    asyncio.run(handler.handle(self.websocket, session, json.dumps(data)))
+    return self.websocket.errors == errors
+
+  def assertReplays(self, handler):
+    log = game.MoveLog.parse_json(handler.move_log.json_str())
+    replayed, _ = replay.Replay(log)
+    for session in handler.websockets:
+      self.assertEqual(replayed.for_player(session), handler.game.for_player(session))
+    return replayed
+
+  def testIslanders(self):
+    handler = game.GameHandler("test", islanders.IslandersGame)
+    self.connect(handler, ["A", "B"])
+    self.send(handler, "A", {"type": "join", "name": "A"})
+    self.send(handler, "B", {"type": "join", "name": "B"})
+    self.send(handler, "A", {"type": "start", "options": {}})
+    self.send(handler, "B", {"type": "roll_dice"})  # Rejected, but still part of the log.
+    self.assertEqual(len(handler.move_log.entries), 6)
+    replayed = self.assertReplays(handler)
+    self.assertEqual(replayed.game.dev_cards, handler.game.game.dev_cards)
+    self.assertEqual(replayed.rng.getstate(), handler.game.rng.getstate())
+
+  def testEldritch(self):
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    self.connect(handler, ["A", "B"])
+    self.send(handler, "A", {"type": "ancient", "ancient": "Wendigo"})
+    self.send(handler, "A", {"type": "join", "char": "Nun"})
+    self.send(handler, "B", {"type": "join", "char": "Doctor"})
+    self.send(handler, "A", {"type": "start"})
+    state = handler.game.game
+    sessions = {idx: session for session, idx in handler.game.player_sessions.items()}
+    policy = simulation.RandomPolicy(random.Random(0))
+    while state.turn_number < 1 and state.game_stage == "slumber":
+      for messages in policy.candidates(state):
+        if all(self.send(handler, sessions[char_idx], data) for char_idx, data in messages):
+          break
+    self.assertGreater(len(handler.move_log.entries), 10)
+    replayed = self.assertReplays(handler)
+    self.assertEqual(replayed.game.rng.getstate(), state.rng.getstate())
+
+  def testUntil(self):
+    handler = game.GameHandler("test", powerplant.PowerPlantGame)
+    self.connect(handler, ["A", "B"])
+    self.send(handler, "A", {"type": "join", "name": "A", "color": "red"})
+    self.send(handler, "B", {"type": "join", "name": "B", "color": "blue"})
+    before_start = handler.game.json_str()
+    self.send(handler, "A", {"type": "start"})
+    log = game.MoveLog.parse_json(handler.move_log.json_str())
+    self.assertEqual(replay.Replay(log, until=4)[0].json_str(), before_start)
+    replayed = self.assertReplays(handler)
+    self.assertEqual(replayed.json_str(), handler.game.json_str())
+
+  def testReplayFromSnapshot(self):
+    handler = game.GameHandler("test", islanders.IslandersGame)
+    self.connect(handler, ["A", "B"])
+    self.send(handler, "A", {"type": "join", "name": "A"})
+    self.send(handler, "B", {"type": "join", "name": "B"})
+    self.send(handler, "A", {"type": "start", "options": {}})
+
+    restored = game.GameHandler("test", islanders.IslandersGame)
+    data = handler.game.json_str()
+    restored.restore(islanders.IslandersGame.parse_json(data), data)
+    self.connect(restored, ["A", "B"])
+    self.send(restored, "A", {"type": "settle", "location": [5, 3]})
+    self.assertEqual(restored.move_log.snapshot, data)
+    self.assertReplays(restored)
+
+  def fetch(self, handler, path):
+    http_handler = FakeHttpHandler()
+    handler.handle_get(http_handler, path, {})
+    return http_handler.body.decode("ascii")
+
+  def testSecretsOnlyForOperator(self):
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    self.connect(handler, ["A"])
+    self.send(handler, "A", {"type": "ancient", "ancient": "Wendigo"})
+    self.send(handler, "A", {"type": "join", "char": "Nun"})
+    self.send(handler, "A", {"type": "start"})
+    rng = handler.game.game.rng
+    for path in ["/json", "/dump"]:
+      self.assertIs(eldritch.EldritchGame.parse_json(self.fetch(handler, path)).game.rng,
+                    events.random)
+    self.assertIsNone(game.MoveLog.parse_json(self.fetch(handler, "/log")).seed)
+
+    with mock.patch.object(game, "OPERATOR", new=True):
+      dumped = eldritch.EldritchGame.parse_json(self.fetch(handler, "/dump"))
+      log = game.MoveLog.parse_json(self.fetch(handler, "/log"))
+    self.assertEqual(dumped.game.rng.getstate(), rng.getstate())
+    self.assertEqual(log.seed, handler.move_log.seed)
+    self.assertEqual(replay.Replay(log)[0].game.rng.getstate(), rng.getstate())
+
+  def testSecureRandom(self):
+    game.SECURE_RANDOM = True
+    self.addCleanup(setattr, game, "SECURE_RANDOM", False)
+    handler = game.GameHandler("test", eldritch.EldritchGame)
+    self.assertIsNone(handler.move_log.seed)
+    self.assertIsInstance(handler.game.game.rng, random.SystemRandom)
+
+
+class SeedTest(unittest.TestCase):
+
+  def testSameSeedSameGame(self):
+    games = []
+    for seed in [5, 5, 6]:
+      state = eldritch.GameState(random.Random(seed))
+      state.handle_ancient("Wendigo")
+      state.handle_join(None, "Nun")
+      for _ in state.handle(None, {"type": "start"}):
+        pass
+      games.append([gate.handle for gate in state.gates] + [card.name for card in state.mythos])
+    self.assertEqual(games[0], games[1])
+    self.assertNotEqual(games[0], games[2])
+
+
+if __name__ == "__main__":
+  unittest.main()
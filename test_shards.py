@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+
+import asyncio
+import collections
+import http.client
+import io
+import json
+import socket
+import unittest
+from unittest import mock
+
+import server
+import shards
+
+
+class FakeWebsocket:
+
+  def __init__(self):
+    self.sent = []
+    self.changed = asyncio.Event()
+
+  async def send(self, data):
+    self.sent.append(data)
+    self.changed.set()
+
+  async def wait_for(self, count):
+    while len(self.sent) < count:
+      self.changed.clear()
+      await asyncio.wait_for(self.changed.wait(), 5)
+
+
+class FakeBackend:
+
+  def __init__(self, idx):
+    self.idx = idx
+
+  def game(self, game_id):  # pylint: disable=unused-argument
+    return None
+
+  def games(self):
+    return [{"game_id": f"game{self.idx}"}]
+
+  def index(self):
+    return self.idx
+
+  def close(self):
+    pass
+
+
+def Headers():
+  return http.client.parse_headers(io.BytesIO(b"\r\n"))
+
+
+class HashRingTest(unittest.TestCase):
+
+  def testSpreadsGames(self):
+    ring = shards.HashRing(4)
+    counts = collections.Counter(ring.shard(f"game{idx}") for idx in range(4000))
+    self.assertEqual(set(counts), {0, 1, 2, 3})
+    self.assertLess(max(counts.values()), 2 * min(counts.values()))
+    self.assertEqual(ring.shard("ab"), shards.HashRing(4).shard("ab"))
+
+  def testAddingShardOnlyMovesGamesToIt(self):
+    before, after = shards.HashRing(4), shards.HashRing(5)
+    moved = 0
+    for idx in range(4000):
+      game_id = f"game{idx}"
+      if before.shard(game_id) != after.shard(game_id):
+        self.assertEqual(after.shard(game_id), 4)
+        moved += 1
+    self.assertGreater(moved, 400)
+    self.assertLess(moved, 1400)
+
+
+class WriteTest(unittest.TestCase):
+
+  def testConcurrentWrites(self):
+    async def Test():
+      front, back = socket.socketpair()
+      worker_reader, worker_writer = await asyncio.open_connection(sock=back)
+      front_reader, front_writer = await asyncio.open_connection(sock=front)
+      worker = shards.Worker(worker_reader, worker_writer, FakeBackend(0))
+      shard = shards.Shard(None, front_reader, front_writer)
+      # Big enough to pause the transport, so that several writers wait to drain at once.
+      messages = [{"op": "send", "conn": idx, "data": "x" * 500000} for idx in range(8)]
+      for writer, reader in [(worker, front_reader), (shard, worker_reader)]:
+        writes = asyncio.gather(*[writer.write(message) for message in messages])
+        received = [await shards.ReadMessage(reader) for _ in messages]
+        await writes
+        self.assertEqual(received, messages)
+      worker_writer.close()
+      front_writer.close()
+    asyncio.run(Test())
+
+
+class ShardedServerTest(unittest.TestCase):
+  """Runs the front end and a worker in the same process, connected by a socket pair."""
+
+  def setUp(self):
+    patches = [
+        mock.patch.dict(server.GAMES, clear=True),
+        mock.patch.object(server, "SHARDS", []),
+        mock.patch.object(server, "RING", shards.HashRing(1)),
+    ]
+    for patch in patches:
+      patch.start()
+      self.addCleanup(patch.stop)
+
+  async def run_test(self, test):
+    front, back = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=back)
+    worker = asyncio.ensure_future(shards.Worker(reader, writer, server.ShardBackend()).run())
+    reader, writer = await asyncio.open_connection(sock=front)
+    shard = shards.Shard(None, reader, writer)
+    shard.start()
+    server.SHARDS.append(shard)
+    try:
+      await test(shard)
+    finally:
+      writer.close()
+      await writer.wait_closed()
+      await asyncio.wait_for(worker, 5)
+      shard.reading.cancel()
+
+  async def request(self, command, path, body=b""):
+    handler = server.MyHandler(command, path, Headers(), body)
+    await (handler.do_GET() if command == "GET" else handler.do_POST())
+    return handler
+
+  def testRequests(self):
+    async def Test(shard):
+      handler = await self.request("POST", "/new", b"type=islanders")
+      self.assertEqual(handler.status.value, 301)
+      self.assertEqual(len(server.GAMES), 1)
+      game_id = next(iter(server.GAMES))
+      self.assertIn(("Location", server.GAMES[game_id].game_url()), handler.response_headers)
+
+      handler = await self.request("GET", f"/json?game_id={game_id}")
+      self.assertEqual(handler.status.value, 200)
+      self.assertEqual(handler.wfile.getvalue(), server.GAMES[game_id].game.json_str().encode())
+      handler = await self.request("GET", "/json?game_id=nope")
+      self.assertEqual(handler.status.value, 400)
+      handler = await self.request("POST", f"/nothing?game_id={game_id}")
+      self.assertEqual(handler.status.value, 404)
+      handler = await self.request("GET", f"/index.html?game_id={game_id}")
+      self.assertEqual(handler.status.value, 200)  # Static files come from the front end.
+
+      while not shard.games:
+        await asyncio.sleep(0.01)
+      self.assertEqual([game["game_id"] for game in server.GameList()], [game_id])
+      profiles = await server.Profiles()
+      # The front end and the worker each have a profile of their own, with no game type.
+      self.assertEqual([game_type for game_type, _ in profiles], [None, None, "IslandersGame"])
+    asyncio.run(self.run_test(Test))
+
+  def testWebsockets(self):
+    async def Test(shard):
+      server.CreateLocalGame("ab", "islanders")
+      websocket = FakeWebsocket()
+
+      async def Messages():
+        await websocket.wait_for(1)  # The state pushed when connecting.
+        yield json.dumps({"type": "join", "name": "Alice"})
+        await websocket.wait_for(2)
+      self.assertTrue(await shard.relay(websocket, "ab", "session1", Messages()))
+      while server.GAMES["ab"].websockets:  # The worker disconnects the websocket after relay().
+        await asyncio.sleep(0.01)
+      self.assertNotEqual(json.loads(websocket.sent[-1]).get("type"), "error")
+      self.assertIn("Alice", websocket.sent[-1])
+
+      async def NoMessages():
+        return
+        yield  # pylint: disable=unreachable
+      self.assertFalse(await shard.relay(FakeWebsocket(), "cd", "session1", NoMessages()))
+    asyncio.run(self.run_test(Test))
+
+
+class WorkerProcessTest(unittest.TestCase):
+
+  def testStartAndStop(self):
+    async def Test(pairs):
+      workers = await shards.ConnectWorkers(pairs)
+      self.assertEqual([await shard.call("index") for shard in workers], [0, 1])
+      while not all(shard.games for shard in workers):
+        await asyncio.sleep(0.01)
+      self.assertEqual([shard.games for shard in workers],
+                       [[{"game_id": "game0"}], [{"game_id": "game1"}]])
+      for shard in workers:
+        await shard.stop()
+      return workers
+
+    pairs = shards.StartWorkers(2, FakeBackend, lambda idx: (idx,))
+    workers = asyncio.run(Test(pairs))
+    self.assertEqual([shard.process.exitcode for shard in workers], [0, 0])
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+import asyncio
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import server
+import static
+
+
+class StaticFileTest(unittest.TestCase):
+
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+    self.addCleanup(self.dir.cleanup)
+    self.cache = static.AssetCache([self.dir.name], recheck_seconds=0)
+
+  def write(self, name, data):
+    path = os.path.join(self.dir.name, name)
+    with open(path, "wb") as writer:
+      writer.write(data)
+    return path
+
+  def testCompressedVariants(self):
+    body = b"function foo() { return 1; }\n" * 100
+    static_file = self.cache.get(self.write("game.js", body))
+    self.assertTrue(static_file.content_type.startswith("text/javascript"))
+    encoding, etag, data = static_file.variant("gzip, deflate")
+    self.assertEqual(encoding, "gzip")
+    self.assertEqual(gzip.decompress(data), body)
+    self.assertNotEqual(etag, static_file.etag)
+    self.assertEqual(static_file.variant(None), (None, static_file.etag, body))
+    self.assertEqual(static_file.variant("gzip;q=0")[0], None)
+
+  def testImagesAreNotCompressed(self):
+    static_file = self.cache.get(self.write("hex.png", b"\x89PNG" * 1000))
+    self.assertTrue(static_file.is_image())
+    self.assertEqual(static_file.variant("gzip, br")[0], None)
+
+  def testReloadsModifiedFiles(self):
+    path = self.write("a.js", b"one")
+    first = self.cache.get(path)
+    self.assertIs(self.cache.get(path), first)
+    self.write("a.js", b"three")
+    second = self.cache.get(path)
+    self.assertEqual(second.body, b"three")
+    self.assertNotEqual(first.etag, second.etag)
+    os.remove(path)
+    self.assertIsNone(self.cache.get(path))
+
+  def testGenerated(self):
+    body = b'{"a": "' + b"x" * 1000 + b'"}'
+    generated = static.StaticFile.generated("/game/catalog.json", body)
+    self.assertEqual(generated.content_type, "application/json")
+    self.assertEqual(generated.size, len(body))
+    self.assertIn("gzip", generated.encoded)
+    self.assertEqual(generated.etag, static.StaticFile.generated("/other.json", body).etag)
+
+  def testMissingAndDirectories(self):
+    self.assertIsNone(self.cache.get(os.path.join(self.dir.name, "nope.js")))
+    self.assertIsNone(self.cache.get(self.dir.name))
+
+  def testRanges(self):
+    static_file = self.cache.get(self.write("beep.mp3", bytes(range(100))))
+    self.assertIsNone(static_file.byte_range(None))
+    self.assertIsNone(static_file.byte_range("bytes=1-2,4-5"))
+    self.assertEqual(static_file.byte_range("bytes=10-19"), (10, 10))
+    self.assertEqual(static_file.byte_range("bytes=90-"), (90, 10))
+    self.assertEqual(static_file.byte_range("bytes=95-200"), (95, 5))
+    self.assertEqual(static_file.byte_range("bytes=-5"), (95, 5))
+    for bad in ["bytes=100-", "bytes=20-10", "bytes=-0"]:
+      with self.subTest(bad=bad), self.assertRaises(static.RangeNotSatisfiable):
+        static_file.byte_range(bad)
+
+  def testEtagMatches(self):
+    self.assertTrue(static.EtagMatches('"a", "b"', '"b"'))
+    self.assertTrue(static.EtagMatches('W/"b"', '"b"'))
+    self.assertTrue(static.EtagMatches("*", '"b"'))
+    self.assertFalse(static.EtagMatches('"a"', '"b"'))
+    self.assertFalse(static.EtagMatches(None, '"b"'))
+
+
+class ServeStaticTest(unittest.TestCase):
+
+  def request(self, path, **headers):
+    async def Fetch():
+      http_server = await asyncio.start_server(server.HandleHttp, "127.0.0.1", 0)
+      port = http_server.sockets[0].getsockname()[1]
+      reader, writer = await asyncio.open_connection("127.0.0.1", port)
+      lines = [f"GET {path} HTTP/1.1", "Connection: close"]
+      lines.extend(f"{name.replace('_', '-')}: {value}" for name, value in headers.items())
+      writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1"))
+      response = await reader.read()
+      writer.close()
+      http_server.close()
+      await http_server.wait_closed()
+      return response
+
+    head, _, body = asyncio.run(Fetch()).partition(b"\r\n\r\n")
+    lines = head.decode("latin-1").split("\r\n")
+    response_headers = dict(line.split(": ", 1) for line in lines[1:])
+    return int(lines[0].split()[1]), response_headers, body
+
+  def testNotModified(self):
+    status, headers, body = self.request("/index.html", Accept_Encoding="gzip")
+    self.assertEqual(status, 200)
+    self.assertEqual(headers["Content-Encoding"], "gzip")
+    with open(os.path.join(server.ROOT_DIR, "index.html"), "rb") as reader:
+      self.assertEqual(gzip.decompress(body), reader.read())
+    etag = headers["ETag"]
+    status, _, body = self.request("/index.html", Accept_Encoding="gzip", If_None_Match=etag)
+    self.assertEqual(status, 304)
+    self.assertEqual(body, b"")
+
+  def testRange(self):
+    status, headers, body = self.request("/beep.mp3", Range="bytes=0-9")
+    self.assertEqual(status, 206)
+    self.assertEqual(headers["Content-Type"], "audio/mpeg")
+    size = os.path.getsize(os.path.join(server.ROOT_DIR, "beep.mp3"))
+    self.assertEqual(headers["Content-Range"], f"bytes 0-9/{size}")
+    self.assertEqual(len(body), 10)
+    status, _, _ = self.request("/beep.mp3", Range="bytes=999999-")
+    self.assertEqual(status, 416)
+
+  def testSendfile(self):
+    with mock.patch.object(static, "SENDFILE_SIZE", new=0):
+      server.STATIC_FILES.files.clear()
+      self.addCleanup(server.STATIC_FILES.files.clear)
+      status, headers, body = self.request("/beep.mp3", Range="bytes=10-")
+    self.assertEqual(status, 206)
+    with open(os.path.join(server.ROOT_DIR, "beep.mp3"), "rb") as reader:
+      self.assertEqual(body, reader.read()[10:])
+    self.assertEqual(int(headers["Content-Length"]), len(body))
+
+  def testForbiddenAndMissing(self):
+    self.assertEqual(self.request("/../etc/passwd")[0], 403)
+    self.assertEqual(self.request("/missing.js")[0], 404)
+
+  def testCatalog(self):
+    status, headers, body = self.request("/eldritch/catalog.json", Accept_Encoding="gzip")
+    self.assertEqual(status, 200)
+    self.assertEqual(headers["Content-Type"], "application/json")
+    self.assertEqual(headers["Content-Encoding"], "gzip")
+    catalog = json.loads(gzip.decompress(body))
+    self.assertIn("Nun", catalog["characters"])
+    self.assertIn("Wendigo", catalog["ancients"])
+    etag = headers["ETag"]
+    status, _, body = self.request(
+        "/eldritch/catalog.json", Accept_Encoding="gzip", If_None_Match=etag,
+    )
+    self.assertEqual(status, 304)
+    self.assertEqual(body, b"")
+    self.assertEqual(self.request("/islanders/catalog.json")[0], 404)
+
+
+if __name__ == "__main__":
+  unittest.main()
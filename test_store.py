@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+
+import asyncio
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from islanders import islanders
+import game
+import server
+import store
+
+
+class FakeWebsocket:
+
+  async def send(self, data):
+    pass
+
+
+class StoreTestMixin:
+  """Tests for every GameStore. Test cases define FILENAME and open_store(path)."""
+
+  def setUp(self):
+    self.dir = tempfile.TemporaryDirectory()  # pylint: disable=consider-using-with
+    self.addCleanup(self.dir.cleanup)
+    self.path = os.path.join(self.dir.name, self.FILENAME)
+
+  def testSaveAndLoad(self):
+    game_store = self.open_store(self.path)
+    game_store.save("ab", "IslandersGame", "{}")
+    game_store.save("cd", "PowerPlantGame", '{"x": 1}')
+    game_store.save("ab", "IslandersGame", '{"y": 2}')
+    game_store.close()
+
+    game_store = self.open_store(self.path)
+    self.assertCountEqual(
+        game_store.load_all(),
+        [("ab", "IslandersGame", '{"y": 2}'), ("cd", "PowerPlantGame", '{"x": 1}')],
+    )
+    game_store.save("ef", "MansionGame", "{}")
+    self.assertEqual(len(game_store.load_all()), 3)
+    game_store.close()
+
+
+class SqliteStoreTest(StoreTestMixin, unittest.TestCase):
+
+  FILENAME = "games.db"
+
+  def open_store(self, path):
+    return store.SqliteStore(path)
+
+
+class AppendOnlyStoreTest(StoreTestMixin, unittest.TestCase):
+
+  FILENAME = "games.log"
+
+  def open_store(self, path):
+    return store.AppendOnlyStore(path)
+
+  def testCompactsAndSkipsTornLines(self):
+    game_store = store.AppendOnlyStore(self.path)
+    for idx in range(5):
+      game_store.save("ab", "IslandersGame", json.dumps({"idx": idx}))
+    game_store.close()
+    with open(self.path, "a", encoding="utf-8") as writer:
+      writer.write('{"game_id": "ab", "game_ty')
+
+    game_store = store.AppendOnlyStore(self.path)
+    self.assertEqual(game_store.load_all(), [("ab", "IslandersGame", '{"idx": 4}')])
+    with open(self.path, encoding="utf-8") as reader:
+      self.assertEqual(len(reader.readlines()), 1)
+
+  @mock.patch.object(store.AppendOnlyStore, "MIN_COMPACT_BYTES", new=1000)
+  def testCompactsWhileRunning(self):
+    game_store = store.AppendOnlyStore(self.path)
+    for idx in range(200):
+      game_store.save(f"game{idx % 3}", "IslandersGame", json.dumps({"idx": idx}))
+      self.assertLess(os.path.getsize(self.path), 2000)
+    game_store.close()
+    self.assertEqual(
+        store.AppendOnlyStore(self.path).load_all(),
+        [(f"game{idx % 3}", "IslandersGame", json.dumps({"idx": idx})) for idx in range(197, 200)],
+    )
+
+
+class FakeStore(store.GameStore):
+
+  def __init__(self):
+    self.saved = []
+
+  def save(self, game_id, game_type, data):
+    self.saved.append((game_id, game_type, data))
+
+  def load_all(self):
+    latest = {game_id: (game_id, game_type, data) for game_id, game_type, data in self.saved}
+    return list(latest.values())
+
+
+class SnapshotTest(unittest.TestCase):
+
+  def setUp(self):
+    self.store = FakeStore()
+    patcher = mock.patch.object(game.GameHandler, "SNAPSHOT_INTERVAL", new=0.05)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+    self.handler = game.GameHandler("test", islanders.IslandersGame, self.store)
+    self.websocket = FakeWebsocket()
+
+  async def play(self, moves, pause):
+    await self.handler.connect_user("A", self.websocket)
+    await self.handler.connect_user("B", self.websocket)
+    for session, move in moves:
+      await self.handler.handle(self.websocket, session, json.dumps(move))
+      await asyncio.sleep(pause)
+    await asyncio.sleep(self.handler.SNAPSHOT_INTERVAL * 2)
+    await self.handler.settle_snapshot()
+
+  def testSnapshotsAreThrottled(self):
+    moves = [("A", {"type": "join", "name": "A", "color": "red"})]
+    moves += [("A", {"type": "scenario", "scenario": "Beginner's Map"})] * 20
+    start = time.monotonic()
+    asyncio.run(self.play(moves, 0.01))
+    elapsed = time.monotonic() - start
+    self.assertGreater(len(self.store.saved), 1)
+    # At most one snapshot per interval, however long the moves took to handle.
+    self.assertLess(len(self.store.saved), min(elapsed / self.handler.SNAPSHOT_INTERVAL + 1, 21))
+    self.assertEqual(self.store.saved[-1][2], self.handler.game.json_str())
+    self.assertFalse(self.handler.dirty)
+
+  def testMovesDoNotWaitForWrites(self):
+    writing = threading.Event()
+    finish = threading.Event()
+    save = self.store.save
+
+    def SlowSave(*args):
+      writing.set()
+      finish.wait(5)
+      save(*args)
+    self.store.save = SlowSave
+
+    async def Test():
+      await self.handler.connect_user("A", self.websocket)
+      await self.handler.handle(self.websocket, "A", json.dumps({"type": "join", "name": "A"}))
+      while not writing.is_set():
+        await asyncio.sleep(0.01)
+      # The snapshot is still being written, but the game is free for the next move.
+      move = {"type": "scenario", "scenario": "Beginner's Map"}
+      await asyncio.wait_for(self.handler.handle(self.websocket, "A", json.dumps(move)), 1)
+      self.assertEqual(self.handler.game.scenario, "Beginner's Map")
+      finish.set()
+      await self.handler.settle_snapshot()
+    asyncio.run(Test())
+    self.assertTrue(self.store.saved)
+
+  def testRestore(self):
+    moves = [
+        ("A", {"type": "join", "name": "A", "color": "red"}),
+        ("B", {"type": "join", "name": "B", "color": "blue"}),
+        ("A", {"type": "start", "options": {}}),
+    ]
+    asyncio.run(self.play(moves, 0))
+    self.assertIsNotNone(self.handler.game.game)
+
+    server.GAMES.clear()
+    self.addCleanup(server.GAMES.clear)
+    server.LoadGames(self.store)
+    self.assertIn("test", server.GAMES)
+    restored = server.GAMES["test"].game
+    self.assertIsNotNone(restored.game)
+    self.assertEqual(restored.json_str(), self.handler.game.json_str())
+
+
+if __name__ == "__main__":
+  unittest.main()